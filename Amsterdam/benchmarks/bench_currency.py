@@ -0,0 +1,177 @@
+"""
+bench_currency.py - Totaux des depenses en plusieurs devises.
+
+Genere N depenses (200 000 par defaut) en EUR, GBP et CHF sur les jours
+d'un voyage, avec une table de taux de change dates, puis compare:
+- avant: chaque rafraichissement reconvertit toutes les lignes (taux
+  cherche dans la table a chaque ligne)
+- apres, recalcul complet: montants additionnes par paquet (devise,
+  date, categorie, participant), puis chaque paquet converti une fois
+  avec le taux garde en cache (data_manager._compute_depenses_totals)
+- apres, changement d'un taux: seuls les paquets sont reconvertis
+  (data_manager._convert_totals), les depenses ne sont pas relues
+- apres, rafraichissement sans changement: les totaux maintenus sont lus
+
+La recherche du taux est aussi mesuree seule, avec et sans le cache
+(exchange_rates.rate).
+
+Usage:
+    python benchmarks/bench_currency.py [depenses]
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_manager
+import exchange_rates
+import records
+from config import BUDGET_CATEGORIES
+
+PARTICIPANTS = ["Groupe", "Alice", "Bob", "Chloe", "David", "Emma"]
+DEVISES = ["EUR", "GBP", "CHF"]
+DATES = ["2025-09-{:02d}".format(day) for day in range(1, 31)]
+
+
+def make_depenses(n):
+    """
+    Genere n depenses (un tiers par devise, un taux par jour).
+    """
+    rng = random.Random(42)
+    depenses = []
+    for i in range(n):
+        devise = DEVISES[i % len(DEVISES)]
+        item = {
+            "id": i + 1,
+            "date": DATES[i % len(DATES)],
+            "categorie": rng.choice(BUDGET_CATEGORIES),
+            "montant": rng.randint(1, 25000) / 100,
+            "description": "Depense",
+            "participant": rng.choice(PARTICIPANTS),
+        }
+        if devise != "EUR":
+            item["devise"] = devise
+        depenses.append(records.Depense.from_dict(item))
+    return depenses
+
+
+def make_rates():
+    """
+    Ecrit la table des taux (un taux par jour pour GBP et CHF).
+    """
+    rng = random.Random(7)
+    for date_str in DATES:
+        exchange_rates.set_rate("GBP", date_str, "0.{}".format(rng.randint(8400, 8600)))
+        exchange_rates.set_rate("CHF", date_str, "0.{}".format(rng.randint(9300, 9500)))
+
+
+def totals_before(depenses):
+    """
+    Reconversion de chaque ligne (taux cherche a chaque ligne, sans cache).
+    """
+    total = 0
+    by_category = {}
+    for d in depenses:
+        devise = d.get('devise') or "EUR"
+        montant = d.cents('montant')
+        if devise != "EUR":
+            exchange_rates._memo.clear()
+            montant = exchange_rates.convert(montant, devise, "EUR", d.get('date'))
+        total += montant
+        cat = d.get('categorie', 'Autre')
+        by_category[cat] = by_category.get(cat, 0) + montant
+    return total, by_category
+
+
+def buckets_of(depenses):
+    """
+    Somme des montants par paquet (comme data_manager._compute_depenses_totals).
+    """
+    buckets = {}
+    counts = {}
+    for d in depenses:
+        key = (d.get('devise') or '', d.get('date') or '',
+               d.get('categorie', 'Autre'), d.get('participant') or '')
+        buckets[key] = buckets.get(key, 0) + d.cents('montant')
+        counts[key] = counts.get(key, 0) + 1
+    return buckets, counts
+
+
+def totals_after(depenses):
+    """
+    Recalcul complet: paquets, puis une conversion par paquet.
+    """
+    buckets, counts = buckets_of(depenses)
+    return data_manager._convert_buckets(buckets, counts, "EUR")
+
+
+def timed(function, repeat=5):
+    """
+    Appelle une fonction plusieurs fois.
+
+    Returns:
+        Tuple (resultat, duree mediane en ms)
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(durations)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    directory = tempfile.mkdtemp(prefix="bench_currency_")
+    path = os.path.join(directory, "taux_de_change.json")
+    exchange_rates.load(path)
+    make_rates()
+
+    depenses = make_depenses(n)
+    print("{} depenses, {} taux de change".format(n, 2 * len(DATES)))
+
+    (_, _), before = timed(lambda: totals_before(depenses))
+    _, after = timed(lambda: totals_after(depenses))
+
+    # Totaux maintenus, comme apres le chargement des depenses
+    buckets, counts = buckets_of(depenses)
+    data_manager._totals["buckets"] = buckets
+    data_manager._totals["bucket_count"] = counts
+    data_manager._totals["devise"] = "EUR"
+    data_manager._data['budget'] = {"devise": "EUR"}
+
+    def change_rate():
+        exchange_rates.set_rate("GBP", "2025-09-15", "0.8500")
+        data_manager._convert_totals()
+    _, reconvert = timed(change_rate)
+    _, read = timed(lambda: data_manager._totals["depenses"], repeat=1000)
+
+    print("Rafraichissement des totaux (total et categories):")
+    print("  avant (chaque ligne reconvertie)       {:9.2f} ms".format(before))
+    print("  apres, recalcul complet (paquets)      {:9.2f} ms  (x{:.1f})".format(after, before / after))
+    print("  apres, changement d'un taux            {:9.2f} ms  ({} paquets, ecriture du fichier comprise)".format(
+        reconvert, len(buckets)))
+    print("  apres, sans changement (totaux lus)    {:9.4f} ms".format(read))
+
+    keys = [(d.get('devise') or "EUR", d.get('date')) for d in depenses[:50000]]
+
+    def lookups(memo):
+        for devise, date_str in keys:
+            if not memo:
+                exchange_rates._memo.clear()
+            exchange_rates.rate(devise, "EUR", date_str)
+    _, uncached = timed(lambda: lookups(False))
+    _, cached = timed(lambda: lookups(True))
+    print("Recherche du taux ({} lignes):".format(len(keys)))
+    print("  sans cache   {:8.2f} ms".format(uncached))
+    print("  avec cache   {:8.2f} ms  (x{:.1f})".format(cached, uncached / cached))
+
+
+if __name__ == "__main__":
+    main()
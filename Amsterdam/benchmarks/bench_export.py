@@ -0,0 +1,125 @@
+"""
+bench_export.py - Debit et memoire des exports en flux (exporter.py).
+
+Pour chaque nombre d'elements (100 000 et 1 000 000 par defaut) et
+chaque export, formate et ecrit des elements generes a la volee (aucune
+collection n'est gardee en memoire), chacun dans un processus neuf, et
+mesure:
+- le debit (elements/s et Mo/s)
+- le pic de memoire du processus (ru_maxrss), qui ne doit pas dependre
+  du nombre d'elements
+
+Usage:
+    python benchmarks/bench_export.py [elements ...]
+"""
+
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import BUDGET_CATEGORIES, CHECKLIST_CATEGORIES, PARTICIPANT_ROLES
+
+
+def generate_items(collection, n):
+    """
+    Genere n elements d'une collection, un par un.
+
+    Args:
+        collection: La collection (activites, depenses, participants, checklist)
+        n: Le nombre d'elements
+
+    Yields:
+        Les enregistrements (voir records.py)
+    """
+    import records
+
+    record_type = records.COLLECTION_TYPES[collection]
+    for i in range(n):
+        day = "2025-09-{:02d}".format(15 + i % 6)
+        if collection == "activites":
+            item = {"id": i + 1, "date": day, "nom": "Activite {}".format(i),
+                    "lieu": "Museumplein", "horaire": "{:02d}:30".format(8 + i % 12),
+                    "duree": "1h30", "prix": i % 40, "description": "Visite, guide"}
+        elif collection == "depenses":
+            item = {"id": i + 1, "date": day,
+                    "categorie": BUDGET_CATEGORIES[i % len(BUDGET_CATEGORIES)],
+                    "montant": (i % 20000) / 100, "description": "Depense {}".format(i),
+                    "participant": "Groupe"}
+        elif collection == "participants":
+            item = {"id": i + 1, "nom": "Nom{}".format(i), "prenom": "Prenom",
+                    "email": "p{}@example.com".format(i), "telephone": "06 00 00 00 00",
+                    "role": PARTICIPANT_ROLES[i % len(PARTICIPANT_ROLES)],
+                    "date_naissance": "2000-05-15", "allergies": "", "notes": "Note"}
+        else:
+            item = {"id": i + 1, "item": "Item {}".format(i),
+                    "categorie": CHECKLIST_CATEGORIES[i % len(CHECKLIST_CATEGORIES)],
+                    "checked": i % 2 == 0}
+        yield record_type.from_dict(item)
+
+
+def peak_rss_mb():
+    """
+    Retourne le pic de memoire du processus en Mo.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Octets sous macOS, kilo-octets sous Linux
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def measure(name, path, n, results):
+    """
+    Ecrit n elements generes avec un export.
+
+    Args:
+        name: Le nom de l'export (cle de exporter.EXPORTS)
+        path: Le fichier a ecrire
+        n: Le nombre d'elements
+        results: File des resultats
+    """
+    import exporter
+
+    items = generate_items(exporter.EXPORTS[name].collection, n)
+    start = time.perf_counter()
+    stats = exporter.write_export(name, path, items, total=n)
+    elapsed = time.perf_counter() - start
+    results.put((stats["rows"], stats["bytes"], elapsed, peak_rss_mb()))
+
+
+def bench_count(directory, n):
+    """
+    Mesure tous les exports pour n elements.
+    """
+    import exporter
+
+    ctx = multiprocessing.get_context("spawn")
+    print("{} elements".format(n))
+    for name, spec in exporter.EXPORTS.items():
+        path = os.path.join(directory, name + spec.extension)
+        results = ctx.Queue()
+        p = ctx.Process(target=measure, args=(name, path, n, results))
+        p.start()
+        rows, size, elapsed, peak = results.get()
+        p.join()
+        os.remove(path)
+        print("  {:20s} {:9.0f} elements/s  {:6.1f} Mo/s  ({:7.1f} Mo)  pic {:5.1f} Mo".format(
+            name, rows / elapsed, size / 1e6 / elapsed, size / 1e6, peak))
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [100000, 1000000]
+    directory = tempfile.mkdtemp(prefix="bench_export_")
+    try:
+        for n in counts:
+            bench_count(directory, n)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
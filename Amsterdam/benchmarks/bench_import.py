@@ -0,0 +1,171 @@
+"""
+bench_import.py - Debit et memoire de l'import en flux (importer.py).
+
+Genere un releve CSV de N depenses (500 000 par defaut, 1 % de doublons
+et 1 % de lignes invalides), puis mesure, chacun dans un processus neuf
+(pic de memoire propre a la mesure):
+- lecture:   lecture + validation + normalisation + dedoublonnage, en
+             serie, sans ajout dans les donnees
+- parallele: la meme chose avec le pool de processus (au moins deux;
+             import_file ne s'en sert que s'il y a plus d'un processeur)
+- import:    import complet dans un repertoire de donnees temporaire
+             (ajout par lots, journal, sauvegarde finale)
+
+Le pic de memoire (ru_maxrss) ne doit pas dependre du nombre de lignes
+pour la lecture; pour l'import, il grandit avec les depenses ajoutees
+(elles sont en memoire), pas avec la taille du fichier.
+
+Usage:
+    python benchmarks/bench_import.py [lignes ...]
+"""
+
+import csv
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import BUDGET_CATEGORIES
+
+
+def generate_csv(path, rows):
+    """
+    Ecrit un releve CSV de depenses (format francais: point-virgule,
+    dates JJ/MM/AAAA, virgule decimale).
+
+    Args:
+        path: Le chemin du fichier
+        rows: Le nombre de lignes
+    """
+    rng = random.Random(42)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(["Date", "Categorie", "Montant", "Libelle", "Paye par"])
+        previous = None
+        for i in range(rows):
+            choice = rng.random()
+            if choice < 0.01 and previous:
+                writer.writerow(previous)
+                continue
+            if choice < 0.02:
+                writer.writerow(["pas une date", "Autre", "1,00", "Invalide", ""])
+                continue
+            previous = [
+                "{:02d}/09/2025".format(15 + i % 6),
+                rng.choice(BUDGET_CATEGORIES),
+                "{:.2f}".format(rng.uniform(1, 200)).replace(".", ","),
+                "Depense {}".format(i),
+                rng.choice(["Groupe", "Alice", "Bob"]),
+            ]
+            writer.writerow(previous)
+
+
+def peak_rss_mb():
+    """
+    Retourne le pic de memoire du processus en Mo.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Octets sous macOS, kilo-octets sous Linux
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def measure_pipeline(path, workers, results):
+    """
+    Lit, valide et dedoublonne le fichier sans rien ajouter.
+
+    Args:
+        path: Le fichier CSV
+        workers: Le nombre de processus du pool (0: en serie)
+        results: File des resultats
+    """
+    import importer
+
+    start = time.perf_counter()
+    stats = {"rows": 0, "duplicates": 0, "rejected": 0, "errors": []}
+    items = 0
+    with open(path, "rb") as f:
+        _, kind, rows = importer.open_rows(path, f)
+        checked = importer._checked(kind, rows, workers)
+        for chunk in importer._deduplicated(checked, importer._digest_set(), stats):
+            items += len(chunk)
+    elapsed = time.perf_counter() - start
+    results.put((stats["rows"], items, elapsed, peak_rss_mb()))
+
+
+def measure_import(path, directory, results):
+    """
+    Importe le fichier dans un repertoire de donnees neuf et sauvegarde.
+
+    Args:
+        path: Le fichier CSV
+        directory: Le repertoire de donnees
+        results: File des resultats
+    """
+    import data_manager
+    import importer
+
+    data_manager._set_trip_paths(directory)
+    data_manager.load_data()
+
+    start = time.perf_counter()
+    stats = importer.import_file(path)
+    data_manager.save_data()
+    elapsed = time.perf_counter() - start
+    results.put((stats["rows"], stats["imported"], elapsed, peak_rss_mb()))
+
+
+def run(ctx, target, args):
+    """
+    Lance une mesure dans un processus neuf.
+
+    Returns:
+        Tuple (lignes lues, elements retenus, duree en s, pic memoire en Mo)
+    """
+    results = ctx.Queue()
+    p = ctx.Process(target=target, args=args + (results,))
+    p.start()
+    outcome = results.get()
+    p.join()
+    return outcome
+
+
+def bench_rows(directory, rows):
+    """
+    Mesure l'import d'un releve de rows lignes.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    path = os.path.join(directory, "releve_{}.csv".format(rows))
+    generate_csv(path, rows)
+    size_mb = os.path.getsize(path) / 1e6
+
+    cpus = os.cpu_count() or 1
+    print("{} lignes ({:.1f} Mo), {} processeur(s)".format(rows, size_mb, cpus))
+    measures = [
+        ("lecture", measure_pipeline, (path, 0)),
+        ("parallele", measure_pipeline, (path, max(2, cpus))),
+        ("import", measure_import, (path, os.path.join(directory, "data_{}".format(rows)))),
+    ]
+    for name, target, args in measures:
+        read, kept, elapsed, peak = run(ctx, target, args)
+        print("  {:10s} {:8d} retenues  {:6.2f} s  {:9.0f} lignes/s  pic {:6.1f} Mo".format(
+            name, kept, elapsed, read / elapsed, peak))
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [500000]
+    directory = tempfile.mkdtemp(prefix="bench_import_")
+    try:
+        for rows in sizes:
+            bench_rows(directory, rows)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
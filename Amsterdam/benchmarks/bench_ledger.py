@@ -0,0 +1,290 @@
+"""
+bench_ledger.py - Registre des depenses en colonnes.
+
+Genere N depenses (300 000 par defaut) puis compare la liste de
+dictionnaires (avant), l'IdMap d'enregistrements (mode par defaut) et
+le registre en colonnes (mode COLUMNAR_DEPENSES, voir ledger.py):
+- recalcul des totaux (total, par categorie): une boucle Python par
+  depense, ou une addition par paquet sur les colonnes
+- IDs des depenses d'une categorie: parcours de la liste, ou selection
+  sur les codes de la colonne (aucune depense decodee)
+- ouverture: lecture du JSON, du cache binaire ou du fichier du registre
+- data_manager dans un processus par mode: memoire residente de tout le
+  processus (RSS: donnees, index, totaux, pages du fichier projete lues),
+  apres le chargement puis apres une recherche (index de recherche
+  construit), duree du chargement, page et compte des depenses d'une
+  categorie, totaux maintenus
+
+et verifie que les resultats sont identiques.
+
+Usage:
+    python benchmarks/bench_ledger.py [depenses]
+"""
+
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_manager
+import exchange_rates
+import ledger
+import money
+import records
+import sections
+import snapshot_cache
+from config import BUDGET_CATEGORIES
+from persistent import IdMap
+
+DATES = ["2025-09-{:02d}".format(day) for day in range(10, 26)]
+DESCRIPTIONS = ["Dejeuner", "Diner", "Tram", "Musee", "Velo", "Courses", "Cafe", "Taxi"]
+
+
+def make_depenses(n, participants=200):
+    """
+    Genere n depenses (dictionnaires, comme dans le fichier JSON).
+    """
+    rng = random.Random(42)
+    names = ["Groupe"] + ["Participant {}".format(i) for i in range(participants)]
+    return [{
+        "id": i + 1,
+        "date": rng.choice(DATES),
+        "categorie": rng.choice(BUDGET_CATEGORIES),
+        "montant": rng.randint(1, 25000) / 100,
+        "description": rng.choice(DESCRIPTIONS),
+        "participant": rng.choice(names),
+    } for i in range(n)]
+
+
+def rss_mb():
+    """
+    Retourne la memoire residente du processus en Mo (VmRSS sous Linux,
+    sinon le maximum atteint, voir resource).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def timed(function, repeat=5):
+    """
+    Appelle une fonction plusieurs fois.
+
+    Returns:
+        Tuple (resultat, duree mediane en ms)
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(durations)
+
+
+def totals_dicts(depenses):
+    """
+    Total et totaux par categorie sur la liste de dictionnaires.
+    """
+    total = 0
+    by_category = {}
+    for d in depenses:
+        montant = money.to_cents(d["montant"])
+        total += montant
+        categorie = d.get("categorie", "Autre")
+        by_category[categorie] = by_category.get(categorie, 0) + montant
+    return total, by_category
+
+
+def totals_records(items):
+    """
+    Total et totaux par categorie sur les enregistrements.
+    """
+    total = 0
+    by_category = {}
+    for d in items:
+        montant = d.cents("montant")
+        total += montant
+        categorie = d.get("categorie", "Autre")
+        by_category[categorie] = by_category.get(categorie, 0) + montant
+    return total, by_category
+
+
+def totals_ledger(items):
+    """
+    Total et totaux par categorie sur les colonnes (par paquet).
+    """
+    sums, _ = ledger.buckets(items, lambda d: d.get("categorie", "Autre"), ("categorie",))
+    return sum(sums.values()), sums
+
+
+def measure_process(mode, directory):
+    """
+    Charge les depenses d'un voyage dans ce processus (appele dans un
+    processus par mode, voir run_process) et affiche les mesures (JSON).
+
+    Args:
+        mode: "dicts" (liste de dictionnaires lue du JSON), "records"
+            (data_manager, IdMap) ou "columns" (data_manager,
+            COLUMNAR_DEPENSES)
+        directory: Le repertoire du voyage
+    """
+    categorie = BUDGET_CATEGORIES[0]
+    result = {"rss_start": rss_mb()}
+
+    start = time.perf_counter()
+    if mode == "dicts":
+        with open(os.path.join(directory, "sections", "depenses.json"), "rb") as f:
+            depenses = json.loads(f.read())
+        result["load_ms"] = (time.perf_counter() - start) * 1000
+        result["rss_loaded"] = rss_mb()
+
+        total, by_category = totals_dicts(depenses)
+        page, result["page_ms"] = timed(lambda: [item_id for _, item_id in sorted(
+            (money.to_cents(d["montant"]), d["id"]) for d in depenses
+            if d.get("categorie") == categorie)[:50]])
+        count, result["count_ms"] = timed(lambda: sum(1 for d in depenses
+                                                      if d.get("categorie") == categorie))
+        result["rss_search"] = result["rss_loaded"]
+    else:
+        columnar = mode == "columns"
+        data_manager.COLUMNAR_DEPENSES = columnar
+        sections.COLUMNAR_DEPENSES = columnar
+        exchange_rates.load(os.path.join(directory, "taux_de_change.json"))
+        data_manager._set_trip_paths(directory)
+        data_manager.load_data()
+        data_manager.get_depenses()
+        result["load_ms"] = (time.perf_counter() - start) * 1000
+        result["rss_loaded"] = rss_mb()
+
+        total = data_manager.get_total_depenses(cents=True)
+        by_category = data_manager.get_depenses_by_category(cents=True)
+        page, result["page_ms"] = timed(lambda: [d["id"] for d in data_manager.query_depenses(
+            categorie=categorie, order_by="montant", limit=50)])
+        count, result["count_ms"] = timed(lambda: data_manager.count_depenses(categorie=categorie))
+        data_manager.search("dejeuner")
+        result["rss_search"] = rss_mb()
+
+    result.update(total=total, by_category=by_category, count=count, page=page)
+    print(json.dumps(result))
+
+
+def run_process(mode, directory):
+    """
+    Lance measure_process dans un nouveau processus.
+
+    Returns:
+        Les mesures (dictionnaire)
+    """
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--process", mode, directory],
+        check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--process":
+        measure_process(sys.argv[2], sys.argv[3])
+        return
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+
+    depenses = make_depenses(n)
+    print("{} depenses".format(n))
+
+    dicts = json.loads(json.dumps(depenses))
+    items = IdMap.from_pairs((d["id"], records.Depense.from_dict(d)) for d in depenses)
+    columns = ledger.Ledger.from_records(items)
+
+    directory = tempfile.mkdtemp(prefix="bench_ledger_")
+    json_path = os.path.join(directory, "depenses.json")
+    path = os.path.join(directory, "depenses.ledger")
+    cache = os.path.join(directory, "depenses.cache")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(depenses, f)
+    json_hash = snapshot_cache.file_hash(json_path)
+    ledger.write(path, json_path, ledger.dumps(columns), json_hash)
+    snapshot_cache.write(cache, json_path, sections._dumps_cache("depenses", dicts), json_hash)
+    mapped = ledger.load(path, json_path)
+
+    # --- Totaux ---
+    expected, before = timed(lambda: totals_dicts(dicts))
+    result, after_records = timed(lambda: totals_records(items))
+    assert result == expected
+    result, after_ledger = timed(lambda: totals_ledger(columns))
+    assert result == expected
+    result, after_mapped = timed(lambda: totals_ledger(mapped))
+    assert result == expected
+
+    print("Recalcul des totaux (total, par categorie):")
+    print("  liste de dictionnaires          {:8.1f} ms".format(before))
+    print("  IdMap d'enregistrements         {:8.1f} ms".format(after_records))
+    print("  registre en colonnes            {:8.1f} ms  (x{:.0f})".format(after_ledger, before / after_ledger))
+    print("  registre projete (mmap)         {:8.1f} ms  (x{:.0f})".format(after_mapped, before / after_mapped))
+
+    # --- Depenses d'une categorie ---
+    categorie = BUDGET_CATEGORIES[0]
+    expected, before = timed(lambda: [d["id"] for d in dicts if d.get("categorie") == categorie])
+    found, after = timed(lambda: mapped.find_ids("categorie", categorie))
+    assert sorted(found) == expected
+
+    print("IDs des depenses d'une categorie ({} depenses):".format(len(expected)))
+    print("  liste de dictionnaires          {:8.1f} ms".format(before))
+    print("  codes de la colonne (mmap)      {:8.1f} ms  (x{:.1f})".format(after, before / after))
+
+    # --- Ouverture ---
+    def read_json():
+        with open(json_path, "rb") as f:
+            return json.loads(f.read())
+    _, json_ms = timed(read_json, repeat=3)
+    _, cache_ms = timed(lambda: snapshot_cache.load(cache, json_path), repeat=3)
+    _, mmap_ms = timed(lambda: ledger.load(path, json_path), repeat=3)
+
+    print("Ouverture des depenses:")
+    print("  fichier JSON                    {:8.1f} ms".format(json_ms))
+    print("  cache binaire (enregistrements) {:8.1f} ms".format(cache_ms))
+    print("  registre projete (mmap)         {:8.1f} ms  (x{:.0f})".format(mmap_ms, json_ms / mmap_ms))
+
+    # --- data_manager, un processus par mode ---
+    trip = tempfile.mkdtemp(prefix="bench_ledger_trip_")
+    exchange_rates.load(os.path.join(trip, "taux_de_change.json"))
+    data_manager._set_trip_paths(trip)
+    data_manager.load_data()
+    data_manager.add_depenses([{k: v for k, v in d.items() if k != "id"} for d in depenses])
+    data_manager.save_data()
+
+    print("Processus complet (RSS), chargement et depenses d'une categorie:")
+    print("  {:24} {:>9} {:>10} {:>10} {:>11} {:>9} {:>9}".format(
+        "", "au depart", "charge", "recherche", "chargement", "page", "compte"))
+    results = []
+    for mode, label in (("dicts", "liste de dictionnaires"),
+                        ("records", "IdMap d'enregistrements"),
+                        ("columns", "registre en colonnes")):
+        if mode != "dicts":
+            # Le premier chargement ecrit le cache, le second le relit
+            run_process(mode, trip)
+        measures = run_process(mode, trip)
+        results.append(measures)
+        print("  {:24} {:6.0f} Mo {:7.0f} Mo {:7.0f} Mo {:8.0f} ms {:6.1f} ms {:6.1f} ms".format(
+            label, measures["rss_start"], measures["rss_loaded"], measures["rss_search"],
+            measures["load_ms"], measures["page_ms"], measures["count_ms"]))
+
+    for measures in results[1:]:
+        for key in ("total", "by_category", "count", "page"):
+            assert measures[key] == results[0][key], key
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+bench_money.py - Totaux des depenses en float et en centimes.
+
+Genere N depenses (1 000 000 par defaut, montants au centime), puis
+compare le recalcul complet des totaux (total, par categorie, par
+participant):
+- avant: somme des montants en float (d.get('montant'))
+- apres: somme des montants en centimes entiers (d.cents('montant'))
+
+et l'ecart du total en float par rapport au total exact. Les totaux
+maintenus par le data_manager sont mis a jour en O(1) a chaque
+modification: ce recalcul n'a lieu qu'au chargement et pour
+VERIFY_AGGREGATES. Le total maintenu est aussi mesure apres l'ajout de
+toutes les depenses puis la suppression de presque toutes (le float
+garde alors l'erreur d'arrondi des montants supprimes).
+
+Usage:
+    python benchmarks/bench_money.py [depenses]
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+from fractions import Fraction
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import records
+from config import BUDGET_CATEGORIES
+from money import format_cents, from_cents
+
+PARTICIPANTS = ["Groupe", "Alice", "Bob", "Chloe", "David", "Emma"]
+
+
+def make_depenses(n):
+    """
+    Genere n depenses (montants au centime, entre 0,01 et 250,00 EUR).
+    """
+    rng = random.Random(42)
+    return [records.Depense.from_dict({
+        "id": i + 1,
+        "date": "2025-09-{:02d}".format(15 + i % 6),
+        "categorie": BUDGET_CATEGORIES[i % len(BUDGET_CATEGORIES)],
+        "montant": rng.randint(1, 25000) / 100,
+        "description": "Depense",
+        "participant": PARTICIPANTS[i % len(PARTICIPANTS)],
+    }) for i in range(n)]
+
+
+def totals_before(depenses):
+    """
+    Totaux en float (calcul de la version precedente).
+    """
+    total = 0
+    by_category = {}
+    by_participant = {}
+    for d in depenses:
+        montant = d.get('montant', 0)
+        total += montant
+        cat = d.get('categorie', 'Autre')
+        by_category[cat] = by_category.get(cat, 0) + montant
+        participant = d.get('participant') or ''
+        by_participant[participant] = by_participant.get(participant, 0) + montant
+    return total, by_category, by_participant
+
+
+def totals_after(depenses):
+    """
+    Totaux en centimes (data_manager._compute_depenses_totals).
+    """
+    total = 0
+    by_category = {}
+    by_participant = {}
+    for d in depenses:
+        montant = d.cents('montant')
+        total += montant
+        cat = d.get('categorie', 'Autre')
+        by_category[cat] = by_category.get(cat, 0) + montant
+        participant = d.get('participant') or ''
+        by_participant[participant] = by_participant.get(participant, 0) + montant
+    return total, by_category, by_participant
+
+
+def churn(depenses, amount, keep=10):
+    """
+    Total maintenu apres l'ajout de toutes les depenses puis la
+    suppression de toutes sauf keep (dans un ordre aleatoire).
+
+    Args:
+        depenses: Les depenses
+        amount: Fonction depense -> montant (float ou centimes)
+        keep: Nombre de depenses conservees
+
+    Returns:
+        Tuple (total maintenu, montants des depenses conservees)
+    """
+    total = 0
+    for d in depenses:
+        total += amount(d)
+    removed = list(depenses)
+    random.Random(7).shuffle(removed)
+    kept = removed[:keep]
+    for d in removed[keep:]:
+        total -= amount(d)
+    return total, [amount(d) for d in kept]
+
+
+def timed(function, repeat=5):
+    """
+    Appelle une fonction plusieurs fois.
+
+    Returns:
+        Tuple (resultat, duree mediane en ms)
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(durations)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    start = time.perf_counter()
+    depenses = make_depenses(n)
+    print("{} depenses generees en {:.1f} s".format(n, time.perf_counter() - start))
+
+    (float_total, float_by_category, _), before = timed(lambda: totals_before(depenses))
+    (cents_total, cents_by_category, _), after = timed(lambda: totals_after(depenses))
+
+    print("Totaux (total, par categorie, par participant):")
+    print("  avant (float)      {:8.1f} ms".format(before))
+    print("  apres (centimes)   {:8.1f} ms  (x{:.2f})".format(after, before / after))
+
+    _, float_sum = timed(lambda: sum(d.get('montant', 0) for d in depenses))
+    _, cents_sum = timed(lambda: sum(d.cents('montant') for d in depenses))
+    print("Total seul:")
+    print("  avant (float)      {:8.1f} ms".format(float_sum))
+    print("  apres (centimes)   {:8.1f} ms  (x{:.2f})".format(cents_sum, float_sum / cents_sum))
+
+    # Ecart du float par rapport a la valeur exacte
+    exact = Fraction(cents_total, 100)
+    print("Total exact: {}".format(format_cents(cents_total)))
+    print("  float: {!r} (ecart {:.3e} EUR)".format(float_total, float(Fraction(float_total) - exact)))
+    worst = max(abs(Fraction(float_by_category[cat]) - Fraction(cents, 100))
+                for cat, cents in cents_by_category.items())
+    print("  plus grand ecart d'une categorie en float: {:.3e} EUR".format(float(worst)))
+    print("  centimes: {} (exact)".format(from_cents(cents_total)))
+
+    float_kept, _ = churn(depenses, lambda d: d.get('montant', 0))
+    cents_kept, kept = churn(depenses, lambda d: d.cents('montant'))
+    assert cents_kept == sum(kept)
+    print("Total maintenu apres {} ajouts et {} suppressions:".format(n, n - len(kept)))
+    print("  exact: {}".format(format_cents(cents_kept)))
+    print("  float: {!r} -> {} (ecart {:.3e} EUR)".format(
+        float_kept, format_cents(round(float_kept * 100)),
+        float(Fraction(float_kept) - Fraction(cents_kept, 100))))
+    print("  centimes: {} (exact)".format(format_cents(cents_kept)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+bench_pivot.py - Tableaux croises des depenses.
+
+Genere N depenses (100 000 par defaut) sur les jours d'un voyage, payees
+par P participants (50 par defaut), puis compare pour plusieurs
+decoupages (date x categorie, participant x date filtre sur une
+categorie, categorie seule...):
+- avant: chaque affichage relit toutes les depenses
+- apres, premier affichage: un passage sur les cellules du cube (date,
+  categorie, participant) maintenu par le data_manager
+- apres, affichage apres l'ajout d'une depense: le tableau garde en
+  cache a deja ete mis a jour (data_manager.get_pivot)
+
+et verifie que les tableaux sont identiques. La projection a la fin du
+sejour (data_manager.get_budget_forecast) est aussi mesuree.
+
+Usage:
+    python benchmarks/bench_pivot.py [depenses] [participants]
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_manager
+import exchange_rates
+import pivot
+from config import BUDGET_CATEGORIES
+
+DATES = ["2025-09-{:02d}".format(day) for day in range(10, 26)]
+
+SPECS = [
+    ("date", "categorie", None),
+    ("participant", "date", {"categorie": "Repas"}),
+    ("categorie", None, None),
+    ("categorie", "participant", {"date": "2025-09-16"}),
+]
+
+
+def make_depenses(n, participants):
+    """
+    Genere n depenses.
+    """
+    rng = random.Random(42)
+    names = ["Groupe"] + ["Participant {}".format(i) for i in range(participants)]
+    return [{
+        "date": rng.choice(DATES),
+        "categorie": rng.choice(BUDGET_CATEGORIES),
+        "montant": rng.randint(1, 25000) / 100,
+        "description": "Depense",
+        "participant": rng.choice(names),
+    } for _ in range(n)]
+
+
+def pivot_before(depenses, rows, columns, filters):
+    """
+    Tableau croise calcule en relisant toutes les depenses.
+    """
+    fields = {"date": "date", "categorie": "categorie", "participant": "participant"}
+    cells = {}
+    row_totals = {}
+    for d in depenses:
+        if filters and any((d.get(fields[dim]) or '') != value for dim, value in filters.items()):
+            continue
+        montant = d.cents('montant')
+        row = d.get(fields[rows]) or ''
+        row_totals[row] = row_totals.get(row, 0) + montant
+        if columns is not None:
+            cell = (row, d.get(fields[columns]) or '')
+            cells[cell] = cells.get(cell, 0) + montant
+    return row_totals, cells
+
+
+def timed(function, repeat=5):
+    """
+    Appelle une fonction plusieurs fois.
+
+    Returns:
+        Tuple (resultat, duree mediane en ms)
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(durations)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    participants = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    directory = tempfile.mkdtemp(prefix="bench_pivot_")
+    exchange_rates.load(os.path.join(directory, "taux_de_change.json"))
+    data_manager._set_trip_paths(directory)
+    data_manager.load_data()
+    data_manager.add_depenses(make_depenses(n, participants))
+    depenses = list(data_manager.get_depenses())
+
+    print("{} depenses, {} cellules dans le cube".format(n, len(data_manager._totals["cube"])))
+
+    rng = random.Random(7)
+    for rows, columns, filters in SPECS:
+        (before_rows, before_cells), before = timed(
+            lambda: pivot_before(depenses, rows, columns, filters))
+
+        def first():
+            data_manager._pivots.clear()
+            return data_manager.get_pivot(rows, columns, filters)
+        table, after = timed(first)
+        assert table["rows"] == before_rows and table["cells"] == before_cells
+
+        durations = []
+        for _ in range(20):
+            depense = make_depenses(1, participants)[0]
+            depense["date"] = rng.choice(DATES)
+            data_manager.add_depense(depense)
+            start = time.perf_counter()
+            data_manager.get_pivot(rows, columns, filters)
+            durations.append((time.perf_counter() - start) * 1000)
+        cached = statistics.median(durations)
+
+        depenses = list(data_manager.get_depenses())
+        table = data_manager.get_pivot(rows, columns, filters)
+        assert (table["rows"], table["cells"]) == pivot_before(depenses, rows, columns, filters)
+
+        print("{}:".format(" x ".join(pivot.LABELS[d] for d in (rows, columns) if d)
+                           + (" (filtre {})".format(filters) if filters else "")))
+        print("  avant (toutes les depenses relues)   {:8.2f} ms".format(before))
+        print("  apres, premier affichage (cube)      {:8.2f} ms  (x{:.0f})".format(after, before / after))
+        print("  apres, apres l'ajout d'une depense   {:8.3f} ms  (x{:.0f})".format(cached, before / cached))
+
+    forecast, duration = timed(lambda: data_manager.get_budget_forecast("2025-09-18"))
+    print("Projection a la fin du sejour: {:.3f} ms ({} jours)".format(duration, len(forecast["jours"])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+bench_records.py - Comparaison memoire dictionnaires / enregistrements compacts.
+
+Genere N depenses, les relit depuis du JSON (comme au chargement du
+fichier de donnees) et mesure avec tracemalloc la memoire occupee:
+- par les dictionnaires produits par json.loads
+- par les enregistrements Depense de records.py
+
+Mesure aussi les durees de chargement et de serialisation JSON.
+
+Usage:
+    python benchmarks/bench_records.py [N]     (par defaut N = 100000)
+"""
+
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import records
+from config import BUDGET_CATEGORIES
+
+
+def generate_json(n):
+    """
+    Genere le texte JSON d'une liste de n depenses.
+
+    Args:
+        n: Le nombre de depenses
+
+    Returns:
+        Le texte JSON
+    """
+    rng = random.Random(42)
+    participants = ["Groupe", "Marie Dupont", "Lucas Martin"]
+    depenses = [
+        {
+            "id": i + 1,
+            "date": "2025-09-{:02d}".format(15 + i % 6),
+            "categorie": rng.choice(BUDGET_CATEGORIES),
+            "montant": round(rng.uniform(1, 200), 2),
+            "description": "Depense {}".format(i + 1),
+            "participant": rng.choice(participants),
+        }
+        for i in range(n)
+    ]
+    return json.dumps(depenses)
+
+
+def measure(build):
+    """
+    Mesure la memoire allouee par une fonction de construction.
+
+    Args:
+        build: Fonction sans argument qui retourne l'objet a mesurer
+
+    Returns:
+        Tuple (objet construit, octets alloues)
+    """
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size
+
+
+def timed(build):
+    """
+    Mesure la duree d'une fonction de construction.
+
+    Args:
+        build: Fonction sans argument
+
+    Returns:
+        La duree en secondes
+    """
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    return time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    text = generate_json(n)
+
+    def load_dicts():
+        return json.loads(text)
+
+    def load_records():
+        return records.convert_list(json.loads(text), records.Depense)
+
+    dicts, dict_bytes = measure(load_dicts)
+    del dicts
+    recs, rec_bytes = measure(load_records)
+
+    # Durees mesurees sans tracemalloc (qui ralentit les allocations)
+    dict_time = timed(load_dicts)
+    rec_time = timed(load_records)
+
+    dicts = load_dicts()
+    dict_dump_time = timed(lambda: json.dumps(dicts, ensure_ascii=False, separators=(",", ":")))
+    rec_dump_time = timed(lambda: records.dumps(recs))
+
+    print(f"{n} depenses")
+    print(f"  dictionnaires   : {dict_bytes / 1e6:8.1f} Mo  ({dict_bytes / n:6.0f} o/element)"
+          f"  chargement {dict_time * 1000:7.1f} ms")
+    print(f"  enregistrements : {rec_bytes / 1e6:8.1f} Mo  ({rec_bytes / n:6.0f} o/element)"
+          f"  chargement {rec_time * 1000:7.1f} ms")
+    print(f"  gain memoire    : {100 * (1 - rec_bytes / dict_bytes):.0f} %")
+    print(f"  serialisation JSON: dictionnaires {dict_dump_time * 1000:.1f} ms, "
+          f"enregistrements {rec_dump_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+bench_rows.py - Calcul des lignes affichees (dates et montants formates).
+
+Mesure le calcul des lignes d'un tableau d'activites (comme le fait
+load_page du frame des activites) pour N activites (5 000 par defaut):
+- avant: dates et montants formates a chaque ligne (strptime, strftime,
+  formatage du float et remplacements) et cle de tri en texte
+- apres, caches vides: dates et montants formates une fois par valeur
+  differente, cle de tri en numero de jour (date_ordinal)
+- apres, caches remplis: lignes reprises du cache des lignes
+  (rafraichissement sans modification)
+- apres une modification: seule la ligne de l'element modifie est
+  recalculee
+
+Usage:
+    python benchmarks/bench_rows.py [activites]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import records
+from config import date_ordinal, format_date, format_cents
+from frames.tree_rows import create_row_cache, cached_row
+
+PLACES = ["Rijksmuseum", "Van Gogh Museum", "Anne Frank Huis", "Vondelpark",
+          "Heineken Experience", "Jordaan", "Albert Cuyp Markt", "Begijnhof", "NEMO"]
+
+
+def make_activities(n):
+    """
+    Genere n activites (quelques dates et prix differents, comme un voyage).
+    """
+    return [records.Activite.from_dict({
+        "id": i + 1,
+        "date": "2025-09-{:02d}".format(15 + i % 6),
+        "nom": PLACES[i % len(PLACES)],
+        "lieu": PLACES[(i * 7) % len(PLACES)],
+        "horaire": "{:02d}:00".format(9 + i % 10),
+        "duree": "2h",
+        "prix": (i % 40) * 2.5,
+    }) for i in range(n)]
+
+
+def format_currency_before(amount):
+    """
+    Formatage d'un montant de la version precedente (float, sans cache).
+    """
+    return f"{amount:,.2f} EUR".replace(",", " ").replace(".", ",")
+
+
+def row_before(activite):
+    """
+    Ligne d'une activite sans cache (calcul de la version precedente).
+    """
+    values = (
+        format_date.__wrapped__(activite.get('date', '')),
+        activite.get('nom', ''),
+        activite.get('lieu', ''),
+        activite.get('horaire', ''),
+        activite.get('duree', ''),
+        format_currency_before(activite.get('prix', 0))
+    )
+    return activite.get('date', '9999-12-31'), values
+
+
+def row_after(activite):
+    """
+    Ligne d'une activite (activities_frame.activity_row).
+    """
+    values = (
+        format_date(activite.get('date', '')),
+        activite.get('nom', ''),
+        activite.get('lieu', ''),
+        activite.get('horaire', ''),
+        activite.get('duree', ''),
+        format_cents(activite.cents('prix'))
+    )
+    return date_ordinal(activite.get('date')), values
+
+
+def clear_caches():
+    """
+    Vide les caches des dates et des montants formates.
+    """
+    format_date.cache_clear()
+    format_cents.cache_clear()
+    date_ordinal.cache_clear()
+
+
+def timed(function, repeat=10, setup=None):
+    """
+    Appelle une fonction plusieurs fois (setup avant chaque appel).
+
+    Returns:
+        Duree mediane en ms
+    """
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    activites = make_activities(n)
+
+    # Meme resultat avant et apres (hors cle de tri, qui suit le meme ordre)
+    for activite in activites[:100]:
+        assert row_before(activite)[1] == row_after(activite)[1]
+
+    before = timed(lambda: [row_before(a) for a in activites])
+
+    after_cold = timed(lambda: [row_after(a) for a in activites], setup=clear_caches)
+
+    cache = create_row_cache(row_after, size=n)
+    [cached_row(cache, a) for a in activites]
+    after_warm = timed(lambda: [cached_row(cache, a) for a in activites])
+
+    def modify():
+        # Une modification remplace l'enregistrement par une nouvelle version
+        index = len(activites) // 2
+        activites[index] = activites[index].replace(prix=activites[index]["prix"] + 1)
+
+    after_change = timed(lambda: [cached_row(cache, a) for a in activites], setup=modify)
+
+    print("{} lignes d'activites (caches de {} valeurs):".format(n, config.FORMAT_CACHE_SIZE))
+    print("  avant (sans cache)           {:7.2f} ms".format(before))
+    print("  apres, caches vides          {:7.2f} ms  (x{:.1f})".format(after_cold, before / after_cold))
+    print("  apres, lignes en cache       {:7.2f} ms  (x{:.1f})".format(after_warm, before / after_warm))
+    print("  apres une modification       {:7.2f} ms  (x{:.1f})".format(after_change, before / after_change))
+
+    # Une page du tableau (PAGE_SIZE lignes)
+    page = activites[:config.PAGE_SIZE]
+    print("Une page de {} lignes:".format(len(page)))
+    print("  avant (sans cache)           {:7.3f} ms".format(timed(lambda: [row_before(a) for a in page])))
+    print("  apres, lignes en cache       {:7.3f} ms".format(timed(lambda: [cached_row(cache, a) for a in page])))
+
+
+if __name__ == "__main__":
+    main()
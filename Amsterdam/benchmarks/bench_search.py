@@ -0,0 +1,159 @@
+"""
+bench_search.py - Temps de reponse de la recherche plein texte.
+
+Remplit un repertoire de donnees temporaire avec N documents (100 000
+par defaut: moitie depenses, 30 % activites, 10 % participants, 10 %
+items de checklist), puis mesure:
+- l'indexation (ajouts par lots, index de recherche compris)
+- data_manager.search pour des recherches courantes (mot entier, partie
+  de mot, debut de mot, plusieurs mots, accents)
+- le filtre texte des requetes (query_depenses(text=...) et
+  count_depenses(text=...))
+- la mise a jour de l'index apres une modification
+
+Chaque recherche doit repondre en moins de 10 ms.
+
+Usage:
+    python benchmarks/bench_search.py [documents]
+"""
+
+import gc
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import BUDGET_CATEGORIES, CHECKLIST_CATEGORIES, PARTICIPANT_ROLES
+
+PLACES = ["Rijksmuseum", "Van Gogh Museum", "Anne Frank Huis", "Vondelpark",
+          "Heineken Experience", "Jordaan", "Albert Cuyp Markt", "Begijnhof", "NEMO"]
+WORDS = ["visite", "guidee", "velo", "canal", "croisiere", "musee", "billet", "diner",
+         "dejeuner", "café", "marché", "fromage", "promenade", "photo", "groupe"]
+ALLERGIES = ["", "", "Arachides", "Gluten", "Lactose"]
+
+QUERIES = ["rijksmuseum", "museum", "arachides", "vi", "cafe marche",
+           "visite velo", "depense", "p1234@example.com", "12345", "zzz"]
+
+# Temps de reponse maximal vise (ms)
+TARGET_MS = 10
+
+
+def fill(n):
+    """
+    Ajoute n documents generes, par lots.
+    """
+    import data_manager
+
+    rng = random.Random(42)
+    depenses, activites, participants, checklist = [], [], [], []
+    for i in range(n):
+        kind = i % 10
+        if kind < 5:
+            depenses.append({
+                "date": "2025-09-{:02d}".format(15 + i % 6),
+                "categorie": BUDGET_CATEGORIES[i % len(BUDGET_CATEGORIES)],
+                "montant": (i % 20000) / 100,
+                "description": "Depense {} {}".format(i, " ".join(rng.sample(WORDS, 3))),
+                "participant": "Groupe",
+            })
+        elif kind < 8:
+            activites.append({
+                "date": "2025-09-{:02d}".format(15 + i % 6),
+                "nom": rng.choice(PLACES), "lieu": rng.choice(PLACES),
+                "horaire": "10:00", "duree": "2h", "prix": i % 40,
+                "description": " ".join(rng.sample(WORDS, 4)),
+            })
+        elif kind < 9:
+            participants.append({
+                "nom": "Nom{}".format(i), "prenom": "Prenom{}".format(i % 500),
+                "email": "p{}@example.com".format(i), "telephone": "06 12 34 56 78",
+                "role": PARTICIPANT_ROLES[i % len(PARTICIPANT_ROLES)],
+                "date_naissance": "2000-05-15", "allergies": rng.choice(ALLERGIES),
+                "notes": "Note",
+            })
+        else:
+            checklist.append({
+                "item": "Item {} {}".format(i, rng.choice(WORDS)),
+                "categorie": CHECKLIST_CATEGORIES[i % len(CHECKLIST_CATEGORIES)],
+            })
+
+    data_manager.add_depenses(depenses)
+    data_manager.add_activites(activites)
+    data_manager.add_participants(participants)
+    data_manager.add_checklist_items(checklist)
+
+
+def timed(function, repeat=20):
+    """
+    Appelle une fonction plusieurs fois.
+
+    Returns:
+        Tuple (resultat, duree mediane en ms, duree maximale en ms)
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(durations), max(durations)
+
+
+def main():
+    import data_manager
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    directory = tempfile.mkdtemp(prefix="bench_search_")
+    try:
+        data_manager._set_trip_paths(directory)
+        data_manager.load_data()
+
+        start = time.perf_counter()
+        fill(n)
+        elapsed = time.perf_counter() - start
+        print("{} documents ajoutes en {:.1f} s ({:.0f} documents/s)".format(n, elapsed, n / elapsed))
+
+        # Ecrire les ajouts tout de suite: la sauvegarde differee (thread)
+        # ne doit pas tomber pendant les mesures
+        data_manager.save_data()
+        gc.collect()
+
+        slowest = 0.0
+        print("search():")
+        for query in QUERIES:
+            (total, _results), median, worst = timed(lambda: data_manager.search(query))
+            slowest = max(slowest, worst)
+            print("  {:22s} {:7d} resultats  median {:5.2f} ms  max {:5.2f} ms".format(
+                query, total, median, worst))
+
+        print("Filtre texte des requetes:")
+        for query in ("musee", "velo canal"):
+            page, median, worst = timed(lambda: data_manager.query_depenses(text=query, limit=100))
+            slowest = max(slowest, worst)
+            print("  query_depenses(text={!r:12}) {:4d} lignes  median {:5.2f} ms  max {:5.2f} ms".format(
+                query, len(page), median, worst))
+            total, median, worst = timed(lambda: data_manager.count_depenses(text=query))
+            slowest = max(slowest, worst)
+            print("  count_depenses(text={!r:12}) {:6d}       median {:5.2f} ms  max {:5.2f} ms".format(
+                query, total, median, worst))
+
+        item_id = data_manager.add_activite({
+            "date": "2025-09-16", "nom": "Moco Museum", "lieu": "Honthorststraat",
+            "horaire": "14:00", "duree": "1h", "prix": 20, "description": "Street art",
+        })
+        _result, median, _worst = timed(lambda: data_manager.update_activite(
+            item_id, {"description": "Street art {}".format(time.perf_counter())}), repeat=50)
+        print("Modification d'une activite (index compris): median {:.2f} ms".format(median))
+
+        print("Recherche la plus lente: {:.2f} ms ({})".format(
+            slowest, "OK" if slowest < TARGET_MS else "au-dela de {} ms".format(TARGET_MS)))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
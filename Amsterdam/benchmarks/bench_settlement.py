@@ -0,0 +1,184 @@
+"""
+bench_settlement.py - Soldes des participants et remboursements.
+
+Genere P participants (1 000 par defaut, chacun present une partie du
+voyage) et N depenses (100 000 par defaut), puis mesure pour chaque mode
+de partage (parts egales, selon la presence, poids):
+- recalcul complet: parts de chaque date reparties de nouveau, soldes
+  et virements (premier appel a data_manager.get_settlement)
+- remplacement d'une depense (suppression puis ajout, a une autre
+  date): seules les parts des deux dates touchees sont reparties de
+  nouveau (settlement.update_shares), puis soldes et virements
+- les parts seules (settlement.update_shares), reparties de zero ou
+  apres le remplacement d'une depense, puis les soldes et virements
+  seuls (compute_balances, settle): part de chaque etape dans l'appel
+
+et verifie que la somme des soldes est nulle, que les virements soldent
+tous les comptes et qu'il y a au plus (participants - 1) virements.
+
+Usage:
+    python benchmarks/bench_settlement.py [participants] [depenses]
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_manager
+import exchange_rates
+import settlement
+from config import BUDGET_CATEGORIES
+
+DATES = ["2025-09-{:02d}".format(day) for day in range(1, 31)]
+
+
+def make_participants(n):
+    """
+    Genere n participants (sejour de 5 a 30 jours, poids 1 ou 2).
+    """
+    rng = random.Random(42)
+    participants = []
+    for i in range(n):
+        first = rng.randrange(len(DATES))
+        last = min(first + rng.randint(4, 29), len(DATES) - 1)
+        participants.append({
+            "nom": "Nom{}".format(i), "prenom": "Prenom{}".format(i), "role": "Participant",
+            "arrivee": DATES[first], "depart": DATES[last],
+        })
+    return participants
+
+
+def make_depenses(n, names):
+    """
+    Genere n depenses (un dixieme payees par le groupe).
+    """
+    rng = random.Random(7)
+    return [{
+        "date": rng.choice(DATES),
+        "categorie": rng.choice(BUDGET_CATEGORIES),
+        "montant": rng.randint(1, 25000) / 100,
+        "description": "Depense",
+        "participant": settlement.GROUP if rng.random() < 0.1 else rng.choice(names),
+    } for _ in range(n)]
+
+
+def check(balances, transfers):
+    """
+    Verifie les soldes et les virements.
+    """
+    assert sum(solde for _, _, solde in balances.values()) == 0
+    remaining = {name: solde for name, (_, _, solde) in balances.items()}
+    for debtor, creditor, amount in transfers:
+        assert amount > 0
+        remaining[debtor] += amount
+        remaining[creditor] -= amount
+    assert not any(remaining.values())
+    assert len(transfers) <= max(len(balances) - 1, 0)
+
+
+def timed(function, repeat=5):
+    """
+    Appelle une fonction plusieurs fois.
+
+    Returns:
+        Tuple (resultat, duree mediane en ms)
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(durations)
+
+
+def main():
+    n_participants = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_depenses = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+
+    directory = tempfile.mkdtemp(prefix="bench_settlement_")
+    exchange_rates.load(os.path.join(directory, "taux_de_change.json"))
+    data_manager._set_trip_paths(directory)
+    data_manager.load_data()
+
+    data_manager.delete_participants([p.get('id') for p in data_manager.get_participants()])
+    data_manager.add_participants(make_participants(n_participants))
+    names = [settlement.member_name(p) for p in data_manager.get_participants()]
+
+    start = time.perf_counter()
+    data_manager.add_depenses(make_depenses(n_depenses, names))
+    print("{} participants, {} depenses ajoutees en {:.1f} s".format(
+        n_participants, n_depenses, time.perf_counter() - start))
+
+    rng = random.Random(11)
+    weights = {name: str(rng.choice((1, 1, 2))) for name in names}
+
+    def replace_one():
+        """Remplace une depense au hasard (autre date, montant et payeur)."""
+        offset = rng.randrange(data_manager.count_depenses())
+        depense = data_manager.query_depenses(limit=1, offset=offset)[0]
+        data_manager.delete_depense(depense.get('id'))
+        data_manager.add_depense({
+            "date": rng.choice(DATES),
+            "categorie": depense.get('categorie'),
+            "montant": rng.randint(1, 25000) / 100,
+            "description": "Depense",
+            "participant": rng.choice(names),
+        })
+
+    for mode, label in settlement.MODES.items():
+        data_manager.update_split_rule({"mode": mode, "poids": weights})
+
+        def full():
+            data_manager._shares.update(settlement.create_shares())
+            return data_manager.get_settlement()
+        (balances, transfers), full_ms = timed(full)
+        check(balances, transfers)
+
+        durations = []
+        shares_full = []
+        shares_incremental = []
+        for _ in range(20):
+            replace_one()
+            rule = data_manager.get_split_rule()
+            members = data_manager._members[1]
+            shared = data_manager._totals["shared_by_date"]
+
+            start = time.perf_counter()
+            expected = settlement.update_shares(settlement.create_shares(), rule, members, shared)
+            shares_full.append((time.perf_counter() - start) * 1000)
+
+            state = {key: dict(value) if isinstance(value, dict) else value
+                     for key, value in data_manager._shares.items()}
+            start = time.perf_counter()
+            owed = settlement.update_shares(state, rule, members, shared)
+            shares_incremental.append((time.perf_counter() - start) * 1000)
+            assert owed == expected
+
+            start = time.perf_counter()
+            balances, transfers = data_manager.get_settlement()
+            durations.append((time.perf_counter() - start) * 1000)
+            check(balances, transfers)
+        incremental = statistics.median(durations)
+
+        paid = {name: total for name, total in data_manager._totals["by_participant"].items()
+                if data_manager._is_shared(name)}
+        _, settle_ms = timed(lambda: settlement.settle(settlement.compute_balances(paid, owed)))
+
+        print("{}:".format(label))
+        print("  recalcul complet                {:8.2f} ms".format(full_ms))
+        print("  apres remplacement d'une depense {:7.2f} ms  (x{:.1f})".format(
+            incremental, full_ms / incremental))
+        print("  parts seules: de zero {:8.2f} ms, apres remplacement {:6.2f} ms  (x{:.1f})".format(
+            statistics.median(shares_full), statistics.median(shares_incremental),
+            statistics.median(shares_full) / statistics.median(shares_incremental)))
+        print("  soldes et virements seuls       {:8.2f} ms".format(settle_ms))
+        print("  {} soldes, {} virements".format(len(balances), len(transfers)))
+
+
+if __name__ == "__main__":
+    main()
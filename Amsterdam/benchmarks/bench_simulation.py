@@ -0,0 +1,124 @@
+"""
+bench_simulation.py - Simulation du risque de depassement du budget.
+
+Genere A activites a venir (200 par defaut, prix minimal et maximal
+saisis pour la moitie) et quelques transports sur place, puis compare
+pour T essais (100 000 par defaut):
+- avant: une boucle par essai, chaque poste tire par
+  random.triangular
+- apres, par paquets: un poste a la fois pour tout un paquet d'essais
+  (NumPy s'il est installe, sinon listes en comprehension)
+- apres, par paquets sur un pool de processus
+- apres, nouvelle demande sans changement: la derniere simulation est
+  gardee par le data_manager (data_manager.get_budget_risk)
+
+et verifie que les resultats avec et sans pool sont identiques.
+
+Usage:
+    python benchmarks/bench_simulation.py [activites] [essais]
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_manager
+import exchange_rates
+import simulation
+
+TODAY = "2025-09-12"
+DATES = ["2025-09-{:02d}".format(day) for day in range(12, 26)]
+
+
+def make_activites(n):
+    """
+    Genere n activites a venir.
+    """
+    rng = random.Random(42)
+    activites = []
+    for i in range(n):
+        prix = rng.randint(5, 150)
+        activite = {"date": rng.choice(DATES), "nom": "Activite {}".format(i), "prix": prix}
+        if i % 2:
+            activite["prix_min"] = prix * rng.randint(50, 100) // 100
+            activite["prix_max"] = prix * rng.randint(100, 250) // 100
+        activites.append(activite)
+    return activites
+
+
+def simulate_before(lines, fixed, budget, trials):
+    """
+    Simulation essai par essai (random.triangular pour chaque poste).
+    """
+    rng = random.Random(1)
+    postes = [key for key, count in lines for _ in range(count)]
+    totals = []
+    for _ in range(trials):
+        total = fixed
+        for low, likely, high in postes:
+            total += rng.triangular(low, high, likely)
+        totals.append(total)
+    return sum(1 for total in totals if total > budget) / trials
+
+
+def timed(function, repeat=3):
+    """
+    Appelle une fonction plusieurs fois.
+
+    Returns:
+        Tuple (resultat, duree mediane en ms)
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(durations)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    trials = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+
+    directory = tempfile.mkdtemp(prefix="bench_simulation_")
+    exchange_rates.load(os.path.join(directory, "taux_de_change.json"))
+    data_manager._set_trip_paths(directory)
+    data_manager.load_data()
+    data_manager.add_activites(make_activites(n))
+    data_manager.update_budget_prevu(n * 85)
+
+    fixed, lines, budget, _ = data_manager._risk_inputs(TODAY, trials)
+    print("{} postes incertains ({} distincts), {} essais, moteur: {}".format(
+        sum(count for _, count in lines), len(lines), trials,
+        "numpy" if simulation.numpy is not None else "python"))
+
+    before_trials = min(trials, 20000)
+    _, before = timed(lambda: simulate_before(lines, fixed, budget, before_trials), repeat=1)
+    before = before * trials / before_trials
+
+    sequential, after = timed(lambda: simulation.simulate(lines, fixed, budget, trials, parallel=False))
+    parallel, pooled = timed(lambda: simulation.simulate(lines, fixed, budget, trials, parallel=True))
+    assert sequential["percentiles"] == parallel["percentiles"]
+    assert sequential["depassement"] == parallel["depassement"]
+
+    data_manager.get_budget_risk(today=TODAY, trials=trials)
+    _, cached = timed(lambda: data_manager.get_budget_risk(today=TODAY, trials=trials), repeat=20)
+
+    print("Simulation:")
+    print("  avant (essai par essai{})".format(", extrapole" if before_trials < trials else "").ljust(40)
+          + "{:9.1f} ms".format(before))
+    print("  apres, par paquets".ljust(40) + "{:9.1f} ms  (x{:.1f})".format(after, before / after))
+    print("  apres, pool de {} processus".format(parallel["processus"]).ljust(40)
+          + "{:9.1f} ms  (x{:.1f})".format(pooled, before / pooled))
+    print("  apres, sans changement (cache)".ljust(40) + "{:9.3f} ms".format(cached))
+    print("Probabilite de depassement: {:.1%}, P50 {} - P95 {} (budget {})".format(
+        sequential["depassement"], sequential["percentiles"][50], sequential["percentiles"][95], budget))
+
+
+if __name__ == "__main__":
+    main()
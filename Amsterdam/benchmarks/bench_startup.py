@@ -0,0 +1,135 @@
+"""
+bench_startup.py - Duree de chargement: fichier JSON / cache binaire.
+
+Pour chaque taille de fichier de donnees (1 Mo, 10 Mo, 100 Mo par defaut),
+genere un voyage avec autant de depenses que necessaire, puis mesure:
+- JSON:  lecture + analyse du fichier JSON + conversion en enregistrements
+- cache: lecture du cache binaire (verification taille, date et empreinte
+         du fichier JSON comprise)
+- reconstruction: analyse JSON + ecriture du cache (premier demarrage
+         apres une modification externe du fichier JSON)
+
+Usage:
+    python benchmarks/bench_startup.py [taille_mo ...]
+"""
+
+import copy
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import records
+import snapshot_cache
+from config import BUDGET_CATEGORIES, DEFAULT_DATA
+
+
+def generate_data(size_mb):
+    """
+    Genere des donnees de voyage dont le JSON fait environ size_mb Mo.
+
+    Args:
+        size_mb: La taille visee en megaoctets
+
+    Returns:
+        Les donnees (dictionnaire)
+    """
+    rng = random.Random(42)
+    sample = {
+        "id": 100000, "date": "2025-09-15", "categorie": "Nourriture",
+        "montant": 123.45, "description": "Depense 100000", "participant": "Groupe",
+    }
+    per_item = len(json.dumps(sample, indent=2)) + 8
+    n = max(1, int(size_mb * 1e6 / per_item))
+
+    data = copy.deepcopy(DEFAULT_DATA)
+    data["budget"]["depenses"] = [
+        {
+            "id": i + 1,
+            "date": "2025-09-{:02d}".format(15 + i % 6),
+            "categorie": rng.choice(BUDGET_CATEGORIES),
+            "montant": round(rng.uniform(1, 200), 2),
+            "description": "Depense {}".format(i + 1),
+            "participant": "Groupe",
+        }
+        for i in range(n)
+    ]
+    return data
+
+
+def load_json(json_path):
+    """
+    Chargement sans cache (analyse JSON puis conversion en enregistrements).
+
+    Args:
+        json_path: Chemin du fichier JSON
+
+    Returns:
+        Tuple (donnees, contenu brut du fichier)
+    """
+    with open(json_path, "rb") as f:
+        raw = f.read()
+    data = json.loads(raw)
+    records.convert_list(data["budget"]["depenses"], records.Depense)
+    return data, raw
+
+
+def bench_size(directory, size_mb):
+    """
+    Mesure les trois modes de chargement pour une taille de fichier.
+
+    Args:
+        directory: Repertoire de travail temporaire
+        size_mb: La taille visee en megaoctets
+    """
+    json_path = os.path.join(directory, "voyage_data.json")
+    cache_path = os.path.join(directory, "voyage_data.cache")
+
+    data = generate_data(size_mb)
+    payload = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    with open(json_path, "wb") as f:
+        f.write(payload)
+    del data
+
+    # Sans cache
+    start = time.perf_counter()
+    data, raw = load_json(json_path)
+    json_ms = (time.perf_counter() - start) * 1000
+
+    # Reconstruction du cache (analyse JSON + ecriture)
+    start = time.perf_counter()
+    data, raw = load_json(json_path)
+    snapshot_cache.write(cache_path, json_path, snapshot_cache.dumps_data(data),
+                         snapshot_cache.content_hash(raw))
+    rebuild_ms = (time.perf_counter() - start) * 1000
+    del data, raw
+
+    # Avec le cache
+    start = time.perf_counter()
+    data = snapshot_cache.load(cache_path, json_path)
+    cache_ms = (time.perf_counter() - start) * 1000
+    assert data is not None
+
+    print(f"{len(payload) / 1e6:7.1f} Mo  {len(data['budget']['depenses']):8d} depenses  "
+          f"JSON {json_ms:8.1f} ms  cache {cache_ms:8.1f} ms  "
+          f"(x{json_ms / cache_ms:.1f})  reconstruction {rebuild_ms:8.1f} ms")
+
+
+def main():
+    sizes = [float(arg) for arg in sys.argv[1:]] or [1, 10, 100]
+
+    directory = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        for size_mb in sizes:
+            bench_size(directory, size_mb)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+stress_shared_dir.py - Plusieurs instances sur le meme repertoire de donnees.
+
+Lance plusieurs processus qui ouvrent le meme repertoire de donnees (comme
+plusieurs personnes sur un dossier partage). Chacun ajoute des depenses,
+modifie les memes activites que les autres et coche des items de la
+checklist, en sauvegardant (journal et compactage) et en integrant les
+modifications des autres a intervalles irreguliers. A la fin:
+- chaque depense ajoutee est presente une seule fois (les IDs attribues
+  en meme temps par deux instances ont ete renumerotes);
+- les totaux maintenus correspondent aux depenses (verify_aggregates);
+- toutes les instances, et une nouvelle instance qui relit le
+  repertoire, voient exactement les memes donnees.
+
+Le scenario deterministe a deux instances (modifications concurrentes
+d'un meme element, sans perte) est un test: tests/test_shared_dir.py.
+
+Usage:
+    python benchmarks/stress_shared_dir.py [processus] [operations]
+"""
+
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Nombre d'activites et d'items modifies par toutes les instances
+SHARED_ITEMS = 20
+
+
+def open_directory(directory):
+    """
+    Ouvre un repertoire de donnees dans ce processus.
+
+    Args:
+        directory: Le repertoire de donnees
+
+    Returns:
+        Le module data_manager
+    """
+    import data_manager
+
+    data_manager._set_trip_paths(directory)
+    data_manager.load_data()
+    return data_manager
+
+
+def fingerprint(dm):
+    """
+    Resume comparable des donnees d'une instance.
+
+    Args:
+        dm: Le module data_manager
+
+    Returns:
+        Dictionnaire de listes triees
+    """
+    return {
+        "depenses": sorted((d['id'], d.get('description'), d.get('montant'))
+                           for d in dm.get_depenses()),
+        "activites": sorted((a['id'], a.get('horaire'), a.get('prix'))
+                            for a in dm.get_activites()),
+        "checklist": sorted((c['id'], c.get('checked', False)) for c in dm.get_checklist()),
+        "budget_prevu": dm.get_budget_prevu(),
+    }
+
+
+def aggregates_ok(dm):
+    """
+    Verifie les totaux maintenus d'une instance (voir verify_aggregates).
+
+    Returns:
+        True si les totaux correspondent aux donnees
+    """
+    try:
+        dm.verify_aggregates()
+    except AssertionError as e:
+        print(f"Totaux: {e}")
+        return False
+    return True
+
+
+def setup(directory):
+    """
+    Cree le repertoire de donnees commun (processus a part).
+
+    Args:
+        directory: Le repertoire de donnees
+    """
+    dm = open_directory(directory)
+    dm.add_activites([
+        {"date": "2025-09-16", "nom": f"Activite {i}", "horaire": "10:00", "prix": 10}
+        for i in range(SHARED_ITEMS)
+    ])
+    dm.add_checklist_items([
+        {"item": f"Item {i}", "categorie": "Divers", "checked": False}
+        for i in range(SHARED_ITEMS)
+    ])
+    dm.save_data()
+
+
+def worker(directory, number, operations, barrier, results):
+    """
+    Une instance: modifications aleatoires, puis synchronisation finale.
+
+    Args:
+        directory: Le repertoire de donnees
+        number: Le numero de l'instance
+        operations: Le nombre de modifications
+        barrier: Barriere commune a toutes les instances
+        results: File des resultats
+    """
+    import events
+
+    dm = open_directory(directory)
+    rng = random.Random(number)
+    added = []
+    conflicts = []
+    events.subscribe(lambda batch: conflicts.extend(events.get_conflicts(batch)))
+
+    barrier.wait()
+    for i in range(operations):
+        choice = rng.random()
+        if choice < 0.5:
+            description = f"w{number}-{i}"
+            dm.add_depense({"date": "2025-09-16", "categorie": "Nourriture",
+                            "montant": rng.randint(1, 100), "description": description,
+                            "participant": "Groupe"})
+            added.append(description)
+        elif choice < 0.8:
+            activites = list(dm.get_activites())
+            activite = rng.choice(activites)
+            dm.update_activite(activite['id'], dict(activite, horaire=f"{number:02d}:{i % 60:02d}",
+                                                    prix=rng.randint(1, 50)))
+        elif choice < 0.9:
+            dm.toggle_checklist_item(rng.choice(list(dm.get_checklist()))['id'])
+        elif choice < 0.95:
+            dm.save_data()
+        else:
+            dm.update_budget_prevu(rng.randint(500, 5000))
+
+        if rng.random() < 0.3:
+            dm.sync_external_changes()
+        if rng.random() < 0.1:
+            time.sleep(0.005)
+
+    # Toutes les instances ecrivent leurs dernieres modifications, puis
+    # integrent celles des autres (deux tours: une fusion peut ecrire)
+    for _ in range(2):
+        dm.save_data()
+        barrier.wait()
+        while dm.has_external_changes():
+            dm.sync_external_changes()
+        barrier.wait()
+    dm.save_data()
+    barrier.wait()
+    while dm.has_external_changes():
+        dm.sync_external_changes()
+
+    events.dispatch()
+    results.put((number, added, len(conflicts), aggregates_ok(dm), fingerprint(dm)))
+
+
+def check(directory, results):
+    """
+    Relit le repertoire dans une nouvelle instance.
+
+    Args:
+        directory: Le repertoire de donnees
+        results: File des resultats
+    """
+    dm = open_directory(directory)
+    results.put((None, [], 0, aggregates_ok(dm), fingerprint(dm)))
+
+
+def run(processes, operations):
+    """
+    Lance les instances et verifie le resultat.
+
+    Returns:
+        True si toutes les verifications reussissent
+    """
+    ctx = multiprocessing.get_context("spawn")
+    directory = tempfile.mkdtemp(prefix="stress_shared_")
+    try:
+        p = ctx.Process(target=setup, args=(directory,))
+        p.start()
+        p.join()
+
+        barrier = ctx.Barrier(processes)
+        results = ctx.Queue()
+        start = time.perf_counter()
+        workers = [ctx.Process(target=worker, args=(directory, n, operations, barrier, results))
+                   for n in range(processes)]
+        for p in workers:
+            p.start()
+        outcomes = [results.get(timeout=600) for _ in workers]
+        for p in workers:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        p = ctx.Process(target=check, args=(directory, results))
+        p.start()
+        outcomes.append(results.get(timeout=600))
+        p.join()
+    finally:
+        shutil.rmtree(directory)
+
+    ok = True
+    reference = outcomes[-1][4]
+    added = [description for outcome in outcomes for description in outcome[1]]
+    descriptions = [description for _, description, _ in reference["depenses"]]
+    ids = [item_id for item_id, _, _ in reference["depenses"]]
+
+    if sorted(added) != sorted(d for d in descriptions if d and d[0] == "w"):
+        print("ECHEC: depenses perdues ou dupliquees")
+        ok = False
+    if len(set(ids)) != len(ids):
+        print("ECHEC: IDs de depenses dupliques")
+        ok = False
+    for number, _, _, totals_ok, data in outcomes:
+        if not totals_ok:
+            print(f"ECHEC: totaux incorrects (instance {number})")
+            ok = False
+        if data != reference:
+            print(f"ECHEC: l'instance {number} ne voit pas les memes donnees")
+            ok = False
+
+    conflicts = sum(outcome[2] for outcome in outcomes)
+    print(f"{processes} instances x {operations} operations: {elapsed:.1f} s, "
+          f"{len(added)} depenses ajoutees, {conflicts} conflit(s) signale(s) "
+          f"-> {'OK' if ok else 'ECHEC'}")
+    return ok
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    sys.exit(0 if run(processes, operations) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+catalog.py - Catalogue des voyages de l'application Amsterdam Trip Planner.
+
+Chaque voyage a son propre repertoire de donnees (fichiers JSON par
+section, journal, caches, base SQLite). Le catalogue est un petit fichier d'index
+(data/catalog.json) qui contient un resume de chaque voyage: dates,
+destination, nombre de participants, budget prevu et total des depenses.
+
+Afficher la liste des voyages ne lit que cet index: les donnees d'un
+voyage ne sont chargees (par data_manager) que lorsqu'il est ouvert.
+
+Le voyage d'origine utilise directement le repertoire data/ (les fichiers
+existants restent a leur place); les autres voyages sont ranges dans
+data/trips/<id>/.
+
+Format du catalogue:
+    {
+        "current": "amsterdam-2025",
+        "trips": {
+            "amsterdam-2025": {"id": ..., "nom": ..., "dir": "", ...}
+        }
+    }
+"""
+
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime
+
+from config import (
+    APP_TITLE, CATALOG_FILE, DATA_DIR, DATA_FILE, DATE_DEPART, DATE_RETOUR,
+    DEFAULT_DATA, DESTINATION, JOURNAL_FILE, SECTIONS_DIR, SNAPSHOT_CACHE_FILE,
+    SQLITE_FILE, TRIPS_DIR
+)
+
+# ============================================
+# VARIABLES GLOBALES
+# ============================================
+
+# Contenu du catalogue en memoire (None tant qu'il n'est pas lu)
+_catalog = None
+
+# Verrou protegeant le catalogue (mis a jour depuis le thread d'ecriture)
+_lock = threading.RLock()
+
+# Champs du resume d'un voyage
+SUMMARY_FIELDS = (
+    "destination", "date_depart", "date_retour",
+    "participants", "budget_prevu", "total_depenses"
+)
+
+
+# ============================================
+# FONCTIONS DE LECTURE/ECRITURE DE L'INDEX
+# ============================================
+
+def _default_catalog():
+    """
+    Cree le catalogue initial avec le voyage d'origine (repertoire data/).
+
+    Returns:
+        Le catalogue (dictionnaire)
+    """
+    trip_id = make_trip_id(f"{DESTINATION} {DATE_DEPART[:4]}", ())
+    budget = DEFAULT_DATA["budget"]
+
+    return {
+        "current": trip_id,
+        "trips": {
+            trip_id: {
+                "id": trip_id,
+                "nom": APP_TITLE,
+                "dir": "",
+                "destination": DESTINATION,
+                "date_depart": DATE_DEPART,
+                "date_retour": DATE_RETOUR,
+                "participants": len(DEFAULT_DATA["participants"]),
+                "budget_prevu": budget["budget_prevu"],
+                "total_depenses": sum(d["montant"] for d in budget["depenses"]),
+                "updated": datetime.now().isoformat(),
+            }
+        },
+    }
+
+
+def _write_catalog():
+    """
+    Ecrit le catalogue sur le disque (fichier temporaire puis renomme).
+    """
+    tmp_file = CATALOG_FILE + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(_catalog, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, CATALOG_FILE)
+
+
+def load_catalog():
+    """
+    Lit le catalogue (une seule fois) ou le cree s'il n'existe pas.
+
+    Returns:
+        Le catalogue (dictionnaire)
+    """
+    global _catalog
+
+    with _lock:
+        if _catalog is not None:
+            return _catalog
+
+        if os.path.exists(CATALOG_FILE):
+            try:
+                with open(CATALOG_FILE, 'r', encoding='utf-8') as f:
+                    _catalog = json.load(f)
+                return _catalog
+            except json.JSONDecodeError as e:
+                print(f"[Catalogue] Erreur de lecture JSON: {e}")
+
+        os.makedirs(DATA_DIR, exist_ok=True)
+        _catalog = _default_catalog()
+        _write_catalog()
+        print(f"[Catalogue] Catalogue cree: {CATALOG_FILE}")
+        return _catalog
+
+
+# ============================================
+# FONCTIONS D'ACCES AUX VOYAGES
+# ============================================
+
+def list_trips():
+    """
+    Liste les resumes de tous les voyages, tries par date de depart.
+
+    Returns:
+        Liste de dictionnaires (id, nom, dir, destination, dates, ...)
+    """
+    trips = load_catalog()["trips"].values()
+    return sorted(trips, key=lambda t: (t.get("date_depart", ""), t.get("nom", "")))
+
+
+def get_trip(trip_id):
+    """
+    Recupere le resume d'un voyage.
+
+    Args:
+        trip_id: L'identifiant du voyage
+
+    Returns:
+        Le resume, ou None si le voyage n'existe pas
+    """
+    return load_catalog()["trips"].get(trip_id)
+
+
+def get_current_trip_id():
+    """
+    Recupere l'identifiant du dernier voyage ouvert.
+
+    Returns:
+        L'identifiant du voyage
+    """
+    catalog = load_catalog()
+    if catalog.get("current") not in catalog["trips"]:
+        catalog["current"] = list_trips()[0]["id"]
+    return catalog["current"]
+
+
+def set_current_trip(trip_id):
+    """
+    Memorise le voyage ouvert (rouvert au prochain lancement).
+
+    Args:
+        trip_id: L'identifiant du voyage
+    """
+    with _lock:
+        load_catalog()["current"] = trip_id
+        _write_catalog()
+
+
+def get_trip_dir(trip_id):
+    """
+    Retourne le repertoire de donnees d'un voyage.
+
+    Args:
+        trip_id: L'identifiant du voyage
+
+    Returns:
+        Le chemin absolu du repertoire
+    """
+    rel_dir = get_trip(trip_id)["dir"]
+    return os.path.join(DATA_DIR, *rel_dir.split("/")) if rel_dir else DATA_DIR
+
+
+def update_summary(trip_id, summary):
+    """
+    Met a jour le resume d'un voyage dans l'index.
+
+    Le fichier n'est reecrit que si le resume a change.
+
+    Args:
+        trip_id: L'identifiant du voyage
+        summary: Dictionnaire avec les champs de SUMMARY_FIELDS
+    """
+    with _lock:
+        trip = get_trip(trip_id)
+        if trip is None:
+            return
+
+        changes = {k: summary[k] for k in SUMMARY_FIELDS
+                   if k in summary and trip.get(k) != summary[k]}
+        if not changes:
+            return
+
+        trip.update(changes)
+        trip["updated"] = datetime.now().isoformat()
+        _write_catalog()
+
+
+# ============================================
+# CREATION ET DUPLICATION DE VOYAGES
+# ============================================
+
+def make_trip_id(nom, existing):
+    """
+    Construit un identifiant lisible et unique a partir d'un nom.
+
+    Args:
+        nom: Le nom du voyage
+        existing: Les identifiants deja utilises
+
+    Returns:
+        L'identifiant (ex: "amsterdam-2025", "amsterdam-2025-2")
+    """
+    ascii_nom = unicodedata.normalize("NFKD", nom).encode("ascii", "ignore").decode()
+    base = re.sub(r"[^a-z0-9]+", "-", ascii_nom.lower()).strip("-") or "voyage"
+
+    trip_id = base
+    counter = 2
+    while trip_id in existing:
+        trip_id = f"{base}-{counter}"
+        counter += 1
+    return trip_id
+
+
+def _link_or_copy(source, target):
+    """
+    Partage un fichier par lien physique, ou le copie si c'est impossible.
+
+    Les fichiers JSON et leurs caches ne sont jamais modifies sur place
+    (ils sont remplaces par renommage d'un fichier temporaire): un lien
+    physique suffit donc, et la copie n'a lieu qu'a la premiere ecriture.
+
+    Args:
+        source: Le fichier d'origine
+        target: Le nouveau fichier
+    """
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def clone_trip(source_id, nom):
+    """
+    Duplique un voyage (utilise comme modele) sous un nouveau nom.
+
+    La duplication est peu couteuse: les fichiers JSON des sections et
+    leurs caches sont partages par lien physique; seul le journal
+    (modifie sur place) est copie, et la base SQLite est copiee avec
+    l'API de sauvegarde.
+
+    Les modifications en attente du voyage d'origine doivent avoir ete
+    ecrites avant l'appel (data_manager.save_data).
+
+    Args:
+        source_id: L'identifiant du voyage a dupliquer
+        nom: Le nom du nouveau voyage
+
+    Returns:
+        L'identifiant du nouveau voyage
+    """
+    with _lock:
+        catalog = load_catalog()
+        source = catalog["trips"][source_id]
+        source_dir = get_trip_dir(source_id)
+
+        trip_id = make_trip_id(nom, catalog["trips"])
+        rel_dir = f"{os.path.basename(TRIPS_DIR)}/{trip_id}"
+        target_dir = os.path.join(TRIPS_DIR, trip_id)
+        os.makedirs(target_dir, exist_ok=True)
+
+        for path in (DATA_FILE, SNAPSHOT_CACHE_FILE):
+            name = os.path.basename(path)
+            if os.path.exists(os.path.join(source_dir, name)):
+                _link_or_copy(os.path.join(source_dir, name), os.path.join(target_dir, name))
+
+        name = os.path.basename(SECTIONS_DIR)
+        source_sections = os.path.join(source_dir, name)
+        if os.path.isdir(source_sections):
+            target_sections = os.path.join(target_dir, name)
+            os.makedirs(target_sections, exist_ok=True)
+            for entry in os.listdir(source_sections):
+                if not entry.endswith(".tmp"):
+                    _link_or_copy(os.path.join(source_sections, entry),
+                                  os.path.join(target_sections, entry))
+
+        name = os.path.basename(JOURNAL_FILE)
+        if os.path.exists(os.path.join(source_dir, name)):
+            shutil.copy2(os.path.join(source_dir, name), os.path.join(target_dir, name))
+
+        name = os.path.basename(SQLITE_FILE)
+        if os.path.exists(os.path.join(source_dir, name)):
+            source_conn = sqlite3.connect(os.path.join(source_dir, name))
+            target_conn = sqlite3.connect(os.path.join(target_dir, name))
+            with target_conn:
+                source_conn.backup(target_conn)
+            source_conn.close()
+            target_conn.close()
+
+        trip = dict(source)
+        trip.update({
+            "id": trip_id,
+            "nom": nom,
+            "dir": rel_dir,
+            "updated": datetime.now().isoformat(),
+        })
+        catalog["trips"][trip_id] = trip
+        _write_catalog()
+
+    print(f"[Catalogue] Voyage {source_id} duplique en {trip_id}")
+    return trip_id
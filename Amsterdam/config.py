@@ -6,8 +6,11 @@ dans l'ensemble de l'application. Centraliser ces valeurs permet de
 les modifier facilement sans toucher au code des autres modules.
 """
 
+import functools
 import os
-from datetime import datetime
+from datetime import date, datetime
+
+import money
 
 # ============================================
 # INFORMATIONS DU VOYAGE
@@ -35,6 +38,29 @@ WINDOW_HEIGHT = 850
 MIN_WIDTH = 800
 MIN_HEIGHT = 600
 
+# Nombre de lignes affichees par page dans les tableaux des activites,
+# des depenses et des participants (voir frames/pager.py)
+PAGE_SIZE = 100
+
+# Lignes formatees gardees en cache par tableau (plusieurs pages, voir
+# frames/tree_rows.py) et textes formates gardes en cache par
+# format_date, format_currency, format_cents et date_ordinal
+ROW_CACHE_SIZE = 4 * PAGE_SIZE
+FORMAT_CACHE_SIZE = 4096
+
+# Taux de change (devise, date) gardes en cache par exchange_rates.rate
+RATE_CACHE_SIZE = 4096
+
+# Tableaux croises gardes en cache et mis a jour a chaque modification des
+# depenses (voir pivot.py), et nombre de colonnes affichees (les autres
+# valeurs sont regroupees dans une colonne "Autres")
+PIVOT_CACHE_SIZE = 16
+PIVOT_MAX_COLUMNS = 8
+
+# Nombre maximal de resultats affiches par la recherche globale (champ de
+# recherche de l'en-tete, voir data_manager.search)
+SEARCH_LIMIT = 50
+
 # ============================================
 # CHEMINS DES FICHIERS
 # ============================================
@@ -45,9 +71,118 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Repertoire des donnees
 DATA_DIR = os.path.join(BASE_DIR, "data")
 
-# Fichier de sauvegarde des donnees JSON
+# Ancien fichier de sauvegarde unique des donnees JSON (migre
+# automatiquement vers SECTIONS_DIR au premier chargement)
 DATA_FILE = os.path.join(DATA_DIR, "voyage_data.json")
 
+# Repertoire des donnees JSON: un fichier par section (voir sections.py)
+SECTIONS_DIR = os.path.join(DATA_DIR, "sections")
+
+# Catalogue des voyages (index avec un resume de chaque voyage)
+CATALOG_FILE = os.path.join(DATA_DIR, "catalog.json")
+
+# Table locale des taux de change dates, commune a tous les voyages
+# (voir exchange_rates.py)
+EXCHANGE_RATES_FILE = os.path.join(DATA_DIR, "taux_de_change.json")
+
+# Repertoire des donnees des voyages crees depuis le catalogue
+# (un sous-repertoire par voyage, avec les memes noms de fichiers)
+TRIPS_DIR = os.path.join(DATA_DIR, "trips")
+
+# Journal des modifications (ajoute a cote des fichiers JSON)
+JOURNAL_FILE = os.path.join(DATA_DIR, "voyage_data.journal")
+
+# Taille (en octets) au-dela de laquelle le journal est compacte:
+# les sections modifiees sont reecrites dans SECTIONS_DIR
+JOURNAL_MAX_BYTES = 256 * 1024
+
+# Verrou partage par toutes les instances qui ouvrent ce repertoire de
+# donnees (dossier partage): voir file_lock.py
+LOCK_FILE = os.path.join(DATA_DIR, "voyage_data.lock")
+
+# Intervalle (en millisecondes) de detection des modifications ecrites
+# par une autre instance (simple lecture de la date et de la taille des
+# fichiers; les modifications sont ensuite fusionnees element par element)
+SYNC_INTERVAL_MS = 1000
+
+# Cache binaire de l'ancien fichier JSON unique (lu seulement pendant
+# la migration). Chaque fichier de section a aussi son cache binaire,
+# relu plus vite tant qu'il correspond exactement au fichier JSON.
+SNAPSHOT_CACHE_FILE = os.path.join(DATA_DIR, "voyage_data.cache")
+USE_SNAPSHOT_CACHE = True
+
+# Base de donnees SQLite (utilisee si STORAGE_BACKEND = "sqlite")
+SQLITE_FILE = os.path.join(DATA_DIR, "voyage_data.db")
+
+# Mode de stockage des donnees:
+# - "json": un fichier JSON par section + journal des modifications
+# - "sqlite": base SQLite locale (adapte aux voyages avec beaucoup de depenses)
+# Au premier lancement en mode "sqlite", les donnees JSON existantes sont migrees.
+STORAGE_BACKEND = "json"
+
+# Registre des depenses en colonnes (voir ledger.py): les depenses sont
+# gardees en memoire dans des tableaux types (une colonne par champ) au
+# lieu d'un enregistrement par depense, et leur cache binaire est un
+# fichier a largeur fixe (depenses.ledger) projete en memoire (mmap) a
+# l'ouverture. Utile a partir de quelques centaines de milliers de
+# depenses.
+COLUMNAR_DEPENSES = False
+
+# ============================================
+# SAUVEGARDE DIFFEREE
+# ============================================
+
+# Delai (en millisecondes) pendant lequel les modifications successives
+# sont regroupees en une seule ecriture sur le disque.
+# Mettre 0 pour sauvegarder immediatement apres chaque modification.
+SAVE_DELAY_MS = 500
+
+# Nombre maximal d'etapes conservees pour annuler / retablir (Ctrl+Z,
+# Ctrl+Y). Chaque etape ne garde que les elements modifies.
+UNDO_MAX_STEPS = 200
+
+# Verifier les totaux maintenus (depenses, checklist) en les recalculant
+# depuis zero a chaque lecture. A activer pendant les tests uniquement.
+VERIFY_AGGREGATES = False
+
+# Import de fichiers (voir importer.py): nombre d'elements ajoutes par
+# transaction, nombre de lignes validees par paquet, taille de fichier a
+# partir de laquelle les paquets sont valides par un pool de processus
+# (IMPORT_WORKERS processus, 0 pour un par coeur; jamais avec un seul
+# processeur, ou le pool est plus lent que la validation en serie) et
+# nombre maximal d'erreurs conservees dans le rapport
+IMPORT_BATCH_SIZE = 2000
+IMPORT_CHUNK_ROWS = 2000
+IMPORT_PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+IMPORT_WORKERS = 0
+IMPORT_MAX_ERRORS = 100
+
+# Export de fichiers (voir exporter.py): nombre d'elements formates
+# ensemble avant chaque ecriture (et chaque rapport d'avancement)
+EXPORT_CHUNK_ROWS = 5000
+
+# Simulation du risque de depassement du budget (voir simulation.py):
+# nombre de tirages, tirages par paquet, nombre de tirages x postes
+# incertains a partir duquel les paquets sont repartis sur un pool de
+# processus (SIMULATION_WORKERS processus, 0 pour un par coeur) et
+# percentiles affiches
+SIMULATION_TRIALS = 100000
+SIMULATION_BATCH_SIZE = 10000
+SIMULATION_PARALLEL_MIN = 5000000
+SIMULATION_WORKERS = 0
+SIMULATION_PERCENTILES = (5, 50, 80, 95)
+
+# Ecart (en % du prix prevu) du minimum et du maximum d'un poste sans
+# estimation saisie, par categorie
+SIMULATION_SPREAD = {
+    "Transport": (-10, 30),
+    "Hebergement": (0, 10),
+    "Nourriture": (-20, 40),
+    "Activites": (-10, 25),
+    "Shopping": (-50, 100),
+    "Autre": (-30, 50),
+}
+
 # ============================================
 # COULEURS DE L'APPLICATION
 # ============================================
@@ -93,6 +228,11 @@ BUDGET_CATEGORIES = [
     "Autre"
 ]
 
+# Devise du voyage si le budget n'en indique pas, et devises proposees
+# pour une depense (en plus de celles de la table des taux de change)
+DEFAULT_CURRENCY = "EUR"
+CURRENCIES = ["EUR", "GBP", "CHF", "USD"]
+
 # ============================================
 # CATEGORIES DE CHECKLIST
 # ============================================
@@ -178,7 +318,7 @@ DEFAULT_DATA = {
     ],
     "budget": {
         "budget_prevu": 500.00,
-        "devise": "EUR",
+        "devise": DEFAULT_CURRENCY,
         "depenses": [
             {
                 "id": 1,
@@ -284,23 +424,55 @@ DEFAULT_DATA = {
 # FONCTIONS UTILITAIRES
 # ============================================
 
-def get_days_until_departure():
+def get_days_until_departure(date_depart=None):
     """
     Calcule le nombre de jours restants avant le depart.
 
+    Args:
+        date_depart: La date de depart AAAA-MM-JJ (par defaut: DATE_DEPART)
+
     Returns:
         Nombre de jours avant le depart (negatif si deja passe)
     """
-    departure = datetime.strptime(DATE_DEPART, "%Y-%m-%d")
+    departure = datetime.strptime(date_depart or DATE_DEPART, "%Y-%m-%d")
     today = datetime.now()
     delta = departure - today
     return delta.days
 
 
+@functools.lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def date_ordinal(date_str):
+    """
+    Convertit une date AAAA-MM-JJ en numero de jour (date.toordinal).
+
+    Les numeros se comparent comme les dates: ils servent de cle de tri
+    et de validation. Le resultat est garde en cache (les donnees d'un
+    voyage n'ont que quelques dates differentes).
+
+    Args:
+        date_str: La date en chaine de caracteres
+
+    Returns:
+        Le numero du jour, ou 0 si la date est absente ou invalide
+    """
+    if not isinstance(date_str, str) or len(date_str) != 10 \
+            or date_str[4] != "-" or date_str[7] != "-" \
+            or not date_str.replace("-", "").isdigit():
+        return 0
+    try:
+        return date(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:])).toordinal()
+    except ValueError:
+        return 0
+
+
+@functools.lru_cache(maxsize=FORMAT_CACHE_SIZE)
 def format_date(date_str, format_input="%Y-%m-%d", format_output="%d/%m/%Y"):
     """
     Convertit une date d'un format a un autre.
 
+    Le resultat est garde en cache: une date n'est analysee qu'une fois,
+    quel que soit le nombre de lignes qui l'affichent.
+
     Args:
         date_str: La date en chaine de caracteres
         format_input: Le format d'entree (par defaut: AAAA-MM-JJ)
@@ -316,9 +488,28 @@ def format_date(date_str, format_input="%Y-%m-%d", format_output="%d/%m/%Y"):
         return date_str
 
 
+@functools.lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def format_cents(cents, currency="EUR"):
+    """
+    Formate un montant en centimes (resultat garde en cache).
+
+    Args:
+        cents: Le montant en centimes (voir money.py)
+        currency: La devise (par defaut: EUR)
+
+    Returns:
+        Le montant formate (ex: "25,50 EUR")
+    """
+    return money.format_cents(cents, currency)
+
+
+@functools.lru_cache(maxsize=FORMAT_CACHE_SIZE)
 def format_currency(amount, currency="EUR"):
     """
-    Formate un montant en devise.
+    Formate un montant en euros (resultat garde en cache).
+
+    Le montant est arrondi au centime puis formate sans autre arrondi
+    (voir format_cents pour un montant deja en centimes).
 
     Args:
         amount: Le montant a formater
@@ -327,6 +518,4 @@ def format_currency(amount, currency="EUR"):
     Returns:
         Le montant formate (ex: "25,50 EUR")
     """
-    if currency == "EUR":
-        return f"{amount:,.2f} EUR".replace(",", " ").replace(".", ",")
-    return f"{amount:,.2f} {currency}"
+    return format_cents(money.to_cents(amount), currency)
@@ -2,18 +2,69 @@
 data_manager.py - Gestionnaire de donnees pour l'application Amsterdam Trip Planner.
 
 Ce module gere toutes les operations de lecture et d'ecriture des donnees
-dans le fichier JSON. Il assure la persistance des donnees entre les sessions.
+dans les fichiers JSON (un fichier par section, voir sections.py). Il assure
+la persistance des donnees entre les sessions.
 
 Ce module utilise des fonctions simples et une variable globale pour stocker
 les donnees en memoire.
+
+Les donnees ne sont pas chargees a l'import du module: elles le sont soit
+explicitement (load_data, ou start_loading dans un thread de chargement),
+soit au premier appel d'une fonction d'acces. Chaque section n'est lue
+qu'au premier acces a ses donnees.
+
+Les donnees en memoire sont immuables: les collections sont des IdMap
+(voir persistent.py), les elements des enregistrements en lecture seule
+et les sections des vues figees (voir records.freeze). Une modification
+remplace la valeur au lieu de la modifier, ce qui permet de prendre un
+instantane en O(1) (snapshot) et d'annuler ou retablir les modifications
+(undo, redo) en ne conservant que les elements modifies.
+
+Plusieurs instances peuvent ouvrir le meme repertoire de donnees (dossier
+partage): les ecritures se font sous un verrou de fichier (voir
+file_lock.py), et les modifications des autres instances sont integrees
+element par element (sync_external_changes), avec une fusion a trois voies
+lorsque le meme element a ete modifie des deux cotes.
 """
 
+import collections
+import contextlib
+import itertools
 import json
+import math
 import os
+import threading
+import time
 from datetime import datetime
+from collections.abc import Mapping
+from types import MappingProxyType
 import copy
 
-from config import DATA_FILE, DATA_DIR, DEFAULT_DATA
+import catalog
+import config
+import events
+import exchange_rates
+import file_lock
+import journal
+import ledger
+import money
+import pivot
+import records
+import search_index
+import sections
+import settlement
+import simulation
+import snapshot_cache
+import sorted_index
+import sqlite_backend
+from persistent import IdMap
+from config import (
+    DATA_FILE, DATA_DIR, DEFAULT_CURRENCY, DEFAULT_DATA, SAVE_DELAY_MS,
+    JOURNAL_FILE, JOURNAL_MAX_BYTES, SQLITE_FILE, STORAGE_BACKEND,
+    SNAPSHOT_CACHE_FILE, USE_SNAPSHOT_CACHE, SECTIONS_DIR,
+    UNDO_MAX_STEPS, LOCK_FILE, SEARCH_LIMIT, CURRENCIES, SIMULATION_TRIALS,
+    COLUMNAR_DEPENSES, date_ordinal
+)
 
 # ============================================
 # VARIABLE GLOBALE POUR LES DONNEES
@@ -22,6 +73,110 @@ from config import DATA_FILE, DATA_DIR, DEFAULT_DATA
 # Dictionnaire qui contient toutes les donnees en memoire
 _data = {}
 
+# Sections deja lues (voir sections.SECTION_FILES)
+_loaded_sections = set()
+
+# Sections modifiees depuis le dernier instantane (a reecrire au
+# prochain compactage)
+_dirty_sections = set()
+
+# Enregistrements du journal pas encore appliques, par section (rejoues
+# au chargement de la section)
+_section_backlog = {}
+
+# True si les totaux des depenses viennent du manifeste (les depenses
+# ne sont pas encore chargees)
+_totals_from_manifest = False
+
+# Verrou protegeant _data entre le thread Tk et le thread d'ecriture
+_lock = threading.RLock()
+
+# Verrou garantissant qu'une seule ecriture disque a lieu a la fois
+_write_lock = threading.Lock()
+
+# Enregistrements du journal pas encore ecrits sur le disque
+_pending_records = []
+
+# Numero du dernier enregistrement du journal attribue
+_journal_seq = 0
+
+# Minuteur de la sauvegarde differee en attente (ou None)
+_save_timer = None
+
+# Connexion a la base (mode STORAGE_BACKEND = "sqlite" uniquement)
+_conn = None
+
+# Evenement signale lorsque le chargement des donnees est termine
+_loaded = threading.Event()
+
+# Thread qui charge les donnees (ou None si le chargement n'a pas commence)
+_load_thread = None
+
+# Thread lance par start_loading (manifeste puis prechargement des
+# sections), ou None
+_prefetch_thread = None
+
+# Verrou evitant de lancer deux chargements en parallele
+_load_lock = threading.Lock()
+
+# Profondeur des transactions imbriquees en cours (0: pas de transaction)
+_tx_depth = 0
+
+# Fonctions annulant les modifications de la transaction en cours
+# (executees en ordre inverse en cas d'exception)
+_undo_log = []
+
+# Evenements de modification de la transaction en cours (publies en un
+# seul lot a la fin de la transaction, abandonnes en cas d'annulation)
+_pending_events = []
+
+# Etapes d'annulation et de retablissement: chaque etape est le lot
+# d'evenements d'une modification ou d'une transaction (les valeurs
+# avant/apres sont immuables et partagees avec les donnees)
+_undo_stack = collections.deque(maxlen=UNDO_MAX_STEPS)
+_redo_stack = collections.deque(maxlen=UNDO_MAX_STEPS)
+
+# "undo" ou "redo" pendant qu'une etape de l'historique est rejouee,
+# "remote" pendant l'integration des modifications d'une autre instance
+_history_mode = None
+
+# Evenements regroupes en une seule etape de l'historique par
+# history_step, par thread (identifiant du thread -> liste d'evenements)
+_history_groups = {}
+
+# Etat des fichiers partages deja integre par cette instance (voir
+# sync_external_changes). _disk_generation vaut None tant que les donnees
+# en memoire ne correspondent a aucun manifeste (valeurs par defaut,
+# migration, reinitialisation pas encore ecrites)
+_disk_generation = None   # Numero de compactage du manifeste
+_disk_offset = 0          # Octets du journal deja lus
+_disk_seq = 0             # Dernier enregistrement du journal integre
+_disk_signature = None    # Date et taille du manifeste et du journal
+
+# Thread qui tient le verrou de fichier (voir _shared_lock), ou None
+_file_lock_owner = None
+
+# Version de chaque element (ou section) avant ses modifications locales
+# pas encore ecrites: {(collection, id ou None): valeur}. C'est la base de
+# la fusion a trois voies avec les modifications des autres instances.
+_sync_base = {}
+
+# Voyage ouvert (identifiant du catalogue), ou None pour utiliser
+# directement les fichiers definis dans config.py
+_trip_id = None
+
+# Compteurs de la sauvegarde differee
+_save_stats = {
+    "writes": 0,            # Ajouts au journal effectivement realises
+    "coalesced": 0,         # Modifications regroupees dans une ecriture en attente
+    "records": 0,           # Enregistrements ajoutes au journal
+    "compactions": 0,       # Instantanes ecrits
+    "sections": 0,          # Fichiers de section reecrits
+    "last_flush_ms": 0.0,   # Duree de la derniere ecriture
+    "max_flush_ms": 0.0,    # Duree maximale observee
+    "total_flush_ms": 0.0,  # Duree cumulee de toutes les ecritures
+}
+
 # ============================================
 # FONCTIONS DE BASE (chargement/sauvegarde)
 # ============================================
@@ -35,538 +190,4698 @@ def _ensure_data_directory():
         print(f"[DataManager] Repertoire cree: {DATA_DIR}")
 
 
+def _read_json_file():
+    """
+    Lit l'ancien fichier JSON unique et rejoue le journal des modifications.
+
+    Utilise pour la migration vers un fichier par section (ou vers
+    SQLite). Si le cache binaire correspond au fichier JSON, il est lu
+    a la place du JSON.
+
+    Returns:
+        Les donnees lues (dictionnaire)
+    """
+    global _journal_seq
+
+    data = None
+    if USE_SNAPSHOT_CACHE:
+        data = snapshot_cache.load(SNAPSHOT_CACHE_FILE, DATA_FILE)
+
+    if data is not None:
+        print(f"[DataManager] Donnees chargees depuis {SNAPSHOT_CACHE_FILE}")
+    else:
+        with open(DATA_FILE, 'rb') as f:
+            data = json.loads(f.read())
+        print(f"[DataManager] Donnees chargees depuis {DATA_FILE}")
+
+    # Rejouer les modifications posterieures a l'instantane
+    snapshot_seq = data.get('journal_seq', 0)
+    applied, _journal_seq = journal.replay(
+        data, journal.read_records(JOURNAL_FILE), snapshot_seq
+    )
+    if applied:
+        print(f"[DataManager] {applied} modification(s) rejouee(s) depuis le journal")
+
+    return data
+
+
+def _load_sqlite():
+    """
+    Ouvre la base SQLite et charge les donnees.
+
+    Au premier lancement, les donnees JSON existantes (fichiers par
+    section ou ancien fichier unique) sont migrees dans la base.
+
+    Returns:
+        Les donnees chargees, ou None si la base est vide
+    """
+    global _conn
+
+    if _conn is None:
+        _conn = sqlite_backend.connect(SQLITE_FILE)
+
+    if not sqlite_backend.is_empty(_conn):
+        print(f"[DataManager] Donnees chargees depuis {SQLITE_FILE}")
+        return sqlite_backend.load(_conn)
+
+    if sections.exists(SECTIONS_DIR):
+        return sqlite_backend.migrate_from_sections(_conn, SECTIONS_DIR, JOURNAL_FILE)
+
+    if os.path.exists(DATA_FILE):
+        data = _read_json_file()
+        sqlite_backend.save_all(_conn, data)
+        print(f"[DataManager] Donnees migrees de {DATA_FILE} vers {SQLITE_FILE}")
+        return data
+
+    return None
+
+
+def _read_manifest():
+    """
+    Lit le manifeste des sections et repartit le journal par section.
+
+    Aucune section n'est lue ici: chacune l'est au premier acces a ses
+    donnees (voir _load_section), et les modifications du journal qui la
+    concernent sont alors rejouees. Les sections modifiees dans le
+    journal sont marquees a reecrire.
+    """
+    global _data, _journal_seq, _totals_from_manifest
+    global _disk_generation, _disk_offset, _disk_seq, _disk_signature
+
+    # Le manifeste et le journal sont lus ensemble, sans ecriture d'une
+    # autre instance entre les deux
+    with _shared_lock():
+        manifest = sections.read_manifest(SECTIONS_DIR)
+        journal_records, offset = journal.read_tail(JOURNAL_FILE)
+        signature = _read_disk_signature()
+
+    manifest.pop('version', None)
+    totals = manifest.pop('totals', None)
+
+    snapshot_seq = manifest.get('journal_seq', 0)
+    last_seq = snapshot_seq
+    backlog = {}
+    for record in journal_records:
+        seq = record.get('seq', 0)
+        if seq <= snapshot_seq:
+            continue
+        last_seq = max(last_seq, seq)
+
+        name = sections.section_of(record.get('col'))
+        if name is not None:
+            backlog.setdefault(name, []).append(record)
+
+    with _lock:
+        _data = manifest
+        _touch(None)
+        _journal_seq = last_seq
+        _loaded_sections.clear()
+        _indexes.clear()
+        _section_backlog.clear()
+        _section_backlog.update(backlog)
+        _clear_history()
+        _sync_base.clear()
+        _dirty_sections.update(backlog)
+
+        _disk_generation = manifest.get('generation', 0)
+        _disk_offset = offset
+        _disk_seq = last_seq
+        _disk_signature = signature
+
+        # Totaux des depenses du manifeste: valables tant que le journal
+        # ne contient pas de modification des depenses
+        _totals_from_manifest = 'depenses' not in backlog and _restore_totals(totals)
+
+    pending = sum(len(records) for records in backlog.values())
+    print(f"[DataManager] Manifeste charge depuis {SECTIONS_DIR} "
+          f"({pending} modification(s) du journal a rejouer)")
+
+
+def _load_section(name):
+    """
+    Lit une section et rejoue les modifications du journal qui la concernent.
+
+    Ne fait rien si la section est deja chargee. Les index de la
+    collection correspondante sont construits.
+
+    Le fichier est lu et decode sans tenir _lock: pendant le
+    prechargement (voir start_loading), le thread Tk n'attend pas la
+    lecture d'une grosse section. Si un compactage a eu lieu entre-temps,
+    la section est relue sous le verrou.
+
+    Args:
+        name: Le nom de la section (voir sections.SECTION_FILES)
+    """
+    global _totals_from_manifest
+
+    with _lock:
+        if name in _loaded_sections:
+            return
+        generation = _disk_generation
+
+    if name == 'depenses':
+        # Les totaux sont convertis dans la devise du voyage (budget)
+        _load_section('budget')
+
+    value = _read_section_file(name)
+
+    with _lock:
+        if name in _loaded_sections:
+            return
+
+        if _disk_generation != generation:
+            # Sections reecrites pendant la lecture (compactage de cette
+            # instance ou d'une autre): le journal restant suit le
+            # nouveau fichier
+            value = _read_section_file(name)
+
+        backlog = _section_backlog.pop(name, None)
+        if backlog and isinstance(value, ledger.Ledger):
+            # Registre en colonnes: rejeu sans convertir toute la collection
+            replayed = ledger.replay(value, backlog)
+            if replayed is not None:
+                value, backlog = replayed, None
+
+        part = {}
+        if value is not None:
+            sections.set_value(part, name, value)
+
+        if backlog:
+            journal.replay(part, backlog)
+
+        value = sections.get_value(part, name)
+        if value is None:
+            value = [] if name in journal.COLLECTION_PATHS else {}
+
+        sections.set_value(_data, name, value)
+        _loaded_sections.add(name)
+
+        if name in FROZEN_SECTIONS:
+            _freeze_section(name)
+        elif name in INDEXED_FIELDS:
+            _build_index(name)
+            if name == 'depenses':
+                _totals_from_manifest = False
+
+
+def _read_section_file(name):
+    """
+    Lit le fichier d'une section (sans rejouer le journal).
+
+    Args:
+        name: Le nom de la section
+
+    Returns:
+        La valeur de la section, ou None si le fichier est absent ou invalide
+    """
+    try:
+        return sections.read_section(SECTIONS_DIR, name, USE_SNAPSHOT_CACHE)
+    except json.JSONDecodeError as e:
+        print(f"[DataManager] Erreur de lecture JSON de la section {name}: {e}")
+        return None
+
+
+def _set_all_data(data, dirty=False):
+    """
+    Remplace toutes les donnees en memoire (toutes les sections chargees).
+
+    Args:
+        data: Les donnees completes
+        dirty: True si toutes les sections doivent etre reecrites
+    """
+    global _data, _totals_from_manifest, _disk_generation
+
+    with _lock:
+        _data = data
+        _touch(None)
+        _loaded_sections.update(sections.SECTION_FILES)
+        _section_backlog.clear()
+        _totals_from_manifest = False
+        # Les fichiers ne correspondent plus aux donnees avant le prochain
+        # instantane: ne pas y integrer les modifications des autres instances
+        _disk_generation = None
+        _sync_base.clear()
+        if dirty:
+            _dirty_sections.update(sections.SECTION_FILES)
+        _rebuild_indexes()
+        _clear_history()
+
+
+def _migrate_json_file():
+    """
+    Migre l'ancien fichier JSON unique vers un fichier par section.
+
+    Le fichier JSON (et son journal) est lu, toutes les sections sont
+    ecrites, puis l'ancien fichier est renomme en .migrated et son
+    cache binaire supprime.
+    """
+    _set_all_data(_read_json_file(), dirty=True)
+
+    if not _save_snapshot():
+        return
+
+    os.replace(DATA_FILE, DATA_FILE + ".migrated")
+    if os.path.exists(SNAPSHOT_CACHE_FILE):
+        os.remove(SNAPSHOT_CACHE_FILE)
+    print(f"[DataManager] Donnees migrees de {DATA_FILE} vers {SECTIONS_DIR}")
+
+
 def load_data():
     """
-    Charge les donnees depuis le fichier JSON.
+    Charge les donnees depuis le stockage configure (STORAGE_BACKEND).
 
-    Si le fichier n'existe pas ou est corrompu, utilise les donnees
-    par defaut definies dans config.py.
+    En mode "json", seul le manifeste des sections est lu (les sections
+    le sont au premier acces, ou prechargees par le thread de
+    start_loading); l'ancien fichier JSON unique est migre.
+    Si aucune donnee n'existe ou si le fichier est corrompu, utilise les
+    donnees par defaut definies dans config.py.
 
     Returns:
         Les donnees chargees (dictionnaire)
     """
     global _data
 
+    try:
+        _read_data()
+    finally:
+        # Debloquer les fonctions d'acces meme si le chargement a echoue
+        _loaded.set()
+
+    # Les frames relisent tout (remis dans le thread Tk)
+    events.publish([events.reload_event()])
+
+    return _data
+
+
+def _read_data():
+    """
+    Lit les donnees depuis le stockage et reconstruit les index.
+
+    Appelee par load_data.
+    """
     _ensure_data_directory()
 
+    # Taux de change (les totaux du manifeste en dependent)
+    exchange_rates.load()
+
     try:
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                _data = json.load(f)
-            print(f"[DataManager] Donnees chargees depuis {DATA_FILE}")
+        if STORAGE_BACKEND == "sqlite":
+            data = _load_sqlite()
+        elif sections.exists(SECTIONS_DIR):
+            _read_manifest()
+            return
+        elif os.path.exists(DATA_FILE):
+            _migrate_json_file()
+            return
+        else:
+            data = None
+
+        if data is not None:
+            _set_all_data(data)
         else:
             # Utiliser les donnees par defaut
-            _data = copy.deepcopy(DEFAULT_DATA)
-            save_data()  # Sauvegarder les donnees par defaut
-            print("[DataManager] Fichier de donnees cree avec les valeurs par defaut")
+            _set_all_data(copy.deepcopy(DEFAULT_DATA), dirty=True)
+            _save_snapshot()  # Sauvegarder les donnees par defaut
+            print("[DataManager] Fichiers de donnees crees avec les valeurs par defaut")
     except json.JSONDecodeError as e:
         print(f"[DataManager] Erreur de lecture JSON: {e}")
         print("[DataManager] Utilisation des donnees par defaut")
-        _data = copy.deepcopy(DEFAULT_DATA)
-        save_data()
+        _set_all_data(copy.deepcopy(DEFAULT_DATA), dirty=True)
+        _save_snapshot()
     except Exception as e:
         print(f"[DataManager] Erreur inattendue: {e}")
-        _data = copy.deepcopy(DEFAULT_DATA)
+        _set_all_data(copy.deepcopy(DEFAULT_DATA))
 
-    return _data
 
+def start_loading():
+    """
+    Lance le chargement des donnees dans un thread de chargement.
 
-def save_data():
+    Le thread lit le manifeste puis precharge toutes les sections (voir
+    _prefetch_sections): le thread Tk n'a jamais a lire une section au
+    premier acces. Ne fait rien si le chargement est deja lance ou
+    termine. Utiliser is_loaded pour savoir quand les donnees sont
+    disponibles.
     """
-    Sauvegarde les donnees dans le fichier JSON.
+    global _load_thread, _prefetch_thread
 
-    Returns:
-        True si la sauvegarde a reussi, False sinon
+    with _load_lock:
+        if _load_thread is not None or _loaded.is_set():
+            return
+        _load_thread = threading.Thread(target=_load_in_background, name="data-loader", daemon=True)
+        _prefetch_thread = _load_thread
+        _load_thread.start()
+
+
+def _load_in_background():
     """
-    global _data
+    Corps du thread de chargement: manifeste, puis toutes les sections.
+    """
+    load_data()
+    _prefetch_sections()
+
+
+def _prefetch_sections():
+    """
+    Lit toutes les sections pas encore chargees, une par une.
 
+    Le verrou _lock n'est tenu que pour installer chaque section (voir
+    _load_section). Un rechargement complet est publie a la fin: les
+    frames, qui affichaient l'etat de chargement, relisent tout.
+    """
+    start = time.perf_counter()
     try:
+        _ensure_loaded(*sections.SECTION_FILES)
+    except Exception as e:
+        print(f"[DataManager] Erreur de prechargement des sections: {e}")
+        return
+
+    print(f"[DataManager] Sections prechargees en "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms")
+    events.publish([events.reload_event()])
+
+
+def is_loaded():
+    """
+    Indique si le chargement des donnees est termine.
+
+    Toutes les sections doivent etre lues: tant qu'elles ne le sont pas,
+    les frames affichent l'etat de chargement au lieu d'appeler les
+    fonctions d'acces (qui liraient les sections dans le thread Tk).
+
+    Returns:
+        True si les donnees sont disponibles
+    """
+    return _loaded.is_set() and _loaded_sections.issuperset(sections.SECTION_FILES)
+
+
+def _ensure_loaded(*names):
+    """
+    Garantit que les donnees sont chargees avant d'y acceder.
+
+    Si le chargement n'a pas encore commence, il est fait immediatement
+    dans le thread appelant. S'il est en cours dans le thread de
+    chargement, attend qu'il se termine. Les sections demandees sont
+    ensuite lues si elles ne l'ont pas encore ete.
+
+    Args:
+        names: Les sections utilisees par l'appelant
+            (voir sections.SECTION_FILES)
+    """
+    global _load_thread
+
+    if not _loaded.is_set():
+        with _load_lock:
+            must_load = _load_thread is None
+            if must_load:
+                _load_thread = threading.current_thread()
+
+        if must_load:
+            load_data()
+        else:
+            _loaded.wait()
+
+    missing = [name for name in names if name not in _loaded_sections]
+    if not missing:
+        return
+
+    # Une autre instance a pu compacter depuis la derniere synchronisation:
+    # ses modifications sont integrees avant de lire les sections (sinon le
+    # journal deja lu serait rejoue sur des sections plus recentes)
+    if has_external_changes():
+        sync_external_changes()
+
+    for name in missing:
+        _load_section(name)
+
+
+def _ensure_depenses_totals():
+    """
+    Garantit que les totaux des depenses sont disponibles.
+
+    Ils viennent du manifeste tant que les depenses ne sont pas chargees
+    et n'ont pas ete modifiees; sinon les depenses sont lues.
+    """
+    global _totals_from_manifest
+
+    _ensure_loaded('budget')
+
+    with _lock:
+        if _totals["devise"] != get_devise():
+            # Devise du voyage modifiee (autre instance, fichier edite)
+            if _totals_from_manifest:
+                _totals_from_manifest = False
+            else:
+                _convert_totals()
+
+    if not _totals_from_manifest:
+        _ensure_loaded('depenses')
+
+
+def _record_stats(elapsed_ms):
+    """
+    Met a jour les compteurs apres une ecriture.
+
+    Args:
+        elapsed_ms: Duree de l'ecriture en millisecondes
+    """
+    with _lock:
+        _save_stats["writes"] += 1
+        _save_stats["last_flush_ms"] = elapsed_ms
+        _save_stats["max_flush_ms"] = max(_save_stats["max_flush_ms"], elapsed_ms)
+        _save_stats["total_flush_ms"] += elapsed_ms
+
+
+def _compact():
+    """
+    Reecrit les sections modifiees et le manifeste, puis vide le journal.
+
+    En mode "sqlite", remplace tout le contenu de la base.
+
+    Doit etre appele avec _write_lock et le verrou de fichier acquis
+    (voir _flush). Seules les sections
+    modifiees depuis le dernier instantane sont reecrites (chacune dans
+    un fichier temporaire renomme ensuite). Le manifeste, ecrit en
+    dernier, memorise le numero du dernier enregistrement inclus: si
+    l'application s'arrete avant le vidage du journal, les
+    enregistrements deja inclus sont ignores au rechargement.
+
+    Le manifeste porte aussi un numero de compactage (generation) et, pour
+    chaque section, le numero du dernier enregistrement inclus
+    (section_seqs): les autres instances savent ainsi quelles sections
+    relire (voir _sync_locked).
+    """
+    global _disk_generation, _disk_offset, _disk_seq, _disk_signature, _journal_seq
+
+    if STORAGE_BACKEND == "sqlite":
+        with _lock:
+            sqlite_backend.save_all(_conn, _data)
+            _pending_records.clear()
+            _dirty_sections.clear()
+        with _lock:
+            _save_stats["compactions"] += 1
+        return
+
+    with _lock:
+        # Sections modifiees seulement dans le journal: les lire d'abord
+        for name in list(_dirty_sections):
+            _load_section(name)
+
+        generation = _disk_generation
+        if generation is None:
+            # Donnees remplacees (reinitialisation, migration): numeroter a
+            # la suite de ce que les autres instances ont deja lu
+            generation, disk_seq = _read_disk_position()
+            _journal_seq = max(_journal_seq, disk_seq)
+        _data['generation'] = generation + 1
+
         # Ajouter un timestamp de derniere modification
         _data['last_modified'] = datetime.now().isoformat()
+        _data['journal_seq'] = journal_seq = _journal_seq
+
+        section_seqs = dict(_data.get('section_seqs', {}))
+        for name in _dirty_sections:
+            section_seqs[name] = journal_seq
+        _data['section_seqs'] = section_seqs
+
+        # Les valeurs des sections sont immuables: elles sont serialisees
+        # apres avoir rendu le verrou
+        dirty = sorted(_dirty_sections)
+        values = [(name, sections.get_value(_data, name)) for name in dirty]
+
+        manifest = sections.get_meta(_data)
+        manifest['next_ids'] = dict(manifest.get('next_ids', {}))
+        if 'depenses' in _loaded_sections or _totals_from_manifest:
+            manifest['totals'] = _manifest_totals()
+
+        # Les enregistrements en attente sont inclus dans l'instantane
+        _dirty_sections.clear()
+        _pending_records.clear()
+        _sync_base.clear()
+
+    try:
+        os.makedirs(SECTIONS_DIR, exist_ok=True)
+        for name, value in values:
+            payload, cached = sections.dumps_section(name, value, USE_SNAPSHOT_CACHE)
+            if not sections.write_section(SECTIONS_DIR, name, payload, cached):
+                print(f"[DataManager] Cache binaire de la section {name} non ecrit: "
+                      f"la section sera relue depuis son fichier JSON")
+        sections.write_manifest(SECTIONS_DIR, manifest)
+    except Exception:
+        with _lock:
+            _dirty_sections.update(dirty)
+        raise
+
+    journal.truncate(JOURNAL_FILE)
+
+    with _lock:
+        _disk_generation = generation + 1
+        _disk_offset = 0
+        _disk_seq = journal_seq
+        _disk_signature = _read_disk_signature()
+
+        _save_stats["compactions"] += 1
+        _save_stats["sections"] += len(dirty)
+
+
+def _flush(compact=False):
+    """
+    Ajoute les enregistrements en attente au journal, puis compacte
+    le journal s'il depasse JOURNAL_MAX_BYTES (ou si compact est vrai).
+
+    En mode "sqlite", les enregistrements sont appliques a la base.
+
+    En mode "json", l'ecriture a lieu sous le verrou de fichier, apres
+    avoir integre les modifications des autres instances: les
+    enregistrements de cette instance sont ajoutes a la suite des leurs
+    (et renumerotes en consequence).
+
+    Args:
+        compact: True pour forcer l'ecriture d'un instantane complet
+
+    Returns:
+        True si l'ecriture a reussi, False sinon
+    """
+    global _journal_seq, _disk_offset, _disk_seq, _disk_signature
+
+    with _write_lock, _shared_lock():
+        start = time.perf_counter()
+
+        _sync_locked()
+
+        with _lock:
+            records = _pending_records[:]
+            _pending_records.clear()
+            bases = dict(_sync_base)
+            _sync_base.clear()
+
+            if STORAGE_BACKEND != "sqlite":
+                # Numeroter a la suite du journal partage
+                for record in records:
+                    _disk_seq += 1
+                    record['seq'] = _disk_seq
+                _journal_seq = max(_journal_seq, _disk_seq)
+
+        if not records and not compact:
+            return True
+
+        try:
+            if STORAGE_BACKEND == "sqlite":
+                if compact:
+                    _compact()
+                elif records:
+                    sqlite_backend.apply_records(_conn, records)
+            else:
+                size = journal.get_size(JOURNAL_FILE)
+                if records and not compact:
+                    size = journal.append_records(JOURNAL_FILE, records)
+                    with _lock:
+                        _disk_offset = size
+                        _disk_signature = _read_disk_signature()
+
+                if compact or size > JOURNAL_MAX_BYTES:
+                    _compact()
+        except Exception as e:
+            print(f"[DataManager] Erreur de sauvegarde: {e}")
+            with _lock:
+                # Conserver les enregistrements pour la prochaine tentative
+                _pending_records[:0] = records
+                for key, base in bases.items():
+                    _sync_base.setdefault(key, base)
+            return False
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        _record_stats(elapsed_ms)
+        with _lock:
+            _save_stats["records"] += len(records)
+
+    if records and not compact:
+        print(f"[DataManager] {len(records)} modification(s) enregistree(s) ({elapsed_ms:.1f} ms)")
+    return True
+
+
+def _background_save():
+    """
+    Callback du minuteur: ecrit les modifications regroupees.
+
+    Si l'ecriture echoue, une nouvelle tentative est planifiee.
+    """
+    global _save_timer
+
+    with _lock:
+        _save_timer = None
+        if not _pending_records:
+            return
+
+    if not _flush():
+        schedule_save()
+
+
+def schedule_save():
+    """
+    Planifie une sauvegarde differee des enregistrements en attente.
+
+    Les appels successifs pendant la fenetre SAVE_DELAY_MS sont regroupes
+    en une seule ecriture, effectuee par un thread en arriere-plan.
+    """
+    global _save_timer
+
+    # Pendant une synchronisation (verrou de fichier tenu par ce thread),
+    # _write_lock est deja pris: l'ecriture passe par le minuteur
+    if SAVE_DELAY_MS <= 0 and _file_lock_owner != threading.get_ident():
+        _flush()
+        return
+
+    with _lock:
+        if _save_timer is not None:
+            # Une ecriture est deja prevue: elle inclura cette modification
+            _save_stats["coalesced"] += 1
+            return
+
+        _save_timer = threading.Timer(max(SAVE_DELAY_MS, 0) / 1000, _background_save)
+        _save_timer.daemon = True
+        _save_timer.start()
 
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(_data, f, ensure_ascii=False, indent=2)
 
-        print(f"[DataManager] Donnees sauvegardees dans {DATA_FILE}")
+def _log_change(op, col, item_id=None, rec=None):
+    """
+    Ajoute une modification au journal et planifie sa sauvegarde.
+
+    Args:
+        op: L'operation (add, update, patch, delete, set)
+        col: La collection ou la section concernee
+        item_id: L'ID de l'element (pour les collections)
+        rec: Les donnees de l'element ou de la section
+    """
+    global _journal_seq
+
+    with _lock:
+        _journal_seq += 1
+        _dirty_sections.add(sections.section_of(col))
+        record = {"seq": _journal_seq, "op": op, "col": col}
+        if item_id is not None:
+            record["id"] = item_id
+        if rec is not None:
+            record["rec"] = rec
+        _pending_records.append(record)
+
+        # Dans une transaction, la sauvegarde est planifiee a la fin
+        if _tx_depth:
+            return
+
+    schedule_save()
+
+
+def _cancel_scheduled_save():
+    """
+    Annule la sauvegarde differee eventuellement en attente.
+    """
+    global _save_timer
+
+    with _lock:
+        if _save_timer is not None:
+            _save_timer.cancel()
+            _save_timer = None
+
+
+def _save_snapshot():
+    """
+    Ecrit immediatement un instantane complet des donnees en memoire.
+
+    Returns:
+        True si la sauvegarde a reussi, False sinon
+    """
+    _cancel_scheduled_save()
+    return _flush(compact=True)
+
+
+def save_data():
+    """
+    Sauvegarde immediatement toutes les donnees.
+
+    Annule la sauvegarde differee eventuellement en attente et ecrit
+    de maniere synchrone (bouton "Sauvegarder", fermeture de
+    l'application). En mode "json", les sections modifiees sont
+    reecrites et le journal est vide; en mode "sqlite", les
+    modifications en attente sont appliquees a la base.
+
+    Returns:
+        True si la sauvegarde a reussi, False sinon
+    """
+    _ensure_loaded()
+
+    _cancel_scheduled_save()
+
+    if _flush(compact=(STORAGE_BACKEND != "sqlite")):
+        target = SQLITE_FILE if STORAGE_BACKEND == "sqlite" else SECTIONS_DIR
+        print(f"[DataManager] Donnees sauvegardees dans {target}")
+        _update_catalog_summary()
         return True
+    return False
+
+
+def _update_catalog_summary():
+    """
+    Reporte le resume du voyage ouvert dans le catalogue des voyages.
+    """
+    if _trip_id is None:
+        return
+
+    try:
+        catalog.update_summary(_trip_id, get_trip_summary())
     except Exception as e:
-        print(f"[DataManager] Erreur de sauvegarde: {e}")
-        return False
+        print(f"[DataManager] Erreur de mise a jour du catalogue: {e}")
+
+
+def has_pending_changes():
+    """
+    Indique si des modifications n'ont pas encore ete ecrites sur le disque.
+
+    Returns:
+        True si une sauvegarde est en attente
+    """
+    return bool(_pending_records)
+
+
+def get_save_stats():
+    """
+    Recupere les compteurs de la sauvegarde differee.
+
+    Returns:
+        Dictionnaire (writes, coalesced, records, compactions, sections,
+        last_flush_ms, max_flush_ms, total_flush_ms, avg_flush_ms,
+        journal_bytes)
+    """
+    with _lock:
+        stats = dict(_save_stats)
+
+    stats["avg_flush_ms"] = stats["total_flush_ms"] / stats["writes"] if stats["writes"] else 0.0
+    stats["journal_bytes"] = journal.get_size(JOURNAL_FILE)
+    return stats
 
 
 def reset_to_defaults():
     """
     Reinitialise toutes les donnees aux valeurs par defaut.
+
+    L'historique d'annulation est vide ensuite (comme apres un
+    chargement).
     """
-    global _data
-    _data = copy.deepcopy(DEFAULT_DATA)
-    save_data()
+    _ensure_loaded()
+
+    _set_all_data(copy.deepcopy(DEFAULT_DATA), dirty=True)
+
+    # Un instantane complet remplace le journal
+    _save_snapshot()
+    events.publish([events.reload_event()])
     print("[DataManager] Donnees reinitialisees aux valeurs par defaut")
 
 
-# ============================================
-# FONCTIONS POUR LES INFORMATIONS DU VOYAGE
-# ============================================
+# ============================================
+# EVENEMENTS DE MODIFICATION
+# ============================================
+
+def subscribe(callback):
+    """
+    Abonne une fonction aux evenements de modification des donnees.
+
+    Les evenements sont remis dans le thread Tk (voir events.dispatch),
+    par lots: une modification isolee ou une transaction complete.
+
+    Args:
+        callback: Fonction appelee avec un tuple de events.ChangeEvent
+    """
+    events.subscribe(callback)
+
+
+def unsubscribe(callback):
+    """
+    Desabonne une fonction des evenements de modification.
+
+    Args:
+        callback: La fonction passee a subscribe
+    """
+    events.unsubscribe(callback)
+
+
+def _emit(op, col, item_id=None, before=None, after=None):
+    """
+    Publie l'evenement d'une modification.
+
+    Dans une transaction, l'evenement est conserve jusqu'a la fin de la
+    transaction (et abandonne si elle est annulee).
+
+    Args:
+        op: L'operation (add, update, patch, delete, set)
+        col: La collection ou la section concernee
+        item_id: L'ID de l'element (pour les collections)
+        before: La valeur avant la modification
+        after: La valeur apres la modification
+    """
+    _touch(col)
+    event = events.ChangeEvent(col, op, item_id, before, after)
+    if _tx_depth:
+        _pending_events.append(event)
+    else:
+        _record_history((event,))
+        events.publish([event])
+
+
+def _touch(name):
+    """
+    Change la version d'une collection ou d'une section (None: toutes).
+
+    Args:
+        name: La collection ou la section modifiee
+    """
+    _versions[name] = next(_version_counter)
+
+
+# ============================================
+# TRANSACTIONS
+# ============================================
+
+def _on_rollback(undo):
+    """
+    Memorise comment annuler une modification de la transaction en cours.
+
+    Sans transaction en cours, ne fait rien.
+
+    Args:
+        undo: Fonction sans argument qui annule la modification
+    """
+    if _tx_depth:
+        _undo_log.append(undo)
+
+
+@contextlib.contextmanager
+def transaction():
+    """
+    Regroupe plusieurs modifications en une seule operation.
+
+    Les modifications sont sauvegardees une seule fois, a la fin de la
+    transaction, et leurs evenements sont publies en un seul lot. Si
+    une exception est levee, toutes les modifications faites en memoire
+    depuis le debut de la transaction sont annulees (sans publier
+    d'evenement) et l'exception est propagee. Les transactions peuvent etre
+    imbriquees: seule la plus externe sauvegarde (ou annule).
+
+    Usage:
+        with data_manager.transaction():
+            data_manager.add_depense(...)
+            data_manager.delete_activite(...)
+    """
+    global _tx_depth, _journal_seq
+
+    _ensure_loaded()
+
+    with _lock:
+        if _tx_depth:
+            _tx_depth += 1
+            try:
+                yield
+            finally:
+                _tx_depth -= 1
+            return
+
+        pending_count = len(_pending_records)
+        journal_seq = _journal_seq
+        next_ids = {col: index["next_id"] for col, index in _indexes.items()}
+        saved_next_ids = dict(_data.get('next_ids', {}))
+
+        _tx_depth = 1
+        try:
+            yield
+        except BaseException:
+            # Annuler les modifications en memoire, de la derniere a la premiere
+            for undo in reversed(_undo_log):
+                undo()
+
+            del _pending_records[pending_count:]
+            _journal_seq = journal_seq
+            for col, next_id in next_ids.items():
+                _indexes[col]["next_id"] = next_id
+            _data['next_ids'] = saved_next_ids
+            # Un resultat calcule pendant la transaction ne vaut plus
+            _touch(None)
+
+            print(f"[DataManager] Transaction annulee ({len(_undo_log)} modification(s))")
+            raise
+        finally:
+            _tx_depth = 0
+            _undo_log.clear()
+            batch = _pending_events[:]
+            _pending_events.clear()
+
+        changed = len(_pending_records) > pending_count
+
+    if changed:
+        schedule_save()
+    # Un seul lot (et une seule etape d'annulation) pour toute la transaction
+    _record_history(tuple(batch))
+    events.publish(batch)
+
+
+def _set_section(col, value):
+    """
+    Remplace une section (voyage_info, hotel, transport, budget_prevu, partage).
+
+    La valeur est figee (voir records.freeze): une modification
+    ulterieure de l'objet passe par l'appelant n'a pas d'effet.
+
+    Args:
+        col: Le nom de la section (voir journal.SECTION_PATHS)
+        value: La nouvelle valeur
+    """
+    path = journal.SECTION_PATHS[col]
+    value = records.freeze(value)
+
+    with _lock:
+        parent = _data
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+
+        key = path[-1]
+        old = parent.get(key)
+        had = key in parent
+
+        def undo():
+            if had:
+                parent[key] = old
+            else:
+                parent.pop(key, None)
+            _search_section(col)
+        _on_rollback(undo)
+
+        parent[key] = value
+        _search_section(col)
+        _track_base(col, None, old)
+        _log_change('set', col, rec=value)
+        _emit('set', col, before=old, after=value)
+
+
+# ============================================
+# GESTION DES VOYAGES (catalogue)
+# ============================================
+
+def _set_trip_paths(directory):
+    """
+    Fait pointer les chemins des fichiers de donnees vers un repertoire.
+
+    Args:
+        directory: Le repertoire de donnees du voyage
+    """
+    global DATA_DIR, DATA_FILE, JOURNAL_FILE, SQLITE_FILE, SNAPSHOT_CACHE_FILE, SECTIONS_DIR
+    global LOCK_FILE
+
+    DATA_DIR = directory
+    DATA_FILE = os.path.join(directory, os.path.basename(DATA_FILE))
+    SECTIONS_DIR = os.path.join(directory, os.path.basename(SECTIONS_DIR))
+    JOURNAL_FILE = os.path.join(directory, os.path.basename(JOURNAL_FILE))
+    SQLITE_FILE = os.path.join(directory, os.path.basename(SQLITE_FILE))
+    SNAPSHOT_CACHE_FILE = os.path.join(directory, os.path.basename(SNAPSHOT_CACHE_FILE))
+    LOCK_FILE = os.path.join(directory, os.path.basename(LOCK_FILE))
+
+
+def open_trip(trip_id):
+    """
+    Ouvre un voyage du catalogue a la place du voyage courant.
+
+    Les modifications du voyage courant sont d'abord ecrites. Les donnees
+    du nouveau voyage ne sont pas lues ici: elles le sont au premier
+    acces, ou en arriere-plan avec start_loading.
+
+    Args:
+        trip_id: L'identifiant du voyage (voir catalog.py)
+    """
+    global _trip_id, _data, _conn, _journal_seq, _load_thread, _totals_from_manifest
+    global _disk_generation, _disk_signature, _prefetch_thread
+
+    # Terminer le chargement en cours (prechargement compris) et
+    # sauvegarder le voyage courant
+    if _load_thread is not None or _loaded.is_set():
+        _loaded.wait()
+        if _prefetch_thread is not None and _prefetch_thread is not threading.current_thread():
+            _prefetch_thread.join()
+        save_data()
+
+    _cancel_scheduled_save()
+
+    with _write_lock, _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+        _set_trip_paths(catalog.get_trip_dir(trip_id))
+        _trip_id = trip_id
+
+        _data = {}
+        _touch(None)
+        _pending_records.clear()
+        _journal_seq = 0
+        _loaded_sections.clear()
+        _dirty_sections.clear()
+        _section_backlog.clear()
+        _indexes.clear()
+        _totals_from_manifest = False
+        _clear_history()
+        _sync_base.clear()
+        _disk_generation = None
+        _disk_signature = None
+
+        with _load_lock:
+            _loaded.clear()
+            _load_thread = None
+            _prefetch_thread = None
+
+    print(f"[DataManager] Voyage ouvert: {trip_id}")
+
+
+def get_current_trip_id():
+    """
+    Recupere l'identifiant du voyage ouvert.
+
+    Returns:
+        L'identifiant, ou None si aucun voyage du catalogue n'est ouvert
+    """
+    return _trip_id
+
+
+def get_trip_summary():
+    """
+    Calcule le resume du voyage ouvert (pour le catalogue).
+
+    Returns:
+        Dictionnaire (destination, date_depart, date_retour, participants,
+        budget_prevu, total_depenses)
+    """
+    _ensure_loaded('voyage_info', 'participants', 'budget')
+    _ensure_depenses_totals()
+
+    voyage_info = get_voyage_info()
+    return {
+        "destination": voyage_info.get('destination', ''),
+        "date_depart": voyage_info.get('date_depart', ''),
+        "date_retour": voyage_info.get('date_retour', ''),
+        "participants": len(_indexes["participants"]["by_id"]),
+        "budget_prevu": get_budget_prevu(),
+        "total_depenses": money.from_cents(_totals["depenses"]),
+    }
+
+
+# ============================================
+# INDEX EN MEMOIRE DES COLLECTIONS
+# ============================================
+
+# Champs indexes (index secondaires) pour chaque collection
+INDEXED_FIELDS = {
+    "activites": ("date",),
+    "depenses": ("categorie", "participant", "date"),
+    "participants": ("role",),
+    "checklist": ("categorie",),
+}
+
+# Champs selon lesquels les elements peuvent etre tries par les requetes
+# (query_depenses...), le premier etant l'ordre par defaut. Chaque ordre
+# est maintenu a chaque modification (voir sorted_index.py).
+SORT_FIELDS = {
+    "activites": ("date", "nom", "prix"),
+    "depenses": ("date", "montant", "categorie", "participant"),
+    "participants": ("nom", "prenom", "role"),
+    "checklist": ("categorie", "item"),
+}
+
+# Champs indexes pour la recherche plein texte (voir search_index.py),
+# dans l'ordre des resultats de search(). Ceux des collections sont aussi
+# ceux du filtre texte des requetes. "transport" couvre les trajets aller
+# et retour, "sur_place" les transports sur place.
+TEXT_FIELDS = {
+    "activites": ("nom", "lieu", "description"),
+    "depenses": ("description", "categorie", "participant"),
+    "participants": ("nom", "prenom", "email", "telephone", "notes", "allergies"),
+    "checklist": ("item", "categorie"),
+    "hotel": ("nom", "adresse", "notes"),
+    "transport": ("type", "compagnie", "numero", "depart_lieu", "arrivee_lieu", "notes"),
+    "sur_place": ("type", "description"),
+}
+
+# Champs montants (tries en centimes, voir records.Record.cents)
+NUMERIC_FIELDS = frozenset(("prix", "montant"))
+
+# Champs de date (AAAA-MM-JJ, tries par numero de jour, voir
+# config.date_ordinal)
+DATE_FIELDS = frozenset(("date",))
+
+# Index de chaque collection:
+# {
+#     "by_id": {id: element} (en colonnes: vue du registre, voir
+#              ledger.IdView),
+#     "columnar": True pour une collection en colonnes (by_id n'est
+#                 alors jamais modifie par _index_add et _index_remove),
+#     "next_id": prochain ID a attribuer,
+#     "by": {champ: {valeur: {id: element}}},
+#     "sorted": {champ: ordre des cles (valeur, id), voir sorted_index.py}
+# }
+_indexes = {}
+
+# Index de la recherche plein texte de chaque section de TEXT_FIELDS
+# (voir search_index.py), mis a jour a chaque modification: les
+# documents sont les elements (cle: ID), l'hotel (cle: None), les
+# trajets aller et retour (cle: "aller", "retour") et les transports sur
+# place (cle: position dans la liste). None pour une collection en
+# colonnes dont l'index n'a pas encore ete construit (voir _search_of)
+_search = {}
+
+# Totaux maintenus au fil des modifications (mis a jour en O(1)). Les
+# sommes sont en centimes entiers (voir money.py): elles restent exactes
+# quel que soit le nombre de depenses.
+#
+# Les depenses sont regroupees par paquet (devise, date, categorie,
+# participant): chaque paquet garde la somme de ses montants dans sa
+# devise et cette somme convertie dans la devise du voyage (un seul
+# arrondi par paquet, voir exchange_rates.convert). Une modification ne
+# reconvertit que son paquet; un changement des taux reconvertit les
+# paquets (quelques centaines) sans relire les depenses. La devise d'un
+# paquet est '' pour une depense dans la devise du voyage.
+#
+# Le cube somme les montants convertis par cellule (date, categorie,
+# participant): les tableaux croises en sont tires sans relire les
+# depenses (voir pivot.py).
+_totals = {
+    "depenses": 0,              # Somme des montants (devise du voyage)
+    "by_category": {},          # categorie -> somme des montants
+    "category_count": {},       # categorie -> nombre de depenses
+    "by_participant": {},       # participant -> somme des montants
+    "participant_count": {},    # participant -> nombre de depenses
+    "shared_by_date": {},       # date -> somme des depenses a partager
+    "shared_count": {},         # date -> nombre de depenses a partager
+    "cube": {},                 # (date, categorie, participant) -> somme
+    "cube_count": {},           # (date, categorie, participant) -> nombre
+    "devise": DEFAULT_CURRENCY, # Devise du voyage des totaux
+    "buckets": {},              # paquet -> somme des montants dans sa devise
+    "bucket_count": {},         # paquet -> nombre de depenses
+    "converted": {},            # paquet -> somme convertie (None: taux inconnu)
+    "unconverted": 0,           # Nombre de depenses sans taux de change
+    "checked": 0,               # Nombre d'items coches dans la checklist
+}
+
+# Sections figees au chargement (les collections sont des IdMap)
+FROZEN_SECTIONS = ("voyage_info", "hotel", "transport")
+
+# Parts de chaque participant dans les depenses partagees, maintenues
+# par date (voir settlement.update_shares), et membres du partage
+# calcules pour la derniere version de la collection des participants
+_shares = settlement.create_shares()
+_members = (None, ())
+
+# Regle de partage verifiee (voir _checked_split_rule): (version de la
+# section partage, regle), ou None
+_split_rule = None
+
+# Tableaux croises deja calcules, mis a jour avec le cube (voir pivot.py)
+_pivots = pivot.create_cache()
+
+# Version de chaque collection ou section (cle None: rechargement
+# complet): numero tire d'un compteur a chaque modification, pour savoir
+# sans rien relire si un resultat calcule est encore valable
+_versions = {}
+_version_counter = itertools.count(1)
+
+# Collections et sections dont depend la simulation du risque
+RISK_SOURCES = (None, 'depenses', 'activites', 'transport', 'budget_prevu',
+                'voyage_info', 'taux_de_change')
+
+# Derniere simulation du risque de depassement du budget: (versions des
+# donnees, donnees de la simulation, resultat), gardee tant que les
+# donnees ne changent pas
+_risk = (None, None, None)
+
+# Valeur sentinelle d'un champ absent (fusion des modifications)
+_MISSING = object()
+
+# Valeurs retournees pour une section ou une collection absente
+_EMPTY_SECTION = MappingProxyType({})
+_EMPTY_COLLECTION = IdMap()
+
+
+def _get_collection(col):
+    """
+    Retourne une collection des donnees (vide si elle est absente).
+
+    Args:
+        col: Le nom de la collection (activites, depenses, participants, checklist)
+
+    Returns:
+        Les elements de la collection (IdMap, voir persistent.py)
+    """
+    path = journal.COLLECTION_PATHS[col]
+    parent = _data
+    for key in path[:-1]:
+        parent = parent.get(key, {})
+    return parent.get(path[-1], _EMPTY_COLLECTION)
+
+
+def _set_collection(col, items):
+    """
+    Remplace une collection des donnees par une nouvelle version.
+
+    Args:
+        col: Le nom de la collection
+        items: Les elements (IdMap)
+    """
+    path = journal.COLLECTION_PATHS[col]
+    parent = _data
+    for key in path[:-1]:
+        parent = parent.setdefault(key, {})
+    parent[path[-1]] = items
+
+
+def _index_add(col, item):
+    """
+    Ajoute un element aux index d'une collection.
+
+    Args:
+        col: Le nom de la collection
+        item: L'element a indexer
+    """
+    index = _indexes[col]
+    item_id = item.get('id')
+    if not index["columnar"]:
+        index["by_id"][item_id] = item
+
+    for field, buckets in index["by"].items():
+        buckets.setdefault(item.get(field), {})[item_id] = item
+
+    for field, order in index["sorted"].items():
+        sorted_index.insert(order, _sort_key(field, item))
+
+    if _search[col] is not None:
+        search_index.add(_search[col], item_id, _search_text(col, item))
+
+    _update_totals(col, item, 1)
+
+
+def _index_remove(col, item):
+    """
+    Retire un element des index d'une collection.
+
+    Args:
+        col: Le nom de la collection
+        item: L'element a retirer
+    """
+    index = _indexes[col]
+    item_id = item.get('id')
+    if not index["columnar"]:
+        index["by_id"].pop(item_id, None)
+
+    for field, buckets in index["by"].items():
+        value = item.get(field)
+        bucket = buckets.get(value)
+        if bucket is not None:
+            bucket.pop(item_id, None)
+            if not bucket:
+                del buckets[value]
+
+    for field, order in index["sorted"].items():
+        sorted_index.remove(order, _sort_key(field, item))
+
+    if _search[col] is not None:
+        search_index.remove(_search[col], item_id)
+
+    _update_totals(col, item, -1)
+
+
+def _sort_key(field, item):
+    """
+    Retourne la cle d'un element dans l'ordre d'un champ.
+
+    Les montants sont compares en centimes, les dates
+    par numero de jour (0 pour une date absente ou invalide), les autres
+    comme des textes (une valeur absente est un texte vide). L'ID
+    departage les elements de meme valeur.
+
+    Args:
+        field: Le champ de tri
+        item: L'element
+
+    Returns:
+        Tuple (valeur, id)
+    """
+    value = item.get(field)
+    if field in DATE_FIELDS:
+        value = date_ordinal(value)
+    elif field in NUMERIC_FIELDS:
+        value = item.cents(field)
+    elif value is None:
+        value = ""
+    elif not isinstance(value, str):
+        value = str(value)
+    return (value, item.get('id'))
+
+
+def _search_text(section, item):
+    """
+    Retourne le texte d'un element indexe pour la recherche.
+
+    Args:
+        section: La section de l'element (voir TEXT_FIELDS)
+        item: L'element
+
+    Returns:
+        Les valeurs des champs de TEXT_FIELDS, separees par des espaces
+    """
+    return " ".join(str(item.get(field) or "") for field in TEXT_FIELDS[section])
+
+
+def _search_section(name):
+    """
+    Indexe de nouveau une section figee (hotel, transport) pour la
+    recherche, apres son chargement ou sa modification.
+
+    Args:
+        name: Le nom de la section (rien pour une section sans texte)
+    """
+    value = _data.get(name) or {}
+
+    if name == 'hotel':
+        index = search_index.create()
+        if value:
+            search_index.add(index, None, _search_text('hotel', value))
+        _search['hotel'] = index
+
+    elif name == 'transport':
+        index = search_index.create()
+        for key in ('aller', 'retour'):
+            if value.get(key):
+                search_index.add(index, key, _search_text('transport', value[key]))
+        _search['transport'] = index
+
+        index = search_index.create()
+        for position, item in enumerate(value.get('sur_place') or ()):
+            search_index.add(index, position, _search_text('sur_place', item))
+        _search['sur_place'] = index
+
+
+def _update_totals(col, item, sign):
+    """
+    Ajoute (sign=1) ou retire (sign=-1) un element des totaux maintenus.
+
+    Args:
+        col: Le nom de la collection
+        item: L'element ajoute ou retire
+        sign: 1 pour un ajout, -1 pour un retrait
+    """
+    if col == "depenses":
+        key = _depense_key(item)
+        categorie, participant = key[2], key[3]
+        montant = _add_to_bucket(key, sign * item.cents('montant'), sign)
+        _totals["depenses"] += montant
+        _add_to_group(_totals["by_category"], _totals["category_count"],
+                      categorie, montant, sign)
+        _add_to_group(_totals["by_participant"], _totals["participant_count"],
+                      participant, montant, sign)
+        if _is_shared(participant):
+            _add_to_group(_totals["shared_by_date"], _totals["shared_count"],
+                          key[1], montant, sign)
+        _add_to_group(_totals["cube"], _totals["cube_count"], key[1:], montant, sign)
+        pivot.update(_pivots, key[1:], montant, sign)
+
+    elif col == "checklist" and item.get('checked', False):
+        _totals["checked"] += sign
+
+
+def _depense_key(item):
+    """
+    Retourne le paquet d'une depense: (devise, date, categorie,
+    participant), '' pour une valeur absente (categorie: 'Autre').
+    """
+    return (item.get('devise') or '', item.get('date') or '',
+            item.get('categorie', 'Autre'), item.get('participant') or '')
+
+
+def _add_to_bucket(key, montant, sign):
+    """
+    Ajoute (sign=1) ou retire (sign=-1) une depense de son paquet et
+    reconvertit la somme du paquet dans la devise du voyage.
+
+    Args:
+        key: Le paquet (devise, date, categorie, participant)
+        montant: Le montant dans la devise de la depense (centimes, deja
+            multiplie par sign)
+        sign: 1 pour un ajout, -1 pour un retrait
+
+    Returns:
+        La variation de la somme convertie du paquet (centimes de la
+        devise du voyage, 0 si le taux est inconnu)
+    """
+    buckets = _totals["buckets"]
+    counts = _totals["bucket_count"]
+    converted = _totals["converted"]
+
+    before = converted.get(key, 0)
+    count = counts.get(key, 0) + sign
+    if count <= 0:
+        # Derniere depense du paquet
+        counts.pop(key, None)
+        buckets.pop(key, None)
+        converted.pop(key, None)
+        after = 0
+    else:
+        counts[key] = count
+        buckets[key] = amount = buckets.get(key, 0) + montant
+        after = converted[key] = _convert_bucket(key, amount)
+
+    if before is None or after is None:
+        # Taux inconnu: la depense n'entre pas dans les totaux
+        _totals["unconverted"] += sign
+        return 0
+    return after - before
+
+
+def _convert_bucket(key, amount, devise=None):
+    """
+    Convertit la somme d'un paquet dans la devise du voyage.
+
+    Args:
+        key: Le paquet (devise, date, categorie, participant)
+        amount: La somme des montants du paquet (centimes de sa devise)
+        devise: La devise du voyage (par defaut: celle des totaux)
+
+    Returns:
+        La somme convertie (centimes), ou None si le taux est inconnu
+    """
+    source, date = key[0], key[1]
+    if not source:
+        return amount
+    return exchange_rates.convert(amount, source, devise or _totals["devise"], date)
+
+
+def _convert_buckets(buckets, counts, devise):
+    """
+    Convertit tous les paquets et calcule les totaux qui en decoulent.
+
+    Chaque paquet est converti une seule fois (taux garde en cache pour
+    chaque devise et date, voir exchange_rates.rate).
+
+    Args:
+        buckets: {paquet: somme des montants dans sa devise}
+        counts: {paquet: nombre de depenses}
+        devise: La devise du voyage
+
+    Returns:
+        Dictionnaire des totaux, avec les memes cles que _totals
+        (depenses, by_category, by_participant, shared_by_date, cube,
+        cube_count, converted, unconverted)
+    """
+    converted = {}
+    total = 0
+    by_category = {}
+    by_participant = {}
+    shared_by_date = {}
+    cube = {}
+    cube_count = {}
+    unconverted = 0
+
+    for key, amount in buckets.items():
+        date, categorie, participant = key[1], key[2], key[3]
+        value = converted[key] = _convert_bucket(key, amount, devise)
+        if value is None:
+            unconverted += counts[key]
+            value = 0
+        total += value
+        by_category[categorie] = by_category.get(categorie, 0) + value
+        by_participant[participant] = by_participant.get(participant, 0) + value
+        if _is_shared(participant):
+            shared_by_date[date] = shared_by_date.get(date, 0) + value
+        cell = key[1:]
+        cube[cell] = cube.get(cell, 0) + value
+        cube_count[cell] = cube_count.get(cell, 0) + counts[key]
+
+    return {
+        "depenses": total,
+        "by_category": by_category,
+        "by_participant": by_participant,
+        "shared_by_date": shared_by_date,
+        "cube": cube,
+        "cube_count": cube_count,
+        "converted": converted,
+        "unconverted": unconverted,
+    }
+
+
+def _is_shared(participant):
+    """
+    Indique si une depense payee par ce participant est partagee entre
+    les participants (pas la cagnotte du groupe, voir settlement.py).
+    """
+    return bool(participant) and participant != settlement.GROUP
+
+
+def _convert_totals():
+    """
+    Reconvertit les totaux des depenses dans la devise du voyage, apres
+    un changement des taux de change ou de la devise du voyage.
+
+    Seuls les paquets sont reconvertis (les depenses ne sont pas
+    relues). Les totaux repris du manifeste sont abandonnes: ils seront
+    recalcules a la lecture des depenses.
+    """
+    global _totals_from_manifest
+
+    _touch('taux_de_change')
+
+    if _totals_from_manifest:
+        _totals_from_manifest = False
+        return
+
+    devise = _trip_devise()
+    _totals.update(_convert_buckets(_totals["buckets"], _totals["bucket_count"], devise))
+    _totals["devise"] = devise
+    _pivots.clear()
+
+
+def _add_to_group(sums, counts, key, montant, sign):
+    """
+    Ajoute (sign=1) ou retire (sign=-1) une depense du total d'un groupe
+    (categorie, participant).
+
+    Args:
+        sums: Dictionnaire groupe -> somme des montants (centimes)
+        counts: Dictionnaire groupe -> nombre de depenses
+        key: Le groupe de la depense
+        montant: Le montant a ajouter (centimes, deja multiplie par sign)
+        sign: 1 pour un ajout, -1 pour un retrait
+    """
+    count = counts.get(key, 0) + sign
+    if count <= 0:
+        # Derniere depense du groupe
+        counts.pop(key, None)
+        sums.pop(key, None)
+    else:
+        counts[key] = count
+        sums[key] = sums.get(key, 0) + montant
+
+
+def _manifest_totals():
+    """
+    Retourne les totaux des depenses a enregistrer dans le manifeste.
+
+    Les cles portent le suffixe _cents: un ancien manifeste (totaux en
+    euros, ou sans les montants a partager) n'est pas repris, les
+    depenses sont alors relues. Les totaux ne sont repris qu'avec les
+    memes taux de change.
+    """
+    return {
+        "depenses_cents": _totals["depenses"],
+        "by_category_cents": dict(_totals["by_category"]),
+        "category_count": dict(_totals["category_count"]),
+        "by_participant_cents": dict(_totals["by_participant"]),
+        "participant_count": dict(_totals["participant_count"]),
+        "shared_by_date_cents": dict(_totals["shared_by_date"]),
+        "shared_count": dict(_totals["shared_count"]),
+        "devise": _totals["devise"],
+        "taux": exchange_rates.fingerprint(),
+        "unconverted": _totals["unconverted"],
+    }
+
+
+def _restore_totals(totals):
+    """
+    Reprend les totaux des depenses enregistres dans le manifeste.
+
+    Args:
+        totals: Les totaux du manifeste (voir _manifest_totals), ou None
+
+    Returns:
+        True si les totaux ont ete repris
+    """
+    if not totals or 'shared_by_date_cents' not in totals \
+            or totals.get('taux') != exchange_rates.fingerprint():
+        return False
+
+    _totals["devise"] = totals.get('devise') or DEFAULT_CURRENCY
+    _totals["unconverted"] = totals.get('unconverted', 0)
+    _totals["depenses"] = totals['depenses_cents']
+    _totals["by_category"] = dict(totals.get('by_category_cents', {}))
+    _totals["category_count"] = dict(totals.get('category_count', {}))
+    _totals["by_participant"] = dict(totals.get('by_participant_cents', {}))
+    _totals["participant_count"] = dict(totals.get('participant_count', {}))
+    _totals["shared_by_date"] = dict(totals['shared_by_date_cents'])
+    _totals["shared_count"] = dict(totals.get('shared_count', {}))
+    # Le cube n'est pas dans le manifeste: il est calcule a la lecture
+    # des depenses (voir get_pivot)
+    _totals["cube"] = {}
+    _totals["cube_count"] = {}
+    _pivots.clear()
+    return True
+
+
+def _freeze_section(name):
+    """
+    Fige une section lue (voyage_info, hotel, transport).
+
+    Les transports sur place sont d'abord convertis en enregistrements
+    compacts.
+
+    Args:
+        name: Le nom de la section (voir FROZEN_SECTIONS)
+    """
+    value = _data.get(name)
+    if value is not None:
+        _data[name] = _frozen_value(name, value)
+
+    _search_section(name)
+
+
+def _frozen_value(name, value):
+    """
+    Retourne la version figee de la valeur d'une section.
+
+    Args:
+        name: Le nom de la section (voir FROZEN_SECTIONS, ou budget_prevu)
+        value: La valeur lue
+
+    Returns:
+        La valeur figee
+    """
+    if name == 'transport' and value and value.get('sur_place'):
+        value = dict(value)
+        value['sur_place'] = records.convert_list(list(value['sur_place']), records.LocalTransport)
+
+    return records.freeze(value)
+
+
+def _build_index(col):
+    """
+    Construit les index et les totaux d'une collection.
+
+    Appele au chargement de la section de la collection. Les elements
+    sont d'abord convertis en enregistrements compacts (voir records.py),
+    puis la liste est remplacee par une IdMap (en mode COLUMNAR_DEPENSES,
+    les depenses par un registre en colonnes, voir _index_columns). Les
+    compteurs d'ID sauvegardes dans l'instantane sont conserves pour ne
+    jamais reattribuer l'ID d'un element supprime.
+
+    Args:
+        col: Le nom de la collection
+    """
+    saved_next_ids = _data.get('next_ids', {})
+
+    if col == "depenses":
+        _totals["depenses"] = 0
+        _totals["by_category"] = {}
+        _totals["category_count"] = {}
+        _totals["by_participant"] = {}
+        _totals["participant_count"] = {}
+        _totals["shared_by_date"] = {}
+        _totals["shared_count"] = {}
+        _totals["cube"] = {}
+        _totals["cube_count"] = {}
+        _pivots.clear()
+        _totals["devise"] = _trip_devise()
+        _totals["buckets"] = {}
+        _totals["bucket_count"] = {}
+        _totals["converted"] = {}
+        _totals["unconverted"] = 0
+    elif col == "checklist":
+        _totals["checked"] = 0
+
+    record_type = records.COLLECTION_TYPES[col]
+    collection = _get_collection(col)
+    columnar = COLUMNAR_DEPENSES and col == "depenses"
+    if columnar and isinstance(collection, ledger.Ledger):
+        # Registre ouvert depuis son fichier (IDs deja valides)
+        items = None
+        max_id = collection.max_id()
+    else:
+        items = records.convert_list(list(collection), record_type)
+        max_id = max((item.get('id') for item in items if _valid_id(item.get('id'))), default=0)
+
+    _indexes[col] = {
+        "by_id": {},
+        "columnar": columnar,
+        "next_id": max(max_id + 1, saved_next_ids.get(col, 1)),
+        "by": {field: {} for field in INDEXED_FIELDS[col]},
+        "sorted": {},
+    }
+    _search[col] = search_index.create()
+
+    # Element sans ID utilisable (fichier modifie a la main): un nouvel
+    # ID lui est attribue
+    if items is not None:
+        for i, item in enumerate(items):
+            if not _valid_id(item.get('id')):
+                items[i] = item.replace(id=_next_id(col))
+                _dirty_sections.add(sections.section_of(col))
+
+        if columnar:
+            collection = ledger.Ledger.from_records(items)
+        else:
+            collection = IdMap.from_pairs((item['id'], item) for item in items)
+        _set_collection(col, collection)
+
+    if columnar:
+        _index_columns(col, collection)
+        return
+
+    for item in collection:
+        _index_add(col, item)
+
+    # Les ordres tries sont construits en une fois (un tri par champ),
+    # puis maintenus par _index_add et _index_remove
+    for field in SORT_FIELDS[col]:
+        _sorted_order(col, field)
+
+
+def _index_columns(col, items):
+    """
+    Construit les index et les totaux d'une collection en colonnes (mode
+    COLUMNAR_DEPENSES, voir ledger.py).
+
+    L'index par ID lit la version courante du registre (voir
+    ledger.IdView) et n'est jamais modifie, les recherches par champ
+    parcourent les colonnes (voir _find_by), les ordres tries et l'index
+    de recherche sont construits a la premiere requete (voir
+    _sorted_order et _search_of). Les totaux sont additionnes par paquet
+    directement sur les colonnes (voir ledger.buckets). Aucune depense
+    n'est decodee.
+
+    Args:
+        col: Le nom de la collection
+        items: Le registre (ledger.Ledger)
+    """
+    index = _indexes[col]
+    index["by_id"] = ledger.IdView(lambda: _get_collection(col))
+    index["by"] = {}
+    _search[col] = None
+
+    buckets, counts = ledger.buckets(items, _depense_key)
+    _totals["buckets"] = buckets
+    _totals["bucket_count"] = counts
+    _totals.update(_convert_buckets(buckets, counts, _totals["devise"]))
+
+    category_count = _totals["category_count"]
+    participant_count = _totals["participant_count"]
+    shared_count = _totals["shared_count"]
+    for (_, date, categorie, participant), count in counts.items():
+        category_count[categorie] = category_count.get(categorie, 0) + count
+        participant_count[participant] = participant_count.get(participant, 0) + count
+        if _is_shared(participant):
+            shared_count[date] = shared_count.get(date, 0) + count
+
+
+def _search_of(col):
+    """
+    Retourne l'index de recherche d'une collection ou d'une section,
+    construit s'il n'existe pas encore (collection en colonnes), puis
+    maintenu par _index_add et _index_remove.
+
+    Les depenses sont indexees par groupe de meme texte (codes des
+    colonnes de TEXT_FIELDS, voir ledger.groups): chaque texte
+    distinct n'est decoupe qu'une fois.
+
+    Args:
+        col: Le nom de la collection (voir TEXT_FIELDS)
+
+    Returns:
+        L'index (voir search_index.py)
+    """
+    index = _search[col]
+    if index is None:
+        index = search_index.create()
+        for item, ids in ledger.groups(_get_collection(col), TEXT_FIELDS[col]):
+            search_index.add_many(index, ids, _search_text(col, item))
+        _search[col] = index
+    return index
+
+
+def _sorted_order(col, field):
+    """
+    Retourne l'ordre d'un champ d'une collection, construit s'il
+    n'existe pas encore (un seul tri), puis maintenu par _index_add et
+    _index_remove.
+
+    Args:
+        col: Le nom de la collection
+        field: Le champ de tri (voir SORT_FIELDS)
+
+    Returns:
+        L'ordre des cles (valeur, id), voir sorted_index.py
+    """
+    orders = _indexes[col]["sorted"]
+    order = orders.get(field)
+    if order is None:
+        items = _get_collection(col)
+        if isinstance(items, ledger.Ledger):
+            keys = ledger.sort_keys(items, field, _sort_key)
+        else:
+            keys = [_sort_key(field, item) for item in items]
+        order = orders[field] = sorted_index.create(sorted(keys))
+    return order
+
+
+def _valid_id(item_id):
+    """
+    Indique si une valeur peut servir d'ID d'element (entier positif).
+    """
+    return type(item_id) is int and item_id >= 0
+
+
+def _rebuild_indexes():
+    """
+    Reconstruit tous les index a partir des donnees en memoire.
+
+    Appele quand toutes les donnees sont remplacees (chargement SQLite,
+    migration, reset_to_defaults).
+    """
+    for name in FROZEN_SECTIONS:
+        _freeze_section(name)
+
+    for col in INDEXED_FIELDS:
+        _build_index(col)
+
+
+def _next_id(col):
+    """
+    Attribue un nouvel ID dans une collection (compteur monotone).
+
+    Args:
+        col: Le nom de la collection
+
+    Returns:
+        Le nouvel ID
+    """
+    index = _indexes[col]
+    new_id = index["next_id"]
+    index["next_id"] = new_id + 1
+    _data.setdefault('next_ids', {})[col] = new_id + 1
+    return new_id
+
+
+def _find(col, item_id):
+    """
+    Recherche un element par son ID en O(1).
+
+    Args:
+        col: Le nom de la collection
+        item_id: L'ID de l'element
+
+    Returns:
+        L'element, ou None s'il n'existe pas
+    """
+    return _indexes[col]["by_id"].get(item_id)
+
+
+def _find_by(col, field, value):
+    """
+    Recupere les elements dont un champ indexe a une valeur donnee.
+
+    Args:
+        col: Le nom de la collection
+        field: Le champ indexe
+        value: La valeur recherchee
+
+    Returns:
+        Liste des elements correspondants
+    """
+    buckets = _indexes[col]["by"].get(field)
+    if buckets is None:
+        # Collection en colonnes: parcours de la colonne du champ
+        return _get_collection(col).find(field, value)
+    return list(buckets.get(value, {}).values())
+
+
+def _insert_record(col, record):
+    """
+    Place un nouvel element (enregistrement avec son ID) dans une
+    collection et dans ses index.
+
+    Args:
+        col: Le nom de la collection
+        record: L'enregistrement a ajouter
+    """
+    items = _get_collection(col)
+    item_id = record['id']
+
+    _set_collection(col, items.set(item_id, record))
+    _index_add(col, record)
+    _track_base(col, item_id, None)
+    _log_change('add', col, item_id, record)
+    _emit('add', col, item_id, after=record)
+
+    def undo():
+        _index_remove(col, record)
+        _set_collection(col, items)
+    _on_rollback(undo)
+
+
+def _replace_record(col, current, record):
+    """
+    Remplace un element d'une collection par une nouvelle version.
+
+    Args:
+        col: Le nom de la collection
+        current: L'element actuel
+        record: La nouvelle version (meme ID)
+    """
+    items = _get_collection(col)
+    item_id = current['id']
+
+    _index_remove(col, current)
+    _set_collection(col, items.set(item_id, record))
+    _index_add(col, record)
+    _track_base(col, item_id, current)
+    _log_change('update', col, item_id, record)
+    _emit('update', col, item_id, current, record)
+
+    def undo():
+        _index_remove(col, record)
+        _set_collection(col, items)
+        _index_add(col, current)
+    _on_rollback(undo)
+
+
+def _remove_record(col, current):
+    """
+    Retire un element d'une collection et de ses index.
+
+    Args:
+        col: Le nom de la collection
+        current: L'element a retirer
+    """
+    items = _get_collection(col)
+    item_id = current['id']
+
+    _index_remove(col, current)
+    _set_collection(col, items.remove(item_id))
+    _track_base(col, item_id, current)
+    _log_change('delete', col, item_id)
+    _emit('delete', col, item_id, before=current)
+
+    def undo():
+        _set_collection(col, items)
+        _index_add(col, current)
+    _on_rollback(undo)
+
+
+def _add_item(col, item):
+    """
+    Ajoute un element a une collection et a ses index.
+
+    Args:
+        col: Le nom de la collection
+        item: L'element a ajouter (son ID est attribue ici)
+
+    Returns:
+        L'ID du nouvel element
+    """
+    with _lock:
+        new_id = _next_id(col)
+        item['id'] = new_id
+
+        # Stocker un enregistrement compact plutot que le dictionnaire
+        _insert_record(col, records.COLLECTION_TYPES[col].from_dict(item))
+
+        return new_id
+
+
+def _update_item(col, item_id, item):
+    """
+    Remplace le contenu d'un element existant.
+
+    Un nouvel enregistrement remplace l'ancien, qui reste inchange
+    (il peut appartenir a un instantane ou a l'historique).
+
+    Args:
+        col: Le nom de la collection
+        item_id: L'ID de l'element a modifier
+        item: Les nouvelles donnees (dictionnaire)
+
+    Returns:
+        True si la mise a jour a reussi
+    """
+    with _lock:
+        current = _find(col, item_id)
+        if current is None:
+            return False
+
+        data = dict(item)
+        data['id'] = item_id
+        _replace_record(col, current, records.COLLECTION_TYPES[col].from_dict(data))
+
+        return True
+
+
+def _delete_item(col, item_id):
+    """
+    Supprime un element d'une collection et de ses index.
+
+    Args:
+        col: Le nom de la collection
+        item_id: L'ID de l'element a supprimer
+
+    Returns:
+        True si la suppression a reussi
+    """
+    with _lock:
+        current = _find(col, item_id)
+        if current is None:
+            return False
+
+        _remove_record(col, current)
+
+        return True
+
+
+def _add_items(col, items):
+    """
+    Ajoute plusieurs elements a une collection en une seule transaction.
+
+    Args:
+        col: Le nom de la collection
+        items: Les elements a ajouter (dictionnaires)
+
+    Returns:
+        La liste des IDs des nouveaux elements
+    """
+    record_type = records.COLLECTION_TYPES[col]
+
+    with transaction():
+        collection = _get_collection(col)
+        added = []
+
+        def undo():
+            for item in added:
+                _index_remove(col, item)
+            _set_collection(col, collection)
+        _on_rollback(undo)
+
+        current = collection
+        for item in items:
+            new_id = _next_id(col)
+            item['id'] = new_id
+            item = record_type.from_dict(item)
+
+            current = current.set(new_id, item)
+            added.append(item)
+            _index_add(col, item)
+            _track_base(col, new_id, None)
+            _log_change('add', col, new_id, item)
+            _emit('add', col, new_id, after=item)
+
+        _set_collection(col, current)
+
+    return [item['id'] for item in added]
+
+
+def _delete_items(col, item_ids):
+    """
+    Supprime plusieurs elements d'une collection en une seule transaction.
+
+    Args:
+        col: Le nom de la collection
+        item_ids: Les IDs des elements a supprimer
+
+    Returns:
+        Le nombre d'elements supprimes
+    """
+    with transaction():
+        removed = []
+        for item_id in set(item_ids):
+            item = _find(col, item_id)
+            if item is not None:
+                removed.append(item)
+
+        if not removed:
+            return 0
+
+        collection = _get_collection(col)
+
+        def undo():
+            _set_collection(col, collection)
+            for item in removed:
+                _index_add(col, item)
+        _on_rollback(undo)
+
+        current = collection
+        for item in removed:
+            _index_remove(col, item)
+            current = current.remove(item['id'])
+            _track_base(col, item['id'], item)
+            _log_change('delete', col, item['id'])
+            _emit('delete', col, item['id'], before=item)
+
+        _set_collection(col, current)
+
+    return len(removed)
+
+
+def _set_checked(item, checked):
+    """
+    Change l'etat coche d'un item de la checklist.
+
+    Args:
+        item: L'item (enregistrement de la checklist)
+        checked: Le nouvel etat
+
+    Returns:
+        True si l'etat a change
+    """
+    if item.get('checked', False) == checked:
+        return False
+
+    record = item.replace(checked=checked)
+    items = _get_collection('checklist')
+
+    # Les index et le nombre d'items coches suivent le nouvel enregistrement
+    _index_remove('checklist', item)
+    _set_collection('checklist', items.set(item['id'], record))
+    _index_add('checklist', record)
+
+    def undo():
+        _index_remove('checklist', record)
+        _set_collection('checklist', items)
+        _index_add('checklist', item)
+    _on_rollback(undo)
+
+    _track_base('checklist', item['id'], item)
+    _log_change('patch', 'checklist', item['id'], {'checked': checked})
+    _emit('patch', 'checklist', item['id'], {'checked': not checked}, {'checked': checked})
+    return True
+
+
+# ============================================
+# HISTORIQUE (ANNULER / RETABLIR)
+# ============================================
+
+def _clear_history():
+    """
+    Vide l'historique d'annulation (rechargement, changement de voyage).
+    """
+    _undo_stack.clear()
+    _redo_stack.clear()
+    for group in _history_groups.values():
+        group.clear()
+
+
+def _record_history(batch):
+    """
+    Memorise un lot d'evenements publie comme une etape de l'historique.
+
+    Une nouvelle modification vide la pile des etapes a retablir.
+
+    Args:
+        batch: Le lot d'evenements (tuple de events.ChangeEvent)
+    """
+    if not batch or _history_mode == "remote":
+        # Les modifications des autres instances ne s'annulent pas ici
+        return
+
+    with _lock:
+        group = _history_groups.get(threading.get_ident())
+        if group is not None and _history_mode is None:
+            # Etape en cours de constitution (voir history_step)
+            group.extend(batch)
+            return
+
+        if _history_mode == "undo":
+            _redo_stack.append(batch)
+        else:
+            _undo_stack.append(batch)
+            if _history_mode is None:
+                _redo_stack.clear()
+
+
+@contextlib.contextmanager
+def history_step():
+    """
+    Regroupe en une seule etape d'annulation les modifications faites
+    par ce thread pendant le bloc.
+
+    Contrairement a transaction, les modifications restent sauvegardees
+    et publiees au fur et a mesure et le verrou n'est pas garde pendant
+    tout le bloc (import d'un gros fichier par lots, voir importer.py).
+    Les modifications des autres threads forment leurs propres etapes.
+    Si une exception est levee, les modifications deja faites forment
+    quand meme une etape. Les blocs peuvent etre imbriques.
+
+    Usage:
+        with data_manager.history_step():
+            data_manager.add_depenses(premier_lot)
+            data_manager.add_depenses(second_lot)
+    """
+    thread = threading.get_ident()
+    with _lock:
+        if thread in _history_groups:
+            outer = False
+        else:
+            _history_groups[thread] = []
+            outer = True
+
+    if not outer:
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        with _lock:
+            batch = tuple(_history_groups.pop(thread))
+        _record_history(batch)
+
+
+def _revert_event(event):
+    """
+    Annule un evenement de l'historique.
+
+    Les evenements de l'annulation forment une nouvelle etape, placee
+    sur l'autre pile: retablir revient a annuler une annulation.
+
+    Un element supprime ou recree entre-temps par une autre instance est
+    laisse tel quel.
+
+    Args:
+        event: L'evenement (events.ChangeEvent)
+    """
+    col, op = event.collection, event.op
+
+    if op == 'set':
+        value = event.before
+        if value is None:
+            # Section absente avant sa premiere modification
+            value = 0 if col == 'budget_prevu' else {}
+        _set_section(col, value)
+        return
+
+    current = _find(col, event.id)
+    if op == 'delete':
+        # L'element supprime reprend sa place (meme ID)
+        if current is None:
+            _insert_record(col, event.before)
+    elif current is None:
+        return
+    elif op == 'patch':
+        _set_checked(current, event.before['checked'])
+    elif op == 'update':
+        _replace_record(col, current, event.before)
+    elif op == 'add':
+        _remove_record(col, current)
+
+
+def _replay_history(source, mode):
+    """
+    Annule la derniere etape d'une pile de l'historique.
+
+    L'etape est annulee dans une transaction: elle est sauvegardee et
+    publiee en un seul lot, qui devient une etape de l'autre pile.
+
+    Args:
+        source: La pile (_undo_stack ou _redo_stack)
+        mode: "undo" ou "redo"
+
+    Returns:
+        True si une etape a ete rejouee
+    """
+    global _history_mode
+
+    _ensure_loaded()
+
+    with _lock:
+        if not source:
+            return False
+        if _tx_depth:
+            raise RuntimeError("Impossible d'annuler ou de retablir pendant une transaction")
+
+        batch = source.pop()
+        _history_mode = mode
+        try:
+            with transaction():
+                for event in reversed(batch):
+                    _revert_event(event)
+        except Exception:
+            source.append(batch)
+            raise
+        finally:
+            _history_mode = None
+
+    print(f"[DataManager] {'Annulation' if mode == 'undo' else 'Retablissement'}: "
+          f"{len(batch)} modification(s)")
+    return True
+
+
+def undo():
+    """
+    Annule la derniere modification (ou la derniere transaction).
+
+    Les modifications annulees sont sauvegardees et publiees comme les
+    autres (les frames se mettent a jour par leurs evenements).
+
+    Returns:
+        True si une modification a ete annulee
+    """
+    return _replay_history(_undo_stack, "undo")
+
+
+def redo():
+    """
+    Retablit la derniere modification annulee.
+
+    Returns:
+        True si une modification a ete retablie
+    """
+    return _replay_history(_redo_stack, "redo")
+
+
+def can_undo():
+    """
+    Indique si une modification peut etre annulee.
+    """
+    return bool(_undo_stack)
+
+
+def can_redo():
+    """
+    Indique si une modification annulee peut etre retablie.
+    """
+    return bool(_redo_stack)
+
+
+def snapshot():
+    """
+    Retourne un instantane immuable de toutes les donnees.
+
+    L'instantane partage toute sa structure avec les donnees en memoire
+    (aucune copie des collections ni des elements): le prendre coute
+    O(1), et il reste inchange quelles que soient les modifications
+    suivantes. Toutes les sections sont lues si elles ne l'ont pas
+    encore ete.
+
+    Returns:
+        Les donnees (vue en lecture seule, meme structure que les
+        fichiers; les collections sont des IdMap)
+    """
+    _ensure_loaded(*sections.SECTION_FILES)
+
+    with _lock:
+        data = dict(_data)
+        data['budget'] = MappingProxyType(dict(_data.get('budget', {})))
+        data['next_ids'] = MappingProxyType(dict(_data.get('next_ids', {})))
+        return MappingProxyType(data)
+
+
+# ============================================
+# SYNCHRONISATION ENTRE INSTANCES
+# ============================================
+
+@contextlib.contextmanager
+def _shared_lock(blocking=True):
+    """
+    Prend le verrou de fichier du repertoire de donnees (voir file_lock.py).
+
+    Le verrou est reentrant pour le thread qui le tient deja. En mode
+    "sqlite", SQLite verrouille lui-meme la base: rien n'est pris.
+
+    Args:
+        blocking: False pour ne pas attendre une autre instance
+
+    Yields:
+        True si le verrou est tenu
+    """
+    global _file_lock_owner
+
+    thread = threading.get_ident()
+    if STORAGE_BACKEND == "sqlite" or _file_lock_owner == thread:
+        yield True
+        return
+
+    with file_lock.locked(LOCK_FILE, blocking) as acquired:
+        if acquired:
+            _file_lock_owner = thread
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                _file_lock_owner = None
+
+
+def _read_disk_signature():
+    """
+    Lit la date, la taille et l'inode du manifeste et du journal.
+
+    Deux signatures differentes indiquent qu'une instance a ecrit entre
+    les deux lectures (un os.stat par fichier, sans lire le contenu).
+
+    Returns:
+        Tuple comparable
+    """
+    signature = []
+    for path in (os.path.join(SECTIONS_DIR, sections.MANIFEST_NAME), JOURNAL_FILE):
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _read_disk_position():
+    """
+    Lit le numero de compactage du manifeste sur le disque et le numero
+    du dernier enregistrement ecrit (manifeste ou journal).
+
+    Returns:
+        Tuple (generation, seq), (0, 0) si le manifeste n'existe pas encore
+    """
+    try:
+        manifest = sections.read_manifest(SECTIONS_DIR)
+    except (OSError, ValueError):
+        return 0, 0
+
+    tail, _ = journal.read_tail(JOURNAL_FILE)
+    seq = max([manifest.get('journal_seq', 0)] + [record.get('seq', 0) for record in tail])
+    return manifest.get('generation', 0), seq
+
+
+def has_external_changes():
+    """
+    Indique si une autre instance a ecrit dans le repertoire de donnees
+    depuis la derniere synchronisation.
+
+    Returns:
+        True si le manifeste ou le journal a change sur le disque
+    """
+    if STORAGE_BACKEND == "sqlite" or _disk_generation is None:
+        return False
+    return _read_disk_signature() != _disk_signature
+
+
+def sync_external_changes():
+    """
+    Integre les modifications ecrites par les autres instances.
+
+    Appelee periodiquement par main.py (SYNC_INTERVAL_MS) et avant chaque
+    ecriture. Ne fait rien (sans attendre) si une ecriture est en cours
+    dans cette instance ou dans une autre. Les modifications sont
+    publiees comme les autres (les frames ne mettent a jour que les
+    lignes concernees); les conflits sont publies dans un evenement
+    events.CONFLICT.
+
+    Returns:
+        True si des modifications ont ete integrees
+    """
+    if not _loaded.is_set() or _tx_depth or not has_external_changes():
+        return False
+
+    if not _write_lock.acquire(blocking=False):
+        return False
+    try:
+        with _shared_lock(blocking=False) as acquired:
+            return acquired and _sync_locked()
+    finally:
+        _write_lock.release()
+
+
+def _sync_locked():
+    """
+    Integre les modifications des autres instances depuis la derniere
+    synchronisation.
+
+    Doit etre appelee avec _write_lock et le verrou de fichier acquis.
+    Seule la fin du journal (a partir de la position deja lue) est
+    analysee, et seules les sections reecrites par le compactage d'une
+    autre instance sont relues: chacune est comparee element par element
+    aux donnees en memoire.
+
+    Returns:
+        True si des modifications ont ete integrees
+    """
+    global _disk_generation, _disk_offset, _disk_seq, _disk_signature
+    global _journal_seq, _history_mode
+
+    if STORAGE_BACKEND == "sqlite" or _disk_generation is None:
+        return False
+
+    signature = _read_disk_signature()
+    if signature == _disk_signature:
+        return False
+
+    try:
+        manifest = sections.read_manifest(SECTIONS_DIR)
+    except (OSError, ValueError) as e:
+        print(f"[DataManager] Erreur de lecture du manifeste: {e}")
+        return False
+
+    generation = manifest.get('generation', 0)
+    compacted = generation != _disk_generation
+    snapshot_seq = manifest.get('journal_seq', 0) if compacted else 0
+
+    # Apres un compactage, le journal a ete vide: il est relu depuis le debut
+    tail, offset = journal.read_tail(JOURNAL_FILE, 0 if compacted else _disk_offset)
+
+    conflicts = []
+    with _lock:
+        if _tx_depth:
+            return False
+
+        last_seq = max(_disk_seq, snapshot_seq)
+        tail = [record for record in tail if record.get('seq', 0) > last_seq]
+        changed = []
+        if compacted:
+            changed = [name for name, seq in manifest.get('section_seqs', {}).items()
+                       if seq > _disk_seq and name in _loaded_sections]
+            _data['generation'] = generation
+            _data['section_seqs'] = dict(manifest.get('section_seqs', {}))
+            _drop_compacted_backlog(snapshot_seq, manifest.get('totals'))
+
+        for col, next_id in manifest.get('next_ids', {}).items():
+            _bump_next_id(col, next_id)
+
+        _history_mode = "remote"
+        try:
+            with transaction():
+                for name in changed:
+                    _merge_section_file(name, conflicts)
+                for record in tail:
+                    _merge_record(record, conflicts)
+        finally:
+            _history_mode = None
+
+        _disk_generation = generation
+        _disk_offset = offset
+        _disk_seq = max([last_seq] + [record.get('seq', 0) for record in tail])
+        _journal_seq = max(_journal_seq, _disk_seq)
+        _disk_signature = signature
+
+    print(f"[DataManager] Modifications d'une autre instance integrees "
+          f"({len(changed)} section(s) relue(s), {len(tail)} modification(s) du journal, "
+          f"{len(conflicts)} conflit(s))")
+    if conflicts:
+        events.publish([events.conflict_event(conflicts)])
+    return True
+
+
+def _drop_compacted_backlog(snapshot_seq, totals):
+    """
+    Oublie les enregistrements du journal inclus dans les sections par le
+    compactage d'une autre instance (sections pas encore chargees).
+
+    Args:
+        snapshot_seq: Le numero du dernier enregistrement inclus
+        totals: Les totaux des depenses du nouveau manifeste (ou None)
+    """
+    global _totals_from_manifest
+
+    for name in list(_section_backlog):
+        kept = [record for record in _section_backlog[name] if record.get('seq', 0) > snapshot_seq]
+        if kept:
+            _section_backlog[name] = kept
+        else:
+            del _section_backlog[name]
+            _dirty_sections.discard(name)
+
+    if 'depenses' not in _loaded_sections and 'depenses' not in _section_backlog \
+            and _restore_totals(totals):
+        _totals_from_manifest = True
+
+
+def _bump_next_id(col, next_id):
+    """
+    Avance le compteur d'ID d'une collection (IDs attribues par une autre
+    instance).
+
+    Args:
+        col: Le nom de la collection
+        next_id: Le prochain ID libre selon l'autre instance
+    """
+    next_ids = _data.setdefault('next_ids', {})
+    if next_id > next_ids.get(col, 1):
+        next_ids[col] = next_id
+
+    index = _indexes.get(col)
+    if index is not None and next_id > index["next_id"]:
+        index["next_id"] = next_id
+
+
+def _merge_section_file(name, conflicts):
+    """
+    Fusionne une section chargee avec son fichier, reecrit par une autre
+    instance.
+
+    Args:
+        name: Le nom de la section
+        conflicts: Liste completee avec les conflits (events.Conflict)
+    """
+    try:
+        value = sections.read_section(SECTIONS_DIR, name, USE_SNAPSHOT_CACHE)
+    except (OSError, ValueError) as e:
+        print(f"[DataManager] Erreur de lecture de la section {name}: {e}")
+        return
+    if value is None:
+        return
+
+    if name in INDEXED_FIELDS:
+        record_type = records.COLLECTION_TYPES[name]
+        theirs = {
+            item.get('id'): item
+            for item in records.convert_list(list(value), record_type)
+            if _valid_id(item.get('id'))
+        }
+        ids = set(theirs).union(_indexes[name]["by_id"])
+        ids.update(item_id for col, item_id in _sync_base if col == name)
+        for item_id in sorted(ids):
+            _merge_remote(name, item_id, theirs.get(item_id), conflicts)
+    elif name == 'budget':
+        _merge_remote('budget_prevu', None, value.get('budget_prevu', 0), conflicts)
+        _merge_remote('partage', None, value.get('partage'), conflicts)
+    else:
+        _merge_remote(name, None, _frozen_value(name, value), conflicts)
+
+
+def _merge_record(record, conflicts):
+    """
+    Fusionne un enregistrement du journal ecrit par une autre instance.
+
+    Args:
+        record: L'enregistrement (voir journal.py)
+        conflicts: Liste completee avec les conflits (events.Conflict)
+    """
+    global _totals_from_manifest
+
+    col, op = record.get('col'), record.get('op')
+    name = sections.section_of(col)
+    if name is None:
+        return
+
+    if name not in _loaded_sections:
+        # Rejoue au chargement de la section
+        _section_backlog.setdefault(name, []).append(record)
+        _dirty_sections.add(name)
+        if name == 'depenses':
+            _totals_from_manifest = False
+        return
+
+    rec = record.get('rec')
+    if op == 'set':
+        if col in journal.SECTION_PATHS:
+            _merge_remote(col, None, _frozen_value(col, rec), conflicts)
+        return
+
+    item_id = record.get('id')
+    if col not in journal.COLLECTION_PATHS or not _valid_id(item_id):
+        return
+
+    if op in ('add', 'update'):
+        data = dict(rec or {})
+        data['id'] = item_id
+        theirs = records.COLLECTION_TYPES[col].from_dict(data)
+    elif op == 'delete':
+        theirs = None
+    elif op == 'patch':
+        key = (col, item_id)
+        previous = _sync_base.get(key) if key in _sync_base else _find(col, item_id)
+        if previous is None:
+            previous = _find(col, item_id)
+        if previous is None:
+            return
+        theirs = previous.replace(**(rec or {}))
+    else:
+        return
+
+    _merge_remote(col, item_id, theirs, conflicts)
+
+
+def _merge_remote(col, item_id, theirs, conflicts):
+    """
+    Fusionne la version d'un element (ou d'une section) ecrite par une
+    autre instance avec la version en memoire.
+
+    Sans modification locale en attente, la version de l'autre instance
+    est reprise telle quelle. Sinon la fusion est faite champ par champ
+    a partir de la version commune (_sync_base): chaque champ modifie
+    d'un seul cote garde cette modification; un champ modifie
+    differemment des deux cotes garde la valeur locale et est signale
+    comme un conflit. Deux nouveaux elements ayant recu le meme ID des
+    deux cotes sont conserves (l'element local recoit un nouvel ID).
+
+    Args:
+        col: La collection ou la section
+        item_id: L'ID de l'element (None pour une section)
+        theirs: La version de l'autre instance (None si supprime)
+        conflicts: Liste completee avec les conflits (events.Conflict)
+    """
+    key = (col, item_id)
+    ours = _current_value(col, item_id)
+
+    if key not in _sync_base:
+        if not _same(ours, theirs):
+            _apply_remote(col, item_id, ours, theirs)
+        return
+
+    base = _sync_base[key]
+    # Les modifications locales portent desormais sur la version de
+    # l'autre instance
+    _sync_base[key] = theirs
+
+    if item_id is not None and base is None and ours is not None \
+            and theirs is not None and not _same(ours, theirs):
+        _renumber_local(col, ours)
+        _apply_remote(col, item_id, None, theirs)
+        return
+
+    merged, fields = _merge_values(base, ours, theirs)
+    if fields is not None:
+        conflicts.append(events.Conflict(col, item_id, fields, base, ours, theirs))
+    if not _same(merged, ours):
+        _set_local(col, item_id, ours, merged)
+
+
+def _merge_values(base, ours, theirs):
+    """
+    Fusion a trois voies de deux versions d'un element.
+
+    Args:
+        base: La version commune
+        ours: La version locale
+        theirs: La version de l'autre instance
+
+    Returns:
+        Tuple (version fusionnee, champs en conflit ou None). Les champs
+        sont vides si le conflit porte sur tout l'element (suppression
+        d'un cote, modification de l'autre).
+    """
+    if _same(ours, theirs) or _same(theirs, base):
+        return ours, None
+    if _same(ours, base):
+        return theirs, None
+    if not all(isinstance(value, Mapping) for value in (base, ours, theirs)):
+        return ours, ()
+
+    merged = {}
+    fields = []
+    for field in dict.fromkeys([*base, *ours, *theirs]):
+        b = base.get(field, _MISSING)
+        o = ours.get(field, _MISSING)
+        t = theirs.get(field, _MISSING)
+        if _same(o, t) or _same(t, b):
+            value = o
+        elif _same(o, b):
+            value = t
+        else:
+            value = o
+            fields.append(field)
+        if value is not _MISSING:
+            merged[field] = value
+
+    if isinstance(ours, records.Record):
+        merged = type(ours).from_dict(merged)
+    else:
+        merged = records.freeze(merged)
+    return merged, (tuple(fields) if fields else None)
+
+
+def _same(a, b):
+    """
+    Compare deux versions d'un element, d'une section ou d'un champ.
+    """
+    return a is b or a == b
+
+
+def _current_value(col, item_id):
+    """
+    Retourne la version en memoire d'un element ou d'une section.
+
+    Args:
+        col: La collection ou la section
+        item_id: L'ID de l'element (None pour une section)
+
+    Returns:
+        La valeur, ou None si elle est absente
+    """
+    if item_id is not None:
+        return _find(col, item_id)
+
+    parent = _data
+    path = journal.SECTION_PATHS[col]
+    for key in path[:-1]:
+        parent = parent.get(key, {})
+    return parent.get(path[-1])
+
+
+def _apply_remote(col, item_id, ours, theirs):
+    """
+    Reprend la version d'une autre instance (deja ecrite sur le disque:
+    rien n'est ajoute au journal).
+
+    Args:
+        col: La collection ou la section
+        item_id: L'ID de l'element (None pour une section)
+        ours: La version en memoire (None si absente)
+        theirs: La version de l'autre instance (None si supprimee)
+    """
+    _dirty_sections.add(sections.section_of(col))
+
+    if item_id is None:
+        parent = _data
+        path = journal.SECTION_PATHS[col]
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        key = path[-1]
+        had = key in parent
+
+        if theirs is None:
+            parent.pop(key, None)
+        else:
+            parent[key] = theirs
+        _search_section(col)
+
+        def undo():
+            if had:
+                parent[key] = ours
+            else:
+                parent.pop(key, None)
+            _search_section(col)
+        _on_rollback(undo)
+
+        _emit('set', col, before=ours, after=theirs)
+        return
+
+    items = _get_collection(col)
+    if ours is not None:
+        _index_remove(col, ours)
+
+    if theirs is None:
+        _set_collection(col, items.remove(item_id))
+        op = 'delete'
+    else:
+        _set_collection(col, items.set(item_id, theirs))
+        _index_add(col, theirs)
+        _bump_next_id(col, item_id + 1)
+        op = 'add' if ours is None else 'update'
+
+    def undo():
+        if theirs is not None:
+            _index_remove(col, theirs)
+        _set_collection(col, items)
+        if ours is not None:
+            _index_add(col, ours)
+    _on_rollback(undo)
+
+    _emit(op, col, item_id, ours, theirs)
+
+
+def _set_local(col, item_id, ours, value):
+    """
+    Applique une version comme une modification locale (ajoutee au
+    journal, donc ecrite pour les autres instances).
+
+    Args:
+        col: La collection ou la section
+        item_id: L'ID de l'element (None pour une section)
+        ours: La version en memoire (None si absente)
+        value: La nouvelle version (None pour supprimer)
+    """
+    if item_id is None:
+        if value is None:
+            value = 0 if col == 'budget_prevu' else {}
+        _set_section(col, value)
+    elif value is None:
+        _remove_record(col, ours)
+    elif ours is None:
+        _bump_next_id(col, item_id + 1)
+        _insert_record(col, value)
+    else:
+        _replace_record(col, ours, value)
+
+
+def _renumber_local(col, item):
+    """
+    Donne un nouvel ID a un element ajoute localement dont l'ID a ete
+    attribue au meme moment par une autre instance.
+
+    Args:
+        col: Le nom de la collection
+        item: L'element local
+    """
+    old_id = item['id']
+
+    # Les enregistrements en attente de l'ancien ID ne sont pas ecrits:
+    # l'element est ajoute sous son nouvel ID
+    _pending_records[:] = [
+        record for record in _pending_records
+        if record.get('col') != col or record.get('id') != old_id
+    ]
+    _apply_remote(col, old_id, item, None)
+    _sync_base.pop((col, old_id), None)
+
+    new_id = _next_id(col)
+    _insert_record(col, item.replace(id=new_id))
+    print(f"[DataManager] {col}: ID {old_id} deja attribue par une autre instance, "
+          f"nouvel ID {new_id}")
+
+
+def _track_base(col, item_id, before):
+    """
+    Memorise la version commune d'un element avant sa premiere
+    modification locale pas encore ecrite (base de la fusion).
+
+    Args:
+        col: La collection ou la section
+        item_id: L'ID de l'element (None pour une section)
+        before: La version avant la modification (None si absent)
+    """
+    key = (col, item_id)
+    if key in _sync_base:
+        return
+
+    _sync_base[key] = before
+    _on_rollback(lambda: _sync_base.pop(key, None))
+
+
+def accept_theirs(conflicts):
+    """
+    Remplace les versions locales en conflit par celles de l'autre instance.
+
+    Args:
+        conflicts: Les conflits (voir events.get_conflicts)
+    """
+    _ensure_loaded()
+
+    with transaction():
+        for conflict in conflicts:
+            ours = _current_value(conflict.collection, conflict.id)
+            if not _same(ours, conflict.theirs):
+                _set_local(conflict.collection, conflict.id, ours, conflict.theirs)
+
+
+# ============================================
+# FONCTIONS POUR LES INFORMATIONS DU VOYAGE
+# ============================================
+
+def get_voyage_info():
+    """
+    Recupere les informations generales du voyage.
+
+    Returns:
+        Les informations du voyage (dictionnaire en lecture seule)
+    """
+    _ensure_loaded('voyage_info')
+
+    return _data.get('voyage_info', _EMPTY_SECTION)
+
+
+def update_voyage_info(info):
+    """
+    Met a jour les informations du voyage.
+
+    Args:
+        info: Les nouvelles informations (dictionnaire)
+    """
+    _ensure_loaded('voyage_info')
+
+    _set_section('voyage_info', info)
+
+
+# ============================================
+# FONCTIONS POUR LES ACTIVITES
+# ============================================
+
+def get_activites():
+    """
+    Recupere la liste des activites.
+
+    Returns:
+        Les activites (collection immuable, voir persistent.py)
+    """
+    _ensure_loaded('activites')
+
+    return _get_collection('activites')
+
+
+def get_activite(activite_id):
+    """
+    Recupere une activite par son ID.
+
+    Args:
+        activite_id: L'ID de l'activite
+
+    Returns:
+        L'activite (dictionnaire), ou None si elle n'existe pas
+    """
+    _ensure_loaded('activites')
+
+    return _find('activites', activite_id)
+
+
+def get_activites_by_date(date):
+    """
+    Recupere les activites prevues a une date donnee.
+
+    Args:
+        date: La date (format AAAA-MM-JJ)
+
+    Returns:
+        Liste des activites de cette date
+    """
+    _ensure_loaded('activites')
+
+    return _find_by('activites', 'date', date)
+
+
+def add_activite(activite):
+    """
+    Ajoute une nouvelle activite.
+
+    Args:
+        activite: Les donnees de l'activite (dictionnaire)
+
+    Returns:
+        L'ID de la nouvelle activite
+    """
+    _ensure_loaded('activites')
+
+    return _add_item('activites', activite)
+
+
+def update_activite(activite_id, activite):
+    """
+    Met a jour une activite existante.
+
+    Args:
+        activite_id: L'ID de l'activite a modifier
+        activite: Les nouvelles donnees (dictionnaire)
+
+    Returns:
+        True si la mise a jour a reussi
+    """
+    _ensure_loaded('activites')
+
+    return _update_item('activites', activite_id, activite)
+
+
+def delete_activite(activite_id):
+    """
+    Supprime une activite.
+
+    Args:
+        activite_id: L'ID de l'activite a supprimer
+
+    Returns:
+        True si la suppression a reussi
+    """
+    _ensure_loaded('activites')
+
+    return _delete_item('activites', activite_id)
+
+
+def add_activites(activites):
+    """
+    Ajoute plusieurs activites en une seule operation (une seule sauvegarde).
+
+    Args:
+        activites: Liste de dictionnaires
+
+    Returns:
+        La liste des IDs des nouveaux elements
+    """
+    _ensure_loaded('activites')
+
+    return _add_items('activites', activites)
+
+
+def delete_activites(activite_ids):
+    """
+    Supprime plusieurs activites en une seule operation (une seule sauvegarde).
+
+    Args:
+        activite_ids: Les IDs des activites a supprimer
+
+    Returns:
+        Le nombre d'elements supprimes
+    """
+    _ensure_loaded('activites')
+
+    return _delete_items('activites', activite_ids)
+
+
+# ============================================
+# FONCTIONS POUR LE BUDGET
+# ============================================
+
+def get_budget():
+    """
+    Recupere les informations de budget.
+
+    Returns:
+        Les donnees du budget (dictionnaire en lecture seule)
+    """
+    _ensure_loaded('budget', 'depenses')
+
+    return MappingProxyType(_data.get('budget', {'budget_prevu': 0, 'depenses': _EMPTY_COLLECTION}))
+
+
+def get_budget_prevu(cents=False):
+    """
+    Recupere le budget prevu (sans lire l'historique des depenses).
+
+    Args:
+        cents: True pour le montant en centimes (voir money.py)
+
+    Returns:
+        Le budget prevu (en euros, ou en centimes)
+    """
+    _ensure_loaded('budget')
+
+    budget_prevu = _data.get('budget', {}).get('budget_prevu', 0)
+    if cents:
+        try:
+            return money.to_cents(budget_prevu)
+        except (TypeError, ValueError):
+            return 0
+    return budget_prevu
+
+
+def _trip_devise():
+    """
+    Retourne la devise du voyage (budget['devise']) sans lire de section.
+    """
+    return _data.get('budget', {}).get('devise') or DEFAULT_CURRENCY
+
+
+def get_devise():
+    """
+    Recupere la devise du voyage, dans laquelle les totaux du budget
+    sont exprimes.
+
+    Returns:
+        Le code de la devise (ex: "EUR")
+    """
+    _ensure_loaded('budget')
+
+    return _trip_devise()
+
+
+def get_depenses():
+    """
+    Recupere la liste des depenses.
+
+    Returns:
+        Les depenses (collection immuable, voir persistent.py)
+    """
+    _ensure_loaded('depenses')
+
+    return get_budget().get('depenses', _EMPTY_COLLECTION)
+
+
+def get_depense(depense_id):
+    """
+    Recupere une depense par son ID.
+
+    Args:
+        depense_id: L'ID de la depense
+
+    Returns:
+        La depense (dictionnaire), ou None si elle n'existe pas
+    """
+    _ensure_loaded('depenses')
+
+    return _find('depenses', depense_id)
+
+
+def get_depenses_by_categorie(categorie):
+    """
+    Recupere les depenses d'une categorie.
+
+    Args:
+        categorie: La categorie de budget
+
+    Returns:
+        Liste des depenses de cette categorie
+    """
+    _ensure_loaded('depenses')
+
+    return _find_by('depenses', 'categorie', categorie)
+
+
+def get_depenses_by_participant(participant):
+    """
+    Recupere les depenses payees par un participant.
+
+    Args:
+        participant: Le nom du participant ("Groupe" pour le groupe)
+
+    Returns:
+        Liste des depenses de ce participant
+    """
+    _ensure_loaded('depenses')
+
+    return _find_by('depenses', 'participant', participant)
+
+
+def get_depenses_by_date(date):
+    """
+    Recupere les depenses d'une date donnee.
+
+    Args:
+        date: La date de la depense
+
+    Returns:
+        Liste des depenses de cette date
+    """
+    _ensure_loaded('depenses')
+
+    return _find_by('depenses', 'date', date)
+
+
+def add_depense(depense):
+    """
+    Ajoute une nouvelle depense.
+
+    Args:
+        depense: Les donnees de la depense (dictionnaire)
+
+    Returns:
+        L'ID de la nouvelle depense
+    """
+    _ensure_loaded('depenses')
+
+    return _add_item('depenses', depense)
+
+
+def update_budget_prevu(montant):
+    """
+    Met a jour le budget prevu (arrondi au centime).
+
+    Args:
+        montant: Le nouveau budget prevu (en euros)
+
+    Raises:
+        TypeError: si le montant n'est pas un nombre
+    """
+    _ensure_loaded('budget')
+
+    _set_section('budget_prevu', money.from_cents(money.to_cents(montant)))
+
+
+def delete_depense(depense_id):
+    """
+    Supprime une depense.
+
+    Args:
+        depense_id: L'ID de la depense a supprimer
+
+    Returns:
+        True si la suppression a reussi
+    """
+    _ensure_loaded('depenses')
+
+    return _delete_item('depenses', depense_id)
+
+
+def add_depenses(depenses):
+    """
+    Ajoute plusieurs depenses en une seule operation (une seule sauvegarde).
+
+    Args:
+        depenses: Liste de dictionnaires
+
+    Returns:
+        La liste des IDs des nouveaux elements
+    """
+    _ensure_loaded('depenses')
+
+    return _add_items('depenses', depenses)
+
+
+def delete_depenses(depense_ids):
+    """
+    Supprime plusieurs depenses en une seule operation (une seule sauvegarde).
+
+    Args:
+        depense_ids: Les IDs des depenses a supprimer
+
+    Returns:
+        Le nombre d'elements supprimes
+    """
+    _ensure_loaded('depenses')
+
+    return _delete_items('depenses', depense_ids)
+
+
+def get_total_depenses(cents=False):
+    """
+    Recupere le total des depenses, dans la devise du voyage.
+
+    Le total est maintenu en centimes a chaque ajout/suppression de
+    depense: il est exact, sans erreur d'arrondi. Les depenses dont la
+    devise n'a pas de taux de change n'y sont pas comptees (voir
+    get_unconverted_count).
+
+    Args:
+        cents: True pour le total en centimes (voir money.py)
+
+    Returns:
+        Le total des depenses (float en euros, ou int en centimes)
+    """
+    _ensure_depenses_totals()
+
+    if config.VERIFY_AGGREGATES:
+        verify_aggregates()
+
+    total = _totals["depenses"]
+    return total if cents else money.from_cents(total)
+
+
+def get_depenses_by_category(cents=False):
+    """
+    Recupere le total des depenses par categorie.
+
+    Les totaux sont maintenus a chaque ajout/suppression de depense.
+
+    Args:
+        cents: True pour les totaux en centimes
+
+    Returns:
+        Dictionnaire avec le total par categorie
+    """
+    _ensure_depenses_totals()
+
+    if config.VERIFY_AGGREGATES:
+        verify_aggregates()
+
+    return _group_totals(_totals["by_category"], cents)
+
+
+def get_totals_by_participant(cents=False):
+    """
+    Recupere le total des depenses par participant (les depenses d'un
+    participant: voir get_depenses_by_participant).
+
+    Les totaux sont maintenus a chaque ajout/suppression de depense.
+
+    Args:
+        cents: True pour les totaux en centimes
+
+    Returns:
+        Dictionnaire avec le total par participant ('' pour une depense
+        sans participant)
+    """
+    _ensure_depenses_totals()
+
+    if config.VERIFY_AGGREGATES:
+        verify_aggregates()
+
+    return _group_totals(_totals["by_participant"], cents)
+
+
+def get_unconverted_count():
+    """
+    Recupere le nombre de depenses exclues des totaux faute de taux de
+    change pour leur devise.
+
+    Returns:
+        Le nombre de depenses
+    """
+    _ensure_depenses_totals()
+
+    return _totals["unconverted"]
+
+
+def _group_totals(sums, cents):
+    """
+    Copie les totaux d'un groupe (en centimes, ou convertis en euros).
+    """
+    if cents:
+        return dict(sums)
+    return {key: money.from_cents(total) for key, total in sums.items()}
+
+
+def _compute_depenses_totals(from_memory=False):
+    """
+    Recalcule entierement les totaux des depenses (en centimes de la
+    devise du voyage).
+
+    Les montants sont d'abord additionnes par paquet (devise, date,
+    categorie, participant), puis chaque paquet est converti une fois.
+    En mode "sqlite", les paquets sont calcules en SQL sur la base,
+    apres l'ecriture des modifications en attente (_flush prend
+    _write_lock: ne pas appeler en tenant _lock).
+
+    Args:
+        from_memory: True pour additionner les depenses en memoire,
+            meme en mode "sqlite"
+
+    Returns:
+        Dictionnaire des totaux (voir _convert_buckets)
+    """
+    if STORAGE_BACKEND == "sqlite" and not from_memory:
+        _flush()
+        with _write_lock:
+            buckets, counts = sqlite_backend.get_depenses_buckets(_conn)
+    else:
+        buckets = {}
+        counts = {}
+        for d in get_depenses():
+            key = _depense_key(d)
+            buckets[key] = buckets.get(key, 0) + d.cents('montant')
+            counts[key] = counts.get(key, 0) + 1
+
+    return _convert_buckets(buckets, counts, get_devise())
+
+
+def verify_aggregates():
+    """
+    Recalcule tous les totaux depuis zero et verifie qu'ils sont egaux
+    aux totaux maintenus.
+
+    Appelee a chaque lecture d'un total si config.VERIFY_AGGREGATES vaut
+    True (lu a chaque lecture: les tests l'activent apres l'import de ce
+    module, voir tests/test_aggregates.py).
+
+    Raises:
+        AssertionError: si un total maintenu differe du recalcul
+    """
+    _ensure_loaded('depenses', 'checklist')
+
+    # Recalcul avant de prendre _lock: en mode "sqlite", il ecrit d'abord
+    # les modifications en attente sous _write_lock, que la sauvegarde en
+    # arriere-plan prend avant _lock. Pendant une transaction (_lock deja
+    # tenu, modifications pas encore validees), les depenses en memoire
+    # sont additionnees.
+    version = _totals_version()
+    computed = _compute_depenses_totals(from_memory=bool(_tx_depth))
+
+    with _lock:
+        if _totals_version() != version:
+            # Depenses modifiees pendant le recalcul
+            computed = _compute_depenses_totals(from_memory=True)
+
+        # Sommes en centimes: egalite exacte
+        for name in ("depenses", "by_category", "by_participant", "shared_by_date",
+                     "cube", "cube_count", "unconverted"):
+            assert _totals[name] == computed[name], \
+                f"Totaux des depenses ({name}): {_totals[name]} maintenus, {computed[name]} recalcules"
+
+        # Tableaux croises mis a jour au fil des modifications
+        for spec, table in _pivots.items():
+            expected = pivot.build(spec, computed["cube"], computed["cube_count"])
+            for name in ("rows", "row_count", "columns", "column_count", "cells", "cell_count", "total", "count"):
+                assert table[name] == expected[name], \
+                    f"Tableau croise {spec} ({name}) desynchronise"
+
+        # Paquets additionnes sur les colonnes du registre
+        depenses = _get_collection('depenses')
+        if isinstance(depenses, ledger.Ledger):
+            assert ledger.buckets(depenses, _depense_key) == (_totals["buckets"], _totals["bucket_count"]), \
+                "Paquets du registre des depenses desynchronises"
+
+        checklist = get_checklist()
+        checked = sum(1 for item in checklist if item.get('checked', False))
+        assert _totals["checked"] == checked, \
+            f"Items coches: {_totals['checked']} maintenu, {checked} recalcule"
+        assert len(_indexes["checklist"]["by_id"]) == len(checklist), \
+            "Index de la checklist desynchronise"
+
+        for col in ('depenses', 'checklist'):
+            for field, order in _indexes[col]["sorted"].items():
+                keys = list(sorted_index.iter_range(order))
+                expected = sorted(_sort_key(field, item) for item in _indexes[col]["by_id"].values())
+                assert keys == expected, f"Ordre {col}/{field} desynchronise"
+
+            docs = _search_of(col)["docs"]
+            assert len(docs) == len(_indexes[col]["by_id"]), f"Recherche {col} desynchronisee"
+            for item_id, item in _indexes[col]["by_id"].items():
+                words = set(search_index.tokenize(_search_text(col, item)))
+                assert set(docs.get(item_id, ())) == words, \
+                    f"Recherche {col}/{item_id} desynchronisee"
+
+
+def _totals_version():
+    """
+    Versions des donnees dont dependent les totaux des depenses (voir
+    _touch).
+    """
+    return tuple(_versions.get(name) for name in (None, 'depenses', 'taux_de_change'))
+
+
+# ============================================
+# FONCTIONS POUR LES TAUX DE CHANGE
+# ============================================
+
+# La table des taux est commune a tous les voyages (voir
+# exchange_rates.py): ses modifications ne passent ni par le journal ni
+# par l'historique d'annulation. Elles sont signalees aux frames par un
+# evenement de la collection 'taux_de_change'.
+
+def get_devises():
+    """
+    Recupere les devises proposees pour une depense.
+
+    Returns:
+        La devise du voyage, puis les devises de config.CURRENCIES et de
+        la table des taux
+    """
+    devises = [get_devise()]
+    for devise in CURRENCIES + exchange_rates.currencies():
+        if devise not in devises:
+            devises.append(devise)
+    return devises
+
+
+def get_exchange_rates():
+    """
+    Recupere la table des taux de change.
+
+    Returns:
+        Tuple (devise de base, {devise: {date: taux (texte)}})
+    """
+    _ensure_loaded()
+
+    return exchange_rates.get_base(), exchange_rates.get_rates()
+
+
+def set_exchange_rate(devise, date, rate):
+    """
+    Ajoute ou remplace un taux de change, puis reconvertit les totaux.
+
+    Args:
+        devise: Le code de la devise (ex: "GBP")
+        date: La date a partir de laquelle le taux s'applique (AAAA-MM-JJ)
+        rate: Le nombre d'unites de la devise pour une unite de la devise
+            de base de la table
+
+    Raises:
+        ValueError: si la devise, la date ou le taux est invalide
+    """
+    _ensure_loaded('budget')
+
+    with _lock:
+        exchange_rates.set_rate(devise, date, rate)
+        _convert_totals()
+
+    events.publish([events.ChangeEvent('taux_de_change', 'set', devise, None, rate)])
+    print(f"[DataManager] Taux de change {devise} au {date}: {rate}")
+
+
+def sync_exchange_rates():
+    """
+    Relit la table des taux de change si son fichier a ete modifie
+    (autre instance, edition a la main), puis reconvertit les totaux.
+
+    Appelee periodiquement (voir main.check_external_changes).
+
+    Returns:
+        True si les taux ont change
+    """
+    if not _loaded.is_set() or not exchange_rates.has_changed():
+        return False
+
+    with _lock:
+        if not exchange_rates.load():
+            return False
+        _convert_totals()
+
+    events.publish([events.ChangeEvent('taux_de_change', 'set', None, None, None)])
+    print("[DataManager] Taux de change relus")
+    return True
+
+
+# ============================================
+# FONCTIONS D'ANALYSE DU BUDGET
+# ============================================
+
+def get_pivot(rows, columns=None, filters=None):
+    """
+    Recupere un tableau croise des depenses (en centimes de la devise du
+    voyage).
+
+    Le tableau est tire du cube maintenu (date, categorie, participant),
+    puis garde en cache et mis a jour a chaque modification: un nouveau
+    decoupage ne relit pas les depenses (voir pivot.py).
+
+    Args:
+        rows: La dimension en lignes ("date", "categorie" ou "participant")
+        columns: La dimension en colonnes (None: une seule colonne)
+        filters: {dimension: valeur} (ex: {"participant": "Groupe"})
+
+    Returns:
+        Dictionnaire (rows: {ligne: somme}, columns: {colonne: somme},
+        cells: {(ligne, colonne): somme}, total, count: nombre de
+        depenses retenues)
+
+    Raises:
+        ValueError: si une dimension est inconnue ou repetee
+    """
+    spec = pivot.make_spec(rows, columns, filters)
+    _ensure_depenses_totals()
+    _ensure_loaded('depenses')
+
+    if config.VERIFY_AGGREGATES:
+        verify_aggregates()
+
+    with _lock:
+        table = pivot.get(_pivots, spec, _totals["cube"], _totals["cube_count"])
+        return {
+            "rows": dict(table["rows"]),
+            "columns": dict(table["columns"]),
+            "cells": dict(table["cells"]),
+            "total": table["total"],
+            "count": table["count"],
+        }
+
+
+def get_budget_forecast(today=None):
+    """
+    Calcule le cumul des depenses par jour du voyage, le rythme des
+    depenses et la projection a la fin du sejour, comparee au budget
+    prevu (voir pivot.forecast).
+
+    Args:
+        today: Le jour courant (AAAA-MM-JJ, par defaut aujourd'hui)
+
+    Returns:
+        Le resultat de pivot.forecast (centimes de la devise du voyage),
+        ou None si les dates du voyage sont invalides
+    """
+    _ensure_loaded('voyage_info')
+
+    info = get_voyage_info()
+    by_date = get_pivot("date")["rows"]
+    return pivot.forecast(
+        by_date,
+        info.get('date_depart'),
+        info.get('date_retour'),
+        today or datetime.now().strftime("%Y-%m-%d"),
+        get_budget_prevu(cents=True)
+    )
+
+
+def _optional_cents(record, key):
+    """
+    Retourne un prix facultatif en centimes (None si absent).
+    """
+    return None if record.get(key) is None else record.cents(key)
+
+
+def _risk_inputs(today, trials):
+    """
+    Rassemble les donnees de la simulation du risque de depassement.
+
+    La partie fixe est la somme des depenses passees (ou sans date); les
+    postes incertains sont les activites a venir (ou sans date), les
+    transports sur place (si le voyage n'est pas termine) et les
+    depenses prevues apres aujourd'hui, regroupees par categorie.
+
+    Returns:
+        Tuple (partie fixe, postes incertains, budget, essais)
+    """
+    _ensure_loaded('voyage_info')
+    _ensure_loaded('transport')
+
+    current = date_ordinal(today)
+    fixed = 0
+    planned = {}
+    for (date_str, categorie), montant in get_pivot("date", "categorie")["cells"].items():
+        ordinal = date_ordinal(date_str)
+        if ordinal and ordinal > current:
+            planned[categorie] = planned.get(categorie, 0) + montant
+        else:
+            fixed += montant
+
+    estimates = [simulation.estimate(montant, None, None, categorie)
+                 for categorie, montant in planned.items()]
+
+    for a in get_activites():
+        ordinal = date_ordinal(a.get('date'))
+        if not ordinal or ordinal >= current:
+            estimates.append(simulation.estimate(
+                a.cents('prix'), _optional_cents(a, 'prix_min'),
+                _optional_cents(a, 'prix_max'), "Activites"))
+
+    end = date_ordinal(get_voyage_info().get('date_retour'))
+    if not end or end >= current:
+        for t in get_transport().get('sur_place', ()):
+            estimates.append(simulation.estimate(
+                t.cents('prix'), _optional_cents(t, 'prix_min'),
+                _optional_cents(t, 'prix_max'), "Transport"))
+
+    certain, lines = simulation.make_lines(estimates)
+    return (fixed + certain, lines, get_budget_prevu(cents=True), trials)
+
+
+def get_budget_risk(compute=True, today=None, trials=None):
+    """
+    Simule le cout du voyage et la probabilite de depasser le budget
+    prevu (Monte-Carlo, voir simulation.py).
+
+    Le resultat est garde tant que les depenses, les activites, les
+    transports, le budget, les dates du voyage et les taux de change ne
+    changent pas (versions, voir _touch): la verification ne relit
+    aucune donnee. Si ces donnees ont change sans modifier les donnees
+    de la simulation (description d'une activite...), le resultat est
+    repris sans relancer la simulation.
+
+    Args:
+        compute: False pour ne retourner que le resultat deja calcule
+            (sans lire les donnees)
+        today: Le jour courant (AAAA-MM-JJ, par defaut aujourd'hui)
+        trials: Le nombre d'essais (par defaut SIMULATION_TRIALS)
+
+    Returns:
+        Le resultat de simulation.simulate (centimes de la devise du
+        voyage), ou None si compute est False et que les donnees ont
+        change depuis la derniere simulation
+    """
+    global _risk
+
+    today = today or datetime.now().strftime("%Y-%m-%d")
+    trials = trials or SIMULATION_TRIALS
+    with _lock:
+        version = (today, trials) + tuple(_versions.get(name) for name in RISK_SOURCES)
+        cached_version, cached_inputs, result = _risk
+    if cached_version == version:
+        return result
+    if not compute:
+        return None
+
+    inputs = _risk_inputs(today, trials)
+    if inputs != cached_inputs:
+        # Hors du verrou: la simulation peut durer quelques secondes
+        fixed, lines, budget, n_trials = inputs
+        result = simulation.simulate(lines, fixed, budget, n_trials)
+        print(f"[DataManager] Simulation du budget: {n_trials} essais, "
+              f"{result['postes']} postes incertains en {result['duree']:.2f} s")
+    with _lock:
+        _risk = (version, inputs, result)
+    return result
+
+
+# ============================================
+# FONCTIONS POUR LE PARTAGE DES DEPENSES
+# ============================================
+
+def get_split_rule():
+    """
+    Recupere la regle de partage des depenses (budget['partage']).
+
+    Returns:
+        La regle: {"mode": "egal", "presence" ou "poids",
+        "poids": {participant: poids}} (voir settlement.py)
+    """
+    _ensure_loaded('budget')
+
+    try:
+        return settlement.normalize_rule(_data.get('budget', {}).get('partage'))
+    except ValueError as e:
+        print(f"[DataManager] Regle de partage ignoree: {e}")
+        return settlement.normalize_rule(None)
+
+
+def update_split_rule(rule):
+    """
+    Met a jour la regle de partage des depenses.
+
+    Args:
+        rule: La regle (voir get_split_rule)
+
+    Raises:
+        ValueError: si le mode ou un poids est invalide
+    """
+    _ensure_loaded('budget')
+
+    _set_section('partage', settlement.normalize_rule(rule))
+
+
+def get_settlement():
+    """
+    Calcule les soldes des participants et les remboursements.
+
+    Les montants payes et les montants a partager par date sont
+    maintenus avec les totaux des depenses; seules les parts des dates
+    modifiees depuis le dernier appel sont recalculees (voir
+    settlement.update_shares).
+
+    Returns:
+        Tuple (soldes, virements): soldes {nom: (paye, part, solde)} et
+        virements [(debiteur, creancier, montant)], en centimes de la
+        devise du voyage
+    """
+    global _members
+
+    _ensure_depenses_totals()
+    _ensure_loaded('participants')
+    rule = _checked_split_rule()
+
+    with _lock:
+        participants = get_participants()
+        if _members[0] is not participants:
+            _members = (participants, settlement.members_of(participants))
+
+        paid = {name: total for name, total in _totals["by_participant"].items() if _is_shared(name)}
+        owed = settlement.update_shares(_shares, rule, _members[1], _totals["shared_by_date"])
+        balances = settlement.compute_balances(paid, owed)
+
+    return balances, settlement.settle(balances)
+
+
+def _checked_split_rule():
+    """
+    Retourne la regle de partage verifiee (voir get_split_rule), gardee
+    tant que la section partage ne change pas (versions, voir _touch):
+    les poids de tous les participants ne sont pas relus a chaque appel
+    de get_settlement.
+    """
+    global _split_rule
+
+    with _lock:
+        version = (_versions.get(None), _versions.get('partage'))
+        if _split_rule is None or _split_rule[0] != version:
+            _split_rule = (version, get_split_rule())
+        return _split_rule[1]
+
+
+# ============================================
+# FONCTIONS POUR L'HOTEL
+# ============================================
+
+def get_hotel():
+    """
+    Recupere les informations de l'hotel.
+
+    Returns:
+        Les donnees de l'hotel (dictionnaire en lecture seule)
+    """
+    _ensure_loaded('hotel')
+
+    return _data.get('hotel', _EMPTY_SECTION)
+
+
+def update_hotel(hotel):
+    """
+    Met a jour les informations de l'hotel.
+
+    Args:
+        hotel: Les nouvelles informations (dictionnaire)
+    """
+    _ensure_loaded('hotel')
+
+    _set_section('hotel', hotel)
+
+
+# ============================================
+# FONCTIONS POUR LE TRANSPORT
+# ============================================
+
+def get_transport():
+    """
+    Recupere les informations de transport.
+
+    Returns:
+        Les donnees de transport (dictionnaire en lecture seule)
+    """
+    _ensure_loaded('transport')
+
+    return _data.get('transport', _EMPTY_SECTION)
+
+
+def update_transport(transport):
+    """
+    Met a jour les informations de transport.
+
+    Args:
+        transport: Les nouvelles informations (dictionnaire)
+    """
+    _ensure_loaded('transport')
+
+    if transport.get('sur_place'):
+        transport = dict(transport)
+        transport['sur_place'] = records.convert_list(list(transport['sur_place']),
+                                                      records.LocalTransport)
+    _set_section('transport', transport)
+
+
+# ============================================
+# FONCTIONS POUR LES PARTICIPANTS
+# ============================================
+
+def get_participants():
+    """
+    Recupere la liste des participants.
+
+    Returns:
+        Les participants (collection immuable, voir persistent.py)
+    """
+    _ensure_loaded('participants')
+
+    return _get_collection('participants')
+
 
-def get_voyage_info():
+def get_participant(participant_id):
     """
-    Recupere les informations generales du voyage.
+    Recupere un participant par son ID.
+
+    Args:
+        participant_id: L'ID du participant
 
     Returns:
-        Les informations du voyage (dictionnaire)
+        Le participant (dictionnaire), ou None s'il n'existe pas
     """
-    return _data.get('voyage_info', {})
+    _ensure_loaded('participants')
 
+    return _find('participants', participant_id)
 
-def update_voyage_info(info):
+
+def get_participants_by_role(role):
     """
-    Met a jour les informations du voyage.
+    Recupere les participants ayant un role donne.
 
     Args:
-        info: Les nouvelles informations (dictionnaire)
+        role: Le role (voir PARTICIPANT_ROLES dans config.py)
+
+    Returns:
+        Liste des participants ayant ce role
     """
-    _data['voyage_info'] = info
-    save_data()
+    _ensure_loaded('participants')
 
+    return _find_by('participants', 'role', role)
 
-# ============================================
-# FONCTIONS POUR LES ACTIVITES
-# ============================================
 
-def get_activites():
+def add_participant(participant):
     """
-    Recupere la liste des activites.
+    Ajoute un nouveau participant.
+
+    Args:
+        participant: Les donnees du participant (dictionnaire)
 
     Returns:
-        Liste des activites
+        L'ID du nouveau participant
     """
-    return _data.get('activites', [])
+    _ensure_loaded('participants')
 
+    return _add_item('participants', participant)
 
-def add_activite(activite):
+
+def update_participant(participant_id, participant):
     """
-    Ajoute une nouvelle activite.
+    Met a jour un participant existant.
+
+    Les depenses sont enregistrees au nom de leur payeur (voir
+    settlement.member_name): si le nom change, ses depenses et son poids
+    dans la regle de partage passent au nouveau nom dans la meme
+    transaction (une seule etape d'annulation). Sinon, ses paiements
+    resteraient dans les soldes sous l'ancien nom.
 
     Args:
-        activite: Les donnees de l'activite (dictionnaire)
+        participant_id: L'ID du participant a modifier
+        participant: Les nouvelles donnees (dictionnaire)
 
     Returns:
-        L'ID de la nouvelle activite
+        True si la mise a jour a reussi
     """
-    activites = get_activites()
+    _ensure_loaded('participants', 'depenses', 'budget')
 
-    # Generer un nouvel ID
-    new_id = max([a.get('id', 0) for a in activites], default=0) + 1
-    activite['id'] = new_id
+    with transaction():
+        before = _find('participants', participant_id)
+        if not _update_item('participants', participant_id, participant):
+            return False
+        after = _find('participants', participant_id)
+        _rename_payer(settlement.member_name(before), settlement.member_name(after))
 
-    activites.append(activite)
-    _data['activites'] = activites
-    save_data()
+    return True
 
-    return new_id
 
+def _rename_payer(old, new):
+    """
+    Reporte le changement de nom d'un participant sur les depenses qu'il
+    a payees et sur son poids dans la regle de partage.
 
-def update_activite(activite_id, activite):
+    Rien n'est change si un autre participant porte encore l'ancien nom
+    (les depenses a ce nom peuvent etre les siennes).
+
+    Args:
+        old: L'ancien nom (voir settlement.member_name)
+        new: Le nouveau nom
     """
-    Met a jour une activite existante.
+    if old == new or any(settlement.member_name(p) == old for p in get_participants()):
+        return
+
+    for depense in _find_by('depenses', 'participant', old):
+        _update_item('depenses', depense['id'], dict(depense, participant=new))
+
+    rule = get_split_rule()
+    if old in rule['poids']:
+        weights = dict(rule['poids'])
+        weights[new] = weights.pop(old)
+        _set_section('partage', dict(rule, poids=weights))
+
+
+def delete_participant(participant_id):
+    """
+    Supprime un participant.
 
     Args:
-        activite_id: L'ID de l'activite a modifier
-        activite: Les nouvelles donnees (dictionnaire)
+        participant_id: L'ID du participant a supprimer
 
     Returns:
-        True si la mise a jour a reussi
+        True si la suppression a reussi
     """
-    activites = get_activites()
-
-    for i, a in enumerate(activites):
-        if a.get('id') == activite_id:
-            activite['id'] = activite_id
-            activites[i] = activite
-            _data['activites'] = activites
-            save_data()
-            return True
+    _ensure_loaded('participants')
 
-    return False
+    return _delete_item('participants', participant_id)
 
 
-def delete_activite(activite_id):
+def add_participants(participants):
     """
-    Supprime une activite.
+    Ajoute plusieurs participants en une seule operation (une seule sauvegarde).
 
     Args:
-        activite_id: L'ID de l'activite a supprimer
+        participants: Liste de dictionnaires
 
     Returns:
-        True si la suppression a reussi
+        La liste des IDs des nouveaux elements
     """
-    activites = get_activites()
-    initial_count = len(activites)
+    _ensure_loaded('participants')
 
-    activites = [a for a in activites if a.get('id') != activite_id]
+    return _add_items('participants', participants)
 
-    if len(activites) < initial_count:
-        _data['activites'] = activites
-        save_data()
-        return True
 
-    return False
+def delete_participants(participant_ids):
+    """
+    Supprime plusieurs participants en une seule operation (une seule sauvegarde).
+
+    Args:
+        participant_ids: Les IDs des participants a supprimer
+
+    Returns:
+        Le nombre d'elements supprimes
+    """
+    _ensure_loaded('participants')
+
+    return _delete_items('participants', participant_ids)
 
 
 # ============================================
-# FONCTIONS POUR LE BUDGET
+# FONCTIONS POUR LA CHECKLIST
 # ============================================
 
-def get_budget():
+def get_checklist():
     """
-    Recupere les informations de budget.
+    Recupere la checklist.
 
     Returns:
-        Les donnees du budget (dictionnaire)
+        Les items de la checklist (collection immuable, voir persistent.py)
     """
-    return _data.get('budget', {'budget_prevu': 0, 'depenses': []})
+    _ensure_loaded('checklist')
 
+    return _get_collection('checklist')
 
-def get_depenses():
+
+def get_checklist_item(item_id):
     """
-    Recupere la liste des depenses.
+    Recupere un item de la checklist par son ID.
+
+    Args:
+        item_id: L'ID de l'item
 
     Returns:
-        Liste des depenses
+        L'item (dictionnaire), ou None s'il n'existe pas
     """
-    return get_budget().get('depenses', [])
+    _ensure_loaded('checklist')
 
+    return _find('checklist', item_id)
 
-def add_depense(depense):
+
+def get_checklist_by_categorie(categorie):
     """
-    Ajoute une nouvelle depense.
+    Recupere les items d'une categorie de la checklist.
 
     Args:
-        depense: Les donnees de la depense (dictionnaire)
+        categorie: La categorie (voir CHECKLIST_CATEGORIES dans config.py)
 
     Returns:
-        L'ID de la nouvelle depense
+        Liste des items de cette categorie
     """
-    budget = get_budget()
-    depenses = budget.get('depenses', [])
-
-    # Generer un nouvel ID
-    new_id = max([d.get('id', 0) for d in depenses], default=0) + 1
-    depense['id'] = new_id
+    _ensure_loaded('checklist')
 
-    depenses.append(depense)
-    budget['depenses'] = depenses
-    _data['budget'] = budget
-    save_data()
-
-    return new_id
+    return _find_by('checklist', 'categorie', categorie)
 
 
-def update_budget_prevu(montant):
+def add_checklist_item(item):
     """
-    Met a jour le budget prevu.
+    Ajoute un item a la checklist.
 
     Args:
-        montant: Le nouveau budget prevu
+        item: Les donnees de l'item (dictionnaire)
+
+    Returns:
+        L'ID du nouvel item
     """
-    budget = get_budget()
-    budget['budget_prevu'] = montant
-    _data['budget'] = budget
-    save_data()
+    _ensure_loaded('checklist')
+
+    item['checked'] = item.get('checked', False)
+    return _add_item('checklist', item)
 
 
-def delete_depense(depense_id):
+def toggle_checklist_item(item_id):
     """
-    Supprime une depense.
+    Inverse l'etat checked d'un item.
 
     Args:
-        depense_id: L'ID de la depense a supprimer
+        item_id: L'ID de l'item
 
     Returns:
-        True si la suppression a reussi
+        Le nouvel etat de l'item (True ou False)
     """
-    budget = get_budget()
-    depenses = budget.get('depenses', [])
-    initial_count = len(depenses)
-
-    depenses = [d for d in depenses if d.get('id') != depense_id]
+    _ensure_loaded('checklist')
 
-    if len(depenses) < initial_count:
-        budget['depenses'] = depenses
-        _data['budget'] = budget
-        save_data()
-        return True
+    with _lock:
+        item = _find('checklist', item_id)
+        if item is None:
+            return False
 
-    return False
+        checked = not item.get('checked', False)
+        _set_checked(item, checked)
+        return checked
 
 
-def get_total_depenses():
+def delete_checklist_item(item_id):
     """
-    Calcule le total des depenses.
+    Supprime un item de la checklist.
+
+    Args:
+        item_id: L'ID de l'item a supprimer
 
     Returns:
-        Le total des depenses (float)
+        True si la suppression a reussi
     """
-    depenses = get_depenses()
-    return sum(d.get('montant', 0) for d in depenses)
+    _ensure_loaded('checklist')
 
+    return _delete_item('checklist', item_id)
 
-def get_depenses_by_category():
-    """
-    Calcule le total des depenses par categorie.
 
-    Returns:
-        Dictionnaire avec le total par categorie
+def add_checklist_items(items):
     """
-    depenses = get_depenses()
-    totaux = {}
+    Ajoute plusieurs items a la checklist en une seule operation.
 
-    for d in depenses:
-        cat = d.get('categorie', 'Autre')
-        totaux[cat] = totaux.get(cat, 0) + d.get('montant', 0)
+    Args:
+        items: Liste de dictionnaires
 
-    return totaux
+    Returns:
+        La liste des IDs des nouveaux items
+    """
+    _ensure_loaded('checklist')
 
+    for item in items:
+        item['checked'] = item.get('checked', False)
+    return _add_items('checklist', items)
 
-# ============================================
-# FONCTIONS POUR L'HOTEL
-# ============================================
 
-def get_hotel():
+def set_checklist_checked(item_ids, checked):
     """
-    Recupere les informations de l'hotel.
+    Coche ou decoche plusieurs items en une seule operation.
+
+    Args:
+        item_ids: Les IDs des items
+        checked: Le nouvel etat (True ou False)
 
     Returns:
-        Les donnees de l'hotel (dictionnaire)
+        Le nombre d'items dont l'etat a change
     """
-    return _data.get('hotel', {})
+    _ensure_loaded('checklist')
 
+    changed = 0
+    with transaction():
+        for item_id in item_ids:
+            item = _find('checklist', item_id)
+            if item is not None and _set_checked(item, checked):
+                changed += 1
 
-def update_hotel(hotel):
+    return changed
+
+
+def delete_checklist_items(item_ids):
     """
-    Met a jour les informations de l'hotel.
+    Supprime plusieurs items de la checklist en une seule operation.
 
     Args:
-        hotel: Les nouvelles informations (dictionnaire)
+        item_ids: Les IDs des items a supprimer
+
+    Returns:
+        Le nombre d'items supprimes
     """
-    _data['hotel'] = hotel
-    save_data()
+    _ensure_loaded('checklist')
 
+    return _delete_items('checklist', item_ids)
 
-# ============================================
-# FONCTIONS POUR LE TRANSPORT
-# ============================================
 
-def get_transport():
+def get_checklist_progress():
     """
-    Recupere les informations de transport.
+    Calcule la progression de la checklist a partir des compteurs maintenus.
 
     Returns:
-        Les donnees de transport (dictionnaire)
+        Tuple (nombre_coches, total, pourcentage)
     """
-    return _data.get('transport', {})
+    _ensure_loaded('checklist')
 
+    if config.VERIFY_AGGREGATES:
+        verify_aggregates()
 
-def update_transport(transport):
-    """
-    Met a jour les informations de transport.
+    total = len(_indexes["checklist"]["by_id"])
+
+    if total == 0:
+        return (0, 0, 0)
+
+    checked = _totals["checked"]
+    percentage = int((checked / total) * 100)
+
+    return (checked, total, percentage)
 
-    Args:
-        transport: Les nouvelles informations (dictionnaire)
-    """
-    _data['transport'] = transport
-    save_data()
 
 
 # ============================================
-# FONCTIONS POUR LES PARTICIPANTS
+# REQUETES (FILTRES, TRI ET PAGINATION)
 # ============================================
 
-def get_participants():
+def _query_filter(col, filters, order_by):
     """
-    Recupere la liste des participants.
+    Prepare les filtres d'une requete.
+
+    Un intervalle de dates sur l'ordre des dates est applique en
+    delimitant les positions parcourues. Un filtre sur un champ indexe
+    est resolu en IDs par l'index du champ ou, pour une collection en
+    colonnes, par les codes de la colonne (voir ledger.Ledger.find_ids);
+    le filtre texte par l'index de recherche de la collection (voir
+    search_index.py). Les autres filtres sont testes sur l'element, lu
+    seulement si son ID a passe les premiers.
+
+    Args:
+        col: Le nom de la collection
+        filters: Les filtres (voir _query), les valeurs None sont ignorees
+        order_by: Le champ de tri
 
     Returns:
-        Liste des participants
+        Tuple (date_debut, date_fin, fonction de test d'un ID ou None);
+        les dates sont des numeros de jour (voir config.date_ordinal),
+        None si elles sont testees par la fonction
+
+    Raises:
+        ValueError: si une date n'est pas au format AAAA-MM-JJ
     """
-    return _data.get('participants', [])
+    filters = {name: value for name, value in filters.items() if value is not None}
+    date_from = _date_bound(filters.pop('date_from', None))
+    date_to = _date_bound(filters.pop('date_to', None))
+    text = filters.pop('text', None)
+    index = _indexes[col]
+    collection = _get_collection(col)
+    id_sets = []
+    checks = []
+
+    if order_by != 'date' and (date_from is not None or date_to is not None):
+        low, high = date_from or 0, date_to
+        checks.append(lambda item: low <= date_ordinal(item.get('date')) and
+                      (high is None or date_ordinal(item.get('date')) <= high))
+        date_from = date_to = None
+
+    for field, value in filters.items():
+        if field in index["by"]:
+            id_sets.append(index["by"][field].get(value, {}))
+        elif field in INDEXED_FIELDS[col] and isinstance(collection, ledger.Ledger):
+            id_sets.append(collection.find_ids(field, value))
+        elif field == 'checked':
+            checks.append(lambda item, value=bool(value): bool(item.get('checked', False)) == value)
+        else:
+            checks.append(lambda item, field=field, value=value: item.get(field) == value)
 
+    if text and search_index.tokenize(text):
+        # Elements trouves par l'index de recherche (aucun texte parcouru)
+        id_sets.append(search_index.matches(_search_of(col), text))
 
-def add_participant(participant):
-    """
-    Ajoute un nouveau participant.
+    if not id_sets and not checks:
+        return date_from, date_to, None
 
-    Args:
-        participant: Les donnees du participant (dictionnaire)
+    by_id = index["by_id"]
 
-    Returns:
-        L'ID du nouveau participant
+    def check(item_id):
+        if not all(item_id in ids for ids in id_sets):
+            return False
+        if not checks:
+            return True
+        item = by_id[item_id]
+        return all(check(item) for check in checks)
+    return date_from, date_to, check
+
+
+def _date_bound(value):
     """
-    participants = get_participants()
+    Convertit une borne de date (AAAA-MM-JJ, ou None) en numero de jour.
 
-    # Generer un nouvel ID
-    new_id = max([p.get('id', 0) for p in participants], default=0) + 1
-    participant['id'] = new_id
+    Raises:
+        ValueError: si la date n'est pas au format AAAA-MM-JJ
+    """
+    if value is None:
+        return None
+    ordinal = date_ordinal(value)
+    if not ordinal:
+        raise ValueError(f"Date invalide: {value!r}")
+    return ordinal
 
-    participants.append(participant)
-    _data['participants'] = participants
-    save_data()
 
-    return new_id
+def _query_range(order, date_from, date_to):
+    """
+    Retourne les positions d'un ordre des dates comprises dans un intervalle.
+    """
+    start = 0 if date_from is None else sorted_index.bisect_left(order, (date_from,))
+    stop = sorted_index.size(order) if date_to is None else \
+        sorted_index.bisect_right(order, (date_to, math.inf))
+    return start, max(start, stop)
 
 
-def update_participant(participant_id, participant):
+def _query(col, filters, order_by, descending, limit, offset):
     """
-    Met a jour un participant existant.
+    Retourne une page d'elements filtres, dans l'ordre d'un champ.
+
+    Les elements sont parcourus dans l'ordre maintenu du champ (aucun
+    tri): sans filtre, seule la page est lue; avec des filtres, le
+    parcours s'arrete des que la page est complete.
 
     Args:
-        participant_id: L'ID du participant a modifier
-        participant: Les nouvelles donnees (dictionnaire)
+        col: Le nom de la collection
+        filters: Dictionnaire des filtres (date_from, date_to: dates
+            AAAA-MM-JJ incluses; text: mots a trouver dans TEXT_FIELDS;
+            autres cles: valeur exacte du champ)
+        order_by: Le champ de tri (voir SORT_FIELDS), None pour l'ordre
+            par defaut
+        descending: True pour l'ordre decroissant
+        limit: Le nombre maximal d'elements, ou None
+        offset: Le nombre d'elements a sauter
 
     Returns:
-        True si la mise a jour a reussi
-    """
-    participants = get_participants()
+        Liste des elements de la page
 
-    for i, p in enumerate(participants):
-        if p.get('id') == participant_id:
-            participant['id'] = participant_id
-            participants[i] = participant
-            _data['participants'] = participants
-            save_data()
-            return True
+    Raises:
+        ValueError: si le champ de tri n'est pas dans SORT_FIELDS, ou si
+            une date n'est pas au format AAAA-MM-JJ
+    """
+    order_by = order_by or SORT_FIELDS[col][0]
+    if order_by not in SORT_FIELDS[col]:
+        raise ValueError(f"Tri impossible sur {col}.{order_by}")
+
+    _ensure_loaded(col)
+
+    with _lock:
+        index = _indexes[col]
+        order = _sorted_order(col, order_by)
+        date_from, date_to, check = _query_filter(col, filters, order_by)
+        start, stop = _query_range(order, date_from, date_to)
+
+        if check is None:
+            # Sans filtre, la page est atteinte directement
+            if descending:
+                stop -= offset
+                if limit is not None:
+                    start = max(start, stop - limit)
+            else:
+                start += offset
+                if limit is not None:
+                    stop = min(stop, start + limit)
+            return [index["by_id"][key[-1]]
+                    for key in sorted_index.iter_range(order, start, stop, descending)]
+
+        page = []
+        skipped = 0
+        for key in sorted_index.iter_range(order, start, stop, descending):
+            if not check(key[-1]):
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            page.append(index["by_id"][key[-1]])
+            if limit is not None and len(page) >= limit:
+                break
+        return page
+
+
+def _count(col, filters):
+    """
+    Compte les elements qui satisfont des filtres (voir _query).
 
-    return False
+    Sans filtre, avec un seul filtre sur un champ indexe, avec le seul
+    filtre texte ou avec un intervalle de dates seul, le compte est lu
+    dans les index.
 
+    Args:
+        col: Le nom de la collection
+        filters: Dictionnaire des filtres
 
-def delete_participant(participant_id):
+    Returns:
+        Le nombre d'elements
     """
-    Supprime un participant.
+    _ensure_loaded(col)
+
+    with _lock:
+        index = _indexes[col]
+        filters = {name: value for name, value in filters.items() if value is not None}
+
+        if not filters:
+            return len(index["by_id"])
+        if col == 'checklist' and list(filters) == ['checked']:
+            checked = _totals["checked"]
+            return checked if filters['checked'] else len(index["by_id"]) - checked
+        if len(filters) == 1:
+            (field, value), = filters.items()
+            if field in index["by"]:
+                return len(index["by"][field].get(value, ()))
+            if field in INDEXED_FIELDS[col] and isinstance(_get_collection(col), ledger.Ledger):
+                return _get_collection(col).count(field, value)
+            if field == 'text':
+                if not search_index.tokenize(value):
+                    return len(index["by_id"])
+                return len(search_index.matches(_search_of(col), value))
+
+        order_by = 'date' if 'date' in SORT_FIELDS[col] else SORT_FIELDS[col][0]
+        order = _sorted_order(col, order_by)
+        date_from, date_to, check = _query_filter(col, filters, order_by)
+        start, stop = _query_range(order, date_from, date_to)
+        if check is None:
+            return stop - start
+        return sum(1 for key in sorted_index.iter_range(order, start, stop)
+                   if check(key[-1]))
+
+
+def query_activites(date_from=None, date_to=None, text=None,
+                    order_by="date", descending=False, limit=None, offset=0):
+    """
+    Recherche des activites.
 
     Args:
-        participant_id: L'ID du participant a supprimer
+        date_from: Premiere date incluse (AAAA-MM-JJ), ou None
+        date_to: Derniere date incluse (AAAA-MM-JJ), ou None
+        text: Mots a trouver dans le nom, le lieu ou la description
+        order_by: Champ de tri (date, nom, prix)
+        descending: True pour l'ordre decroissant
+        limit: Nombre maximal d'activites (taille de la page), ou None
+        offset: Nombre d'activites a sauter (debut de la page)
 
     Returns:
-        True si la suppression a reussi
+        Liste des activites de la page
     """
-    participants = get_participants()
-    initial_count = len(participants)
+    return _query('activites', {"date_from": date_from, "date_to": date_to, "text": text},
+                  order_by, descending, limit, offset)
 
-    participants = [p for p in participants if p.get('id') != participant_id]
 
-    if len(participants) < initial_count:
-        _data['participants'] = participants
-        save_data()
-        return True
+def count_activites(date_from=None, date_to=None, text=None):
+    """
+    Compte les activites qui satisfont les filtres de query_activites.
+    """
+    return _count('activites', {"date_from": date_from, "date_to": date_to, "text": text})
 
-    return False
 
+def query_depenses(date_from=None, date_to=None, categorie=None, participant=None,
+                   text=None, order_by="date", descending=False, limit=None, offset=0):
+    """
+    Recherche des depenses.
 
-# ============================================
-# FONCTIONS POUR LA CHECKLIST
-# ============================================
+    Args:
+        date_from: Premiere date incluse (AAAA-MM-JJ), ou None
+        date_to: Derniere date incluse (AAAA-MM-JJ), ou None
+        categorie: Categorie de budget, ou None
+        participant: Nom du payeur ("Groupe" pour le groupe), ou None
+        text: Mots a trouver dans la description, la categorie ou le payeur
+        order_by: Champ de tri (date, montant, categorie, participant)
+        descending: True pour l'ordre decroissant
+        limit: Nombre maximal de depenses (taille de la page), ou None
+        offset: Nombre de depenses a sauter (debut de la page)
 
-def get_checklist():
+    Returns:
+        Liste des depenses de la page
     """
-    Recupere la checklist.
+    return _query('depenses', {"date_from": date_from, "date_to": date_to,
+                               "categorie": categorie, "participant": participant, "text": text},
+                  order_by, descending, limit, offset)
 
-    Returns:
-        Liste des items de la checklist
+
+def count_depenses(date_from=None, date_to=None, categorie=None, participant=None, text=None):
     """
-    return _data.get('checklist', [])
+    Compte les depenses qui satisfont les filtres de query_depenses.
+    """
+    return _count('depenses', {"date_from": date_from, "date_to": date_to,
+                               "categorie": categorie, "participant": participant, "text": text})
 
 
-def add_checklist_item(item):
+def query_participants(role=None, text=None, order_by="nom", descending=False,
+                       limit=None, offset=0):
     """
-    Ajoute un item a la checklist.
+    Recherche des participants.
 
     Args:
-        item: Les donnees de l'item (dictionnaire)
+        role: Role du participant, ou None
+        text: Mots a trouver dans le nom, le prenom, l'email, le telephone,
+            les notes ou les allergies
+        order_by: Champ de tri (nom, prenom, role)
+        descending: True pour l'ordre decroissant
+        limit: Nombre maximal de participants (taille de la page), ou None
+        offset: Nombre de participants a sauter (debut de la page)
 
     Returns:
-        L'ID du nouvel item
+        Liste des participants de la page
     """
-    checklist = get_checklist()
-
-    # Generer un nouvel ID
-    new_id = max([i.get('id', 0) for i in checklist], default=0) + 1
-    item['id'] = new_id
-    item['checked'] = item.get('checked', False)
+    return _query('participants', {"role": role, "text": text},
+                  order_by, descending, limit, offset)
 
-    checklist.append(item)
-    _data['checklist'] = checklist
-    save_data()
 
-    return new_id
+def count_participants(role=None, text=None):
+    """
+    Compte les participants qui satisfont les filtres de query_participants.
+    """
+    return _count('participants', {"role": role, "text": text})
 
 
-def toggle_checklist_item(item_id):
+def query_checklist(categorie=None, checked=None, text=None, order_by="categorie",
+                    descending=False, limit=None, offset=0):
     """
-    Inverse l'etat checked d'un item.
+    Recherche des items de la checklist.
 
     Args:
-        item_id: L'ID de l'item
+        categorie: Categorie de l'item, ou None
+        checked: True (coches), False (non coches) ou None (tous)
+        text: Mots a trouver dans l'item ou sa categorie
+        order_by: Champ de tri (categorie, item)
+        descending: True pour l'ordre decroissant
+        limit: Nombre maximal d'items (taille de la page), ou None
+        offset: Nombre d'items a sauter (debut de la page)
 
     Returns:
-        Le nouvel etat de l'item (True ou False)
+        Liste des items de la page
     """
-    checklist = get_checklist()
+    return _query('checklist', {"categorie": categorie, "checked": checked, "text": text},
+                  order_by, descending, limit, offset)
 
-    for item in checklist:
-        if item.get('id') == item_id:
-            item['checked'] = not item.get('checked', False)
-            _data['checklist'] = checklist
-            save_data()
-            return item['checked']
 
-    return False
+def count_checklist(categorie=None, checked=None, text=None):
+    """
+    Compte les items qui satisfont les filtres de query_checklist.
+    """
+    return _count('checklist', {"categorie": categorie, "checked": checked, "text": text})
 
 
-def delete_checklist_item(item_id):
+def query_position(col, item_id, order_by=None, descending=False):
     """
-    Supprime un item de la checklist.
+    Retourne la position d'un element dans l'ordre d'un champ (sans
+    filtre), pour afficher la page qui le contient.
 
     Args:
-        item_id: L'ID de l'item a supprimer
+        col: Le nom de la collection
+        item_id: L'ID de l'element
+        order_by: Le champ de tri (voir SORT_FIELDS), None pour l'ordre
+            par defaut
+        descending: True pour l'ordre decroissant
 
     Returns:
-        True si la suppression a reussi
+        La position (0 pour le premier element), ou None si l'element
+        n'existe pas
+
+    Raises:
+        ValueError: si le champ de tri n'est pas dans SORT_FIELDS
     """
-    checklist = get_checklist()
-    initial_count = len(checklist)
+    order_by = order_by or SORT_FIELDS[col][0]
+    if order_by not in SORT_FIELDS[col]:
+        raise ValueError(f"Tri impossible sur {col}.{order_by}")
 
-    checklist = [i for i in checklist if i.get('id') != item_id]
+    _ensure_loaded(col)
 
-    if len(checklist) < initial_count:
-        _data['checklist'] = checklist
-        save_data()
-        return True
+    with _lock:
+        index = _indexes[col]
+        item = index["by_id"].get(item_id)
+        if item is None:
+            return None
 
-    return False
+        order = _sorted_order(col, order_by)
+        position = sorted_index.bisect_left(order, _sort_key(order_by, item))
+        if descending:
+            position = sorted_index.size(order) - 1 - position
+        return position
 
 
-def get_checklist_progress():
+# ============================================
+# RECHERCHE PLEIN TEXTE
+# ============================================
+
+def search(text, limit=SEARCH_LIMIT):
     """
-    Calcule la progression de la checklist.
+    Recherche des mots dans toutes les sections (activites, depenses,
+    participants, checklist, hotel, transports).
+
+    Chaque mot doit se trouver dans un champ de TEXT_FIELDS, sans tenir
+    compte des majuscules ni des accents; un mot de 3 lettres ou plus
+    peut etre une partie d'un mot ("museum" trouve "Rijksmuseum"), un
+    mot plus court un debut de mot. Les resultats sont lus dans les index
+    de recherche maintenus a chaque modification (voir search_index.py).
+
+    Args:
+        text: Les mots cherches
+        limit: Le nombre maximal de resultats retournes
 
     Returns:
-        Tuple (nombre_coches, total, pourcentage)
+        Tuple (nombre total de resultats, liste des resultats). Chaque
+        resultat est un tuple (section, cle, element): la section de
+        TEXT_FIELDS, la cle du document (ID de l'element, None pour
+        l'hotel, "aller" ou "retour" pour un trajet, position dans la
+        liste pour un transport sur place) et l'element trouve
     """
-    checklist = get_checklist()
-    total = len(checklist)
+    _ensure_loaded(*INDEXED_FIELDS, 'hotel', 'transport')
 
-    if total == 0:
-        return (0, 0, 0)
+    total = 0
+    results = []
+    with _lock:
+        for section in TEXT_FIELDS:
+            if section not in _search:
+                continue
 
-    checked = sum(1 for item in checklist if item.get('checked', False))
-    percentage = int((checked / total) * 100)
+            count, keys = search_index.search(_search_of(section), text,
+                                              max(limit - len(results), 0))
+            total += count
+            for key in keys:
+                results.append((section, key, _search_element(section, key)))
 
-    return (checked, total, percentage)
+    return total, results
 
 
-# ============================================
-# INITIALISATION AU CHARGEMENT DU MODULE
-# ============================================
+def _search_element(section, key):
+    """
+    Retourne l'element d'un resultat de recherche.
 
-# Charger les donnees automatiquement quand le module est importe
-load_data()
+    Args:
+        section: La section (voir TEXT_FIELDS)
+        key: La cle du document (voir search)
+
+    Returns:
+        L'element (enregistrement ou dictionnaire en lecture seule)
+    """
+    if section in INDEXED_FIELDS:
+        return _indexes[section]["by_id"][key]
+    if section == 'hotel':
+        return _data.get('hotel', _EMPTY_SECTION)
+
+    transport = _data.get('transport', _EMPTY_SECTION)
+    if section == 'sur_place':
+        return transport['sur_place'][key]
+    return transport[key]
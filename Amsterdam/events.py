@@ -0,0 +1,189 @@
+"""
+events.py - Bus d'evenements de modification de l'application Amsterdam Trip Planner.
+
+data_manager publie un evenement pour chaque modification des donnees
+(ajout, modification, suppression d'un element, remplacement d'une
+section). Les frames s'abonnent au bus et ne mettent a jour que les
+lignes, totaux et libelles concernes, au lieu de tout relire.
+
+Les modifications peuvent venir d'un autre thread que celui de Tk
+(chargement en arriere-plan, import...). Les evenements sont donc
+places dans une file et remis aux abonnes par dispatch(), que main.py
+appelle periodiquement depuis la boucle Tk (root.after).
+
+Les evenements sont remis par lots: un lot contient les evenements
+d'une modification isolee ou de toute une transaction.
+
+Usage:
+    events.subscribe(lambda batch: ...)   # batch: tuple de ChangeEvent
+    events.dispatch()                     # depuis le thread Tk
+"""
+
+import queue
+from collections import namedtuple
+
+
+# ============================================
+# TYPE D'EVENEMENT
+# ============================================
+
+# Evenement de modification:
+#   collection: la collection (activites, depenses, participants,
+#               checklist) ou la section (voyage_info, hotel, transport,
+#               budget_prevu, partage); None pour un rechargement complet ou
+#               des conflits
+#   op:         add, update, patch, delete, set, reload ou conflict
+#   id:         l'ID de l'element (None pour une section)
+#   before:     la valeur avant la modification (None pour un ajout)
+#   after:      la valeur apres la modification (None pour une suppression)
+ChangeEvent = namedtuple("ChangeEvent", ("collection", "op", "id", "before", "after"))
+
+# Operation indiquant que toutes les donnees ont ete remplacees
+# (chargement, reinitialisation): les abonnes doivent tout relire
+RELOAD = "reload"
+
+
+def reload_event():
+    """
+    Cree l'evenement de rechargement complet des donnees.
+
+    Returns:
+        Le ChangeEvent correspondant
+    """
+    return ChangeEvent(None, RELOAD, None, None, None)
+
+
+# Operation signalant des modifications concurrentes du meme element par
+# une autre instance (voir data_manager.sync_external_changes)
+CONFLICT = "conflict"
+
+# Conflit sur un element (ou une section, id None):
+#   base:   la version commune avant les deux modifications
+#   ours:   la version de cette instance (conservee)
+#   theirs: la version ecrite par l'autre instance
+#   fields: les champs modifies differemment des deux cotes (vide si le
+#           conflit porte sur tout l'element: supprime d'un cote)
+Conflict = namedtuple("Conflict", ("collection", "id", "fields", "base", "ours", "theirs"))
+
+
+def conflict_event(conflicts):
+    """
+    Cree l'evenement signalant des conflits avec une autre instance.
+
+    Args:
+        conflicts: Les conflits (liste de Conflict)
+
+    Returns:
+        Le ChangeEvent correspondant (conflits dans after)
+    """
+    return ChangeEvent(None, CONFLICT, None, None, tuple(conflicts))
+
+
+def get_conflicts(batch):
+    """
+    Extrait les conflits d'un lot d'evenements.
+
+    Args:
+        batch: Le lot d'evenements
+
+    Returns:
+        Liste de Conflict (vide s'il n'y en a pas)
+    """
+    return [conflict for event in batch if event.op == CONFLICT for conflict in event.after]
+
+
+def is_reload(batch):
+    """
+    Indique si un lot d'evenements contient un rechargement complet.
+
+    Args:
+        batch: Le lot d'evenements
+
+    Returns:
+        True si les abonnes doivent tout relire
+    """
+    return any(event.op == RELOAD for event in batch)
+
+
+# ============================================
+# VARIABLES GLOBALES
+# ============================================
+
+# Fonctions abonnees (appelees avec chaque lot d'evenements)
+_subscribers = []
+
+# File des lots en attente de remise (alimentee par tous les threads)
+_queue = queue.Queue()
+
+
+# ============================================
+# ABONNEMENT, PUBLICATION ET REMISE
+# ============================================
+
+def subscribe(callback):
+    """
+    Abonne une fonction aux evenements de modification.
+
+    Args:
+        callback: Fonction appelee avec un lot (tuple de ChangeEvent),
+            toujours depuis le thread qui appelle dispatch
+    """
+    if callback not in _subscribers:
+        _subscribers.append(callback)
+
+
+def unsubscribe(callback):
+    """
+    Desabonne une fonction.
+
+    Args:
+        callback: La fonction passee a subscribe
+    """
+    if callback in _subscribers:
+        _subscribers.remove(callback)
+
+
+def publish(batch):
+    """
+    Publie un lot d'evenements (depuis n'importe quel thread).
+
+    Args:
+        batch: Liste de ChangeEvent
+    """
+    if batch:
+        _queue.put(tuple(batch))
+
+
+def has_pending():
+    """
+    Indique si des lots attendent d'etre remis.
+
+    Returns:
+        True si dispatch a du travail
+    """
+    return not _queue.empty()
+
+
+def dispatch():
+    """
+    Remet aux abonnes tous les lots en attente.
+
+    A appeler depuis le thread Tk. Une erreur dans un abonne est
+    affichee et n'empeche pas la remise aux autres abonnes.
+
+    Returns:
+        Le nombre de lots remis
+    """
+    count = 0
+    while True:
+        try:
+            batch = _queue.get_nowait()
+        except queue.Empty:
+            return count
+
+        count += 1
+        for callback in list(_subscribers):
+            try:
+                callback(batch)
+            except Exception as e:
+                print(f"[Evenements] Erreur dans un abonne: {e}")
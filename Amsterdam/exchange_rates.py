@@ -0,0 +1,357 @@
+"""
+exchange_rates.py - Taux de change dates de l'application Amsterdam Trip
+Planner.
+
+Chaque depense peut etre payee dans sa propre devise (GBP, CHF...). Les
+totaux du budget sont exprimes dans la devise du voyage (budget['devise'])
+a l'aide d'une table locale de taux de change dates, commune a tous les
+voyages (config.EXCHANGE_RATES_FILE).
+
+Format du fichier:
+    {
+        "base": "EUR",
+        "taux": {
+            "GBP": {"2025-09-01": "0.8521", "2025-09-16": "0.8498"},
+            "CHF": {"2025-09-01": "0.9412"}
+        }
+    }
+
+Un taux est le nombre d'unites de la devise pour une unite de la devise
+de base. Il s'applique a partir de sa date jusqu'au taux suivant; avant
+le premier taux (ou pour une date absente), le premier taux s'applique.
+
+Les taux sont gardes en fractions exactes (jamais en float): un montant
+en centimes est converti en un seul arrondi, au centime le plus proche.
+Le taux d'un couple de devises a une date est calcule une seule fois
+(cache vide a chaque modification de la table).
+
+Usage:
+    exchange_rates.load()
+    cents = exchange_rates.convert(1000, "GBP", "EUR", "2025-09-16")
+"""
+
+import hashlib
+import json
+import os
+import re
+from bisect import bisect_right
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+
+from config import DEFAULT_CURRENCY, EXCHANGE_RATES_FILE, RATE_CACHE_SIZE, date_ordinal
+
+# Code de devise accepte (ISO 4217: trois lettres majuscules)
+CURRENCY_CODE = re.compile(r"^[A-Z]{3}$")
+
+_ONE = Fraction(1)
+
+# ============================================
+# VARIABLES GLOBALES
+# ============================================
+
+# Fichier de la table
+_path = EXCHANGE_RATES_FILE
+
+# Devise de base de la table (taux 1)
+_base = DEFAULT_CURRENCY
+
+# Contenu du fichier: {devise: {date: taux (texte decimal)}}
+_rates = {}
+
+# Table de recherche: {devise: (numeros de jour tries, taux Fraction)}
+_table = {}
+
+# Taux deja calcules: {(devise source, devise cible, date): Fraction ou None}
+_memo = {}
+
+# Date de modification et taille du fichier lu (voir has_changed)
+_signature = None
+
+# Empreinte du contenu de la table (voir fingerprint)
+_fingerprint = ""
+
+
+# ============================================
+# LECTURE ET ECRITURE DE LA TABLE
+# ============================================
+
+def _read_signature(path):
+    """
+    Retourne la date de modification et la taille d'un fichier (ou None).
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def parse_rate(value):
+    """
+    Convertit un taux (texte ou nombre) en fraction exacte.
+
+    Args:
+        value: Le taux ("0.8521", 0.8521...)
+
+    Returns:
+        Le taux (Fraction strictement positive)
+
+    Raises:
+        ValueError: si le taux n'est pas un nombre strictement positif
+    """
+    try:
+        rate = Decimal(str(value).strip().replace(",", "."))
+    except InvalidOperation:
+        raise ValueError(f"Taux de change invalide: {value!r}") from None
+    if not rate.is_finite() or rate <= 0:
+        raise ValueError(f"Taux de change invalide: {value!r}")
+    return Fraction(rate)
+
+
+def _set_table(base, rates):
+    """
+    Remplace la table en memoire et vide le cache des taux.
+
+    Args:
+        base: La devise de base
+        rates: {devise: {date: taux (texte)}} (dates valides uniquement)
+    """
+    global _base, _rates, _table, _fingerprint
+
+    table = {}
+    for devise, dated in rates.items():
+        points = sorted((date_ordinal(date_str), parse_rate(text)) for date_str, text in dated.items())
+        if points:
+            table[devise] = (
+                [ordinal for ordinal, _ in points],
+                [rate for _, rate in points],
+            )
+
+    canonical = json.dumps([base, rates], sort_keys=True)
+    _base = base
+    _rates = rates
+    _table = table
+    _fingerprint = hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).hexdigest()
+    _memo.clear()
+
+
+def load(path=None):
+    """
+    Lit la table des taux de change.
+
+    Un fichier absent donne une table vide (seule la devise de base est
+    connue). Les taux illisibles sont ignores.
+
+    Args:
+        path: Chemin du fichier (par defaut: config.EXCHANGE_RATES_FILE,
+            ou le dernier fichier lu)
+
+    Returns:
+        True si le contenu de la table a change
+    """
+    global _path, _signature
+
+    if path is not None:
+        _path = path
+
+    previous = _fingerprint
+    _signature = _read_signature(_path)
+
+    content = {}
+    if _signature is not None:
+        try:
+            with open(_path, "r", encoding="utf-8") as f:
+                content = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[Taux] Erreur de lecture de {_path}: {e}")
+            content = {}
+
+    base = content.get("base") or DEFAULT_CURRENCY
+    rates = {}
+    for devise, dated in (content.get("taux") or {}).items():
+        if not CURRENCY_CODE.match(devise) or not isinstance(dated, dict):
+            continue
+        for date_str, text in dated.items():
+            try:
+                parse_rate(text)
+            except ValueError:
+                print(f"[Taux] Taux ignore: {devise} {date_str} {text!r}")
+                continue
+            if date_ordinal(date_str):
+                rates.setdefault(devise, {})[date_str] = str(text)
+
+    _set_table(base, rates)
+    return _fingerprint != previous
+
+
+def has_changed():
+    """
+    Indique si le fichier a ete modifie depuis la derniere lecture
+    (simple lecture de sa date et de sa taille).
+
+    Returns:
+        True si la table doit etre relue (voir load)
+    """
+    return _read_signature(_path) != _signature
+
+
+def save():
+    """
+    Ecrit la table des taux de change (fichier temporaire renomme).
+    """
+    global _signature
+
+    directory = os.path.dirname(_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = _path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"base": _base, "taux": _rates}, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, _path)
+    _signature = _read_signature(_path)
+
+
+def set_rate(devise, date_str, rate):
+    """
+    Ajoute ou remplace le taux d'une devise a une date, puis enregistre
+    la table.
+
+    Args:
+        devise: Le code de la devise (ex: "GBP")
+        date_str: La date a partir de laquelle le taux s'applique (AAAA-MM-JJ)
+        rate: Le nombre d'unites de la devise pour une unite de la devise
+            de base (texte ou nombre)
+
+    Raises:
+        ValueError: si la devise, la date ou le taux est invalide
+    """
+    devise = str(devise).strip().upper()
+    if not CURRENCY_CODE.match(devise):
+        raise ValueError(f"Devise invalide: {devise!r}")
+    if devise == _base:
+        raise ValueError(f"La devise de base ({_base}) a toujours le taux 1")
+    if not date_ordinal(date_str):
+        raise ValueError(f"Date invalide: {date_str!r}")
+    parse_rate(rate)
+    text = str(rate).strip().replace(",", ".")
+
+    rates = {code: dict(dated) for code, dated in _rates.items()}
+    rates.setdefault(devise, {})[date_str] = text
+    _set_table(_base, rates)
+    save()
+
+
+# ============================================
+# CONSULTATION ET CONVERSION
+# ============================================
+
+def get_base():
+    """
+    Retourne la devise de base de la table.
+    """
+    return _base
+
+
+def get_rates():
+    """
+    Retourne une copie de la table: {devise: {date: taux (texte)}}.
+    """
+    return {devise: dict(dated) for devise, dated in _rates.items()}
+
+
+def currencies():
+    """
+    Retourne les devises connues (la devise de base, puis celles de la
+    table par ordre alphabetique).
+    """
+    return [_base] + sorted(devise for devise in _table if devise != _base)
+
+
+def fingerprint():
+    """
+    Retourne l'empreinte du contenu de la table (change a chaque
+    modification des taux).
+    """
+    return _fingerprint
+
+
+def _rate_to_base(devise, ordinal):
+    """
+    Retourne le taux d'une devise (unites pour une unite de la devise de
+    base) en vigueur au jour donne, ou None si la devise est inconnue.
+    """
+    if devise == _base:
+        return _ONE
+    points = _table.get(devise)
+    if points is None:
+        return None
+    ordinals, rates = points
+    return rates[max(bisect_right(ordinals, ordinal) - 1, 0)]
+
+
+def rate(source, target, date_str):
+    """
+    Retourne le taux de conversion d'une devise vers une autre a une date.
+
+    Le resultat est garde en cache (les depenses d'un voyage n'ont que
+    quelques devises et quelques dates differentes).
+
+    Args:
+        source: La devise du montant
+        target: La devise voulue
+        date_str: La date du montant (AAAA-MM-JJ)
+
+    Returns:
+        Le taux (Fraction: montant cible = montant source * taux), ou
+        None si l'une des devises n'a pas de taux
+    """
+    key = (source, target, date_str)
+    try:
+        return _memo[key]
+    except KeyError:
+        pass
+
+    if source == target:
+        result = _ONE
+    else:
+        ordinal = date_ordinal(date_str)
+        from_rate = _rate_to_base(source, ordinal)
+        to_rate = _rate_to_base(target, ordinal)
+        result = None if from_rate is None or to_rate is None else to_rate / from_rate
+
+    if len(_memo) >= RATE_CACHE_SIZE:
+        _memo.clear()
+    _memo[key] = result
+    return result
+
+
+def convert(cents, source, target, date_str):
+    """
+    Convertit un montant en centimes d'une devise vers une autre.
+
+    Le resultat est arrondi au centime le plus proche (un demi-centime
+    est arrondi en s'eloignant de zero), en un seul arrondi exact.
+
+    Args:
+        cents: Le montant en centimes de la devise source
+        source: La devise du montant
+        target: La devise voulue
+        date_str: La date du montant (taux en vigueur ce jour-la)
+
+    Returns:
+        Le montant en centimes de la devise cible, ou None si le taux est
+        inconnu
+    """
+    if source == target:
+        return cents
+
+    factor = rate(source, target, date_str)
+    if factor is None:
+        return None
+
+    numerator, denominator = factor.numerator, factor.denominator
+    quotient, remainder = divmod(abs(cents) * numerator, denominator)
+    if 2 * remainder >= denominator:
+        quotient += 1
+    return -quotient if cents < 0 else quotient
@@ -0,0 +1,475 @@
+"""
+exporter.py - Export en flux des donnees de l'application Amsterdam
+Trip Planner (comptabilite, agendas et carnets d'adresses).
+
+Exports disponibles (voir EXPORTS):
+- activites_ics:      activites -> calendrier ICS
+- depenses_csv:       depenses -> CSV (colonnes de l'onglet Budget, et la
+                      devise: vide pour la devise du voyage)
+- depenses_jsonl:     depenses -> JSON Lines (un objet par ligne)
+- participants_csv:   participants -> CSV
+- participants_vcard: participants -> vCard 3.0
+- checklist_csv:      checklist -> CSV
+
+Chaque element est formate par un generateur et ecrit par paquets de
+EXPORT_CHUNK_ROWS elements: la memoire ne depend pas du nombre
+d'elements. Les collections sont immuables (persistent.py): l'export lit
+un etat coherent des donnees, meme si elles sont modifiees pendant
+l'ecriture.
+
+Les fichiers CSV, ICS et vCard produits peuvent etre relus par
+importer.py (memes noms de colonnes et de proprietes).
+
+Le fichier est ecrit dans un fichier temporaire, renomme a la fin: un
+export interrompu ne laisse pas de fichier incomplet.
+
+Usage:
+    resultat = exporter.export("depenses_csv", "depenses.csv", progress=callback)
+    python exporter.py depenses_csv depenses.csv
+"""
+
+import collections
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+
+import catalog
+import data_manager
+from config import EXPORT_CHUNK_ROWS
+from importer import parse_date
+
+
+# ============================================
+# FORMATAGE DES VALEURS
+# ============================================
+
+# Separateur des fichiers CSV (celui d'Excel en francais)
+CSV_DELIMITER = ";"
+
+_CSV_SPECIAL = re.compile(r'[;"\r\n]')
+
+
+def _csv_field(value):
+    """
+    Formate un champ CSV (entre guillemets s'il contient le separateur,
+    un guillemet ou un retour a la ligne).
+    """
+    text = "" if value is None else str(value)
+    if _CSV_SPECIAL.search(text):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _csv_line(values):
+    """
+    Formate une ligne CSV (terminee par CRLF).
+    """
+    return CSV_DELIMITER.join(map(_csv_field, values)) + "\r\n"
+
+
+def _decimal(amount):
+    """
+    Formate un montant avec une virgule decimale (12,50).
+    """
+    return f"{float(amount or 0):.2f}".replace(".", ",")
+
+
+def _ics_text(value):
+    """
+    Echappe une valeur texte ICS/vCard (\\, ; , et retours a la ligne).
+    """
+    text = str(value or "")
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _fold(line):
+    """
+    Replie une ligne ICS/vCard a 75 octets (RFC 5545), sans couper un
+    caractere UTF-8.
+
+    Returns:
+        La ligne (terminee par CRLF)
+    """
+    if len(line) <= 75 and line.isascii():
+        return line + "\r\n"
+
+    parts = []
+    current = []
+    size = 0
+    limit = 75
+    for ch in line:
+        width = len(ch.encode("utf-8"))
+        if size + width > limit:
+            parts.append("".join(current))
+            current, size, limit = [], 0, 74
+        current.append(ch)
+        size += width
+    parts.append("".join(current))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+_DURATION = re.compile(r"^\s*(?:(\d+)\s*h)?\s*(?:(\d+)\s*(?:min|m)?)?\s*$", re.IGNORECASE)
+_HORAIRE = re.compile(r"^\s*(\d{1,2})\s*[:hH]\s*(\d{2})?\s*$")
+
+
+def duration_minutes(text):
+    """
+    Convertit une duree du planning (3h, 1h30, 45min) en minutes.
+
+    Returns:
+        Le nombre de minutes, ou None si la duree n'est pas reconnue
+    """
+    match = _DURATION.match(text or "")
+    if not match or not any(match.groups()):
+        return None
+    hours, minutes = match.groups()
+    if hours is None and minutes is not None and not re.search(r"m", text, re.IGNORECASE):
+        # Un nombre seul est un nombre d'heures
+        hours, minutes = minutes, None
+    total = int(hours or 0) * 60 + int(minutes or 0)
+    return total or None
+
+
+def _ics_date(text):
+    """
+    Formate une date pour ICS/vCard (AAAAMMJJ).
+
+    Returns:
+        La date, ou None si elle n'est pas reconnue
+    """
+    try:
+        return parse_date(text).replace("-", "") if text else None
+    except ValueError:
+        return None
+
+
+# ============================================
+# FORMATS D'EXPORT
+# ============================================
+
+def _activite_ics(activite, stamp, devise):
+    """
+    Formate une activite en VEVENT.
+
+    Une activite avec un horaire (HH:MM) commence a cette heure (heure
+    locale) et dure sa duree; sans horaire, elle occupe la journee. Le
+    prix est dans la propriete X-PRIX (montant et devise du voyage, relue
+    par importer.parse_ics).
+    """
+    day = _ics_date(activite.get('date'))
+    if day is None:
+        return ""
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:activite-{activite.get('id')}@amsterdam-trip-planner",
+        f"DTSTAMP:{stamp}",
+    ]
+
+    horaire = _HORAIRE.match(activite.get('horaire') or "")
+    if horaire:
+        lines.append(f"DTSTART:{day}T{int(horaire.group(1)):02d}{horaire.group(2) or '00'}00")
+        minutes = duration_minutes(activite.get('duree'))
+        if minutes:
+            hours, minutes = divmod(minutes, 60)
+            lines.append("DURATION:PT" + (f"{hours}H" if hours else "") +
+                         (f"{minutes}M" if minutes else ""))
+    else:
+        lines.append(f"DTSTART;VALUE=DATE:{day}")
+
+    lines.append("SUMMARY:" + _ics_text(activite.get('nom')))
+    if activite.get('lieu'):
+        lines.append("LOCATION:" + _ics_text(activite['lieu']))
+
+    if activite.get('description'):
+        lines.append("DESCRIPTION:" + _ics_text(activite['description']))
+    if activite.get('prix'):
+        lines.append(f"X-PRIX:{float(activite['prix']):.2f} {devise}")
+
+    lines.append("END:VEVENT")
+    return "".join(map(_fold, lines))
+
+
+def _depense_csv(depense):
+    """
+    Formate une depense en ligne CSV (colonnes de l'onglet Budget).
+    """
+    return _csv_line((
+        depense.get('date', ''),
+        depense.get('categorie', ''),
+        _decimal(depense.get('montant', 0)),
+        depense.get('description', ''),
+        depense.get('participant', ''),
+        depense.get('devise', ''),
+    ))
+
+
+def _depense_jsonl(depense):
+    """
+    Formate une depense en ligne JSON (tous les champs, montant en nombre).
+    """
+    return json.dumps({
+        "id": depense.get('id'),
+        "date": depense.get('date', ''),
+        "categorie": depense.get('categorie', ''),
+        "montant": round(float(depense.get('montant') or 0), 2),
+        "description": depense.get('description', ''),
+        "participant": depense.get('participant', ''),
+        "devise": depense.get('devise', ''),
+    }, ensure_ascii=False) + "\n"
+
+
+def _participant_csv(participant):
+    """
+    Formate un participant en ligne CSV.
+    """
+    return _csv_line((
+        participant.get('nom', ''),
+        participant.get('prenom', ''),
+        participant.get('email', ''),
+        participant.get('telephone', ''),
+        participant.get('role', ''),
+        participant.get('date_naissance', ''),
+        participant.get('allergies', ''),
+        participant.get('notes', ''),
+        participant.get('arrivee', ''),
+        participant.get('depart', ''),
+    ))
+
+
+def _participant_vcard(participant):
+    """
+    Formate un participant en carte vCard 3.0.
+    """
+    nom = participant.get('nom', '')
+    prenom = participant.get('prenom', '')
+    lines = [
+        "BEGIN:VCARD",
+        "VERSION:3.0",
+        f"N:{_ics_text(nom)};{_ics_text(prenom)};;;",
+        "FN:" + _ics_text(f"{prenom} {nom}".strip()),
+    ]
+    if participant.get('email'):
+        lines.append("EMAIL;TYPE=INTERNET:" + _ics_text(participant['email']))
+    if participant.get('telephone'):
+        lines.append("TEL:" + _ics_text(participant['telephone']))
+    if participant.get('role'):
+        lines.append("ROLE:" + _ics_text(participant['role']))
+    birthday = _ics_date(participant.get('date_naissance'))
+    if birthday:
+        lines.append(f"BDAY:{birthday[:4]}-{birthday[4:6]}-{birthday[6:]}")
+    if participant.get('allergies'):
+        lines.append("X-ALLERGIES:" + _ics_text(participant['allergies']))
+    if participant.get('notes'):
+        lines.append("NOTE:" + _ics_text(participant['notes']))
+    lines.append("END:VCARD")
+    return "".join(map(_fold, lines))
+
+
+def _checklist_csv(item):
+    """
+    Formate un item de la checklist en ligne CSV.
+    """
+    return _csv_line((
+        item.get('item', ''),
+        item.get('categorie', ''),
+        "Oui" if item.get('checked') else "Non",
+    ))
+
+
+def _ics_header():
+    """
+    Debut d'un calendrier ICS.
+    """
+    return "".join(map(_fold, (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Amsterdam Trip Planner//Activites//FR",
+        "CALSCALE:GREGORIAN",
+    )))
+
+
+# Description d'un export:
+# - label: texte du menu
+# - collection: la collection exportee
+# - extension: extension proposee pour le fichier
+# - encoding: encodage du fichier (BOM pour qu'Excel lise l'UTF-8)
+# - header: fonction retournant le debut du fichier
+# - row: fonction formatant un element (texte avec ses fins de ligne)
+# - footer: fin du fichier
+Export = collections.namedtuple(
+    "Export", ["label", "collection", "extension", "encoding", "header", "row", "footer"])
+
+EXPORTS = {
+    "activites_ics": Export(
+        "Activites (calendrier ICS)", "activites", ".ics", "utf-8",
+        _ics_header, _activite_ics, "END:VCALENDAR\r\n"),
+    "depenses_csv": Export(
+        "Depenses (CSV)", "depenses", ".csv", "utf-8-sig",
+        lambda: _csv_line(("Date", "Categorie", "Montant", "Description", "Paye par", "Devise")),
+        _depense_csv, ""),
+    "depenses_jsonl": Export(
+        "Depenses (JSON Lines)", "depenses", ".jsonl", "utf-8",
+        lambda: "", _depense_jsonl, ""),
+    "participants_csv": Export(
+        "Participants (CSV)", "participants", ".csv", "utf-8-sig",
+        lambda: _csv_line(("Nom", "Prenom", "Email", "Telephone", "Role",
+                           "Date de naissance", "Allergies", "Notes",
+                           "Arrivee", "Depart")),
+        _participant_csv, ""),
+    "participants_vcard": Export(
+        "Participants (vCard)", "participants", ".vcf", "utf-8",
+        lambda: "", _participant_vcard, ""),
+    "checklist_csv": Export(
+        "Checklist (CSV)", "checklist", ".csv", "utf-8-sig",
+        lambda: _csv_line(("Item", "Categorie", "Coche")),
+        _checklist_csv, ""),
+}
+
+# Fonction d'acces de chaque collection exportable
+_GETTERS = {
+    "activites": data_manager.get_activites,
+    "depenses": data_manager.get_depenses,
+    "participants": data_manager.get_participants,
+    "checklist": data_manager.get_checklist,
+}
+
+
+# ============================================
+# ECRITURE EN FLUX
+# ============================================
+
+def iter_chunks(name, items):
+    """
+    Formate des elements par paquets.
+
+    Les activites ICS recoivent l'horodatage de l'export (DTSTAMP) et la
+    devise du voyage (X-PRIX).
+
+    Args:
+        name: Le nom de l'export (cle de EXPORTS)
+        items: Les elements (iterable, parcouru une seule fois)
+
+    Yields:
+        Tuples (texte, nombre d'elements du paquet), en commencant par
+        le debut du fichier et en finissant par sa fin
+    """
+    spec = EXPORTS[name]
+    row = spec.row
+    if name == "activites_ics":
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        devise = data_manager.get_devise()
+        row = lambda activite: _activite_ics(activite, stamp, devise)
+
+    yield spec.header(), 0
+    chunk = []
+    for item in items:
+        chunk.append(row(item))
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield "".join(chunk), len(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk), len(chunk)
+    yield spec.footer, 0
+
+
+def write_export(name, path, items, total=None, progress=None):
+    """
+    Ecrit des elements dans un fichier, paquet par paquet.
+
+    Args:
+        name: Le nom de l'export (cle de EXPORTS)
+        path: Le chemin du fichier
+        items: Les elements (iterable)
+        total: Le nombre d'elements (pour l'avancement), ou None
+        progress: Fonction appelee avec le rapport (copie) apres chaque
+            paquet, ou None
+
+    Returns:
+        Le rapport d'export (dictionnaire: export, path, rows, total,
+        bytes, elapsed_s, rows_per_s)
+    """
+    stats = {"export": name, "path": path, "rows": 0, "total": total,
+             "bytes": 0, "elapsed_s": 0.0, "rows_per_s": 0.0}
+    start = time.perf_counter()
+
+    def report():
+        stats["elapsed_s"] = time.perf_counter() - start
+        stats["rows_per_s"] = stats["rows"] / stats["elapsed_s"] if stats["elapsed_s"] else 0.0
+        if progress is not None:
+            progress(dict(stats))
+
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding=EXPORTS[name].encoding, newline="") as f:
+            for text, count in iter_chunks(name, items):
+                f.write(text)
+                if count:
+                    stats["rows"] += count
+                    report()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    stats["bytes"] = os.path.getsize(path)
+    report()
+    return stats
+
+
+def export(name, path, progress=None):
+    """
+    Exporte une collection du voyage ouvert dans un fichier.
+
+    Peut etre appelee depuis un thread: la collection lue est un etat
+    immuable des donnees.
+
+    Args:
+        name: Le nom de l'export (cle de EXPORTS)
+        path: Le chemin du fichier
+        progress: Fonction appelee avec le rapport apres chaque paquet
+
+    Returns:
+        Le rapport d'export (voir write_export)
+
+    Raises:
+        KeyError: si l'export n'existe pas
+        OSError: si le fichier ne peut pas etre ecrit
+    """
+    items = _GETTERS[EXPORTS[name].collection]()
+    stats = write_export(name, path, items, total=len(items), progress=progress)
+    print(f"[Exporter] {path}: {stats['rows']} element(s) exporte(s) "
+          f"({stats['rows_per_s']:.0f} elements/s)")
+    return stats
+
+
+# ============================================
+# UTILISATION EN LIGNE DE COMMANDE
+# ============================================
+
+def main(args):
+    """
+    Exporte des collections du voyage ouvert.
+
+    Args:
+        args: Paires (nom de l'export, chemin du fichier)
+    """
+    data_manager.open_trip(catalog.get_current_trip_id())
+    data_manager.load_data()
+
+    for name, path in zip(args[::2], args[1::2]):
+        export(name, path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or len(sys.argv) % 2 == 0 or \
+            any(name not in EXPORTS for name in sys.argv[1::2]):
+        print("Usage: python exporter.py export fichier [export fichier ...]")
+        print("Exports: " + ", ".join(EXPORTS))
+        sys.exit(1)
+    main(sys.argv[1:])
@@ -0,0 +1,115 @@
+"""
+file_lock.py - Verrou consultatif entre plusieurs instances de
+l'application Amsterdam Trip Planner.
+
+Plusieurs personnes peuvent ouvrir le meme voyage depuis un dossier
+partage. Chaque instance prend le verrou du repertoire de donnees
+(voyage_data.lock) avant de lire les modifications des autres et
+d'ecrire les siennes (journal, sections, manifeste): deux ecritures ne
+se melangent jamais.
+
+Le verrou est "consultatif": il ne bloque que les instances qui le
+demandent. Il utilise fcntl.flock sous Linux/macOS et msvcrt.locking
+sous Windows; sans l'un ni l'autre, il ne protege rien.
+
+Le verrou n'est pas reentrant: une meme instance ne doit pas le
+demander deux fois (data_manager le prend sous son _write_lock).
+
+Usage:
+    with file_lock.locked(LOCK_FILE):
+        ...
+    with file_lock.locked(LOCK_FILE, blocking=False) as acquired:
+        if acquired:
+            ...
+"""
+
+import contextlib
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+def _acquire(f, blocking):
+    """
+    Prend le verrou sur un fichier ouvert.
+
+    Args:
+        f: Le fichier de verrou (ouvert en ecriture)
+        blocking: False pour abandonner si le verrou est deja pris
+
+    Returns:
+        True si le verrou est pris
+    """
+    if fcntl is not None:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(f.fileno(), flags)
+        except BlockingIOError:
+            return False
+        return True
+
+    if msvcrt is not None:
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                # LK_LOCK abandonne apres 10 secondes: reessayer
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    return True
+                except OSError:
+                    continue
+
+    return True
+
+
+def _release(f):
+    """
+    Rend le verrou pris par _acquire.
+
+    Args:
+        f: Le fichier de verrou
+    """
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def locked(path, blocking=True):
+    """
+    Prend le verrou exclusif d'un fichier pendant un bloc with.
+
+    Le fichier est cree s'il n'existe pas (il reste vide).
+
+    Args:
+        path: Le chemin du fichier de verrou
+        blocking: False pour ne pas attendre si une autre instance
+            tient le verrou
+
+    Yields:
+        True si le verrou est pris (toujours le cas si blocking est vrai)
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    with open(path, "a+b") as f:
+        acquired = _acquire(f, blocking)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                _release(f)
@@ -12,13 +12,16 @@ pour organiser les widgets en lignes et colonnes.
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime
 
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import COLORS, FONTS, format_date, format_currency
+from config import COLORS, FONTS, format_date, format_cents, date_ordinal
+from money import from_cents
+from simulation import parse_estimate
+from frames.tree_rows import create_rows, show_page, select_row, create_row_cache, cached_row
+from frames.pager import create_pager, set_total, show_position
 
 
 # ============================================
@@ -38,6 +41,8 @@ def clear_form(frame):
     frame.var_horaire.set("")
     frame.var_duree.set("")
     frame.var_prix.set("")
+    frame.var_prix_min.set("")
+    frame.var_prix_max.set("")
     frame.var_description.set("")
     frame.selected_id = None
 
@@ -46,6 +51,31 @@ def clear_form(frame):
         frame.tree.selection_remove(item)
 
 
+def read_prices(frame):
+    """
+    Lit le prix, le prix minimal et le prix maximal du formulaire.
+
+    Args:
+        frame: Le frame contenant les variables du formulaire
+
+    Returns:
+        Dictionnaire (prix, prix_min, prix_max; None si absent), ou None
+        si un prix est invalide (message affiche)
+    """
+    try:
+        prix, low, high = parse_estimate(frame.var_prix.get(), frame.var_prix_min.get(),
+                                         frame.var_prix_max.get())
+    except ValueError as e:
+        messagebox.showerror("Erreur", f"Prix invalide: {e}")
+        return None
+
+    return {
+        "prix": from_cents(prix),
+        "prix_min": None if low is None else from_cents(low),
+        "prix_max": None if high is None else from_cents(high),
+    }
+
+
 def add_activity(frame):
     """
     Ajoute une nouvelle activite.
@@ -63,17 +93,13 @@ def add_activity(frame):
         return
 
     # Valider le format de la date
-    try:
-        datetime.strptime(frame.var_date.get(), "%Y-%m-%d")
-    except ValueError:
+    if not date_ordinal(frame.var_date.get()):
         messagebox.showerror("Erreur", "Format de date invalide. Utilisez AAAA-MM-JJ")
         return
 
-    # Valider le prix
-    try:
-        prix = float(frame.var_prix.get() or 0)
-    except ValueError:
-        messagebox.showerror("Erreur", "Le prix doit etre un nombre.")
+    # Valider les prix (prix probable, minimum et maximum facultatifs)
+    prices = read_prices(frame)
+    if prices is None:
         return
 
     # Creer l'activite
@@ -83,15 +109,14 @@ def add_activity(frame):
         "lieu": frame.var_lieu.get().strip(),
         "horaire": frame.var_horaire.get().strip(),
         "duree": frame.var_duree.get().strip(),
-        "prix": prix,
-        "description": frame.var_description.get().strip()
+        "description": frame.var_description.get().strip(),
+        **prices
     }
 
     # Ajouter via le data manager
     frame.data_manager.add_activite(activite)
 
-    # Rafraichir et vider le formulaire
-    refresh_activities(frame)
+    # Vider le formulaire (le tableau est mis a jour par on_data_changed)
     clear_form(frame)
 
     messagebox.showinfo("Succes", "Activite ajoutee avec succes !")
@@ -113,10 +138,8 @@ def update_activity(frame):
         messagebox.showwarning("Attention", "Le nom de l'activite est obligatoire.")
         return
 
-    try:
-        prix = float(frame.var_prix.get() or 0)
-    except ValueError:
-        messagebox.showerror("Erreur", "Le prix doit etre un nombre.")
+    prices = read_prices(frame)
+    if prices is None:
         return
 
     # Creer l'activite mise a jour
@@ -126,15 +149,14 @@ def update_activity(frame):
         "lieu": frame.var_lieu.get().strip(),
         "horaire": frame.var_horaire.get().strip(),
         "duree": frame.var_duree.get().strip(),
-        "prix": prix,
-        "description": frame.var_description.get().strip()
+        "description": frame.var_description.get().strip(),
+        **prices
     }
 
     # Mettre a jour via le data manager
     frame.data_manager.update_activite(frame.selected_id, activite)
 
-    # Rafraichir et vider
-    refresh_activities(frame)
+    # Vider le formulaire
     clear_form(frame)
 
     messagebox.showinfo("Succes", "Activite modifiee avec succes !")
@@ -159,7 +181,6 @@ def delete_activity(frame):
 
     if confirm:
         frame.data_manager.delete_activite(frame.selected_id)
-        refresh_activities(frame)
         clear_form(frame)
         messagebox.showinfo("Succes", "Activite supprimee.")
 
@@ -183,7 +204,7 @@ def on_select(frame, event):
     # Recuperer l'ID stocke dans le tag
     item = selection[0]
     tags = frame.tree.item(item)["tags"]
-    frame.selected_id = tags[0] if tags else None
+    frame.selected_id = int(tags[0]) if tags else None
 
 
 def on_double_click(frame, event):
@@ -209,24 +230,92 @@ def on_double_click(frame, event):
     frame.selected_id = int(tags[0])
 
     # Trouver l'activite correspondante
-    activites = frame.data_manager.get_activites()
-    for activite in activites:
-        if activite.get('id') == frame.selected_id:
-            # Remplir le formulaire
-            frame.var_date.set(activite.get('date', ''))
-            frame.var_nom.set(activite.get('nom', ''))
-            frame.var_lieu.set(activite.get('lieu', ''))
-            frame.var_horaire.set(activite.get('horaire', ''))
-            frame.var_duree.set(activite.get('duree', ''))
-            frame.var_prix.set(str(activite.get('prix', '')))
-            frame.var_description.set(activite.get('description', ''))
-            break
+    activite = frame.data_manager.get_activite(frame.selected_id)
+    if activite is None:
+        return
+
+    # Remplir le formulaire
+    frame.var_date.set(activite.get('date', ''))
+    frame.var_nom.set(activite.get('nom', ''))
+    frame.var_lieu.set(activite.get('lieu', ''))
+    frame.var_horaire.set(activite.get('horaire', ''))
+    frame.var_duree.set(activite.get('duree', ''))
+    frame.var_prix.set(str(activite.get('prix', '')))
+    for key, var in (('prix_min', frame.var_prix_min), ('prix_max', frame.var_prix_max)):
+        var.set('' if activite.get(key) is None else str(activite.get(key)))
+    frame.var_description.set(activite.get('description', ''))
 
 
 # ============================================
 # FONCTION DE RAFRAICHISSEMENT
 # ============================================
 
+def activity_row(activite):
+    """
+    Calcule la cle de tri et les valeurs de la ligne d'une activite.
+
+    Args:
+        activite: L'activite
+
+    Returns:
+        Tuple (cle de tri, valeurs des colonnes)
+    """
+    values = (
+        format_date(activite.get('date', '')),
+        activite.get('nom', ''),
+        activite.get('lieu', ''),
+        activite.get('horaire', ''),
+        activite.get('duree', ''),
+        format_cents(activite.cents('prix'))
+    )
+    return date_ordinal(activite.get('date')), values
+
+
+def update_totals(frame):
+    """
+    Met a jour le nombre d'activites et le cout total.
+
+    Args:
+        frame: Le frame contenant les variables des totaux
+    """
+    frame.var_total_activities.set(str(frame.pager["total"]))
+    frame.var_total_prix.set(format_cents(frame.total_prix))
+
+
+def load_page(frame):
+    """
+    Affiche la page courante des activites (triees par date).
+
+    Seule la page affichee est demandee au data_manager, dans l'ordre
+    des dates qu'il maintient (aucun tri ici).
+
+    Args:
+        frame: Le frame contenant le treeview et la pagination
+    """
+    set_total(frame.pager, frame.data_manager.count_activites())
+    activites = frame.data_manager.query_activites(
+        limit=frame.pager["size"],
+        offset=frame.pager["offset"]
+    )
+    show_page(frame.rows, [(a.get('id'),) + cached_row(frame.row_cache, a) for a in activites])
+
+
+def show_item(frame, item_id):
+    """
+    Affiche la page qui contient une activite et selectionne sa ligne
+    (resultat de la recherche globale).
+
+    Args:
+        frame: Le frame contenant le treeview et la pagination
+        item_id: L'ID de l'element
+    """
+    position = frame.data_manager.query_position('activites', item_id)
+    if position is None:
+        return
+    show_position(frame.pager, position)
+    select_row(frame.rows, item_id)
+
+
 def refresh_activities(frame):
     """
     Rafraichit le tableau des activites.
@@ -234,44 +323,50 @@ def refresh_activities(frame):
     Args:
         frame: Le frame contenant le treeview et le data_manager
     """
-    # Vider le tableau
-    for item in frame.tree.get_children():
-        frame.tree.delete(item)
-
     # Recuperer les activites
     activites = frame.data_manager.get_activites()
 
-    # Trier par date
-    activites_triees = sorted(
-        activites,
-        key=lambda x: x.get('date', '9999-12-31')
-    )
+    # Prix de chaque activite en centimes (cout total exact)
+    frame.prix_by_id.clear()
+    for activite in activites:
+        frame.prix_by_id[activite.get('id')] = activite.cents('prix')
+    frame.total_prix = sum(frame.prix_by_id.values())
 
-    # Calculer les totaux
-    total_prix = 0
-
-    # Remplir le tableau
-    for activite in activites_triees:
-        prix = activite.get('prix', 0)
-        total_prix += prix
-
-        frame.tree.insert(
-            "",
-            "end",
-            values=(
-                format_date(activite.get('date', '')),
-                activite.get('nom', ''),
-                activite.get('lieu', ''),
-                activite.get('horaire', ''),
-                activite.get('duree', ''),
-                format_currency(prix)
-            ),
-            tags=(activite.get('id'),)
-        )
+    # Remplir le tableau (page courante, triee par date)
+    load_page(frame)
 
     # Mettre a jour les totaux
-    frame.var_total_activities.set(str(len(activites)))
-    frame.var_total_prix.set(format_currency(total_prix))
+    update_totals(frame)
+
+
+def on_data_changed(frame, batch):
+    """
+    Met a jour uniquement les lignes des activites modifiees.
+
+    Appelee par le bus d'evenements (dans le thread Tk).
+
+    Args:
+        frame: Le frame contenant le treeview
+        batch: Le lot d'evenements (tuple de ChangeEvent)
+    """
+    changed = False
+
+    for event in batch:
+        if event.collection != 'activites':
+            continue
+
+        if event.op == 'delete':
+            frame.total_prix -= frame.prix_by_id.pop(event.id, 0)
+        else:
+            prix = event.after.cents('prix')
+            frame.total_prix += prix - frame.prix_by_id.get(event.id, 0)
+            frame.prix_by_id[event.id] = prix
+        changed = True
+
+    if changed:
+        # Relire la page: seules les lignes modifiees sont touchees
+        load_page(frame)
+        update_totals(frame)
 
 
 # ============================================
@@ -299,6 +394,11 @@ def ActivitiesFrame(parent, data_manager):
     frame.data_manager = data_manager
     frame.selected_id = None
 
+    # Prix de chaque activite affichee et cout total (maintenu a chaque
+    # modification)
+    frame.prix_by_id = {}
+    frame.total_prix = 0
+
     # Variables pour le formulaire
     frame.var_date = tk.StringVar()
     frame.var_nom = tk.StringVar()
@@ -306,6 +406,8 @@ def ActivitiesFrame(parent, data_manager):
     frame.var_horaire = tk.StringVar()
     frame.var_duree = tk.StringVar()
     frame.var_prix = tk.StringVar()
+    frame.var_prix_min = tk.StringVar()
+    frame.var_prix_max = tk.StringVar()
     frame.var_description = tk.StringVar()
 
     # Configuration du grid principal
@@ -379,9 +481,26 @@ def ActivitiesFrame(parent, data_manager):
         row=2, column=4, columnspan=3, sticky="ew", padx=5, pady=5
     )
 
-    # Ligne 4: Boutons
+    # Ligne 4: Prix minimal et maximal (estimation, voir simulation.py)
+    ttk.Label(form_frame, text="Prix min:").grid(
+        row=3, column=0, sticky="e", padx=5, pady=5
+    )
+    ttk.Entry(form_frame, textvariable=frame.var_prix_min, width=10).grid(
+        row=3, column=1, sticky="w", padx=5, pady=5
+    )
+
+    ttk.Label(form_frame, text="Prix max:").grid(
+        row=3, column=3, sticky="e", padx=5, pady=5
+    )
+    ttk.Entry(form_frame, textvariable=frame.var_prix_max, width=10).grid(
+        row=3, column=4, sticky="w", padx=5, pady=5
+    )
+    ttk.Label(form_frame, text="(facultatifs, pour la simulation du budget)",
+              font=FONTS["small"]).grid(row=3, column=5, columnspan=2, sticky="w")
+
+    # Ligne 5: Boutons
     btn_frame = ttk.Frame(form_frame)
-    btn_frame.grid(row=3, column=0, columnspan=7, pady=10)
+    btn_frame.grid(row=4, column=0, columnspan=7, pady=10)
 
     ttk.Button(
         btn_frame,
@@ -466,10 +585,18 @@ def ActivitiesFrame(parent, data_manager):
     scrollbar_x.grid(row=1, column=0, sticky="ew")
     frame.tree.configure(xscrollcommand=scrollbar_x.set)
 
+    # Pagination (seule la page affichee est lue)
+    frame.pager = create_pager(table_frame, lambda: load_page(frame))
+    frame.pager["bar"].grid(row=2, column=0, columnspan=2, pady=(5, 0))
+
     # Evenement de selection
     frame.tree.bind("<<TreeviewSelect>>", lambda e: on_select(frame, e))
     frame.tree.bind("<Double-1>", lambda e: on_double_click(frame, e))
 
+    # Ordre de tri des lignes de la page (mises a jour une par une)
+    frame.rows = create_rows(frame.tree)
+    frame.row_cache = create_row_cache(activity_row)
+
     # ============================================
     # RESUME (utilise GRID)
     # ============================================
@@ -514,7 +641,15 @@ def ActivitiesFrame(parent, data_manager):
 
     frame.refresh = lambda: refresh_activities(frame)
 
-    # Charger les donnees initiales
-    frame.refresh()
+    # Afficher un element trouve par la recherche globale (main.py)
+    frame.show_item = lambda item_id: show_item(frame, item_id)
+
+    # Mettre a jour les lignes modifiees a chaque evenement du data_manager
+    frame.data_manager.subscribe(lambda batch: on_data_changed(frame, batch))
+
+    # Charger les donnees initiales (sinon main.py rafraichit le frame
+    # a la fin du chargement)
+    if frame.data_manager.is_loaded():
+        frame.refresh()
 
     return frame
@@ -3,9 +3,16 @@ budget_frame.py - Gestion du budget pour le voyage a Amsterdam.
 
 Ce module permet de gerer les depenses du voyage:
 - Definir le budget prevu
-- Ajouter des depenses par categorie
+- Ajouter des depenses par categorie (dans la devise du voyage ou une
+  autre devise, convertie avec la table des taux de change)
 - Visualiser le budget restant
 - Voir la repartition par categorie
+- Voir les soldes des participants et les remboursements a faire
+  (regle de partage: parts egales, selon la presence ou poids)
+- Analyser les depenses dans un tableau croise (date, categorie, payeur)
+  et suivre le rythme des depenses et la projection a la fin du sejour
+- Estimer le risque de depasser le budget (simulation de Monte-Carlo des
+  activites, transports sur place et depenses a venir)
 
 IMPORTANT: Ce frame utilise le gestionnaire de layout GRID
 pour organiser les widgets en lignes et colonnes.
@@ -14,11 +21,20 @@ pour organiser les widgets en lignes et colonnes.
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+import queue
+import threading
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import COLORS, FONTS, BUDGET_CATEGORIES, format_currency
+from config import (COLORS, FONTS, BUDGET_CATEGORIES, CURRENCIES, PIVOT_MAX_COLUMNS,
+                    date_ordinal, format_cents, format_date)
+from exchange_rates import CURRENCY_CODE
+from pivot import LABELS as PIVOT_LABELS
+from settlement import MODES, member_name
+from money import from_cents, parse_amount
+from frames.tree_rows import create_rows, clear_rows, show_page, select_row, create_row_cache, cached_row
+from frames.pager import create_pager, set_total, show_position
 
 
 # ============================================
@@ -33,9 +49,8 @@ def save_budget_prevu(frame):
         frame: Le frame contenant les variables
     """
     try:
-        montant = float(frame.var_budget_prevu.get().replace(",", ".").replace(" ", "").replace("EUR", ""))
-        frame.data_manager.update_budget_prevu(montant)
-        refresh_budget(frame)
+        montant = parse_amount(frame.var_budget_prevu.get())
+        frame.data_manager.update_budget_prevu(from_cents(montant))
         messagebox.showinfo("Succes", "Budget prevu mis a jour !")
     except ValueError:
         messagebox.showerror("Erreur", "Veuillez entrer un montant valide.")
@@ -54,7 +69,7 @@ def add_expense(frame):
         return
 
     try:
-        montant = float(frame.var_montant.get().replace(",", "."))
+        montant = parse_amount(frame.var_montant.get())
     except ValueError:
         messagebox.showerror("Erreur", "Le montant doit etre un nombre.")
         return
@@ -63,17 +78,26 @@ def add_expense(frame):
         messagebox.showwarning("Attention", "Le montant doit etre positif.")
         return
 
+    devise_voyage = frame.data_manager.get_devise()
+    devise = frame.var_devise.get().strip().upper() or devise_voyage
+    if not CURRENCY_CODE.match(devise):
+        messagebox.showwarning("Attention", "La devise doit etre un code de trois lettres (ex: GBP).")
+        return
+
     # Creer la depense
     depense = {
         "date": frame.var_date.get() or "Non specifie",
         "categorie": frame.var_categorie.get(),
-        "montant": montant,
+        "montant": from_cents(montant),
         "description": frame.var_description.get().strip(),
         "participant": frame.var_participant.get() or "Groupe"
     }
 
+    # Devise enregistree seulement si elle differe de celle du voyage
+    if devise != devise_voyage:
+        depense["devise"] = devise
+
     frame.data_manager.add_depense(depense)
-    refresh_budget(frame)
     clear_form(frame)
 
     messagebox.showinfo("Succes", "Depense ajoutee !")
@@ -97,7 +121,6 @@ def delete_expense(frame):
 
     if confirm:
         frame.data_manager.delete_depense(frame.selected_id)
-        refresh_budget(frame)
         clear_form(frame)
 
 
@@ -113,6 +136,7 @@ def clear_form(frame):
     frame.var_montant.set("")
     frame.var_description.set("")
     frame.var_participant.set("")
+    frame.var_devise.set(frame.data_manager.get_devise())
     frame.selected_id = None
 
 
@@ -150,8 +174,9 @@ def update_categories_display(frame):
     for widget in frame.categories_container.winfo_children():
         widget.destroy()
 
-    # Obtenir les totaux par categorie
-    totaux = frame.data_manager.get_depenses_by_category()
+    # Obtenir les totaux par categorie (dans la devise du voyage)
+    totaux = frame.data_manager.get_depenses_by_category(cents=True)
+    devise = frame.data_manager.get_devise()
     total = sum(totaux.values())
 
     if total == 0:
@@ -189,7 +214,7 @@ def update_categories_display(frame):
             # Montant et pourcentage
             ttk.Label(
                 frame.categories_container,
-                text=f"{format_currency(montant)} ({pourcentage:.1f}%)",
+                text=f"{format_cents(montant, devise)} ({pourcentage:.1f}%)",
                 font=FONTS["small"]
             ).grid(row=row, column=2, sticky="w", padx=5, pady=2)
 
@@ -204,67 +229,634 @@ def update_participants_list(frame):
         frame: Le frame contenant le combobox
     """
     participants = frame.data_manager.get_participants()
-    noms = ["Groupe"] + [f"{p.get('prenom', '')} {p.get('nom', '')}" for p in participants]
+    noms = ["Groupe"] + [member_name(p) for p in participants]
     frame.participant_combo["values"] = noms
 
 
+def update_devises_list(frame):
+    """
+    Met a jour la liste des devises dans le combobox.
+
+    Args:
+        frame: Le frame contenant le combobox
+    """
+    frame.devise_combo["values"] = frame.data_manager.get_devises()
+    if not frame.var_devise.get():
+        frame.var_devise.set(frame.data_manager.get_devise())
+
+
+# ============================================
+# FONCTIONS DE PARTAGE ET REMBOURSEMENTS
+# ============================================
+
+def on_split_mode(frame, event=None):
+    """
+    Change le mode de partage des depenses (combobox).
+
+    Args:
+        frame: Le frame contenant le combobox
+        event: L'evenement (ignore)
+    """
+    labels = {label: mode for mode, label in MODES.items()}
+    mode = labels.get(frame.var_split_mode.get())
+    rule = frame.data_manager.get_split_rule()
+    if mode is None or mode == rule["mode"]:
+        return
+
+    frame.data_manager.update_split_rule({"mode": mode, "poids": rule["poids"]})
+
+
+def on_balance_select(frame, event):
+    """
+    Affiche le poids du participant selectionne dans les soldes.
+
+    Args:
+        frame: Le frame contenant le treeview des soldes
+        event: L'evenement de selection
+    """
+    selection = frame.balance_tree.selection()
+    if not selection:
+        return
+
+    rule = frame.data_manager.get_split_rule()
+    frame.var_poids.set(rule["poids"].get(selection[0], "1"))
+
+
+def apply_weight(frame):
+    """
+    Enregistre le poids du participant selectionne (mode "poids").
+
+    Args:
+        frame: Le frame contenant les variables
+    """
+    selection = frame.balance_tree.selection()
+    if not selection:
+        messagebox.showwarning("Attention", "Veuillez selectionner un participant.")
+        return
+
+    rule = frame.data_manager.get_split_rule()
+    poids = dict(rule["poids"])
+    poids[selection[0]] = frame.var_poids.get()
+    try:
+        frame.data_manager.update_split_rule({"mode": rule["mode"], "poids": poids})
+    except ValueError:
+        messagebox.showerror("Erreur", "Veuillez entrer un poids positif ou nul.")
+
+
+def load_balances_page(frame):
+    """
+    Affiche la page courante des soldes (participants par ordre
+    alphabetique).
+
+    Args:
+        frame: Le frame contenant le treeview et la pagination
+    """
+    devise = frame.data_manager.get_devise()
+    names = frame.balance_names
+    set_total(frame.balance_pager, len(names))
+    start = frame.balance_pager["offset"]
+
+    entries = []
+    for name in names[start:start + frame.balance_pager["size"]]:
+        paye, part, solde = frame.balances[name]
+        entries.append((name, name, (
+            name,
+            format_cents(paye, devise),
+            format_cents(part, devise),
+            format_cents(solde, devise),
+        )))
+    show_page(frame.balance_rows, entries)
+
+
+def update_settlement(frame):
+    """
+    Met a jour les soldes et les remboursements.
+
+    Le data_manager ne recalcule que les parts des dates modifiees: un
+    rafraichissement apres la modification d'une depense reste rapide
+    meme avec de nombreux participants et depenses.
+
+    Args:
+        frame: Le frame contenant les treeviews des remboursements
+    """
+    rule = frame.data_manager.get_split_rule()
+    frame.var_split_mode.set(MODES[rule["mode"]])
+
+    balances, transfers = frame.data_manager.get_settlement()
+    frame.balances = balances
+    frame.balance_names = sorted(balances)
+    load_balances_page(frame)
+
+    devise = frame.data_manager.get_devise()
+    show_page(frame.transfer_rows, [
+        (f"{debtor}>{creditor}", (-amount, debtor, creditor),
+         (debtor, creditor, format_cents(amount, devise)))
+        for debtor, creditor, amount in transfers
+    ])
+    frame.var_settlement.set("{} virement(s) pour solder les comptes".format(len(transfers)))
+
+
+# ============================================
+# FONCTIONS DU TABLEAU CROISE
+# ============================================
+
+# Choix "aucune dimension" des combobox du tableau croise
+NO_DIMENSION = "(aucune)"
+
+# Libelles des valeurs vides (depense sans date ou sans payeur)
+EMPTY_VALUES = {"date": "(sans date)", "participant": "(aucun)"}
+
+
+def _dimension(label):
+    """
+    Retourne la dimension d'un libelle de combobox (None: aucune).
+    """
+    for dimension, text in PIVOT_LABELS.items():
+        if text == label:
+            return dimension
+    return None
+
+
+def _value_label(dimension, value):
+    """
+    Retourne le libelle affiche d'une valeur d'une dimension.
+    """
+    if not value:
+        return EMPTY_VALUES.get(dimension, "")
+    if dimension == "date":
+        return format_date(value)
+    return value
+
+
+def _value_key(dimension, value, total):
+    """
+    Retourne la cle de tri d'une valeur: dates croissantes, sinon
+    montants decroissants.
+    """
+    if dimension == "date":
+        return (value,)
+    return (-total, value)
+
+
+def on_filter_dimension(frame, event=None):
+    """
+    Met a jour les valeurs proposees pour le filtre, puis le tableau.
+
+    Args:
+        frame: Le frame contenant les combobox du tableau croise
+        event: L'evenement (ignore)
+    """
+    dimension = _dimension(frame.var_filter_dimension.get())
+    frame.filter_values = {}
+    if dimension is not None:
+        values = frame.data_manager.get_pivot(dimension)["rows"]
+        for value in sorted(values, key=lambda v: _value_key(dimension, v, values[v])):
+            frame.filter_values[_value_label(dimension, value)] = value
+
+    frame.filter_combo["values"] = list(frame.filter_values)
+    if frame.var_filter_value.get() not in frame.filter_values:
+        frame.var_filter_value.set("")
+    on_pivot_changed(frame)
+
+
+def on_pivot_changed(frame, event=None):
+    """
+    Affiche le tableau croise depuis la premiere page (changement de
+    dimension ou de filtre).
+
+    Args:
+        frame: Le frame contenant le tableau croise
+        event: L'evenement (ignore)
+    """
+    frame.pivot_pager["offset"] = 0
+    update_pivot(frame)
+
+
+def _pivot_headings(frame, headings):
+    """
+    Change les colonnes du tableau croise si elles ont change.
+
+    Args:
+        frame: Le frame contenant le treeview du tableau croise
+        headings: Les en-tetes des colonnes (ligne, valeurs, total)
+    """
+    if headings == frame.pivot_headings:
+        return
+    frame.pivot_headings = headings
+
+    clear_rows(frame.pivot_rows)
+    tree = frame.pivot_tree
+    columns = ["c{}".format(i) for i in range(len(headings))]
+    tree["columns"] = columns
+    for i, (column, text) in enumerate(zip(columns, headings)):
+        tree.heading(column, text=text)
+        if i == 0:
+            tree.column(column, width=140, anchor="w")
+        else:
+            tree.column(column, width=90, anchor="e")
+
+
+def update_pivot(frame):
+    """
+    Met a jour le tableau croise (page courante) et la projection.
+
+    Le tableau est tire des totaux maintenus par le data_manager: aucune
+    depense n'est relue, seules les lignes modifiees de la page sont
+    touchees.
+
+    Args:
+        frame: Le frame contenant le tableau croise
+    """
+    devise = frame.data_manager.get_devise()
+    rows = _dimension(frame.var_pivot_rows.get()) or "categorie"
+    columns = _dimension(frame.var_pivot_columns.get())
+    if columns == rows:
+        columns = None
+    filters = {}
+    filter_dimension = _dimension(frame.var_filter_dimension.get())
+    if filter_dimension is not None and frame.var_filter_value.get() in frame.filter_values:
+        filters[filter_dimension] = frame.filter_values[frame.var_filter_value.get()]
+
+    table = frame.data_manager.get_pivot(rows, columns, filters)
+
+    # Colonnes: les plus fortes (dates croissantes), les autres regroupees
+    shown = []
+    others = False
+    if columns is not None:
+        totals = table["columns"]
+        shown = sorted(totals, key=lambda v: (-totals[v], v))[:PIVOT_MAX_COLUMNS]
+        others = len(totals) > len(shown)
+        shown.sort(key=lambda v: _value_key(columns, v, totals[v]))
+
+    headings = [PIVOT_LABELS[rows]] + [_value_label(columns, v) for v in shown]
+    if others:
+        headings.append("Autres")
+    headings.append("Total")
+    _pivot_headings(frame, tuple(headings))
+
+    # Lignes de la page courante
+    totals = table["rows"]
+    ordered = sorted(totals, key=lambda v: _value_key(rows, v, totals[v]))
+    set_total(frame.pivot_pager, len(ordered))
+    start = frame.pivot_pager["offset"]
+    cells = table["cells"]
+
+    entries = []
+    for value in ordered[start:start + frame.pivot_pager["size"]]:
+        total = totals[value]
+        amounts = [cells.get((value, column), 0) for column in shown]
+        values = [_value_label(rows, value)] + [format_cents(amount, devise) for amount in amounts]
+        if others:
+            values.append(format_cents(total - sum(amounts), devise))
+        values.append(format_cents(total, devise))
+        # Identifiant de ligne: le libelle (jamais vide, voir EMPTY_VALUES)
+        entries.append((values[0], _value_key(rows, value, total), tuple(values)))
+    show_page(frame.pivot_rows, entries)
+
+    frame.var_pivot_total.set("Total: {} ({} depense(s))".format(
+        format_cents(table["total"], devise), table["count"]))
+
+    update_forecast(frame)
+
+
+def update_forecast(frame):
+    """
+    Met a jour le rythme des depenses et la projection a la fin du sejour.
+
+    Args:
+        frame: Le frame contenant les variables de la projection
+    """
+    devise = frame.data_manager.get_devise()
+    forecast = frame.data_manager.get_budget_forecast()
+
+    if forecast is None:
+        frame.var_forecast.set("Dates du voyage invalides: pas de projection")
+        frame.label_forecast.configure(foreground=COLORS["warning"])
+        return
+
+    if forecast["rythme"] is None:
+        text = "Voyage pas encore commence - depenses prevues: {}".format(
+            format_cents(forecast["projection"], devise))
+    else:
+        text = "Depense: {} - Rythme: {} / jour ({} jour(s)) - Projection fin de sejour: {}".format(
+            format_cents(forecast["depense"], devise),
+            format_cents(forecast["rythme"], devise),
+            forecast["jours_ecoules"],
+            format_cents(forecast["projection"], devise))
+    text += " - Budget: {}".format(format_cents(forecast["budget"], devise))
+    frame.var_forecast.set(text)
+
+    if forecast["ecart"] < 0:
+        frame.label_forecast.configure(foreground=COLORS["danger"])
+    else:
+        frame.label_forecast.configure(foreground=COLORS["success"])
+
+
+# ============================================
+# FONCTIONS DE SIMULATION DU RISQUE
+# ============================================
+
+# Intervalle de verification de la fin de la simulation (ms)
+RISK_POLL_MS = 50
+
+
+def run_simulation(frame):
+    """
+    Lance la simulation du risque de depassement dans un thread: la
+    fenetre reste utilisable pendant la simulation.
+
+    Args:
+        frame: Le frame contenant les variables de la simulation
+    """
+    if frame.risk_queue is not None:
+        return
+
+    frame.risk_queue = queue.Queue()
+    results = frame.risk_queue
+
+    def run():
+        try:
+            results.put(("done", frame.data_manager.get_budget_risk()))
+        except Exception as e:
+            results.put(("error", e))
+
+    frame.var_risk_status.set("Simulation en cours...")
+    frame.btn_simulate.configure(state="disabled")
+    threading.Thread(target=run, name="simulation", daemon=True).start()
+    frame.after(RISK_POLL_MS, poll_simulation, frame)
+
+
+def poll_simulation(frame):
+    """
+    Affiche le resultat de la simulation quand elle est terminee.
+
+    Args:
+        frame: Le frame contenant les variables de la simulation
+    """
+    try:
+        status, result = frame.risk_queue.get_nowait()
+    except queue.Empty:
+        frame.after(RISK_POLL_MS, poll_simulation, frame)
+        return
+
+    frame.risk_queue = None
+    frame.btn_simulate.configure(state="normal")
+    if status == "error":
+        frame.var_risk_status.set("Simulation impossible")
+        messagebox.showerror("Erreur", f"Simulation impossible: {result}")
+        return
+
+    # Les donnees ont pu changer pendant la simulation
+    update_risk(frame)
+
+
+def update_risk(frame):
+    """
+    Affiche la derniere simulation si les donnees n'ont pas change depuis
+    (sinon, invite a la relancer).
+
+    Tant que l'onglet Risque est masque ou que les donnees sont en cours
+    de chargement, rien n'est lu: l'affichage est mis a jour quand
+    l'onglet apparait (voir show_risk_if_stale).
+
+    Args:
+        frame: Le frame contenant les variables de la simulation
+    """
+    if frame.risk_queue is not None:
+        return
+
+    if not frame.risk_frame.winfo_viewable() or not frame.data_manager.is_loaded():
+        frame.risk_stale = True
+        return
+    frame.risk_stale = False
+
+    result = frame.data_manager.get_budget_risk(compute=False)
+    if result is None:
+        clear_rows(frame.risk_rows)
+        frame.var_risk.set("")
+        frame.var_risk_status.set("Simulation a lancer (aucune simulation pour les donnees actuelles)")
+        return
+
+    devise = frame.data_manager.get_devise()
+    budget = result["budget"]
+    values = [("Minimum", result["minimum"])]
+    values += [("P{}".format(p), cout) for p, cout in result["percentiles"].items()]
+    values += [("Moyenne", result["moyenne"]), ("Maximum", result["maximum"])]
+    show_page(frame.risk_rows, [
+        (label, position, (label, format_cents(cout, devise), format_cents(budget - cout, devise)))
+        for position, (label, cout) in enumerate(values)
+    ])
+
+    depassement = result["depassement"] * 100
+    frame.var_risk.set("Probabilite de depasser le budget ({}): {} %".format(
+        format_cents(budget, devise), "{:.1f}".format(depassement).replace(".", ",")))
+    if depassement >= 50:
+        frame.label_risk.configure(foreground=COLORS["danger"])
+    elif depassement >= 10:
+        frame.label_risk.configure(foreground=COLORS["warning"])
+    else:
+        frame.label_risk.configure(foreground=COLORS["success"])
+
+    frame.var_risk_status.set("{} essais, {} postes incertains, depenses faites: {} ({}, {} processus, {:.1f} s)".format(
+        "{:,}".format(result["essais"]).replace(",", " "), result["postes"],
+        format_cents(result["fixe"], devise), result["moteur"], result["processus"], result["duree"]))
+
+
+def show_risk_if_stale(frame):
+    """
+    Met a jour l'onglet Risque quand il apparait, si des donnees ont
+    change pendant qu'il etait masque.
+
+    Args:
+        frame: Le frame contenant les variables de la simulation
+    """
+    if frame.risk_stale:
+        update_risk(frame)
+
+
 # ============================================
 # FONCTION DE RAFRAICHISSEMENT
 # ============================================
 
-def refresh_budget(frame):
+def expense_row(depense, devise):
     """
-    Rafraichit toutes les donnees.
+    Calcule la cle de tri et les valeurs de la ligne d'une depense.
 
     Args:
-        frame: Le frame contenant toutes les variables
+        depense: La depense
+        devise: La devise du voyage (montant d'une depense sans devise)
+
+    Returns:
+        Tuple (cle de tri, valeurs des colonnes)
     """
-    # Budget
-    budget = frame.data_manager.get_budget()
-    budget_prevu = budget.get('budget_prevu', 0)
-    frame.var_budget_prevu.set(str(budget_prevu))
+    values = (
+        depense.get('date', ''),
+        depense.get('categorie', ''),
+        format_cents(depense.cents('montant'), depense.get('devise') or devise),
+        depense.get('description', ''),
+        depense.get('participant', '')
+    )
+    return date_ordinal(depense.get('date')), values
 
-    # Total depenses
-    total = frame.data_manager.get_total_depenses()
-    frame.var_total_depenses.set(format_currency(total))
+
+def update_totals(frame):
+    """
+    Met a jour le total des depenses et le budget restant.
+
+    Args:
+        frame: Le frame contenant les variables des totaux
+    """
+    # Montants en centimes (exacts), dans la devise du voyage
+    budget_prevu = frame.data_manager.get_budget_prevu(cents=True)
+    devise = frame.data_manager.get_devise()
+
+    # Total depenses (maintenu par le data_manager, converti)
+    total = frame.data_manager.get_total_depenses(cents=True)
+    text = format_cents(total, devise)
+    unconverted = frame.data_manager.get_unconverted_count()
+    if unconverted:
+        text += f" (+{unconverted} sans taux)"
+    frame.var_total_depenses.set(text)
 
     # Restant
     restant = budget_prevu - total
-    frame.var_budget_restant.set(format_currency(restant))
+    frame.var_budget_restant.set(format_cents(restant, devise))
 
-    # Couleur selon le restant
+    # Couleur selon le restant (moins de 20 % du budget: avertissement)
     if restant < 0:
         frame.label_restant.configure(foreground=COLORS["danger"])
-    elif restant < budget_prevu * 0.2:
+    elif restant * 5 < budget_prevu:
         frame.label_restant.configure(foreground=COLORS["warning"])
     else:
         frame.label_restant.configure(foreground=COLORS["success"])
 
-    # Vider le tableau
-    for item in frame.tree.get_children():
-        frame.tree.delete(item)
-
-    # Remplir le tableau
-    depenses = frame.data_manager.get_depenses()
-    for dep in sorted(depenses, key=lambda x: x.get('date', ''), reverse=True):
-        frame.tree.insert(
-            "",
-            "end",
-            values=(
-                dep.get('date', ''),
-                dep.get('categorie', ''),
-                format_currency(dep.get('montant', 0)),
-                dep.get('description', ''),
-                dep.get('participant', '')
-            ),
-            tags=(dep.get('id'),)
-        )
+
+def load_page(frame):
+    """
+    Affiche la page courante des depenses (dates decroissantes).
+
+    Seule la page affichee est demandee au data_manager, dans l'ordre
+    des dates qu'il maintient (aucun tri ici).
+
+    Args:
+        frame: Le frame contenant le treeview et la pagination
+    """
+    set_total(frame.pager, frame.data_manager.count_depenses())
+    depenses = frame.data_manager.query_depenses(
+        descending=True,
+        limit=frame.pager["size"],
+        offset=frame.pager["offset"]
+    )
+    show_page(frame.rows, [(dep.get('id'),) + cached_row(frame.row_cache, dep) for dep in depenses])
+
+
+def show_item(frame, item_id):
+    """
+    Affiche la page qui contient une depense et selectionne sa ligne
+    (resultat de la recherche globale).
+
+    Args:
+        frame: Le frame contenant le treeview et la pagination
+        item_id: L'ID de l'element
+    """
+    position = frame.data_manager.query_position('depenses', item_id, descending=True)
+    if position is None:
+        return
+    show_position(frame.pager, position)
+    select_row(frame.rows, item_id)
+
+
+def refresh_budget(frame):
+    """
+    Rafraichit toutes les donnees.
+
+    Args:
+        frame: Le frame contenant toutes les variables
+    """
+    # Budget
+    frame.var_budget_prevu.set(str(frame.data_manager.get_budget_prevu()))
+
+    # Total et restant
+    update_totals(frame)
+
+    # Remplir le tableau (page courante, dates decroissantes)
+    load_page(frame)
 
     # Mettre a jour les categories
     update_categories_display(frame)
 
-    # Mettre a jour les participants
+    # Mettre a jour les participants et les devises
     update_participants_list(frame)
+    update_devises_list(frame)
+
+    # Soldes et remboursements
+    update_settlement(frame)
+
+    # Tableau croise et projection
+    on_filter_dimension(frame)
+
+    # Derniere simulation du risque
+    update_risk(frame)
+
+
+def on_data_changed(frame, batch):
+    """
+    Met a jour uniquement les lignes et les totaux concernes.
+
+    Appelee par le bus d'evenements (dans le thread Tk).
+
+    Args:
+        frame: Le frame contenant toutes les variables
+        batch: Le lot d'evenements (tuple de ChangeEvent)
+    """
+    depenses_changed = False
+    budget_changed = False
+    participants_changed = False
+    rates_changed = False
+    split_changed = False
+    trip_changed = False
+    estimates_changed = False
+
+    for event in batch:
+        if event.collection == 'depenses':
+            depenses_changed = True
+        elif event.collection == 'budget_prevu':
+            frame.var_budget_prevu.set(str(event.after))
+            budget_changed = True
+        elif event.collection == 'participants':
+            participants_changed = True
+        elif event.collection == 'taux_de_change':
+            rates_changed = True
+        elif event.collection == 'partage':
+            split_changed = True
+        elif event.collection == 'voyage_info':
+            trip_changed = True
+        elif event.collection in ('activites', 'transport'):
+            estimates_changed = True
+
+    if depenses_changed or budget_changed or rates_changed:
+        update_totals(frame)
+    if depenses_changed:
+        # Relire la page: seules les lignes modifiees sont touchees
+        load_page(frame)
+    if depenses_changed or rates_changed:
+        # Totaux reconvertis par le data_manager (les lignes gardent
+        # le montant dans la devise de chaque depense)
+        update_categories_display(frame)
+    if participants_changed:
+        update_participants_list(frame)
+    if rates_changed:
+        update_devises_list(frame)
+    if depenses_changed or participants_changed or rates_changed or split_changed:
+        update_settlement(frame)
+    if depenses_changed or rates_changed:
+        # Tableaux croises mis a jour par le data_manager
+        update_pivot(frame)
+    elif budget_changed or trip_changed:
+        update_forecast(frame)
+    if depenses_changed or rates_changed or budget_changed or trip_changed or estimates_changed:
+        # Derniere simulation gardee tant que ses donnees n'ont pas change
+        update_risk(frame)
 
 
 # ============================================
@@ -298,12 +890,36 @@ def BudgetFrame(parent, data_manager):
     frame.var_montant = tk.StringVar()
     frame.var_description = tk.StringVar()
     frame.var_participant = tk.StringVar()
+    frame.var_devise = tk.StringVar()
 
     # Variables du budget
     frame.var_budget_prevu = tk.StringVar()
     frame.var_total_depenses = tk.StringVar(value="0,00 EUR")
     frame.var_budget_restant = tk.StringVar(value="0,00 EUR")
 
+    # Variables des remboursements
+    frame.var_split_mode = tk.StringVar()
+    frame.var_poids = tk.StringVar()
+    frame.var_settlement = tk.StringVar()
+    frame.balances = {}
+    frame.balance_names = []
+
+    # Variables du tableau croise
+    frame.var_pivot_rows = tk.StringVar(value=PIVOT_LABELS["categorie"])
+    frame.var_pivot_columns = tk.StringVar(value=NO_DIMENSION)
+    frame.var_filter_dimension = tk.StringVar(value=NO_DIMENSION)
+    frame.var_filter_value = tk.StringVar()
+    frame.var_pivot_total = tk.StringVar()
+    frame.var_forecast = tk.StringVar()
+    frame.filter_values = {}
+    frame.pivot_headings = None
+
+    # Variables de la simulation du risque
+    frame.var_risk = tk.StringVar()
+    frame.var_risk_status = tk.StringVar()
+    frame.risk_queue = None
+    frame.risk_stale = True
+
     # Configuration du grid principal
     frame.columnconfigure(0, weight=1)
     frame.columnconfigure(1, weight=2)
@@ -404,13 +1020,21 @@ def BudgetFrame(parent, data_manager):
     )
     categorie_combo.grid(row=0, column=3, sticky="w", padx=5, pady=5)
 
-    ttk.Label(form_frame, text="Montant (EUR):").grid(
+    ttk.Label(form_frame, text="Montant:").grid(
         row=0, column=4, sticky="e", padx=5, pady=5
     )
     ttk.Entry(form_frame, textvariable=frame.var_montant, width=12).grid(
         row=0, column=5, sticky="w", padx=5, pady=5
     )
 
+    frame.devise_combo = ttk.Combobox(
+        form_frame,
+        textvariable=frame.var_devise,
+        values=CURRENCIES,
+        width=5
+    )
+    frame.devise_combo.grid(row=0, column=6, sticky="w", padx=5, pady=5)
+
     # Ligne 2: Description, Participant
     ttk.Label(form_frame, text="Description:").grid(
         row=1, column=0, sticky="e", padx=5, pady=5
@@ -432,7 +1056,7 @@ def BudgetFrame(parent, data_manager):
 
     # Ligne 3: Boutons
     btn_frame = ttk.Frame(form_frame)
-    btn_frame.grid(row=2, column=0, columnspan=6, pady=10)
+    btn_frame.grid(row=2, column=0, columnspan=7, pady=10)
 
     ttk.Button(
         btn_frame,
@@ -497,9 +1121,19 @@ def BudgetFrame(parent, data_manager):
     scrollbar.grid(row=0, column=1, sticky="ns")
     frame.tree.configure(yscrollcommand=scrollbar.set)
 
+    # Pagination (seule la page affichee est lue)
+    frame.pager = create_pager(table_frame, lambda: load_page(frame))
+    frame.pager["bar"].grid(row=1, column=0, columnspan=2, pady=(5, 0))
+
     # Selection
     frame.tree.bind("<<TreeviewSelect>>", lambda e: on_select(frame, e))
 
+    # Ordre de tri des lignes de la page (dates decroissantes, mises a
+    # jour une par une)
+    frame.rows = create_rows(frame.tree, reverse=True)
+    frame.row_cache = create_row_cache(
+        lambda depense: expense_row(depense, frame.data_manager.get_devise()))
+
     # ============================================
     # REPARTITION PAR CATEGORIE (utilise GRID)
     # ============================================
@@ -515,13 +1149,215 @@ def BudgetFrame(parent, data_manager):
     frame.categories_container.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
     frame.categories_container.columnconfigure(1, weight=1)
 
+    # ============================================
+    # REMBOURSEMENTS (utilise GRID)
+    # ============================================
+
+    # Remboursements, analyse et risque: trois onglets sous les depenses
+    details = ttk.Notebook(frame)
+    details.grid(row=3, column=0, columnspan=2, sticky="ew", padx=10, pady=(0, 10))
+
+    settle_frame = ttk.Frame(details, padding=10)
+    details.add(settle_frame, text="Remboursements")
+
+    settle_frame.columnconfigure(0, weight=1)
+    settle_frame.columnconfigure(1, weight=1)
+
+    # Regle de partage et poids du participant selectionne
+    rule_frame = ttk.Frame(settle_frame)
+    rule_frame.grid(row=0, column=0, columnspan=2, sticky="w", pady=(0, 5))
+
+    ttk.Label(rule_frame, text="Partage:").pack(side="left", padx=5)
+    split_combo = ttk.Combobox(
+        rule_frame,
+        textvariable=frame.var_split_mode,
+        values=list(MODES.values()),
+        width=20,
+        state="readonly"
+    )
+    split_combo.pack(side="left", padx=5)
+    split_combo.bind("<<ComboboxSelected>>", lambda e: on_split_mode(frame, e))
+
+    ttk.Label(rule_frame, text="Poids:").pack(side="left", padx=(20, 5))
+    ttk.Entry(rule_frame, textvariable=frame.var_poids, width=6).pack(side="left")
+    ttk.Button(
+        rule_frame,
+        text="Appliquer",
+        command=lambda: apply_weight(frame)
+    ).pack(side="left", padx=5)
+
+    ttk.Label(
+        rule_frame,
+        textvariable=frame.var_settlement,
+        font=FONTS["small"]
+    ).pack(side="left", padx=20)
+
+    # Soldes des participants
+    frame.balance_tree = ttk.Treeview(
+        settle_frame,
+        columns=("participant", "paye", "part", "solde"),
+        show="headings",
+        selectmode="browse",
+        height=6
+    )
+    frame.balance_tree.heading("participant", text="Participant")
+    frame.balance_tree.heading("paye", text="Paye")
+    frame.balance_tree.heading("part", text="Part")
+    frame.balance_tree.heading("solde", text="Solde")
+    frame.balance_tree.column("participant", width=150)
+    for column in ("paye", "part", "solde"):
+        frame.balance_tree.column(column, width=100, anchor="e")
+    frame.balance_tree.grid(row=1, column=0, sticky="nsew", padx=(0, 5))
+    frame.balance_tree.bind("<<TreeviewSelect>>", lambda e: on_balance_select(frame, e))
+
+    frame.balance_pager = create_pager(settle_frame, lambda: load_balances_page(frame))
+    frame.balance_pager["bar"].grid(row=2, column=0, pady=(5, 0))
+    frame.balance_rows = create_rows(frame.balance_tree)
+
+    # Virements a faire (montants decroissants)
+    frame.transfer_tree = ttk.Treeview(
+        settle_frame,
+        columns=("de", "a", "montant"),
+        show="headings",
+        selectmode="browse",
+        height=6
+    )
+    frame.transfer_tree.heading("de", text="De")
+    frame.transfer_tree.heading("a", text="A")
+    frame.transfer_tree.heading("montant", text="Montant")
+    frame.transfer_tree.column("de", width=150)
+    frame.transfer_tree.column("a", width=150)
+    frame.transfer_tree.column("montant", width=100, anchor="e")
+    frame.transfer_tree.grid(row=1, column=1, sticky="nsew", padx=(5, 0))
+    frame.transfer_rows = create_rows(frame.transfer_tree)
+
+    # ============================================
+    # ANALYSE DU BUDGET (utilise GRID)
+    # ============================================
+
+    pivot_frame = ttk.Frame(details, padding=10)
+    details.add(pivot_frame, text="Analyse")
+
+    pivot_frame.columnconfigure(0, weight=1)
+
+    # Dimensions en lignes et en colonnes, filtre sur une dimension
+    controls = ttk.Frame(pivot_frame)
+    controls.grid(row=0, column=0, columnspan=2, sticky="w", pady=(0, 5))
+
+    dimensions = list(PIVOT_LABELS.values())
+
+    ttk.Label(controls, text="Lignes:").pack(side="left", padx=5)
+    rows_combo = ttk.Combobox(
+        controls, textvariable=frame.var_pivot_rows,
+        values=dimensions, width=12, state="readonly"
+    )
+    rows_combo.pack(side="left", padx=5)
+    rows_combo.bind("<<ComboboxSelected>>", lambda e: on_pivot_changed(frame, e))
+
+    ttk.Label(controls, text="Colonnes:").pack(side="left", padx=(15, 5))
+    columns_combo = ttk.Combobox(
+        controls, textvariable=frame.var_pivot_columns,
+        values=[NO_DIMENSION] + dimensions, width=12, state="readonly"
+    )
+    columns_combo.pack(side="left", padx=5)
+    columns_combo.bind("<<ComboboxSelected>>", lambda e: on_pivot_changed(frame, e))
+
+    ttk.Label(controls, text="Filtre:").pack(side="left", padx=(15, 5))
+    filter_dimension_combo = ttk.Combobox(
+        controls, textvariable=frame.var_filter_dimension,
+        values=[NO_DIMENSION] + dimensions, width=12, state="readonly"
+    )
+    filter_dimension_combo.pack(side="left", padx=5)
+    filter_dimension_combo.bind("<<ComboboxSelected>>", lambda e: on_filter_dimension(frame, e))
+
+    ttk.Label(controls, text="=").pack(side="left")
+    frame.filter_combo = ttk.Combobox(
+        controls, textvariable=frame.var_filter_value, width=20, state="readonly"
+    )
+    frame.filter_combo.pack(side="left", padx=5)
+    frame.filter_combo.bind("<<ComboboxSelected>>", lambda e: on_pivot_changed(frame, e))
+
+    ttk.Label(
+        controls,
+        textvariable=frame.var_pivot_total,
+        font=FONTS["small"]
+    ).pack(side="left", padx=15)
+
+    # Tableau croise (colonnes definies a l'affichage)
+    frame.pivot_tree = ttk.Treeview(pivot_frame, show="headings", selectmode="browse", height=6)
+    frame.pivot_tree.grid(row=1, column=0, sticky="nsew")
+
+    pivot_scrollbar = ttk.Scrollbar(pivot_frame, orient="horizontal", command=frame.pivot_tree.xview)
+    pivot_scrollbar.grid(row=2, column=0, sticky="ew")
+    frame.pivot_tree.configure(xscrollcommand=pivot_scrollbar.set)
+
+    frame.pivot_pager = create_pager(pivot_frame, lambda: update_pivot(frame))
+    frame.pivot_pager["bar"].grid(row=3, column=0, pady=(5, 0))
+    frame.pivot_rows = create_rows(frame.pivot_tree)
+
+    # Rythme des depenses et projection a la fin du sejour
+    frame.label_forecast = ttk.Label(pivot_frame, textvariable=frame.var_forecast)
+    frame.label_forecast.grid(row=4, column=0, sticky="w", pady=(5, 0))
+
+    # ============================================
+    # RISQUE DE DEPASSEMENT (utilise GRID)
+    # ============================================
+
+    risk_frame = ttk.Frame(details, padding=10)
+    details.add(risk_frame, text="Risque")
+    frame.risk_frame = risk_frame
+
+    # Onglet Risque affiche (dans les details, ou onglet Budget choisi)
+    risk_frame.bind("<Map>", lambda e: show_risk_if_stale(frame))
+    frame.bind("<Map>", lambda e: show_risk_if_stale(frame))
+
+    risk_frame.columnconfigure(1, weight=1)
+
+    frame.btn_simulate = ttk.Button(
+        risk_frame,
+        text="Lancer la simulation",
+        command=lambda: run_simulation(frame)
+    )
+    frame.btn_simulate.grid(row=0, column=0, sticky="w", padx=(0, 10))
+
+    frame.label_risk = ttk.Label(risk_frame, textvariable=frame.var_risk, font=FONTS["body_bold"])
+    frame.label_risk.grid(row=0, column=1, sticky="w")
+
+    # Cout simule: percentiles et marge restante par rapport au budget
+    risk_columns = ("valeur", "cout", "marge")
+    frame.risk_tree = ttk.Treeview(
+        risk_frame, columns=risk_columns, show="headings", selectmode="none", height=7
+    )
+    frame.risk_tree.heading("valeur", text="Cout simule")
+    frame.risk_tree.heading("cout", text="Cout total")
+    frame.risk_tree.heading("marge", text="Reste du budget")
+    frame.risk_tree.column("valeur", width=100)
+    frame.risk_tree.column("cout", width=130, anchor="e")
+    frame.risk_tree.column("marge", width=130, anchor="e")
+    frame.risk_tree.grid(row=1, column=0, columnspan=2, sticky="w", pady=5)
+    frame.risk_rows = create_rows(frame.risk_tree)
+
+    ttk.Label(
+        risk_frame,
+        textvariable=frame.var_risk_status,
+        font=FONTS["small"]
+    ).grid(row=2, column=0, columnspan=2, sticky="w")
+
     # ============================================
     # ATTACHER LA METHODE REFRESH AU FRAME
     # ============================================
 
     frame.refresh = lambda: refresh_budget(frame)
 
-    # Charger les donnees initiales
-    frame.refresh()
+    # Afficher un element trouve par la recherche globale (main.py)
+    frame.show_item = lambda item_id: show_item(frame, item_id)
+
+    # Mettre a jour les lignes et totaux a chaque evenement du data_manager
+    frame.data_manager.subscribe(lambda batch: on_data_changed(frame, batch))
+
+    # Charger les donnees initiales (sinon main.py rafraichit le frame
+    # a la fin du chargement)
+    if frame.data_manager.is_loaded():
+        frame.refresh()
 
     return frame
@@ -10,6 +10,7 @@ IMPORTANT: Ce frame utilise les gestionnaires PACK et GRID combines
 pour demontrer l'utilisation mixte des layouts.
 """
 
+import bisect
 import tkinter as tk
 from tkinter import ttk, messagebox
 
@@ -18,6 +19,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import COLORS, FONTS, CHECKLIST_CATEGORIES
+from events import is_reload
 
 
 # ============================================
@@ -75,12 +77,9 @@ def add_item(frame):
 
     frame.data_manager.add_checklist_item(item)
 
-    # Vider le champ
+    # Vider le champ (la liste est mise a jour par on_data_changed)
     frame.var_item.set("")
 
-    # Rafraichir
-    refresh_checklist(frame)
-
 
 def toggle_item(frame, item_id):
     """
@@ -91,7 +90,6 @@ def toggle_item(frame, item_id):
         item_id: L'ID de l'item a inverser
     """
     frame.data_manager.toggle_checklist_item(item_id)
-    update_progress(frame)
 
 
 def delete_item(frame, item_id):
@@ -103,7 +101,6 @@ def delete_item(frame, item_id):
         item_id: L'ID de l'item a supprimer
     """
     frame.data_manager.delete_checklist_item(item_id)
-    refresh_checklist(frame)
 
 
 def check_all(frame):
@@ -114,12 +111,7 @@ def check_all(frame):
         frame: Le frame contenant le data_manager
     """
     checklist = frame.data_manager.get_checklist()
-
-    for item in checklist:
-        if not item.get('checked', False):
-            frame.data_manager.toggle_checklist_item(item['id'])
-
-    refresh_checklist(frame)
+    frame.data_manager.set_checklist_checked([item['id'] for item in checklist], True)
 
 
 def uncheck_all(frame):
@@ -130,12 +122,7 @@ def uncheck_all(frame):
         frame: Le frame contenant le data_manager
     """
     checklist = frame.data_manager.get_checklist()
-
-    for item in checklist:
-        if item.get('checked', False):
-            frame.data_manager.toggle_checklist_item(item['id'])
-
-    refresh_checklist(frame)
+    frame.data_manager.set_checklist_checked([item['id'] for item in checklist], False)
 
 
 def delete_checked(frame):
@@ -158,10 +145,7 @@ def delete_checked(frame):
     )
 
     if confirm:
-        for item in checked_items:
-            frame.data_manager.delete_checklist_item(item['id'])
-
-        refresh_checklist(frame)
+        frame.data_manager.delete_checklist_items([item['id'] for item in checked_items])
 
 
 # ============================================
@@ -181,12 +165,177 @@ def update_progress(frame):
     frame.var_progress_text.set("{}/{} items coches".format(checked, total))
     frame.progressbar["value"] = percentage
 
-    # Mettre a jour les checkbuttons
-    checklist = frame.data_manager.get_checklist()
-    for item in checklist:
-        item_id = item.get('id')
-        if item_id in frame.checkbuttons:
-            frame.checkbuttons[item_id].set(item.get('checked', False))
+
+def _category_section(frame, categorie):
+    """
+    Retourne la section d'une categorie dans la liste, creee au besoin.
+
+    Chaque categorie a son propre frame, place a sa ligne fixe de la
+    grille (ordre de CHECKLIST_CATEGORIES): ajouter ou retirer une
+    categorie ne deplace pas les autres.
+
+    Args:
+        frame: Le frame contenant les widgets
+        categorie: La categorie (dans CHECKLIST_CATEGORIES)
+
+    Returns:
+        Dictionnaire (frame, label, items: frame des lignes, ids: IDs
+        affiches par ordre croissant, checked, total)
+    """
+    section = frame.sections.get(categorie)
+    if section is not None:
+        return section
+
+    container = tk.Frame(frame.items_frame, bg="white")
+    container.grid(row=CHECKLIST_CATEGORIES.index(categorie), column=0, sticky="ew")
+
+    # En-tete de categorie (avec son compteur)
+    label = tk.Label(
+        container,
+        font=FONTS["heading"],
+        bg="white",
+        fg=COLORS["secondary"]
+    )
+    label.pack(anchor="w", padx=10, pady=(15, 5))
+
+    # Separateur
+    ttk.Separator(container, orient="horizontal").pack(fill="x", padx=10)
+
+    items = tk.Frame(container, bg="white")
+    items.pack(fill="x")
+
+    section = {"frame": container, "label": label, "items": items,
+               "ids": [], "checked": 0, "total": 0}
+    frame.sections[categorie] = section
+    return section
+
+
+def _update_category_label(frame, categorie):
+    """
+    Met a jour l'en-tete d'une categorie (items coches / items).
+    """
+    section = frame.sections[categorie]
+    section["label"].config(text="{} {} ({}/{})".format(
+        get_category_icon(categorie), categorie, section["checked"], section["total"]))
+
+
+def _add_item_row(frame, item):
+    """
+    Ajoute la ligne d'un item (case a cocher et bouton supprimer) a sa
+    place dans sa categorie, et met a jour le compteur de la categorie.
+
+    Args:
+        frame: Le frame contenant les widgets
+        item: L'item (dictionnaire)
+    """
+    categorie = item.get('categorie', 'Autre')
+    if categorie not in CHECKLIST_CATEGORIES:
+        return
+
+    item_id = item.get('id')
+    checked = bool(item.get('checked', False))
+    if item_id in frame.item_states:
+        _remove_item_row(frame, item_id)
+    section = _category_section(frame, categorie)
+
+    row = tk.Frame(section["items"], bg="white")
+
+    # Variable pour la checkbox
+    var = tk.BooleanVar(value=checked)
+    frame.checkbuttons[item_id] = var
+
+    # Checkbox avec le texte
+    cb = tk.Checkbutton(
+        row,
+        text=item.get('item', ''),
+        variable=var,
+        font=FONTS["body"],
+        bg="white",
+        activebackground="white",
+        command=lambda: toggle_item(frame, item_id)
+    )
+    cb.pack(side="left", padx=20, pady=2)
+    frame.item_widgets[item_id] = cb
+
+    # Bouton supprimer
+    tk.Button(
+        row,
+        text="X",
+        font=("Segoe UI", 8),
+        bg="white",
+        relief="flat",
+        cursor="hand2",
+        command=lambda: delete_item(frame, item_id)
+    ).pack(side="right", padx=10)
+
+    # Ordre des IDs (ordre d'ajout): un nouvel item va a la fin
+    ids = section["ids"]
+    position = bisect.bisect_left(ids, item_id)
+    if position < len(ids):
+        row.pack(fill="x", before=frame.item_rows[ids[position]])
+    else:
+        row.pack(fill="x")
+    ids.insert(position, item_id)
+
+    frame.item_rows[item_id] = row
+    frame.item_states[item_id] = (categorie, checked)
+    section["total"] += 1
+    section["checked"] += checked
+    _update_category_label(frame, categorie)
+
+
+def _remove_item_row(frame, item_id):
+    """
+    Retire la ligne d'un item (et sa categorie si elle est vide).
+
+    Args:
+        frame: Le frame contenant les widgets
+        item_id: L'ID de l'item
+    """
+    state = frame.item_states.pop(item_id, None)
+    if state is None:
+        return
+
+    categorie, checked = state
+    frame.item_rows.pop(item_id).destroy()
+    frame.item_widgets.pop(item_id, None)
+    frame.checkbuttons.pop(item_id, None)
+
+    section = frame.sections[categorie]
+    section["ids"].remove(item_id)
+    section["total"] -= 1
+    section["checked"] -= checked
+    if section["total"]:
+        _update_category_label(frame, categorie)
+    else:
+        section["frame"].destroy()
+        del frame.sections[categorie]
+
+
+def _set_item_checked(frame, item_id, checked):
+    """
+    Coche ou decoche la case d'un item et met a jour le compteur de sa
+    categorie.
+    """
+    state = frame.item_states.get(item_id)
+    if state is None or state[1] == checked:
+        return
+
+    categorie = state[0]
+    frame.checkbuttons[item_id].set(checked)
+    frame.item_states[item_id] = (categorie, checked)
+    frame.sections[categorie]["checked"] += 1 if checked else -1
+    _update_category_label(frame, categorie)
+
+
+def _update_empty_label(frame):
+    """
+    Affiche le message de liste vide s'il n'y a aucun item.
+    """
+    if frame.sections:
+        frame.empty_label.grid_remove()
+    else:
+        frame.empty_label.grid()
 
 
 def refresh_checklist(frame):
@@ -197,95 +346,95 @@ def refresh_checklist(frame):
         frame: Le frame contenant le data_manager et les widgets
     """
     # Nettoyer
-    for widget in frame.items_frame.winfo_children():
-        widget.destroy()
+    for section in frame.sections.values():
+        section["frame"].destroy()
 
+    frame.sections.clear()
     frame.checkbuttons.clear()
+    frame.item_widgets.clear()
+    frame.item_rows.clear()
+    frame.item_states.clear()
 
-    # Recuperer les items
-    checklist = frame.data_manager.get_checklist()
+    # Afficher par categorie (dans l'ordre des IDs)
+    for item in frame.data_manager.get_checklist():
+        _add_item_row(frame, item)
 
-    # Organiser par categorie
-    by_category = {}
-    for item in checklist:
-        cat = item.get('categorie', 'Autre')
-        if cat not in by_category:
-            by_category[cat] = []
-        by_category[cat].append(item)
+    _update_empty_label(frame)
 
-    # Afficher par categorie
-    row = 0
+    # Mettre a jour la progression
+    update_progress(frame)
 
-    for categorie in CHECKLIST_CATEGORIES:
-        items = by_category.get(categorie, [])
 
-        if not items:
+def show_item(frame, item_id):
+    """
+    Fait defiler la liste jusqu'a un item et le met en evidence
+    (resultat de la recherche globale).
+
+    Args:
+        frame: Le frame contenant les widgets
+        item_id: L'ID de l'item
+    """
+    cb = frame.item_widgets.get(item_id)
+    if cb is None:
+        return
+
+    frame.items_frame.update_idletasks()
+    height = frame.items_frame.winfo_height()
+    if height > 0:
+        y = cb.winfo_rooty() - frame.items_frame.winfo_rooty()
+        frame.canvas.yview_moveto(y / height)
+    cb.focus_set()
+    cb.flash()
+
+
+def on_data_changed(frame, batch):
+    """
+    Met a jour la checklist selon les evenements du data_manager.
+
+    Seules les lignes des items ajoutes, modifies ou supprimes sont
+    creees, modifiees ou detruites, avec le compteur de leur categorie;
+    la progression est relue une fois par lot. Apres un rechargement
+    complet, main.py reconstruit la liste (refresh_checklist). Appelee
+    par le bus d'evenements (dans le thread Tk).
+
+    Args:
+        frame: Le frame contenant les widgets
+        batch: Le lot d'evenements (tuple de ChangeEvent)
+    """
+    if is_reload(batch):
+        # Liste reconstruite par main.py (frame.refresh)
+        return
+
+    changed = False
+
+    for event in batch:
+        if event.collection != 'checklist':
             continue
 
-        # En-tete de categorie
-        icon = get_category_icon(categorie)
-        cat_label = tk.Label(
-            frame.items_frame,
-            text="{} {}".format(icon, categorie),
-            font=FONTS["heading"],
-            bg="white",
-            fg=COLORS["secondary"]
-        )
-        cat_label.grid(row=row, column=0, columnspan=3, sticky="w", padx=10, pady=(15, 5))
-        row += 1
-
-        # Separateur
-        sep = ttk.Separator(frame.items_frame, orient="horizontal")
-        sep.grid(row=row, column=0, columnspan=3, sticky="ew", padx=10)
-        row += 1
-
-        # Items de cette categorie
-        for item in items:
-            item_id = item.get('id')
-
-            # Variable pour la checkbox
-            var = tk.BooleanVar(value=item.get('checked', False))
-            frame.checkbuttons[item_id] = var
-
-            # Checkbox avec le texte
-            cb = tk.Checkbutton(
-                frame.items_frame,
-                text=item.get('item', ''),
-                variable=var,
-                font=FONTS["body"],
-                bg="white",
-                activebackground="white",
-                command=lambda iid=item_id: toggle_item(frame, iid)
-            )
-            cb.grid(row=row, column=0, columnspan=2, sticky="w", padx=20, pady=2)
-
-            # Bouton supprimer
-            del_btn = tk.Button(
-                frame.items_frame,
-                text="X",
-                font=("Segoe UI", 8),
-                bg="white",
-                relief="flat",
-                cursor="hand2",
-                command=lambda iid=item_id: delete_item(frame, iid)
-            )
-            del_btn.grid(row=row, column=2, sticky="e", padx=10)
-
-            row += 1
-
-    # Si aucun item
-    if not checklist:
-        tk.Label(
-            frame.items_frame,
-            text="Aucun item dans la checklist.\nAjoutez des affaires a emporter !",
-            font=FONTS["body"],
-            bg="white",
-            fg="#666666",
-            justify="center"
-        ).grid(row=0, column=0, pady=50, padx=50)
+        if event.op == 'add':
+            _add_item_row(frame, event.after)
+        elif event.op == 'delete':
+            _remove_item_row(frame, event.id)
+        elif event.op == 'patch':
+            # Seuls les champs modifies (checked)
+            if 'checked' in event.after:
+                _set_item_checked(frame, event.id, bool(event.after['checked']))
+        elif event.op == 'update':
+            state = frame.item_states.get(event.id)
+            if state is not None and state[0] == event.after.get('categorie', 'Autre'):
+                frame.item_widgets[event.id].config(text=event.after.get('item', ''))
+                _set_item_checked(frame, event.id, bool(event.after.get('checked', False)))
+            else:
+                # Autre categorie: la ligne change de section
+                _remove_item_row(frame, event.id)
+                _add_item_row(frame, event.after)
+        else:
+            continue
+        changed = True
 
-    # Mettre a jour la progression
-    update_progress(frame)
+    if changed:
+        _update_empty_label(frame)
+        update_progress(frame)
 
 
 # ============================================
@@ -313,6 +462,10 @@ def ChecklistFrame(parent, data_manager):
     # Stocker les references
     frame.data_manager = data_manager
     frame.checkbuttons = {}
+    frame.item_widgets = {}
+    frame.item_rows = {}
+    frame.item_states = {}      # ID -> (categorie, coche)
+    frame.sections = {}         # categorie -> section (voir _category_section)
 
     # Variables
     frame.var_item = tk.StringVar()
@@ -433,9 +586,22 @@ def ChecklistFrame(parent, data_manager):
 
     # Canvas pour le scroll
     canvas = tk.Canvas(list_frame, bg="white", highlightthickness=1, highlightbackground=COLORS["border"])
+    frame.canvas = canvas
     scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=canvas.yview)
 
     frame.items_frame = ttk.Frame(canvas)
+    frame.items_frame.columnconfigure(0, weight=1)
+
+    # Message affiche quand la liste est vide
+    frame.empty_label = tk.Label(
+        frame.items_frame,
+        text="Aucun item dans la checklist.\nAjoutez des affaires a emporter !",
+        font=FONTS["body"],
+        bg="white",
+        fg="#666666",
+        justify="center"
+    )
+    frame.empty_label.grid(row=len(CHECKLIST_CATEGORIES), column=0, pady=50, padx=50)
 
     # Configurer le scroll
     frame.items_frame.bind(
@@ -480,7 +646,15 @@ def ChecklistFrame(parent, data_manager):
 
     frame.refresh = lambda: refresh_checklist(frame)
 
-    # Charger les donnees initiales
-    frame.refresh()
+    # Afficher un item trouve par la recherche globale (main.py)
+    frame.show_item = lambda item_id: show_item(frame, item_id)
+
+    # Mettre a jour la checklist a chaque evenement du data_manager
+    frame.data_manager.subscribe(lambda batch: on_data_changed(frame, batch))
+
+    # Charger les donnees initiales (sinon main.py rafraichit le frame
+    # a la fin du chargement)
+    if frame.data_manager.is_loaded():
+        frame.refresh()
 
     return frame
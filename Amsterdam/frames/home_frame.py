@@ -17,7 +17,7 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import COLORS, FONTS, get_days_until_departure, format_date, format_currency
+from config import COLORS, FONTS, get_days_until_departure, format_date, format_cents
 
 
 # ============================================
@@ -138,7 +138,10 @@ def update_countdown(frame, countdown_var):
         frame: Le frame parent (pour planifier la prochaine mise a jour)
         countdown_var: La variable StringVar pour afficher le resultat
     """
-    days = get_days_until_departure()
+    try:
+        days = get_days_until_departure(frame.date_depart)
+    except ValueError:
+        days = get_days_until_departure()
 
     if days > 0:
         countdown_var.set(f"{days} jours")
@@ -155,6 +158,56 @@ def update_countdown(frame, countdown_var):
 # FONCTION POUR RAFRAICHIR LES DONNEES
 # ============================================
 
+def update_budget_card(frame):
+    """
+    Met a jour le budget restant.
+
+    Args:
+        frame: Le frame contenant les variables des statistiques
+    """
+    data_manager = frame.data_manager
+
+    # Le total des depenses est maintenu (en centimes, dans la devise du
+    # voyage): l'historique n'est pas relu
+    budget_prevu = data_manager.get_budget_prevu(cents=True)
+    total_depenses = data_manager.get_total_depenses(cents=True)
+    reste = budget_prevu - total_depenses
+    frame.stats_vars["budget"].set(format_cents(reste, data_manager.get_devise()))
+
+
+def update_voyage_info(frame):
+    """
+    Met a jour la destination, les dates et le compte a rebours.
+
+    Args:
+        frame: Le frame contenant les variables d'information
+    """
+    voyage_info = frame.data_manager.get_voyage_info()
+    frame.info_destination.set(voyage_info.get('destination', 'Amsterdam'))
+
+    # Compte a rebours du voyage ouvert
+    if voyage_info.get('date_depart') != frame.date_depart:
+        frame.date_depart = voyage_info.get('date_depart')
+        if frame.countdown_job:
+            frame.after_cancel(frame.countdown_job)
+        update_countdown(frame, frame.countdown_var)
+
+    date_depart = format_date(voyage_info.get('date_depart', '2025-09-15'))
+    date_retour = format_date(voyage_info.get('date_retour', '2025-09-20'))
+    frame.info_dates.set(f"{date_depart} - {date_retour}")
+
+
+def update_checklist_info(frame):
+    """
+    Met a jour la progression de la checklist.
+
+    Args:
+        frame: Le frame contenant les variables d'information
+    """
+    checked, total, percentage = frame.data_manager.get_checklist_progress()
+    frame.info_checklist.set(f"{percentage}% ({checked}/{total})")
+
+
 def refresh_home(frame):
     """
     Rafraichit toutes les donnees affichees.
@@ -165,31 +218,44 @@ def refresh_home(frame):
     data_manager = frame.data_manager
 
     # Nombre d'activites
-    activites = data_manager.get_activites()
-    frame.stats_vars["activities"].set(str(len(activites)))
+    frame.stats_vars["activities"].set(str(len(data_manager.get_activites())))
 
     # Budget restant
-    budget = data_manager.get_budget()
-    budget_prevu = budget.get('budget_prevu', 0)
-    total_depenses = data_manager.get_total_depenses()
-    reste = budget_prevu - total_depenses
-    frame.stats_vars["budget"].set(format_currency(reste))
+    update_budget_card(frame)
 
     # Nombre de participants
-    participants = data_manager.get_participants()
-    frame.stats_vars["participants"].set(str(len(participants)))
+    frame.stats_vars["participants"].set(str(len(data_manager.get_participants())))
 
     # Informations du voyage
-    voyage_info = data_manager.get_voyage_info()
-    frame.info_destination.set(voyage_info.get('destination', 'Amsterdam'))
-
-    date_depart = format_date(voyage_info.get('date_depart', '2025-09-15'))
-    date_retour = format_date(voyage_info.get('date_retour', '2025-09-20'))
-    frame.info_dates.set(f"{date_depart} - {date_retour}")
+    update_voyage_info(frame)
 
     # Progression checklist
-    checked, total, percentage = data_manager.get_checklist_progress()
-    frame.info_checklist.set(f"{percentage}% ({checked}/{total})")
+    update_checklist_info(frame)
+
+
+def on_data_changed(frame, batch):
+    """
+    Met a jour uniquement les statistiques concernees par un lot d'evenements.
+
+    Appelee par le bus d'evenements (dans le thread Tk).
+
+    Args:
+        frame: Le frame contenant les variables
+        batch: Le lot d'evenements (tuple de ChangeEvent)
+    """
+    collections = {event.collection for event in batch}
+    data_manager = frame.data_manager
+
+    if 'activites' in collections:
+        frame.stats_vars["activities"].set(str(len(data_manager.get_activites())))
+    if collections & {'depenses', 'budget_prevu', 'taux_de_change'}:
+        update_budget_card(frame)
+    if 'participants' in collections:
+        frame.stats_vars["participants"].set(str(len(data_manager.get_participants())))
+    if 'voyage_info' in collections:
+        update_voyage_info(frame)
+    if 'checklist' in collections:
+        update_checklist_info(frame)
 
 
 # ============================================
@@ -218,8 +284,12 @@ def HomeFrame(parent, data_manager):
 
     # Variable pour le compte a rebours
     countdown_var = tk.StringVar(value="Calcul...")
+    frame.countdown_var = countdown_var
     frame.countdown_job = None
 
+    # Date de depart du voyage affiche (None: DATE_DEPART de config.py)
+    frame.date_depart = None
+
     # ============================================
     # CANVAS DE FOND (pour le design)
     # ============================================
@@ -449,10 +519,15 @@ def HomeFrame(parent, data_manager):
 
     frame.refresh = lambda: refresh_home(frame)
 
+    # Mettre a jour les statistiques a chaque evenement du data_manager
+    frame.data_manager.subscribe(lambda batch: on_data_changed(frame, batch))
+
     # Lancer le compte a rebours
     update_countdown(frame, countdown_var)
 
-    # Charger les donnees initiales
-    frame.refresh()
+    # Charger les donnees initiales (sinon main.py rafraichit le frame
+    # a la fin du chargement)
+    if frame.data_manager.is_loaded():
+        frame.refresh()
 
     return frame
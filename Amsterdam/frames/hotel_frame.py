@@ -60,11 +60,9 @@ def save_hotel(frame):
         "notes": notes
     }
 
+    # L'affichage rapide est mis a jour par on_data_changed
     frame.data_manager.update_hotel(hotel)
 
-    # Mettre a jour l'affichage rapide
-    update_quick_info(frame)
-
     messagebox.showinfo("Succes", "Informations de l'hotel sauvegardees !")
 
 
@@ -102,6 +100,36 @@ Reservation: {reservation}
     frame.quick_info.configure(text=info_text.strip())
 
 
+# Champs du formulaire (cle de l'hotel, variable frame.var_<cle>; les
+# notes sont dans frame.notes_text)
+FORM_FIELDS = (
+    "nom", "adresse", "telephone", "email", "site_web",
+    "date_checkin", "heure_checkin", "date_checkout", "heure_checkout",
+    "numero_reservation", "nombre_chambres", "type_chambre",
+    "petit_dejeuner", "wifi", "notes",
+)
+
+
+def _load_field(frame, hotel, key):
+    """
+    Remplit un champ du formulaire avec sa valeur sauvegardee.
+
+    Args:
+        frame: Le frame contenant les variables
+        hotel: Les informations de l'hotel
+        key: La cle du champ (dans FORM_FIELDS)
+    """
+    if key == 'notes':
+        frame.notes_text.delete("1.0", "end")
+        frame.notes_text.insert("1.0", hotel.get('notes', ''))
+    elif key == 'nombre_chambres':
+        frame.var_nombre_chambres.set(str(hotel.get('nombre_chambres', '')))
+    elif key in ('petit_dejeuner', 'wifi'):
+        getattr(frame, 'var_' + key).set(hotel.get(key, False))
+    else:
+        getattr(frame, 'var_' + key).set(hotel.get(key, ''))
+
+
 def refresh_hotel(frame):
     """
     Rafraichit les donnees depuis le data manager.
@@ -112,29 +140,62 @@ def refresh_hotel(frame):
     hotel = frame.data_manager.get_hotel()
 
     # Remplir les champs
-    frame.var_nom.set(hotel.get('nom', ''))
-    frame.var_adresse.set(hotel.get('adresse', ''))
-    frame.var_telephone.set(hotel.get('telephone', ''))
-    frame.var_email.set(hotel.get('email', ''))
-    frame.var_site_web.set(hotel.get('site_web', ''))
-    frame.var_date_checkin.set(hotel.get('date_checkin', ''))
-    frame.var_heure_checkin.set(hotel.get('heure_checkin', ''))
-    frame.var_date_checkout.set(hotel.get('date_checkout', ''))
-    frame.var_heure_checkout.set(hotel.get('heure_checkout', ''))
-    frame.var_numero_reservation.set(hotel.get('numero_reservation', ''))
-    frame.var_nombre_chambres.set(str(hotel.get('nombre_chambres', '')))
-    frame.var_type_chambre.set(hotel.get('type_chambre', ''))
-    frame.var_petit_dejeuner.set(hotel.get('petit_dejeuner', False))
-    frame.var_wifi.set(hotel.get('wifi', False))
-
-    # Notes
-    frame.notes_text.delete("1.0", "end")
-    frame.notes_text.insert("1.0", hotel.get('notes', ''))
+    for key in FORM_FIELDS:
+        _load_field(frame, hotel, key)
 
     # Info rapide
     update_quick_info(frame)
 
 
+def show_item(frame, key):
+    """
+    Met en evidence les notes de l'hotel (resultat de la recherche
+    globale: nom, adresse ou notes).
+
+    Args:
+        frame: Le frame contenant les widgets
+        key: La cle du resultat (None pour l'hotel)
+    """
+    frame.notes_text.focus_set()
+    frame.notes_text.see("1.0")
+
+
+def on_data_changed(frame, batch):
+    """
+    Met a jour l'affichage rapide quand l'hotel est modifie.
+
+    Seuls les champs du formulaire dont la valeur sauvegardee a change
+    sont relus (sauvegarde du formulaire, annulation avec Ctrl+Z,
+    modification d'une autre instance): la saisie en cours dans les
+    autres champs n'est pas perdue. Appelee par le bus d'evenements
+    (dans le thread Tk).
+
+    Args:
+        frame: Le frame contenant les variables
+        batch: Le lot d'evenements (tuple de ChangeEvent)
+    """
+    changed = False
+    fields = set()
+
+    for event in batch:
+        if event.collection != 'hotel':
+            continue
+        changed = True
+        before = event.before or {}
+        after = event.after or {}
+        fields.update(key for key in FORM_FIELDS if before.get(key) != after.get(key))
+
+    if not changed:
+        return
+
+    hotel = frame.data_manager.get_hotel()
+    for key in FORM_FIELDS:
+        if key in fields:
+            _load_field(frame, hotel, key)
+
+    update_quick_info(frame)
+
+
 # ============================================
 # FONCTION PRINCIPALE DE CREATION DU FRAME
 # ============================================
@@ -438,7 +499,15 @@ def HotelFrame(parent, data_manager):
 
     frame.refresh = lambda: refresh_hotel(frame)
 
-    # Charger les donnees initiales
-    frame.refresh()
+    # Afficher les informations trouvees par la recherche globale (main.py)
+    frame.show_item = lambda key: show_item(frame, key)
+
+    # Mettre a jour le frame a chaque evenement du data_manager
+    frame.data_manager.subscribe(lambda batch: on_data_changed(frame, batch))
+
+    # Charger les donnees initiales (sinon main.py rafraichit le frame
+    # a la fin du chargement)
+    if frame.data_manager.is_loaded():
+        frame.refresh()
 
     return frame
@@ -0,0 +1,112 @@
+"""
+pager.py - Pagination des tableaux (Treeview) des frames.
+
+Un tableau pagine n'affiche que PAGE_SIZE lignes, demandees au
+data_manager avec limit et offset (query_depenses, query_activites,
+query_participants). La barre de pagination affiche la position
+("1-100 sur 2500") et les boutons Precedent / Suivant.
+
+Usage:
+    frame.pager = create_pager(parent, lambda: load_page(frame))
+    frame.pager["bar"].grid(...)
+
+    def load_page(frame):
+        set_total(frame.pager, data_manager.count_depenses())
+        depenses = data_manager.query_depenses(limit=frame.pager["size"],
+                                               offset=frame.pager["offset"])
+        ...
+
+    # Page d'un element (resultat de la recherche globale)
+    show_position(frame.pager, data_manager.query_position('depenses', item_id))
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import FONTS, PAGE_SIZE
+
+
+def create_pager(parent, on_change):
+    """
+    Cree la barre de pagination d'un tableau.
+
+    Args:
+        parent: Le widget parent de la barre
+        on_change: Fonction appelee (sans argument) quand la page change
+
+    Returns:
+        Dictionnaire (bar: le frame de la barre a placer, offset: debut
+        de la page, size: lignes par page, total: nombre d'elements)
+    """
+    pager = {
+        "offset": 0,
+        "size": PAGE_SIZE,
+        "total": 0,
+        "var": tk.StringVar(value=""),
+        "on_change": on_change,
+    }
+
+    bar = ttk.Frame(parent)
+    pager["bar"] = bar
+
+    pager["prev"] = ttk.Button(bar, text="< Precedent", command=lambda: _go(pager, -1))
+    pager["prev"].pack(side="left")
+
+    ttk.Label(bar, textvariable=pager["var"], font=FONTS["small"]).pack(side="left", padx=10)
+
+    pager["next"] = ttk.Button(bar, text="Suivant >", command=lambda: _go(pager, 1))
+    pager["next"].pack(side="left")
+
+    return pager
+
+
+def set_total(pager, total):
+    """
+    Met a jour le nombre d'elements et la position affichee.
+
+    La page courante est ramenee sur la derniere page si des elements
+    ont ete supprimes.
+
+    Args:
+        pager: La pagination (voir create_pager)
+        total: Le nombre d'elements du tableau
+    """
+    size = pager["size"]
+    pager["total"] = total
+    last = max(total - 1, 0) // size * size
+    pager["offset"] = min(pager["offset"], last)
+
+    offset = pager["offset"]
+    if total:
+        pager["var"].set("{}-{} sur {}".format(offset + 1, min(offset + size, total), total))
+    else:
+        pager["var"].set("")
+
+    pager["prev"].state(["!disabled"] if offset > 0 else ["disabled"])
+    pager["next"].state(["!disabled"] if offset + size < total else ["disabled"])
+
+
+def _go(pager, direction):
+    """
+    Passe a la page precedente (-1) ou suivante (1).
+    """
+    offset = pager["offset"] + direction * pager["size"]
+    if 0 <= offset < max(pager["total"], 1):
+        pager["offset"] = offset
+        pager["on_change"]()
+
+
+def show_position(pager, position):
+    """
+    Affiche la page qui contient une position.
+
+    Args:
+        pager: La pagination (voir create_pager)
+        position: La position d'un element dans l'ordre du tableau
+    """
+    pager["offset"] = position // pager["size"] * pager["size"]
+    pager["on_change"]()
@@ -17,25 +17,36 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import COLORS, FONTS, PARTICIPANT_ROLES
+from config import COLORS, FONTS, PARTICIPANT_ROLES, date_ordinal
+from frames.tree_rows import create_rows, show_page, select_row, create_row_cache, cached_row
+from frames.pager import create_pager, set_total, show_position
 
 
 # ============================================
 # FONCTIONS DE GESTION DES PARTICIPANTS
 # ============================================
 
-def add_participant(frame):
+def read_form(frame):
     """
-    Ajoute un nouveau participant.
+    Lit le participant saisi dans le formulaire.
 
     Args:
         frame: Le frame contenant les variables
-    """
-    if not frame.var_nom.get().strip() or not frame.var_prenom.get().strip():
-        messagebox.showwarning("Attention", "Le nom et le prenom sont obligatoires.")
-        return
 
-    participant = {
+    Returns:
+        Le participant, ou None si une date de sejour est invalide
+    """
+    arrivee = frame.var_arrivee.get().strip()
+    depart = frame.var_depart.get().strip()
+    for value in (arrivee, depart):
+        if value and not date_ordinal(value):
+            messagebox.showerror("Erreur", "Format de date invalide. Utilisez AAAA-MM-JJ")
+            return None
+    if arrivee and depart and date_ordinal(depart) < date_ordinal(arrivee):
+        messagebox.showerror("Erreur", "Le depart doit suivre l'arrivee.")
+        return None
+
+    return {
         "nom": frame.var_nom.get().strip(),
         "prenom": frame.var_prenom.get().strip(),
         "email": frame.var_email.get().strip(),
@@ -43,11 +54,28 @@ def add_participant(frame):
         "role": frame.var_role.get() or "Participant",
         "date_naissance": frame.var_date_naissance.get().strip(),
         "allergies": frame.var_allergies.get().strip(),
-        "notes": frame.var_notes.get().strip()
+        "notes": frame.var_notes.get().strip(),
+        "arrivee": arrivee,
+        "depart": depart,
     }
 
+
+def add_participant(frame):
+    """
+    Ajoute un nouveau participant.
+
+    Args:
+        frame: Le frame contenant les variables
+    """
+    if not frame.var_nom.get().strip() or not frame.var_prenom.get().strip():
+        messagebox.showwarning("Attention", "Le nom et le prenom sont obligatoires.")
+        return
+
+    participant = read_form(frame)
+    if participant is None:
+        return
+
     frame.data_manager.add_participant(participant)
-    refresh_participants(frame)
     clear_form(frame)
 
     messagebox.showinfo("Succes", "Participant ajoute !")
@@ -68,19 +96,11 @@ def update_participant(frame):
         messagebox.showwarning("Attention", "Le nom et le prenom sont obligatoires.")
         return
 
-    participant = {
-        "nom": frame.var_nom.get().strip(),
-        "prenom": frame.var_prenom.get().strip(),
-        "email": frame.var_email.get().strip(),
-        "telephone": frame.var_telephone.get().strip(),
-        "role": frame.var_role.get() or "Participant",
-        "date_naissance": frame.var_date_naissance.get().strip(),
-        "allergies": frame.var_allergies.get().strip(),
-        "notes": frame.var_notes.get().strip()
-    }
+    participant = read_form(frame)
+    if participant is None:
+        return
 
     frame.data_manager.update_participant(frame.selected_id, participant)
-    refresh_participants(frame)
     clear_form(frame)
 
     messagebox.showinfo("Succes", "Participant modifie !")
@@ -104,7 +124,6 @@ def delete_participant(frame):
 
     if confirm:
         frame.data_manager.delete_participant(frame.selected_id)
-        refresh_participants(frame)
         clear_form(frame)
 
 
@@ -123,6 +142,8 @@ def clear_form(frame):
     frame.var_date_naissance.set("")
     frame.var_allergies.set("")
     frame.var_notes.set("")
+    frame.var_arrivee.set("")
+    frame.var_depart.set("")
     frame.selected_id = None
 
     # Deselectionner
@@ -170,24 +191,114 @@ def on_double_click(frame, event):
     frame.selected_id = int(tags[0])
 
     # Trouver le participant
-    participants = frame.data_manager.get_participants()
-    for p in participants:
-        if p.get('id') == frame.selected_id:
-            frame.var_nom.set(p.get('nom', ''))
-            frame.var_prenom.set(p.get('prenom', ''))
-            frame.var_email.set(p.get('email', ''))
-            frame.var_telephone.set(p.get('telephone', ''))
-            frame.var_role.set(p.get('role', ''))
-            frame.var_date_naissance.set(p.get('date_naissance', ''))
-            frame.var_allergies.set(p.get('allergies', ''))
-            frame.var_notes.set(p.get('notes', ''))
-            break
+    p = frame.data_manager.get_participant(frame.selected_id)
+    if p is None:
+        return
+
+    frame.var_nom.set(p.get('nom', ''))
+    frame.var_prenom.set(p.get('prenom', ''))
+    frame.var_email.set(p.get('email', ''))
+    frame.var_telephone.set(p.get('telephone', ''))
+    frame.var_role.set(p.get('role', ''))
+    frame.var_date_naissance.set(p.get('date_naissance', ''))
+    frame.var_allergies.set(p.get('allergies', ''))
+    frame.var_notes.set(p.get('notes', ''))
+    frame.var_arrivee.set(p.get('arrivee', ''))
+    frame.var_depart.set(p.get('depart', ''))
 
 
 # ============================================
 # FONCTION DE RAFRAICHISSEMENT
 # ============================================
 
+def participant_row(p):
+    """
+    Calcule la cle de tri et les valeurs de la ligne d'un participant.
+
+    Args:
+        p: Le participant
+
+    Returns:
+        Tuple (cle de tri, valeurs des colonnes)
+    """
+    values = (
+        p.get('nom', ''),
+        p.get('prenom', ''),
+        p.get('role', 'Participant'),
+        p.get('email', ''),
+        p.get('telephone', '')
+    )
+    return p.get('nom', ''), values
+
+
+def update_summary(frame):
+    """
+    Met a jour le total et le compte par role.
+
+    Args:
+        frame: Le frame contenant les variables du resume
+    """
+    frame.var_total.set("{} participant(s)".format(frame.pager["total"]))
+
+    # Roles connus dans l'ordre de la configuration, puis les autres
+    roles = [r for r in PARTICIPANT_ROLES if frame.role_count.get(r)]
+    roles += [r for r in frame.role_count if r not in PARTICIPANT_ROLES and frame.role_count[r]]
+    role_text = " | ".join(["{}: {}".format(role, frame.role_count[role]) for role in roles])
+    frame.role_counts.set(role_text)
+
+
+def _set_role(frame, participant_id, role):
+    """
+    Met a jour les compteurs par role pour un participant.
+
+    Args:
+        frame: Le frame contenant les compteurs
+        participant_id: L'ID du participant
+        role: Son role (None s'il a ete supprime)
+    """
+    old_role = frame.role_by_id.pop(participant_id, None)
+    if old_role is not None:
+        frame.role_count[old_role] -= 1
+
+    if role is not None:
+        frame.role_by_id[participant_id] = role
+        frame.role_count[role] = frame.role_count.get(role, 0) + 1
+
+
+def load_page(frame):
+    """
+    Affiche la page courante des participants (tries par nom).
+
+    Seule la page affichee est demandee au data_manager, dans l'ordre
+    des noms qu'il maintient (aucun tri ici).
+
+    Args:
+        frame: Le frame contenant le treeview et la pagination
+    """
+    set_total(frame.pager, frame.data_manager.count_participants())
+    participants = frame.data_manager.query_participants(
+        limit=frame.pager["size"],
+        offset=frame.pager["offset"]
+    )
+    show_page(frame.rows, [(p.get('id'),) + cached_row(frame.row_cache, p) for p in participants])
+
+
+def show_item(frame, item_id):
+    """
+    Affiche la page qui contient un participant et selectionne sa ligne
+    (resultat de la recherche globale).
+
+    Args:
+        frame: Le frame contenant le treeview et la pagination
+        item_id: L'ID de l'element
+    """
+    position = frame.data_manager.query_position('participants', item_id)
+    if position is None:
+        return
+    show_position(frame.pager, position)
+    select_row(frame.rows, item_id)
+
+
 def refresh_participants(frame):
     """
     Rafraichit la liste des participants.
@@ -195,42 +306,48 @@ def refresh_participants(frame):
     Args:
         frame: Le frame contenant le treeview et les variables
     """
-    # Vider le tableau
-    for item in frame.tree.get_children():
-        frame.tree.delete(item)
-
     # Recuperer les participants
     participants = frame.data_manager.get_participants()
 
     # Compteurs par role
-    role_count = {}
-
-    # Remplir le tableau
-    for p in sorted(participants, key=lambda x: x.get('nom', '')):
-        # Compter les roles
-        role = p.get('role', 'Participant')
-        role_count[role] = role_count.get(role, 0) + 1
-
-        frame.tree.insert(
-            "",
-            "end",
-            values=(
-                p.get('nom', ''),
-                p.get('prenom', ''),
-                role,
-                p.get('email', ''),
-                p.get('telephone', '')
-            ),
-            tags=(p.get('id'),)
-        )
-
-    # Mettre a jour le total
-    total = len(participants)
-    frame.var_total.set("{} participant(s)".format(total))
-
-    # Afficher le compte par role
-    role_text = " | ".join(["{}: {}".format(role, count) for role, count in role_count.items()])
-    frame.role_counts.set(role_text)
+    frame.role_by_id.clear()
+    frame.role_count.clear()
+
+    for p in participants:
+        _set_role(frame, p.get('id'), p.get('role', 'Participant'))
+
+    # Remplir le tableau (page courante, triee par nom)
+    load_page(frame)
+
+    update_summary(frame)
+
+
+def on_data_changed(frame, batch):
+    """
+    Met a jour uniquement les lignes des participants modifies.
+
+    Appelee par le bus d'evenements (dans le thread Tk).
+
+    Args:
+        frame: Le frame contenant le treeview et les variables
+        batch: Le lot d'evenements (tuple de ChangeEvent)
+    """
+    changed = False
+
+    for event in batch:
+        if event.collection != 'participants':
+            continue
+
+        if event.op == 'delete':
+            _set_role(frame, event.id, None)
+        else:
+            _set_role(frame, event.id, event.after.get('role', 'Participant'))
+        changed = True
+
+    if changed:
+        # Relire la page: seules les lignes modifiees sont touchees
+        load_page(frame)
+        update_summary(frame)
 
 
 # ============================================
@@ -267,6 +384,8 @@ def ParticipantsFrame(parent, data_manager):
     frame.var_date_naissance = tk.StringVar()
     frame.var_allergies = tk.StringVar()
     frame.var_notes = tk.StringVar()
+    frame.var_arrivee = tk.StringVar()
+    frame.var_depart = tk.StringVar()
 
     # ============================================
     # EN-TETE (utilise PACK)
@@ -343,6 +462,17 @@ def ParticipantsFrame(parent, data_manager):
     ttk.Label(row4, text="Notes:", width=12).pack(side="left")
     ttk.Entry(row4, textvariable=frame.var_notes, width=60).pack(side="left", padx=5, fill="x", expand=True)
 
+    # Ligne 5: Dates de sejour (partage des depenses selon la presence)
+    row5 = ttk.Frame(form_frame)
+    row5.pack(fill="x", pady=5)
+
+    ttk.Label(row5, text="Arrivee:", width=12).pack(side="left")
+    ttk.Entry(row5, textvariable=frame.var_arrivee, width=15).pack(side="left", padx=5)
+
+    ttk.Label(row5, text="Depart:", width=12).pack(side="left", padx=(20, 0))
+    ttk.Entry(row5, textvariable=frame.var_depart, width=15).pack(side="left", padx=5)
+    ttk.Label(row5, text="(AAAA-MM-JJ, vide: tout le voyage)", font=FONTS["small"]).pack(side="left")
+
     # Boutons
     btn_frame = ttk.Frame(form_frame)
     btn_frame.pack(fill="x", pady=10)
@@ -418,10 +548,22 @@ def ParticipantsFrame(parent, data_manager):
     scrollbar.pack(side="right", fill="y")
     frame.tree.configure(yscrollcommand=scrollbar.set)
 
+    # Pagination (seule la page affichee est lue)
+    frame.pager = create_pager(list_frame, lambda: load_page(frame))
+    frame.pager["bar"].pack(pady=(5, 0))
+
     # Evenements
     frame.tree.bind("<<TreeviewSelect>>", lambda e: on_select(frame, e))
     frame.tree.bind("<Double-1>", lambda e: on_double_click(frame, e))
 
+    # Ordre de tri des lignes de la page (mises a jour une par une)
+    frame.rows = create_rows(frame.tree)
+    frame.row_cache = create_row_cache(participant_row)
+
+    # Role de chaque participant affiche et nombre de participants par role
+    frame.role_by_id = {}
+    frame.role_count = {}
+
     # ============================================
     # RESUME (utilise PACK)
     # ============================================
@@ -451,7 +593,15 @@ def ParticipantsFrame(parent, data_manager):
 
     frame.refresh = lambda: refresh_participants(frame)
 
-    # Charger les donnees initiales
-    frame.refresh()
+    # Afficher un element trouve par la recherche globale (main.py)
+    frame.show_item = lambda item_id: show_item(frame, item_id)
+
+    # Mettre a jour les lignes modifiees a chaque evenement du data_manager
+    frame.data_manager.subscribe(lambda batch: on_data_changed(frame, batch))
+
+    # Charger les donnees initiales (sinon main.py rafraichit le frame
+    # a la fin du chargement)
+    if frame.data_manager.is_loaded():
+        frame.refresh()
 
     return frame
@@ -17,7 +17,9 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import COLORS, FONTS, TRANSPORT_TYPES, format_date
+from config import COLORS, FONTS, TRANSPORT_TYPES, format_date, format_cents
+from money import from_cents
+from simulation import parse_estimate
 
 
 # ============================================
@@ -38,32 +40,36 @@ def add_local_transport(frame):
         messagebox.showwarning("Attention", "Veuillez remplir le type et la description.")
         return
 
+    # Prix probable, minimum et maximum facultatifs (voir simulation.py)
     try:
-        prix = float(frame.local_prix.get() or 0)
-    except ValueError:
-        messagebox.showerror("Erreur", "Le prix doit etre un nombre.")
+        prix, low, high = parse_estimate(frame.local_prix.get(), frame.local_prix_min.get(),
+                                         frame.local_prix_max.get())
+    except ValueError as e:
+        messagebox.showerror("Erreur", f"Prix invalide: {e}")
         return
 
-    # Ajouter au transport
-    transport = frame.data_manager.get_transport()
-    sur_place = transport.get('sur_place', [])
+    # Ajouter au transport (les donnees lues sont en lecture seule)
+    transport = dict(frame.data_manager.get_transport())
+    sur_place = list(transport.get('sur_place', []))
 
     sur_place.append({
         "type": transport_type,
         "description": description,
-        "prix": prix
+        "prix": from_cents(prix),
+        "prix_min": None if low is None else from_cents(low),
+        "prix_max": None if high is None else from_cents(high)
     })
 
+    # La liste est mise a jour par on_data_changed
     transport['sur_place'] = sur_place
     frame.data_manager.update_transport(transport)
 
-    # Rafraichir
-    refresh_local_tree(frame)
-
     # Vider les champs
     frame.local_type.set("")
     frame.local_desc.delete(0, "end")
     frame.local_prix.delete(0, "end")
+    frame.local_prix_min.delete(0, "end")
+    frame.local_prix_max.delete(0, "end")
 
 
 def delete_local_transport(frame):
@@ -83,14 +89,13 @@ def delete_local_transport(frame):
     index = frame.local_tree.index(item)
 
     # Supprimer
-    transport = frame.data_manager.get_transport()
-    sur_place = transport.get('sur_place', [])
+    transport = dict(frame.data_manager.get_transport())
+    sur_place = list(transport.get('sur_place', []))
 
     if 0 <= index < len(sur_place):
         del sur_place[index]
         transport['sur_place'] = sur_place
         frame.data_manager.update_transport(transport)
-        refresh_local_tree(frame)
 
 
 def refresh_local_tree(frame):
@@ -115,7 +120,7 @@ def refresh_local_tree(frame):
             values=(
                 t.get('type', ''),
                 t.get('description', ''),
-                "{:.2f} EUR".format(t.get('prix', 0))
+                format_cents(t.cents('prix'))
             )
         )
 
@@ -127,7 +132,7 @@ def save_all(frame):
     Args:
         frame: Le frame contenant les variables
     """
-    transport = frame.data_manager.get_transport()
+    transport = dict(frame.data_manager.get_transport())
 
     # Aller
     transport['aller'] = {
@@ -201,6 +206,56 @@ def refresh_transport(frame):
     refresh_local_tree(frame)
 
 
+def show_item(frame, key):
+    """
+    Selectionne un transport sur place (resultat de la recherche
+    globale). Les trajets aller et retour sont toujours affiches.
+
+    Args:
+        frame: Le frame contenant les widgets
+        key: "aller", "retour" ou la position du transport sur place
+    """
+    if not isinstance(key, int):
+        return
+
+    children = frame.local_tree.get_children()
+    if 0 <= key < len(children):
+        frame.local_tree.selection_set(children[key])
+        frame.local_tree.focus(children[key])
+        frame.local_tree.see(children[key])
+
+
+def on_data_changed(frame, batch):
+    """
+    Met a jour la liste des transports locaux quand le transport est modifie.
+
+    Les champs aller/retour ne sont relus que si leurs valeurs
+    sauvegardees ont change (sauvegarde du formulaire, annulation avec
+    Ctrl+Z): ajouter un transport local ne perd pas une saisie en cours.
+    Appelee par le bus d'evenements (dans le thread Tk).
+
+    Args:
+        frame: Le frame contenant le treeview
+        batch: Le lot d'evenements (tuple de ChangeEvent)
+    """
+    changed = False
+    forms_changed = False
+
+    for event in batch:
+        if event.collection != 'transport':
+            continue
+        changed = True
+        before = event.before or {}
+        after = event.after or {}
+        if any(before.get(key) != after.get(key) for key in ('aller', 'retour')):
+            forms_changed = True
+
+    if forms_changed:
+        refresh_transport(frame)
+    elif changed:
+        refresh_local_tree(frame)
+
+
 # ============================================
 # FONCTION POUR CREER UN FORMULAIRE DE TRANSPORT
 # ============================================
@@ -447,11 +502,19 @@ def TransportFrame(parent, data_manager):
     frame.local_prix = ttk.Entry(add_frame, width=10)
     frame.local_prix.grid(row=0, column=5, padx=5)
 
+    ttk.Label(add_frame, text="Min:").grid(row=0, column=6, padx=5)
+    frame.local_prix_min = ttk.Entry(add_frame, width=8)
+    frame.local_prix_min.grid(row=0, column=7, padx=5)
+
+    ttk.Label(add_frame, text="Max:").grid(row=0, column=8, padx=5)
+    frame.local_prix_max = ttk.Entry(add_frame, width=8)
+    frame.local_prix_max.grid(row=0, column=9, padx=5)
+
     ttk.Button(
         add_frame,
         text="Ajouter",
         command=lambda: add_local_transport(frame)
-    ).grid(row=0, column=6, padx=10)
+    ).grid(row=0, column=10, padx=10)
 
     # Liste des transports locaux
     columns = ("type", "description", "prix")
@@ -513,7 +576,15 @@ def TransportFrame(parent, data_manager):
 
     frame.refresh = lambda: refresh_transport(frame)
 
-    # Charger les donnees initiales
-    frame.refresh()
+    # Afficher un transport trouve par la recherche globale (main.py)
+    frame.show_item = lambda key: show_item(frame, key)
+
+    # Mettre a jour les transports locaux a chaque evenement du data_manager
+    frame.data_manager.subscribe(lambda batch: on_data_changed(frame, batch))
+
+    # Charger les donnees initiales (sinon main.py rafraichit le frame
+    # a la fin du chargement)
+    if frame.data_manager.is_loaded():
+        frame.refresh()
 
     return frame
@@ -0,0 +1,260 @@
+"""
+tree_rows.py - Mise a jour ligne par ligne d'un Treeview trie.
+
+Les frames qui affichent une collection dans un Treeview (activites,
+depenses, participants) gardent l'ordre de tri des lignes affichees
+dans une liste triee de cles. Un ajout, une modification ou une
+suppression ne touche alors qu'une ligne, inseree a sa place (bisect),
+au lieu de vider et remplir de nouveau tout le tableau.
+
+Chaque ligne a pour identifiant Treeview (iid) l'ID de l'element.
+
+Un tableau pagine (voir pager.py) n'affiche que la page demandee au
+data_manager (query_depenses...): show_page remplace les lignes de la
+page en ne touchant que celles qui ont change.
+
+Les valeurs affichees (dates et montants formates) sont calculees une
+fois par version d'un element: le cache des lignes (create_row_cache)
+garde la ligne calculee tant que l'element n'est pas remplace par une
+nouvelle version (les enregistrements du data_manager sont immuables).
+
+Usage:
+    frame.rows = create_rows(frame.tree)
+    fill_rows(frame.rows, [(item_id, cle_de_tri, valeurs), ...])
+    put_row(frame.rows, item_id, cle_de_tri, valeurs)
+    remove_row(frame.rows, item_id)
+    show_page(frame.rows, [(item_id, cle_de_tri, valeurs), ...])
+    select_row(frame.rows, item_id)
+
+    frame.row_cache = create_row_cache(activity_row)
+    cle_de_tri, valeurs = cached_row(frame.row_cache, activite)
+"""
+
+import bisect
+from collections import OrderedDict
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import ROW_CACHE_SIZE
+
+
+def create_rows(tree, reverse=False):
+    """
+    Cree l'etat de tri des lignes d'un Treeview.
+
+    Args:
+        tree: Le Treeview
+        reverse: True pour un tri decroissant
+
+    Returns:
+        Dictionnaire (tree, reverse, keys, key_by_id, values_by_id)
+    """
+    return {
+        "tree": tree,
+        "reverse": reverse,
+        "keys": [],           # Cles de tri (croissantes), avec l'ID en dernier
+        "key_by_id": {},      # ID de l'element -> cle de tri
+        "values_by_id": {},   # ID de l'element -> valeurs affichees
+    }
+
+
+def clear_rows(rows):
+    """
+    Supprime toutes les lignes.
+
+    Args:
+        rows: L'etat cree par create_rows
+    """
+    tree = rows["tree"]
+    children = tree.get_children()
+    if children:
+        tree.delete(*children)
+    rows["keys"].clear()
+    rows["key_by_id"].clear()
+    rows["values_by_id"].clear()
+
+
+def fill_rows(rows, entries):
+    """
+    Remplace toutes les lignes (rafraichissement complet).
+
+    Args:
+        rows: L'etat cree par create_rows
+        entries: Liste de tuples (item_id, cle de tri, valeurs)
+    """
+    clear_rows(rows)
+
+    entries = sorted(entries, key=lambda e: (e[1], e[0]))
+    rows["keys"].extend((key, item_id) for item_id, key, _values in entries)
+    rows["key_by_id"].update((item_id, (key, item_id)) for item_id, key, _values in entries)
+    rows["values_by_id"].update((item_id, values) for item_id, _key, values in entries)
+
+    if rows["reverse"]:
+        entries.reverse()
+
+    tree = rows["tree"]
+    for item_id, _key, values in entries:
+        tree.insert("", "end", iid=str(item_id), values=values, tags=(item_id,))
+
+
+def _display_index(rows, position):
+    """
+    Convertit une position dans la liste des cles en index d'affichage.
+    """
+    if rows["reverse"]:
+        return len(rows["keys"]) - 1 - position
+    return position
+
+
+def put_row(rows, item_id, key, values):
+    """
+    Ajoute ou met a jour la ligne d'un element, a sa place dans le tri.
+
+    Une ligne deja affichee avec les memes valeurs n'est pas touchee.
+
+    Args:
+        rows: L'etat cree par create_rows
+        item_id: L'ID de l'element
+        key: La cle de tri de l'element
+        values: Les valeurs des colonnes
+    """
+    tree = rows["tree"]
+    iid = str(item_id)
+    key = (key, item_id)
+    old_key = rows["key_by_id"].get(item_id)
+
+    if old_key is not None and old_key != key:
+        del rows["keys"][bisect.bisect_left(rows["keys"], old_key)]
+        old_key = None
+
+    old_values = rows["values_by_id"].get(item_id)
+    rows["values_by_id"][item_id] = values
+
+    if old_key is None:
+        position = bisect.bisect_left(rows["keys"], key)
+        rows["keys"].insert(position, key)
+        rows["key_by_id"][item_id] = key
+        index = _display_index(rows, position)
+
+        if tree.exists(iid):
+            tree.move(iid, "", index)
+            tree.item(iid, values=values)
+        else:
+            tree.insert("", index, iid=iid, values=values, tags=(item_id,))
+    elif values != old_values:
+        tree.item(iid, values=values)
+
+
+def remove_row(rows, item_id):
+    """
+    Supprime la ligne d'un element (s'il est affiche).
+
+    Args:
+        rows: L'etat cree par create_rows
+        item_id: L'ID de l'element
+    """
+    key = rows["key_by_id"].pop(item_id, None)
+    rows["values_by_id"].pop(item_id, None)
+    if key is None:
+        return
+
+    del rows["keys"][bisect.bisect_left(rows["keys"], key)]
+    rows["tree"].delete(str(item_id))
+
+
+def count_rows(rows):
+    """
+    Retourne le nombre de lignes affichees.
+
+    Args:
+        rows: L'etat cree par create_rows
+    """
+    return len(rows["keys"])
+
+
+def show_page(rows, entries):
+    """
+    Affiche exactement les lignes d'une page (resultat d'une requete).
+
+    Les lignes qui ne sont plus dans la page sont supprimees, les autres
+    sont ajoutees ou mises a jour a leur place: la selection et le
+    defilement sont conserves pour les lignes qui restent.
+
+    Args:
+        rows: L'etat cree par create_rows
+        entries: Liste de tuples (item_id, cle de tri, valeurs)
+    """
+    shown = {item_id for item_id, _key, _values in entries}
+    for item_id in [item_id for item_id in rows["key_by_id"] if item_id not in shown]:
+        remove_row(rows, item_id)
+
+    for item_id, key, values in entries:
+        put_row(rows, item_id, key, values)
+
+
+def select_row(rows, item_id):
+    """
+    Selectionne une ligne et la fait defiler a l'ecran (resultat de la
+    recherche globale).
+
+    Args:
+        rows: L'etat cree par create_rows
+        item_id: L'ID de l'element (rien si sa ligne n'est pas affichee)
+    """
+    tree = rows["tree"]
+    iid = str(item_id)
+    if not tree.exists(iid):
+        return
+    tree.selection_set(iid)
+    tree.focus(iid)
+    tree.see(iid)
+
+
+def create_row_cache(row_function, size=ROW_CACHE_SIZE):
+    """
+    Cree le cache des lignes calculees d'un tableau.
+
+    Args:
+        row_function: Fonction element -> (cle de tri, valeurs)
+        size: Nombre maximal de lignes gardees (les moins recemment
+            utilisees sont oubliees)
+
+    Returns:
+        Dictionnaire (function, size, rows: ID -> (element, ligne))
+    """
+    return {
+        "function": row_function,
+        "size": size,
+        "rows": OrderedDict(),
+    }
+
+
+def cached_row(cache, item):
+    """
+    Retourne la ligne calculee d'un element (cle de tri, valeurs).
+
+    La ligne est recalculee si l'element a ete remplace par une nouvelle
+    version (modification) depuis son dernier calcul.
+
+    Args:
+        cache: Le cache cree par create_row_cache
+        item: L'element (enregistrement du data_manager)
+
+    Returns:
+        Tuple (cle de tri, valeurs des colonnes)
+    """
+    rows = cache["rows"]
+    item_id = item.get('id')
+    entry = rows.get(item_id)
+    if entry is not None and entry[0] is item:
+        rows.move_to_end(item_id)
+        return entry[1]
+
+    row = cache["function"](item)
+    rows[item_id] = (item, row)
+    rows.move_to_end(item_id)
+    if len(rows) > cache["size"]:
+        rows.popitem(last=False)
+    return row
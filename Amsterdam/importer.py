@@ -0,0 +1,1034 @@
+"""
+importer.py - Import en flux de depenses, d'activites et de participants
+pour l'application Amsterdam Trip Planner.
+
+Formats reconnus (d'apres l'extension du fichier):
+- .csv:         depenses, activites ou participants (d'apres les colonnes)
+- .ofx, .qfx:   releve bancaire OFX (SGML ou XML) -> depenses
+- .xml, .camt:  releve bancaire CAMT.053 (ISO 20022) -> depenses
+- .ics:         calendrier -> activites
+- .vcf:         cartes de visite vCard -> participants
+
+L'import est une chaine de generateurs; aucune etape ne garde le fichier
+en memoire, seulement un paquet de lignes a la fois:
+
+    lecture -> validation -> normalisation (dates, montants)
+            -> dedoublonnage (empreinte du contenu) -> ajout par lots
+
+Les paquets de lignes sont valides et normalises dans un pool de
+processus pour les gros fichiers (IMPORT_PARALLEL_MIN_BYTES), s'il y a
+plus d'un processeur. Un element dont le contenu existe deja (dans les
+donnees ou plus haut dans le fichier) n'est pas ajoute: importer deux
+fois le meme releve ne cree pas de doublons. Seules les empreintes sont
+gardees, dans un tableau trie (8 octets par element).
+
+Chaque lot est ajoute en une transaction (add_depenses, add_activites,
+add_participants): une sauvegarde et un lot d'evenements par lot. Tout
+l'import forme une seule etape d'annulation (data_manager.history_step).
+
+Usage:
+    resultat = importer.import_file("releve.ofx", progress=callback)
+    python importer.py fichier [fichier ...]
+"""
+
+import array
+import bisect
+import codecs
+import collections
+import csv
+import functools
+import hashlib
+import html
+import io
+import multiprocessing
+import os
+import re
+import sys
+import time
+import unicodedata
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+import catalog
+import data_manager
+import money
+from exchange_rates import CURRENCY_CODE
+import records
+from config import (
+    BUDGET_CATEGORIES, PARTICIPANT_ROLES,
+    IMPORT_BATCH_SIZE, IMPORT_CHUNK_ROWS, IMPORT_PARALLEL_MIN_BYTES,
+    IMPORT_WORKERS, IMPORT_MAX_ERRORS
+)
+
+
+# ============================================
+# FORMATS ET COLLECTIONS
+# ============================================
+
+# Format de chaque extension de fichier
+FORMATS = {
+    ".csv": "csv",
+    ".ofx": "ofx",
+    ".qfx": "ofx",
+    ".xml": "camt",
+    ".camt": "camt",
+    ".ics": "ics",
+    ".ical": "ics",
+    ".vcf": "vcard",
+    ".vcard": "vcard",
+}
+
+# Types de fichiers proposes par la fenetre de choix (main.py)
+FILE_TYPES = [
+    ("Fichiers importables", "*.csv *.ofx *.qfx *.xml *.camt *.ics *.vcf"),
+    ("CSV", "*.csv"),
+    ("Releve bancaire OFX", "*.ofx *.qfx"),
+    ("Releve bancaire CAMT.053", "*.xml *.camt"),
+    ("Calendrier ICS", "*.ics"),
+    ("vCard", "*.vcf"),
+]
+
+# Colonnes CSV reconnues (en minuscules, sans accents) -> champ
+CSV_COLUMNS = {
+    "date": "date", "jour": "date", "date operation": "date", "booking date": "date",
+    "categorie": "categorie", "category": "categorie",
+    "montant": "montant", "amount": "montant", "debit": "montant",
+    "description": "description", "libelle": "description", "memo": "description",
+    "participant": "participant", "payeur": "participant", "paye par": "participant",
+    "devise": "devise", "currency": "devise", "monnaie": "devise",
+    "nom": "nom", "name": "nom", "titre": "nom", "activite": "nom",
+    "lieu": "lieu", "location": "lieu", "adresse": "lieu",
+    "horaire": "horaire", "heure": "horaire", "time": "horaire",
+    "duree": "duree", "duration": "duree",
+    "prix": "prix", "price": "prix", "cout": "prix",
+    "prenom": "prenom", "first name": "prenom",
+    "email": "email", "e-mail": "email", "mail": "email",
+    "telephone": "telephone", "tel": "telephone", "phone": "telephone",
+    "role": "role",
+    "date naissance": "date_naissance", "date de naissance": "date_naissance",
+    "allergies": "allergies", "notes": "notes",
+    "arrivee": "arrivee", "date d'arrivee": "arrivee", "arrival": "arrivee",
+    "depart": "depart", "date de depart": "depart", "departure": "depart",
+}
+
+
+# ============================================
+# NORMALISATION DES VALEURS
+# ============================================
+
+def _plain(text):
+    """
+    Retourne un texte en minuscules, sans accents ni espaces superflus
+    (comparaison des noms de colonnes, categories et roles).
+    """
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.replace("_", " ").casefold().split())
+
+
+_CATEGORIES = {_plain(value): value for value in BUDGET_CATEGORIES}
+_ROLES = {_plain(value): value for value in PARTICIPANT_ROLES}
+
+_ISO_DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+_COMPACT_DATE = re.compile(r"(\d{4})(\d{2})(\d{2})(?:$|[T\[\s]|\d)")
+_DATE_FORMATS = ("%d/%m/%Y", "%d.%m.%Y", "%d-%m-%Y", "%Y/%m/%d", "%d/%m/%y")
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(text):
+    """
+    Convertit une date au format AAAA-MM-JJ.
+
+    Accepte AAAA-MM-JJ, JJ/MM/AAAA, JJ.MM.AAAA, JJ-MM-AAAA, AAAA/MM/JJ,
+    JJ/MM/AA et les dates compactes des releves et calendriers
+    (20250915, 20250915T100000Z, 20250915120000[-5:EST]).
+
+    Args:
+        text: Le texte de la date
+
+    Returns:
+        La date (AAAA-MM-JJ)
+
+    Raises:
+        ValueError: si la date n'est pas reconnue
+    """
+    value = text.strip()
+
+    match = _ISO_DATE.match(value) or _COMPACT_DATE.match(value)
+    if match:
+        try:
+            return date(*map(int, match.groups())).isoformat()
+        except ValueError:
+            pass
+    else:
+        value = value.split(" ")[0]
+        for fmt in _DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt).date().isoformat()
+            except ValueError:
+                continue
+
+    raise ValueError(f"Date invalide: {text!r}")
+
+
+def parse_amount(text):
+    """
+    Convertit un montant (1234.5, 1 234,50 EUR, 1.234,50, -12,00, (12.00)).
+
+    Avec une virgule et un point, le dernier des deux est le separateur
+    decimal; une virgule seule est un separateur decimal (voir
+    money.parse_amount).
+
+    Args:
+        text: Le texte du montant (ou un nombre)
+
+    Returns:
+        Le montant arrondi au centime (negatif pour un debit)
+
+    Raises:
+        ValueError: si le montant n'est pas reconnu
+    """
+    return money.from_cents(money.parse_amount(text))
+
+
+_TIME = re.compile(r"(?:T|^)(\d{1,2})\s*[:hH]?\s*(\d{2})?")
+
+
+def parse_time(text):
+    """
+    Convertit un horaire au format HH:MM (10:00, 10h, 10h30, 1030,
+    20250916T103000).
+
+    Args:
+        text: Le texte de l'horaire
+
+    Returns:
+        L'horaire (HH:MM), ou le texte tel quel s'il n'est pas reconnu
+    """
+    value = text.strip()
+    compact = re.search(r"T(\d{2})(\d{2})", value)
+    match = compact or _TIME.match(value)
+    if match:
+        hours, minutes = int(match.group(1)), int(match.group(2) or 0)
+        if hours < 24 and minutes < 60:
+            return f"{hours:02d}:{minutes:02d}"
+    return value
+
+
+def format_duration(minutes):
+    """
+    Formate une duree comme dans le planning (45min, 2h, 1h30).
+    """
+    if minutes < 60:
+        return f"{minutes}min"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}" if minutes else f"{hours}h"
+
+
+def _text(raw, field):
+    """
+    Retourne un champ texte d'une ligne, sans espaces superflus.
+    """
+    return " ".join(str(raw.get(field) or "").split())
+
+
+# ============================================
+# VALIDATION ET NORMALISATION DES LIGNES
+# ============================================
+
+def validate(kind, raw):
+    """
+    Verifie qu'une ligne lue peut etre importee.
+
+    Args:
+        kind: La collection (depenses, activites, participants)
+        raw: Les champs lus (textes)
+
+    Returns:
+        Le message d'erreur, ou None si la ligne est valide
+    """
+    try:
+        if kind == "depenses":
+            if raw.get("sens") == "credit":
+                return "Credit ignore (ce n'est pas une depense)"
+            if not _text(raw, "date"):
+                return "Date manquante"
+            parse_date(raw["date"])
+            if not _text(raw, "montant"):
+                return "Montant manquant"
+            if parse_amount(raw["montant"]) == 0:
+                return "Montant nul"
+            devise = _text(raw, "devise")
+            if devise and not CURRENCY_CODE.match(devise.upper()):
+                return f"Devise invalide: {devise}"
+        elif kind == "activites":
+            if not _text(raw, "nom"):
+                return "Nom de l'activite manquant"
+            if not _text(raw, "date"):
+                return "Date manquante"
+            parse_date(raw["date"])
+            if _text(raw, "prix"):
+                parse_amount(raw["prix"])
+        elif kind == "participants":
+            if not _text(raw, "nom") or not _text(raw, "prenom"):
+                return "Nom ou prenom manquant"
+            for field in ("arrivee", "depart"):
+                if _text(raw, field):
+                    parse_date(raw[field])
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def normalize(kind, raw):
+    """
+    Convertit une ligne valide en element de la collection (dates au
+    format AAAA-MM-JJ, montants en nombres, categories et roles connus).
+
+    Args:
+        kind: La collection (depenses, activites, participants)
+        raw: Les champs lus (textes, voir validate)
+
+    Returns:
+        L'element (dictionnaire sans ID)
+    """
+    if kind == "depenses":
+        depense = {
+            "date": parse_date(raw["date"]),
+            "categorie": _CATEGORIES.get(_plain(_text(raw, "categorie")), "Autre"),
+            "montant": abs(parse_amount(raw["montant"])),
+            "description": _text(raw, "description"),
+            "participant": _text(raw, "participant") or "Groupe",
+        }
+        # Sans devise, la depense est dans la devise du voyage
+        devise = _text(raw, "devise")
+        if devise:
+            depense["devise"] = devise.upper()
+        return depense
+
+    if kind == "activites":
+        prix = _text(raw, "prix")
+        return {
+            "date": parse_date(raw["date"]),
+            "nom": _text(raw, "nom"),
+            "lieu": _text(raw, "lieu"),
+            "horaire": parse_time(_text(raw, "horaire")),
+            "duree": _text(raw, "duree"),
+            "prix": abs(parse_amount(prix)) if prix else 0.0,
+            "description": _text(raw, "description"),
+        }
+
+    return {
+        "nom": _text(raw, "nom"),
+        "prenom": _text(raw, "prenom"),
+        "email": _text(raw, "email").lower(),
+        "telephone": _text(raw, "telephone"),
+        "role": _ROLES.get(_plain(_text(raw, "role")), "Participant"),
+        "date_naissance": _text(raw, "date_naissance"),
+        "allergies": _text(raw, "allergies"),
+        "notes": _text(raw, "notes"),
+        "arrivee": parse_date(raw["arrivee"]) if _text(raw, "arrivee") else "",
+        "depart": parse_date(raw["depart"]) if _text(raw, "depart") else "",
+    }
+
+
+def _digest_value(value):
+    """
+    Representation d'un champ pour l'empreinte (10 et 10.0 sont egaux;
+    espaces et retours a la ligne comptent pour un espace, comme a la
+    lecture d'un champ, voir _text).
+    """
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"{float(value):.2f}"
+    return " ".join(str(value).split())
+
+
+def content_digest(kind, item):
+    """
+    Calcule l'empreinte du contenu d'un element (tous les champs sauf l'ID).
+
+    Args:
+        kind: La collection
+        item: L'element (dictionnaire ou enregistrement)
+
+    Returns:
+        L'empreinte (entier de 64 bits)
+    """
+    fields = records.COLLECTION_TYPES[kind].FIELDS
+    text = "\x1f".join(_digest_value(item.get(field)) for field in fields if field != "id")
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def check_rows(kind, rows):
+    """
+    Valide et normalise un paquet de lignes.
+
+    Executee dans un processus du pool pour les gros fichiers: ne depend
+    que de ses arguments.
+
+    Args:
+        kind: La collection
+        rows: Liste de (numero de ligne, champs lus)
+
+    Returns:
+        Liste de (numero de ligne, element ou None, empreinte, erreur ou None)
+    """
+    results = []
+    for line, raw in rows:
+        error = validate(kind, raw)
+        if error is not None:
+            results.append((line, None, None, error))
+            continue
+        item = normalize(kind, raw)
+        results.append((line, item, content_digest(kind, item), None))
+    return results
+
+
+# ============================================
+# LECTURE DES FICHIERS
+# ============================================
+
+def detect_format(path):
+    """
+    Retourne le format d'un fichier d'apres son extension.
+
+    Raises:
+        ValueError: si l'extension n'est pas reconnue
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Format de fichier non reconnu: {ext or path}")
+    return FORMATS[ext]
+
+
+def _text_stream(f):
+    """
+    Ouvre un fichier binaire en texte (UTF-8, BOM accepte).
+    """
+    return io.TextIOWrapper(f, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def _detached(text, rows):
+    """
+    Lit les lignes d'un fichier ouvert en texte, puis detache le texte du
+    fichier binaire: le TextIOWrapper fermerait sinon le fichier en etant
+    libere, avant la fin de l'import (position lue par import_file).
+    """
+    yield from rows
+    text.detach()
+
+
+def parse_csv(text):
+    """
+    Lit un fichier CSV (separateur detecte: virgule, point-virgule ou
+    tabulation).
+
+    Seul le separateur est detecte: les guillemets suivent toujours la
+    regle d'Excel (RFC 4180, "" dans un champ entre guillemets, retours
+    a la ligne permis), que csv.Sniffer devine mal sur un echantillon.
+
+    Args:
+        text: Le fichier ouvert en texte
+
+    Returns:
+        Tuple (collection detectee d'apres les colonnes, generateur de
+        (numero de ligne, champs lus))
+
+    Raises:
+        ValueError: si les colonnes ne sont pas reconnues
+    """
+    sample = text.read(64 * 1024)
+    text.seek(0)
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t").delimiter
+    except csv.Error:
+        delimiter = csv.excel.delimiter
+
+    reader = csv.reader(text, csv.excel, delimiter=delimiter)
+    header = next(reader, [])
+    columns = [(i, CSV_COLUMNS[_plain(name)]) for i, name in enumerate(header)
+               if _plain(name) in CSV_COLUMNS]
+    fields = {field for _, field in columns}
+
+    if "montant" in fields:
+        kind = "depenses"
+    elif fields & {"prenom", "email", "telephone", "role"}:
+        kind = "participants"
+    elif "nom" in fields:
+        kind = "activites"
+    else:
+        raise ValueError("Colonnes CSV non reconnues: " + ", ".join(header))
+
+    def rows():
+        for row in reader:
+            if any(cell.strip() for cell in row):
+                yield reader.line_num, {field: row[i] for i, field in columns if i < len(row)}
+
+    return kind, rows()
+
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def _ofx_tokens(f):
+    """
+    Decoupe un fichier OFX en balises (closing, nom, texte), par morceaux
+    de 64 Ko. Accepte l'OFX 1.x (SGML, balises feuilles non fermees) et
+    l'OFX 2.x (XML).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    while True:
+        chunk = f.read(64 * 1024)
+        buffer += decoder.decode(chunk, final=not chunk)
+        # Le texte apres la derniere balise peut continuer dans le morceau suivant
+        end = buffer.rfind("<") if chunk else len(buffer)
+        for match in _OFX_TAG.finditer(buffer, 0, end):
+            yield match.group(1) == "/", match.group(2).upper(), match.group(3).strip()
+        buffer = buffer[end:]
+        if not chunk:
+            return
+
+
+def parse_ofx(f):
+    """
+    Lit les operations (STMTTRN) d'un releve OFX.
+
+    Args:
+        f: Le fichier ouvert en binaire
+
+    Yields:
+        (numero de l'operation, champs lus)
+    """
+    count = 0
+    current = None
+    for closing, tag, text in _ofx_tokens(f):
+        if tag == "STMTTRN":
+            if closing and current is not None:
+                count += 1
+                yield count, _ofx_expense(current)
+            current = None if closing else {}
+        elif current is not None and not closing and text:
+            current[tag] = html.unescape(text)
+
+
+def _ofx_expense(transaction):
+    """
+    Convertit une operation OFX en champs de depense.
+    """
+    amount = transaction.get("TRNAMT", "")
+    label = " - ".join(filter(None, (transaction.get("NAME"), transaction.get("MEMO"))))
+    return {
+        "date": transaction.get("DTPOSTED", ""),
+        "montant": amount,
+        "description": label,
+        "sens": "debit" if amount.strip().startswith("-") else "credit",
+    }
+
+
+def _local(tag):
+    """
+    Retourne le nom d'une balise XML sans son espace de noms.
+    """
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_camt(f):
+    """
+    Lit les ecritures (Ntry) d'un releve CAMT.053.
+
+    Chaque ecriture est retiree de l'arbre apres lecture: la memoire ne
+    depend pas de la taille du releve.
+
+    Args:
+        f: Le fichier ouvert en binaire
+
+    Yields:
+        (numero de l'ecriture, champs lus)
+    """
+    count = 0
+    parents = []
+    for event, elem in ET.iterparse(f, events=("start", "end")):
+        if event == "start":
+            parents.append(elem)
+            continue
+
+        parents.pop()
+        if _local(elem.tag) != "Ntry":
+            continue
+
+        count += 1
+        yield count, _camt_expense(elem)
+        if parents:
+            parents[-1].remove(elem)
+
+
+def _camt_expense(entry):
+    """
+    Convertit une ecriture CAMT.053 en champs de depense.
+    """
+    values = {}
+    creditor = ""
+    currency = ""
+    for elem in entry.iter():
+        name = _local(elem.tag)
+        if name == "Amt" and not currency:
+            currency = elem.get("Ccy", "")
+        if name == "Cdtr" and not creditor:
+            creditor = next((child.text.strip() for child in elem.iter()
+                             if _local(child.tag) == "Nm" and child.text), "")
+        if name not in values and elem.text and elem.text.strip():
+            values[name] = elem.text.strip()
+
+    label = values.get("Ustrd") or values.get("AddtlNtryInf") or values.get("AddtlTxInf", "")
+    return {
+        "date": values.get("Dt") or values.get("DtTm", ""),
+        "montant": values.get("Amt", ""),
+        "devise": currency,
+        "description": " - ".join(filter(None, (creditor, label))),
+        "sens": "debit" if values.get("CdtDbtInd") == "DBIT" else "credit",
+    }
+
+
+def _content_lines(text):
+    """
+    Lit les lignes d'un fichier ICS ou vCard en recollant les lignes
+    repliees (qui commencent par un espace ou une tabulation).
+
+    Yields:
+        (numero de ligne, ligne complete)
+    """
+    pending = None
+    start = 0
+    for number, line in enumerate(text, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending:
+            yield start, pending
+        pending, start = line, number
+    if pending:
+        yield start, pending
+
+
+def _split_content_line(line):
+    """
+    Decoupe une ligne ICS/vCard (NOM;PARAM=...:valeur).
+
+    Returns:
+        Tuple (nom en majuscules sans groupe, valeur), ou None
+    """
+    quoted = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            quoted = not quoted
+        elif ch == ":" and not quoted:
+            name = line[:i].split(";", 1)[0].rsplit(".", 1)[-1]
+            return name.upper(), line[i + 1:]
+    return None
+
+
+_ESCAPED = re.compile(r"\\([nN,;\\])")
+
+
+def _unescape(value):
+    """
+    Decode les caracteres echappes d'une valeur ICS/vCard.
+    """
+    return _ESCAPED.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), value or "")
+
+
+def _components(text, component):
+    """
+    Lit les composants (VEVENT, VCARD) d'un fichier ICS ou vCard.
+
+    Yields:
+        (numero de ligne du debut, {propriete: valeur}) (premiere valeur
+        de chaque propriete)
+    """
+    current = None
+    start = 0
+    for number, line in _content_lines(text):
+        parsed = _split_content_line(line)
+        if parsed is None:
+            continue
+        name, value = parsed
+        if name == "BEGIN" and value.upper() == component:
+            current, start = {}, number
+        elif name == "END" and value.upper() == component and current is not None:
+            yield start, current
+            current = None
+        elif current is not None and name not in current:
+            current[name] = value
+
+
+_ICS_DATETIME = re.compile(r"(\d{4})(\d{2})(\d{2})(?:T(\d{2})(\d{2}))?")
+_ICS_DURATION = re.compile(r"P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?")
+
+
+def _ics_minutes(start, end, duration):
+    """
+    Calcule la duree d'un evenement en minutes (DTEND ou DURATION).
+
+    Returns:
+        Le nombre de minutes, ou None (journee entiere, inconnue)
+    """
+    if duration:
+        match = _ICS_DURATION.match(duration.strip())
+        if match and any(match.groups()):
+            weeks, days, hours, minutes = (int(g or 0) for g in match.groups())
+            return ((weeks * 7 + days) * 24 + hours) * 60 + minutes
+        return None
+
+    times = [_ICS_DATETIME.match(value or "") for value in (start, end)]
+    if not all(times) or times[0].group(4) is None or times[1].group(4) is None:
+        return None
+    start_dt, end_dt = (datetime(*map(int, match.groups())) for match in times)
+    minutes = int((end_dt - start_dt).total_seconds() // 60)
+    return minutes if minutes > 0 else None
+
+
+def parse_ics(text):
+    """
+    Lit les evenements (VEVENT) d'un calendrier ICS.
+
+    Le prix est lu dans la propriete X-PRIX (voir exporter._activite_ics),
+    dans la devise du voyage.
+
+    Args:
+        text: Le fichier ouvert en texte
+
+    Yields:
+        (numero de ligne, champs d'activite lus)
+    """
+    for line, event in _components(text, "VEVENT"):
+        start = event.get("DTSTART", "")
+        minutes = _ics_minutes(start, event.get("DTEND"), event.get("DURATION"))
+        yield line, {
+            "date": start,
+            "horaire": start if "T" in start else "",
+            "duree": format_duration(minutes) if minutes else "",
+            "nom": _unescape(event.get("SUMMARY")),
+            "lieu": _unescape(event.get("LOCATION")),
+            "description": _unescape(event.get("DESCRIPTION")),
+            "prix": _unescape(event.get("X-PRIX")),
+        }
+
+
+def parse_vcard(text):
+    """
+    Lit les cartes (VCARD) d'un fichier vCard.
+
+    Args:
+        text: Le fichier ouvert en texte
+
+    Yields:
+        (numero de ligne, champs de participant lus)
+    """
+    for line, card in _components(text, "VCARD"):
+        parts = [_unescape(part) for part in re.split(r"(?<!\\);", card.get("N", ""))]
+        nom = parts[0] if parts else ""
+        prenom = parts[1] if len(parts) > 1 else ""
+        if not (nom and prenom) and card.get("FN"):
+            words = _unescape(card["FN"]).split()
+            prenom, nom = " ".join(words[:-1]), words[-1] if words else ""
+
+        yield line, {
+            "nom": nom,
+            "prenom": prenom,
+            "email": _unescape(card.get("EMAIL")),
+            "telephone": _unescape(card.get("TEL")),
+            "role": _unescape(card.get("ROLE") or card.get("TITLE")),
+            "date_naissance": card.get("BDAY", ""),
+            "allergies": _unescape(card.get("X-ALLERGIES")),
+            "notes": _unescape(card.get("NOTE")),
+        }
+
+
+def open_rows(path, f):
+    """
+    Prepare la lecture d'un fichier.
+
+    Args:
+        path: Le chemin du fichier (pour son extension)
+        f: Le fichier ouvert en binaire
+
+    Returns:
+        Tuple (format, collection, generateur de (numero de ligne, champs lus))
+    """
+    fmt = detect_format(path)
+    if fmt == "ofx":
+        return fmt, "depenses", parse_ofx(f)
+    if fmt == "camt":
+        return fmt, "depenses", parse_camt(f)
+
+    text = _text_stream(f)
+    if fmt == "csv":
+        kind, rows = parse_csv(text)
+    elif fmt == "ics":
+        kind, rows = "activites", parse_ics(text)
+    else:
+        kind, rows = "participants", parse_vcard(text)
+    return fmt, kind, _detached(text, rows)
+
+
+# ============================================
+# ETAPES DU PIPELINE
+# ============================================
+
+def _chunks(items, size):
+    """
+    Regroupe les elements d'un flux en listes de taille donnee.
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _pool_workers(total_bytes):
+    """
+    Nombre de processus du pool de validation pour un fichier.
+
+    Le pool ne sert qu'aux gros fichiers (IMPORT_PARALLEL_MIN_BYTES) et
+    s'il y a plus d'un processeur: sur un seul coeur, envoyer les lignes
+    aux processus coute plus que les valider (voir
+    benchmarks/bench_import.py).
+
+    Args:
+        total_bytes: La taille du fichier
+
+    Returns:
+        Le nombre de processus, ou 0 pour valider en serie
+    """
+    cpus = os.cpu_count() or 1
+    workers = IMPORT_WORKERS or cpus
+    if cpus < 2 or workers < 2 or total_bytes < IMPORT_PARALLEL_MIN_BYTES:
+        return 0
+    return workers
+
+
+def _checked(kind, rows, workers=0):
+    """
+    Valide et normalise les lignes par paquets (voir check_rows).
+
+    En parallele, au plus deux paquets par processus sont en attente:
+    la lecture du fichier ne prend pas d'avance sur la validation.
+
+    Args:
+        kind: La collection
+        rows: Les lignes lues (generateur)
+        workers: Le nombre de processus du pool (0: en serie, voir
+            _pool_workers)
+
+    Yields:
+        Paquets de resultats de check_rows, dans l'ordre du fichier
+    """
+    chunks = _chunks(rows, IMPORT_CHUNK_ROWS)
+    if not workers:
+        for chunk in chunks:
+            yield check_rows(kind, chunk)
+        return
+
+    # spawn: l'application a des threads (Tk, sauvegarde), fork n'est pas sur
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.submit(check_rows, kind, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _digest_set(digests=()):
+    """
+    Cree un ensemble compact d'empreintes (voir content_digest).
+
+    Les empreintes sont rangees dans un tableau trie (8 octets chacune,
+    contre plus de 60 dans un set d'entiers). Les nouvelles sont d'abord
+    placees dans un petit set, fusionne dans le tableau quand il en
+    atteint le huitieme: la memoire reste proche de 8 octets par
+    empreinte, quelle que soit la taille du fichier importe.
+
+    Args:
+        digests: Les empreintes initiales
+
+    Returns:
+        L'ensemble (dictionnaire: tableau trie et set des ajouts recents)
+    """
+    return {"sorted": array.array("Q", sorted(set(digests))), "recent": set()}
+
+
+def _digest_seen(digests, digest):
+    """
+    Indique si une empreinte est dans l'ensemble (recherche dichotomique).
+    """
+    if digest in digests["recent"]:
+        return True
+    table = digests["sorted"]
+    i = bisect.bisect_left(table, digest)
+    return i < len(table) and table[i] == digest
+
+
+def _digest_add(digests, digest):
+    """
+    Ajoute une empreinte a l'ensemble.
+    """
+    recent = digests["recent"]
+    recent.add(digest)
+    table = digests["sorted"]
+    if len(recent) >= max(IMPORT_CHUNK_ROWS, len(table) // 8):
+        table.extend(recent)
+        digests["sorted"] = array.array("Q", sorted(table))
+        recent.clear()
+
+
+def _deduplicated(results, seen, stats):
+    """
+    Ecarte les lignes invalides et les elements deja presents.
+
+    Args:
+        results: Paquets de resultats de check_rows
+        seen: Les empreintes des elements deja presents (voir _digest_set,
+            completees)
+        stats: Le rapport d'import (compteurs et erreurs mis a jour)
+
+    Yields:
+        Paquets d'elements a ajouter
+    """
+    for chunk in results:
+        items = []
+        for line, item, digest, error in chunk:
+            stats["rows"] += 1
+            if error is not None:
+                stats["rejected"] += 1
+                if len(stats["errors"]) < IMPORT_MAX_ERRORS:
+                    stats["errors"].append((line, error))
+            elif _digest_seen(seen, digest):
+                stats["duplicates"] += 1
+            else:
+                _digest_add(seen, digest)
+                items.append(item)
+        yield items
+
+
+# Fonctions d'acces de chaque collection importable
+_GETTERS = {
+    "depenses": data_manager.get_depenses,
+    "activites": data_manager.get_activites,
+    "participants": data_manager.get_participants,
+}
+_ADDERS = {
+    "depenses": data_manager.add_depenses,
+    "activites": data_manager.add_activites,
+    "participants": data_manager.add_participants,
+}
+
+
+def import_file(path, progress=None):
+    """
+    Importe un fichier dans le voyage ouvert.
+
+    Peut etre appelee depuis un thread: les frames sont mis a jour par
+    les evenements de modification.
+
+    Args:
+        path: Le chemin du fichier
+        progress: Fonction appelee avec le rapport (copie) apres chaque
+            paquet de lignes, ou None
+
+    Returns:
+        Le rapport d'import (dictionnaire: format, collection, rows,
+        imported, duplicates, rejected, errors [(ligne, message)],
+        bytes, total_bytes, elapsed_s, rows_per_s)
+
+    Raises:
+        ValueError: si le format ou les colonnes ne sont pas reconnus
+        OSError: si le fichier ne peut pas etre lu
+    """
+    total_bytes = os.path.getsize(path)
+    stats = {
+        "format": None, "collection": None, "rows": 0, "imported": 0,
+        "duplicates": 0, "rejected": 0, "errors": [],
+        "bytes": 0, "total_bytes": total_bytes, "elapsed_s": 0.0, "rows_per_s": 0.0,
+    }
+    start = time.perf_counter()
+
+    def report():
+        stats["elapsed_s"] = time.perf_counter() - start
+        stats["rows_per_s"] = stats["rows"] / stats["elapsed_s"] if stats["elapsed_s"] else 0.0
+        if progress is not None:
+            progress(dict(stats, errors=list(stats["errors"])))
+
+    with open(path, "rb") as f:
+        stats["format"], kind, rows = open_rows(path, f)
+        stats["collection"] = kind
+
+        seen = _digest_set(content_digest(kind, item) for item in _GETTERS[kind]())
+        results = _checked(kind, rows, _pool_workers(total_bytes))
+
+        # Un seul Ctrl+Z annule tout l'import, meme ajoute en plusieurs lots
+        with data_manager.history_step():
+            batch = []
+            for items in _deduplicated(results, seen, stats):
+                batch.extend(items)
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    _ADDERS[kind](batch)
+                    stats["imported"] += len(batch)
+                    batch = []
+                stats["bytes"] = min(f.tell(), total_bytes)
+                report()
+
+            if batch:
+                _ADDERS[kind](batch)
+                stats["imported"] += len(batch)
+
+    stats["bytes"] = total_bytes
+    report()
+    print(f"[Importer] {path}: {stats['imported']} {kind} importe(s), "
+          f"{stats['duplicates']} doublon(s), {stats['rejected']} ligne(s) rejetee(s) "
+          f"({stats['rows_per_s']:.0f} lignes/s)")
+    return stats
+
+
+# ============================================
+# UTILISATION EN LIGNE DE COMMANDE
+# ============================================
+
+def main(paths):
+    """
+    Importe des fichiers dans le voyage ouvert et sauvegarde.
+
+    Args:
+        paths: Les chemins des fichiers
+    """
+    def show(stats):
+        print(f"\r{stats['rows']} lignes ({stats['rows_per_s']:.0f} lignes/s)", end="", flush=True)
+
+    data_manager.open_trip(catalog.get_current_trip_id())
+    data_manager.load_data()
+
+    for path in paths:
+        stats = import_file(path, progress=show)
+        print()
+        for line, error in stats["errors"][:10]:
+            print(f"  ligne {line}: {error}")
+
+    data_manager.save_data()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python importer.py fichier [fichier ...]")
+        sys.exit(1)
+    main(sys.argv[1:])
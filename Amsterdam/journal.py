@@ -0,0 +1,269 @@
+"""
+journal.py - Journal des modifications de l'application Amsterdam Trip Planner.
+
+Ce module gere un fichier journal "append-only" place a cote du fichier
+JSON principal. Chaque modification des donnees y est ajoutee sous la forme
+d'un enregistrement JSON compact (une ligne par enregistrement).
+
+Au chargement, le journal est rejoue par-dessus le dernier instantane
+(le fichier JSON). Lorsque le journal devient trop gros, il est compacte:
+un nouvel instantane est ecrit et le journal est vide.
+
+Format d'un enregistrement:
+    {"seq": 12, "op": "add", "col": "activites", "id": 4, "rec": {...}}
+
+Operations:
+    - add:    ajoute l'enregistrement "rec" a la collection "col"
+    - update: remplace l'element "id" de la collection "col" par "rec"
+    - patch:  modifie seulement les champs "rec" de l'element "id"
+    - delete: supprime l'element "id" de la collection "col"
+    - set:    remplace la section "col" (hotel, transport, ...) par "rec"
+"""
+
+import json
+import os
+
+from records import json_default
+
+
+# ============================================
+# EMPLACEMENT DES COLLECTIONS DANS LES DONNEES
+# ============================================
+
+# Chemin de chaque collection (liste avec des IDs) dans le dictionnaire
+COLLECTION_PATHS = {
+    "activites": ("activites",),
+    "depenses": ("budget", "depenses"),
+    "participants": ("participants",),
+    "checklist": ("checklist",),
+}
+
+# Chemin de chaque section remplacee en bloc par l'operation "set"
+SECTION_PATHS = {
+    "voyage_info": ("voyage_info",),
+    "hotel": ("hotel",),
+    "transport": ("transport",),
+    "budget_prevu": ("budget", "budget_prevu"),
+    "partage": ("budget", "partage"),
+}
+
+
+# ============================================
+# FONCTIONS D'ACCES AU FICHIER
+# ============================================
+
+def encode_records(records):
+    """
+    Serialise des enregistrements au format du journal.
+
+    Args:
+        records: Liste d'enregistrements (dictionnaires)
+
+    Returns:
+        Le texte a ajouter au journal (une ligne JSON par enregistrement)
+    """
+    return "".join(
+        json.dumps(r, ensure_ascii=False, separators=(",", ":"),
+                   default=json_default) + "\n"
+        for r in records
+    )
+
+
+def append_records(path, records):
+    """
+    Ajoute des enregistrements a la fin du journal.
+
+    Args:
+        path: Chemin du fichier journal
+        records: Liste d'enregistrements (dictionnaires)
+
+    Returns:
+        La taille du journal apres l'ajout (en octets)
+    """
+    payload = encode_records(records).encode("utf-8")
+
+    with open(path, "ab") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+def read_records(path):
+    """
+    Lit les enregistrements du journal.
+
+    Une derniere ligne incomplete (ecriture interrompue) est ignoree.
+
+    Args:
+        path: Chemin du fichier journal
+
+    Yields:
+        Les enregistrements (dictionnaires) dans l'ordre d'ecriture
+    """
+    if not os.path.exists(path):
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"[Journal] Enregistrement incomplet ignore dans {path}")
+                return
+
+
+def read_tail(path, offset=0):
+    """
+    Lit les enregistrements ajoutes au journal apres une position.
+
+    Utilise pour suivre les ajouts des autres instances sans relire tout
+    le journal. Une derniere ligne incomplete n'est pas lue (la position
+    retournee s'arrete avant elle).
+
+    Args:
+        path: Chemin du fichier journal
+        offset: La position (en octets) deja lue
+
+    Returns:
+        Tuple (liste des enregistrements, nouvelle position)
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            raw = f.read()
+    except OSError:
+        return [], 0
+
+    end = raw.rfind(b"\n") + 1
+    records = []
+    for line in raw[:end].splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            print(f"[Journal] Enregistrement illisible ignore dans {path}")
+    return records, offset + end
+
+
+def get_size(path):
+    """
+    Retourne la taille du journal.
+
+    Args:
+        path: Chemin du fichier journal
+
+    Returns:
+        La taille en octets (0 si le fichier n'existe pas)
+    """
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def truncate(path):
+    """
+    Vide le journal (apres un compactage).
+
+    Args:
+        path: Chemin du fichier journal
+    """
+    with open(path, "wb") as f:
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# ============================================
+# FONCTIONS DE REJEU
+# ============================================
+
+def _get_parent(data, path):
+    """
+    Retourne le dictionnaire parent de la cle finale d'un chemin.
+
+    Args:
+        data: Les donnees completes
+        path: Tuple de cles
+
+    Returns:
+        Le dictionnaire contenant la derniere cle du chemin
+    """
+    parent = data
+    for key in path[:-1]:
+        parent = parent.setdefault(key, {})
+    return parent
+
+
+def replay(data, records, after_seq=0):
+    """
+    Rejoue des enregistrements sur les donnees d'un instantane.
+
+    Les collections touchees sont converties en dictionnaires id -> element
+    le temps du rejeu, ce qui rend chaque enregistrement O(1).
+
+    Args:
+        data: Les donnees de l'instantane (modifiees sur place)
+        records: Iterable d'enregistrements
+        after_seq: Les enregistrements de numero <= after_seq sont ignores
+            (ils sont deja inclus dans l'instantane)
+
+    Returns:
+        Tuple (nombre d'enregistrements appliques, dernier numero vu)
+    """
+    by_id = {}
+    applied = 0
+    last_seq = after_seq
+
+    for record in records:
+        seq = record.get("seq", 0)
+        if seq <= after_seq:
+            continue
+        last_seq = max(last_seq, seq)
+
+        op = record.get("op")
+        col = record.get("col")
+
+        if op == "set":
+            path = SECTION_PATHS.get(col)
+            if path:
+                _get_parent(data, path)[path[-1]] = record.get("rec")
+                applied += 1
+            continue
+
+        path = COLLECTION_PATHS.get(col)
+        if not path:
+            continue
+
+        if col not in by_id:
+            items = _get_parent(data, path).get(path[-1], [])
+            by_id[col] = {item.get("id"): item for item in items}
+        items = by_id[col]
+        item_id = record.get("id")
+
+        if op in ("add", "update"):
+            items[item_id] = record.get("rec")
+        elif op == "patch":
+            if item_id in items:
+                # L'element peut etre un enregistrement immuable (cache)
+                item = dict(items[item_id])
+                item.update(record.get("rec", {}))
+                items[item_id] = item
+        elif op == "delete":
+            items.pop(item_id, None)
+        else:
+            continue
+
+        applied += 1
+
+    # Reconvertir les collections touchees en listes
+    for col, items in by_id.items():
+        path = COLLECTION_PATHS[col]
+        _get_parent(data, path)[path[-1]] = list(items.values())
+
+    return applied, last_seq
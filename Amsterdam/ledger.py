@@ -0,0 +1,1048 @@
+"""
+ledger.py - Registre des depenses en colonnes de l'application Amsterdam
+Trip Planner (mode COLUMNAR_DEPENSES de config.py).
+
+Pour un voyage avec des centaines de milliers de depenses, un
+enregistrement par depense (objet, entiers, references dans l'IdMap)
+occupe l'essentiel de la memoire. Le registre range les depenses en
+colonnes, une par champ, dans des tableaux types:
+
+    id           entier 64 bits (IDs croissants)
+    date         numero de jour 32 bits (voir _encode_date)
+    categorie    code 32 bits dans la table des categories
+    montant      centimes, entier 64 bits
+    description  code 32 bits dans la table des descriptions
+    participant  code 32 bits dans la table des participants
+    devise       code 32 bits dans la table des devises
+
+Les champs texte sont encodes par dictionnaire: chaque valeur distincte
+n'est stockee qu'une fois (code 0: champ absent). Une depense qui ne
+peut pas etre encodee (date non canonique, montant qui n'est pas un
+nombre, cle inconnue...) reste un enregistrement ordinaire.
+
+Un Ledger s'utilise comme l'IdMap qu'il remplace (get, set, remove,
+iteration par ID croissant) et reste immuable: les colonnes (la base)
+ne changent jamais, les depenses ajoutees ou modifiees depuis sont dans
+une IdMap a cote, et les depenses de la base supprimees ou remplacees
+sont masquees. Les enregistrements sont crees a la demande, a la lecture.
+
+Le cache binaire de la section des depenses est un fichier a largeur
+fixe: un en-tete JSON (empreinte du fichier JSON, tables des valeurs,
+position des colonnes), puis les colonnes. A l'ouverture, le fichier est
+projete en memoire (mmap): les colonnes sont lues directement dans le
+fichier, page par page, sans copie.
+
+Un fichier projete ne peut pas etre remplace ni supprime sous Windows
+tant qu'une instance l'utilise. Chaque version du registre a donc son
+propre fichier, nomme d'apres la taille et la date du fichier JSON
+(depenses.<taille>-<date>.ledger, voir versioned_path): une ecriture ne
+remplace jamais un fichier projete, et les anciennes versions sont
+supprimees des qu'aucune instance ne les utilise plus.
+
+Usage:
+    items = Ledger.from_records(depenses)
+    items2 = items.set(12, depense)        # items est inchange
+    sums, counts = buckets(items, key_of)  # totaux par paquet
+    write(path, json_path, dumps(items), json_hash)
+    items = load(path, json_path)
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import Counter
+from datetime import date
+from itertools import compress
+
+import records
+import snapshot_cache
+from persistent import IdMap
+from records import ABSENT, Depense
+
+
+# ============================================
+# FORMAT DES COLONNES
+# ============================================
+
+# Colonnes (dans l'ordre de Depense.FIELDS) et code de type (array)
+COLUMNS = (
+    ("id", "q"),
+    ("date", "i"),
+    ("categorie", "I"),
+    ("montant", "q"),
+    ("description", "I"),
+    ("participant", "I"),
+    ("devise", "I"),
+)
+_TYPECODES = dict(COLUMNS)
+_POSITIONS = {name: position for position, (name, _) in enumerate(COLUMNS)}
+
+# Champs des paquets de totaux (voir buckets)
+BUCKET_FIELDS = ("devise", "date", "categorie", "participant")
+
+# Nombre de lignes dont les enregistrements sont crees ensemble (parcours)
+_CHUNK_ROWS = 4096
+
+# Nombre maximal de valeurs d'une colonne additionnees par un parcours
+# de la colonne pour chacune (au-dela: une boucle sur les lignes)
+SCAN_MAX_CODES = 32
+
+# Colonnes encodees par dictionnaire (code 0: champ absent)
+DICTIONARY_FIELDS = ("categorie", "description", "participant", "devise")
+
+# Codes de la colonne des dates qui ne sont pas des numeros de jour
+_DATE_ABSENT = 0
+_DATE_NONE = -1
+_DATE_EMPTY = -2
+_DATE_SPECIAL = {_DATE_ABSENT: ABSENT, _DATE_NONE: None, _DATE_EMPTY: ""}
+
+# Bornes des entiers 64 bits (IDs, montants)
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+# Fichier: signature, longueur de l'en-tete (8 octets), en-tete JSON,
+# puis les colonnes (chacune alignee sur 8 octets)
+MAGIC = b"AMSLEDG1"
+_LENGTH = struct.Struct("<Q")
+_ALIGN = 8
+
+# Version du format (a incrementer si la structure du fichier change)
+LEDGER_VERSION = 1
+
+
+def _encode_date(value):
+    """
+    Retourne le code d'une date, ou None si elle ne peut pas etre
+    encodee sans perte (date invalide ou non canonique).
+    """
+    if value is ABSENT:
+        return _DATE_ABSENT
+    if value is None:
+        return _DATE_NONE
+    if value == "":
+        return _DATE_EMPTY
+    if type(value) is not str:
+        return None
+    try:
+        ordinal = date.fromisoformat(value).toordinal()
+    except ValueError:
+        return None
+    if date.fromordinal(ordinal).isoformat() != value:
+        return None
+    return ordinal
+
+
+def _packed_codes(column):
+    """
+    Retourne les codes d'une colonne encodee en octets (un par ligne), ou
+    None si un code depasse 255 (table de plus de 255 valeurs).
+    """
+    if not len(column) or max(column) > 255:
+        return None
+    if isinstance(column, list):
+        return bytes(column)
+    # Octet de poids faible de chaque code
+    itemsize = column.itemsize
+    start = 0 if sys.byteorder == "little" else itemsize - 1
+    return column.tobytes()[start::itemsize]
+
+
+def _selector(column, codes, packed=None):
+    """
+    Retourne, pour chaque ligne d'une colonne, 1 si son code est l'un des
+    codes donnes, 0 sinon (selecteurs de itertools.compress).
+
+    Avec les codes en octets (voir _packed_codes), les selecteurs sont
+    calcules par bytes.translate, sans appel Python par ligne.
+    """
+    if packed is not None:
+        table = bytes(1 if code in codes else 0 for code in range(256))
+        return packed.translate(table)
+    if len(codes) == 1:
+        code, = codes
+        return map(code.__eq__, column)
+    return map(codes.__contains__, column)
+
+
+def _padding(size):
+    """
+    Retourne le nombre d'octets a ajouter pour aligner une taille.
+    """
+    return -size % _ALIGN
+
+
+# ============================================
+# COLONNES (BASE IMMUABLE)
+# ============================================
+
+class Columns:
+    """
+    Depenses rangees en colonnes (jamais modifiees apres creation).
+
+    Les colonnes sont des array (construction) ou des memoryview sur le
+    fichier projete en memoire (voir load).
+    """
+
+    __slots__ = ("count", "columns", "tables", "_codes", "_dates", "_packed", "_mmap")
+
+    def __init__(self, columns, tables, mapped=None):
+        self.count = len(columns["id"])
+        self.columns = columns
+        self.tables = tables
+        self._codes = {}      # champ -> {valeur: code} (construit a la demande)
+        self._dates = {}      # code de date -> texte interne
+        self._packed = {}     # champ -> codes en octets (voir packed)
+        self._mmap = mapped   # Fichier projete (garde ouvert avec les colonnes)
+
+    @classmethod
+    def build(cls, items):
+        """
+        Range des depenses en colonnes.
+
+        Args:
+            items: Les depenses (enregistrements, IDs croissants et uniques)
+
+        Returns:
+            Tuple (colonnes, depenses qui ne peuvent pas etre encodees)
+        """
+        columns = {name: array(typecode) for name, typecode in COLUMNS}
+        tables = {field: [ABSENT] for field in DICTIONARY_FIELDS}
+        codes = {field: {} for field in DICTIONARY_FIELDS}
+        leftovers = []
+
+        appenders = [columns[name].append for name, _ in COLUMNS]
+        positions = [(position, name) for position, (name, _) in enumerate(COLUMNS)]
+
+        for item in items:
+            values = item.to_values()
+            row = _encode_row(values, tables, codes, positions)
+            if row is None:
+                leftovers.append(item)
+                continue
+            for append, value in zip(appenders, row):
+                append(value)
+
+        result = cls(columns, tables)
+        result._codes = codes
+        return result, leftovers
+
+    # --- Lecture d'une ligne ---
+
+    def position(self, item_id):
+        """
+        Retourne la position d'un ID dans les colonnes, ou None.
+        """
+        ids = self.columns["id"]
+        position = bisect.bisect_left(ids, item_id)
+        if position < self.count and ids[position] == item_id:
+            return position
+        return None
+
+    def decode_date(self, code):
+        """
+        Retourne la date (texte interne) d'un code de la colonne des dates.
+        """
+        value = self._dates.get(code)
+        if value is None:
+            if code in _DATE_SPECIAL:
+                return _DATE_SPECIAL[code]
+            value = self._dates[code] = records.intern_value(date.fromordinal(code).isoformat())
+        return value
+
+    def row(self, position):
+        """
+        Cree l'enregistrement de la depense d'une position.
+        """
+        return self.rows((position,))[0]
+
+    def rows(self, positions):
+        """
+        Cree les enregistrements des depenses de plusieurs positions.
+        """
+        ids, dates, categories, montants, descriptions, participants, devises = \
+            (self.columns[name] for name, _ in COLUMNS)
+        tables = self.tables
+        categorie_table = tables["categorie"]
+        description_table = tables["description"]
+        participant_table = tables["participant"]
+        devise_table = tables["devise"]
+        decode_date = self.decode_date
+        from_values = Depense.from_values
+        return [from_values((
+            ids[position],
+            decode_date(dates[position]),
+            categorie_table[categories[position]],
+            montants[position],
+            description_table[descriptions[position]],
+            participant_table[participants[position]],
+            devise_table[devises[position]],
+        )) for position in positions]
+
+    def codes_of(self, field, value):
+        """
+        Retourne les codes d'une colonne dont la valeur lue par get() est
+        la valeur donnee (None: champ absent ou None).
+        """
+        if field == "date":
+            if value is None:
+                return {_DATE_ABSENT, _DATE_NONE}
+            code = _encode_date(value)
+            return set() if code is None else {code}
+
+        codes = self._codes.get(field)
+        if codes is None:
+            codes = self._codes[field] = {}
+            for code, entry in enumerate(self.tables[field]):
+                if code:
+                    codes.setdefault(entry, code)
+        found = {0} if value is None else set()
+        try:
+            code = codes.get(value)
+        except TypeError:
+            code = None
+        if code is not None:
+            found.add(code)
+        return found
+
+    def packed(self, field):
+        """
+        Retourne les codes d'une colonne encodee par dictionnaire en
+        octets (calcules une fois), ou None (voir _packed_codes).
+        """
+        if field not in DICTIONARY_FIELDS:
+            return None
+        if field not in self._packed:
+            self._packed[field] = _packed_codes(self.columns[field])
+        return self._packed[field]
+
+    def value_of(self, field, code):
+        """
+        Retourne la valeur d'un code d'une colonne (ABSENT: champ absent).
+        """
+        if field == "date":
+            return self.decode_date(code)
+        return self.tables[field][code]
+
+
+def _encode_row(values, tables, codes, positions):
+    """
+    Encode les valeurs d'une depense (voir Record.to_values).
+
+    Returns:
+        Les valeurs des colonnes, ou None si la depense ne peut pas etre
+        encodee sans perte
+    """
+    if values is None:
+        return None
+
+    row = list(values)
+    for position, name in positions:
+        value = values[position]
+        if name == "id" or name == "montant":
+            if type(value) is not int or not _INT64_MIN <= value <= _INT64_MAX:
+                return None
+            if name == "id" and value < 0:
+                return None
+        elif name == "date":
+            row[position] = _encode_date(value)
+            if row[position] is None:
+                return None
+        else:
+            if value is ABSENT:
+                row[position] = 0
+                continue
+            if value is not None and type(value) is not str:
+                return None
+            field_codes = codes[name]
+            code = field_codes.get(value)
+            if code is None:
+                table = tables[name]
+                code = field_codes[value] = len(table)
+                table.append(value)
+            row[position] = code
+    return row
+
+
+# ============================================
+# REGISTRE (MEME INTERFACE QU'UNE IdMap)
+# ============================================
+
+class Ledger(IdMap):
+    """
+    Collection immuable des depenses, rangees en colonnes.
+
+    Une modification retourne un nouveau Ledger qui partage les colonnes
+    avec l'ancien: seules l'IdMap des depenses ajoutees ou modifiees et
+    l'IdMap des IDs masques de la base sont copiees (chemin d'un element,
+    voir persistent.py).
+    """
+
+    __slots__ = ("_base", "_hidden", "_overlay")
+
+    def __init__(self):
+        super().__init__()
+        self._base = Columns.build(())[0]
+        self._hidden = IdMap()
+        self._overlay = IdMap()
+
+    @classmethod
+    def _make_ledger(cls, base, hidden, overlay):
+        result = cls.__new__(cls)
+        IdMap.__init__(result)
+        result._base = base
+        result._hidden = hidden
+        result._overlay = overlay
+        return result
+
+    @classmethod
+    def from_records(cls, items):
+        """
+        Construit un registre a partir de depenses.
+
+        Args:
+            items: Les depenses (enregistrements avec un ID valide); pour
+                un ID repete, la derniere est conservee
+
+        Returns:
+            Le nouveau registre
+        """
+        by_id = {}
+        for item in items:
+            by_id[item['id']] = item
+        base, leftovers = Columns.build(by_id[item_id] for item_id in sorted(by_id))
+        overlay = IdMap.from_pairs((item['id'], item) for item in leftovers)
+        return cls._make_ledger(base, IdMap(), overlay)
+
+    @property
+    def columns(self):
+        """
+        Les colonnes de la base (les depenses masquees y sont encore).
+        """
+        return self._base
+
+    def max_id(self):
+        """
+        Retourne le plus grand ID du registre (0 s'il est vide).
+        """
+        best = max(self._overlay.keys(), default=0)
+        ids = self._base.columns["id"]
+        for position in range(self._base.count - 1, -1, -1):
+            if self._hidden.get(ids[position]) is None:
+                return max(best, ids[position])
+        return best
+
+    # --- Lecture ---
+
+    def get(self, key, default=None):
+        value = self._overlay.get(key)
+        if value is not None:
+            return value
+        if self._hidden.get(key) is not None:
+            return default
+        position = self._base.position(key)
+        if position is None:
+            return default
+        return self._base.row(position)
+
+    def __len__(self):
+        return self._base.count - len(self._hidden) + len(self._overlay)
+
+    def __iter__(self):
+        for _, value in self.items():
+            yield value
+
+    def keys(self):
+        for key, _ in self.items():
+            yield key
+
+    def items(self):
+        """
+        Itere sur les couples (ID, depense) par ID croissant.
+        """
+        base = self._base
+        hidden = self._hidden
+        ids = base.columns["id"]
+        overlay = iter(self._overlay.items())
+        pending = next(overlay, None)
+
+        # Les enregistrements sont crees par blocs de lignes
+        for start in range(0, base.count, _CHUNK_ROWS):
+            positions = range(start, min(start + _CHUNK_ROWS, base.count))
+            if hidden:
+                positions = [position for position in positions
+                             if hidden.get(ids[position]) is None]
+            for position, item in zip(positions, base.rows(positions)):
+                item_id = ids[position]
+                while pending is not None and pending[0] < item_id:
+                    yield pending
+                    pending = next(overlay, None)
+                yield item_id, item
+
+        if pending is not None:
+            yield pending
+            yield from overlay
+
+    # --- Modification (nouveau registre) ---
+
+    def _hide(self, key):
+        """
+        Retourne les IDs masques, avec celui-ci s'il est dans la base.
+        """
+        if self._hidden.get(key) is None and self._base.position(key) is not None:
+            return self._hidden.set(key, True)
+        return self._hidden
+
+    def set(self, key, value):
+        """
+        Retourne un nouveau registre avec la depense placee.
+        """
+        return Ledger._make_ledger(self._base, self._hide(key), self._overlay.set(key, value))
+
+    def remove(self, key):
+        """
+        Retourne un nouveau registre sans l'ID donne (self s'il est absent).
+        """
+        if self.get(key) is None:
+            return self
+        return Ledger._make_ledger(self._base, self._hide(key), self._overlay.remove(key))
+
+    def __repr__(self):
+        return "Ledger({} depenses, {} en colonnes)".format(len(self), self._base.count)
+
+    # --- Parcours des colonnes ---
+
+    def _positions(self, field, value):
+        """
+        Retourne les positions visibles de la base ou un champ a une valeur.
+        """
+        base = self._base
+        codes = base.codes_of(field, value)
+        if not codes:
+            return []
+        column = base.columns[field]
+        packed = base.packed(field)
+        positions = compress(range(base.count), _selector(column, codes, packed))
+        if not self._hidden:
+            return list(positions)
+        ids = base.columns["id"]
+        hidden = self._hidden
+        return [position for position in positions if hidden.get(ids[position]) is None]
+
+    def find_ids(self, field, value):
+        """
+        Retourne les IDs des depenses dont un champ a une valeur donnee.
+
+        Les lignes de la base sont selectionnees sur les codes de la
+        colonne: aucune depense n'est decodee.
+
+        Args:
+            field: Le champ (colonne du registre)
+            value: La valeur recherchee
+
+        Returns:
+            Ensemble des IDs
+        """
+        base = self._base
+        codes = base.codes_of(field, value)
+        found = set()
+        if codes:
+            column = base.columns[field]
+            packed = base.packed(field)
+            found.update(compress(base.columns["id"], _selector(column, codes, packed)))
+            if self._hidden:
+                found.difference_update(self._hidden.keys())
+        found.update(item_id for item_id, item in self._overlay.items()
+                     if item.get(field) == value)
+        return found
+
+    def find(self, field, value):
+        """
+        Retourne les depenses dont un champ a une valeur donnee.
+
+        Args:
+            field: Le champ (colonne du registre)
+            value: La valeur recherchee
+
+        Returns:
+            Liste des depenses (par ID croissant pour la base, puis les
+            depenses ajoutees ou modifiees)
+        """
+        base = self._base
+        found = base.rows(self._positions(field, value))
+        found.extend(item for item in self._overlay if item.get(field) == value)
+        return found
+
+    def count(self, field, value):
+        """
+        Compte les depenses dont un champ a une valeur donnee.
+        """
+        return (len(self._positions(field, value))
+                + sum(1 for item in self._overlay if item.get(field) == value))
+
+
+# ============================================
+# AGREGATS SUR LES COLONNES
+# ============================================
+
+def _visible_rows(items, names):
+    """
+    Retourne les colonnes demandees d'un registre, restreintes aux lignes
+    visibles de sa base.
+    """
+    base = items._base
+    columns = [base.columns[name] for name in names]
+    if not items._hidden:
+        return columns
+    ids = base.columns["id"]
+    hidden = items._hidden
+    visible = [hidden.get(item_id) is None for item_id in ids]
+    return [list(compress(column, visible)) for column in columns]
+
+
+def _representative(items, fields, codes):
+    """
+    Cree une depense dont seuls quelques champs sont renseignes (ceux
+    d'un groupe de lignes de meme valeur).
+    """
+    values = [ABSENT] * len(COLUMNS)
+    for field, code in zip(fields, codes):
+        values[_POSITIONS[field]] = items._base.value_of(field, code)
+    return Depense.from_values(values)
+
+
+def buckets(items, key_of, fields=BUCKET_FIELDS):
+    """
+    Additionne les montants d'un registre par paquet.
+
+    Les lignes de la base sont regroupees par codes des champs lus
+    par key_of, sans creer d'enregistrement; chaque groupe de codes
+    est ensuite range dans son paquet par key_of, appele sur une
+    depense qui ne porte que ces champs. Pour un seul champ avec peu
+    de valeurs, chaque somme est un parcours de la colonne (sans
+    boucle Python par depense).
+
+    Args:
+        items: Le registre
+        key_of: Fonction depense -> paquet
+        fields: Les champs lus par key_of (colonnes encodees)
+
+    Returns:
+        Tuple (sommes, nombres): {paquet: somme des montants en
+        centimes}, {paquet: nombre de depenses}
+    """
+    *columns, montants = _visible_rows(items, tuple(fields) + ("montant",))
+
+    if len(columns) == 1:
+        column = columns[0]
+        packed = _packed_codes(column) if fields[0] in DICTIONARY_FIELDS else None
+        counts = Counter(column if packed is None else packed)
+        if len(counts) <= SCAN_MAX_CODES:
+            sums = {(code,): sum(compress(montants, _selector(column, {code}, packed)))
+                    for code in counts}
+        else:
+            sums = {}
+            for code, montant in zip(column, montants):
+                sums[(code,)] = sums.get((code,), 0) + montant
+        counts = {(code,): count for code, count in counts.items()}
+    else:
+        sums = {}
+        for codes, montant in zip(zip(*columns), montants):
+            sums[codes] = sums.get(codes, 0) + montant
+        counts = Counter(zip(*columns))
+
+    bucket_sums = {}
+    bucket_counts = {}
+    for codes, total in sums.items():
+        key = key_of(_representative(items, fields, codes))
+        bucket_sums[key] = bucket_sums.get(key, 0) + total
+        bucket_counts[key] = bucket_counts.get(key, 0) + counts[codes]
+
+    for item in items._overlay:
+        key = key_of(item)
+        bucket_sums[key] = bucket_sums.get(key, 0) + item.cents('montant')
+        bucket_counts[key] = bucket_counts.get(key, 0) + 1
+    return bucket_sums, bucket_counts
+
+
+def groups(items, fields):
+    """
+    Regroupe les depenses d'un registre par valeurs de quelques champs
+    encodes.
+
+    Les lignes de la base sont regroupees par codes, sans creer
+    d'enregistrement; les depenses ajoutees ou modifiees forment
+    chacune un groupe.
+
+    Args:
+        items: Le registre
+        fields: Les champs (colonnes encodees)
+
+    Returns:
+        Liste de tuples (depense qui ne porte que ces champs, IDs)
+    """
+    ids, *columns = _visible_rows(items, ("id",) + tuple(fields))
+    by_codes = {}
+    for item_id, codes in zip(ids, zip(*columns)):
+        group = by_codes.get(codes)
+        if group is None:
+            by_codes[codes] = [item_id]
+        else:
+            group.append(item_id)
+
+    result = [(_representative(items, fields, codes), group)
+              for codes, group in by_codes.items()]
+    result.extend((item, [item_id]) for item_id, item in items._overlay.items())
+    return result
+
+
+def sort_keys(items, field, key_of):
+    """
+    Retourne les cles de tri de toutes les depenses d'un registre (non
+    triees).
+
+    Pour une colonne encodee, key_of n'est appele qu'une fois par
+    valeur distincte; les montants sont compares en centimes.
+
+    Args:
+        items: Le registre
+        field: Le champ de tri
+        key_of: Fonction (champ, depense) -> (valeur, id)
+
+    Returns:
+        Liste des cles (valeur, id)
+    """
+    if field == "id" or field not in _TYPECODES:
+        return [key_of(field, item) for item in items]
+
+    keys = [key_of(field, item) for item in items._overlay]
+
+    column, ids = _visible_rows(items, (field, "id"))
+    if field == "montant":
+        keys.extend(zip(column, ids))
+        return keys
+
+    values = {code: key_of(field, _representative(items, (field,), (code,)))[0]
+              for code in set(column)}
+    keys.extend(zip(map(values.__getitem__, column), ids))
+    return keys
+
+
+# ============================================
+# JOURNAL
+# ============================================
+
+def replay(items, backlog):
+    """
+    Rejoue les enregistrements du journal sur un registre (voir
+    journal.replay, qui convertirait toute la collection en
+    dictionnaire).
+
+    Args:
+        items: Le registre lu
+        backlog: Les enregistrements du journal de la collection
+
+    Returns:
+        Le nouveau registre, ou None si un enregistrement a un ID qui ne
+        peut pas etre place dans le registre
+    """
+    for record in backlog:
+        op = record.get("op")
+        item_id = record.get("id")
+        if op not in ("add", "update", "patch", "delete"):
+            continue
+        if type(item_id) is not int or item_id < 0:
+            return None
+
+        if op in ("add", "update"):
+            items = items.set(item_id, Depense.from_dict(record.get("rec")))
+        elif op == "patch":
+            current = items.get(item_id)
+            if current is not None:
+                # L'element est un enregistrement immuable
+                item = dict(current)
+                item.update(record.get("rec", {}))
+                items = items.set(item_id, Depense.from_dict(item))
+        else:
+            items = items.remove(item_id)
+    return items
+
+
+# ============================================
+# VUE DES DEPENSES PAR ID
+# ============================================
+
+class IdView:
+    """
+    Index par ID (dictionnaire en lecture) d'une collection en colonnes.
+
+    Remplace le dictionnaire id -> element des index (voir
+    data_manager._build_index): les depenses sont lues dans la version
+    courante du registre au lieu d'etre gardees en double. La vue est en
+    lecture seule: data_manager ne l'ecrit pas (index "columnar"), le
+    registre etant la reference.
+    """
+
+    __slots__ = ("_collection",)
+
+    def __init__(self, collection):
+        """
+        Args:
+            collection: Fonction sans argument qui retourne le registre courant
+        """
+        self._collection = collection
+
+    def get(self, key, default=None):
+        return self._collection().get(key, default)
+
+    def __getitem__(self, key):
+        value = self._collection().get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self._collection().get(key) is not None
+
+    def __len__(self):
+        return len(self._collection())
+
+    def __iter__(self):
+        return self._collection().keys()
+
+    def keys(self):
+        return self._collection().keys()
+
+    def values(self):
+        return iter(self._collection())
+
+    def items(self):
+        return self._collection().items()
+
+
+# ============================================
+# FICHIER A LARGEUR FIXE (CACHE DE LA SECTION)
+# ============================================
+
+def dumps(items):
+    """
+    Prepare le contenu du fichier d'un registre.
+
+    Args:
+        items: Les depenses (Ledger, IdMap ou liste d'enregistrements)
+
+    Returns:
+        Tuple (en-tete sans l'empreinte du JSON, colonnes en octets)
+    """
+    if not isinstance(items, Ledger) or items._hidden or items._overlay:
+        items = Ledger.from_records(
+            item if isinstance(item, Depense) else Depense.from_dict(item) for item in items)
+
+    base = items.columns
+    chunks = []
+    layout = {}
+    offset = 0
+    for name, typecode in COLUMNS:
+        column = base.columns[name]
+        data = column.tobytes() if isinstance(column, array) else bytes(column)
+        layout[name] = [typecode, array(typecode).itemsize, offset]
+        chunks.append(data)
+        chunks.append(b"\0" * _padding(len(data)))
+        offset += len(data) + _padding(len(data))
+
+    header = {
+        "version": LEDGER_VERSION,
+        "byteorder": sys.byteorder,
+        "rows": base.count,
+        "columns": layout,
+        # La premiere valeur de chaque table (champ absent) n'est pas lue
+        "tables": {field: [None] + base.tables[field][1:] for field in DICTIONARY_FIELDS},
+        # Depenses qui ne peuvent pas etre encodees (rares): gardees en JSON
+        "autres": [item.to_dict() for item in items._overlay],
+    }
+    return header, b"".join(chunks)
+
+
+def versioned_path(path, stat):
+    """
+    Retourne le chemin du fichier d'un registre pour une version du
+    fichier JSON (taille et date de modification).
+
+    Args:
+        path: Chemin du registre sans version (ex: sections/depenses.ledger)
+        stat: Le resultat de os.stat sur le fichier JSON
+    """
+    root, extension = os.path.splitext(path)
+    return "{}.{:x}-{:x}{}".format(root, stat.st_size, stat.st_mtime_ns, extension)
+
+
+def _remove_stale(path, keep):
+    """
+    Supprime les anciennes versions d'un registre (et le fichier sans
+    version des versions precedentes de l'application).
+
+    Une version encore projetee par une instance (Windows) ne peut pas
+    etre supprimee: elle le sera a une prochaine ecriture.
+
+    Args:
+        path: Chemin du registre sans version
+        keep: Le fichier de la version courante
+    """
+    directory, filename = os.path.split(path)
+    root, extension = os.path.splitext(filename)
+    for entry in os.listdir(directory or "."):
+        stale = entry == filename or (entry.startswith(root + ".") and entry.endswith(extension))
+        full_path = os.path.join(directory, entry)
+        if not stale or full_path == keep:
+            continue
+        try:
+            os.remove(full_path)
+        except OSError as e:
+            print(f"[Ledger] Ancienne version gardee (encore ouverte?): {entry} ({e})")
+
+
+def write(path, json_path, packed, json_hash):
+    """
+    Ecrit le fichier d'un registre a cote du fichier JSON de la section.
+
+    Le fichier porte la version du fichier JSON (voir versioned_path):
+    il ne remplace pas le registre projete par une instance ouverte.
+
+    Args:
+        path: Chemin du registre sans version
+        json_path: Chemin du fichier JSON (deja ecrit)
+        packed: Le contenu prepare par dumps
+        json_hash: L'empreinte du contenu du fichier JSON
+
+    Returns:
+        Le chemin du fichier ecrit
+    """
+    header, body = packed
+    stat = os.stat(json_path)
+    target = versioned_path(path, stat)
+    header = dict(header, size=stat.st_size, mtime_ns=stat.st_mtime_ns, hash=json_hash)
+    encoded = json.dumps(header, ensure_ascii=False, default=records.json_default).encode("utf-8")
+    encoded += b" " * _padding(len(MAGIC) + _LENGTH.size + len(encoded))
+
+    tmp_path = target + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(encoded)))
+        f.write(encoded)
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    try:
+        os.replace(tmp_path, target)
+    except OSError:
+        os.remove(tmp_path)
+        raise
+
+    _remove_stale(path, target)
+    return target
+
+
+def load(path, json_path):
+    """
+    Ouvre le fichier d'un registre s'il correspond au fichier JSON.
+
+    Le fichier de la version du fichier JSON est ouvert (voir
+    versioned_path), puis son empreinte est verifiee (voir
+    snapshot_cache.load). Les colonnes sont lues dans le fichier projete
+    en memoire; la projection est fermee si l'ouverture echoue ensuite.
+
+    Args:
+        path: Chemin du registre sans version
+        json_path: Chemin du fichier JSON
+
+    Returns:
+        Le registre, ou None si le fichier est absent, perime ou illisible
+    """
+    try:
+        stat = os.stat(json_path)
+    except OSError:
+        return None
+    path = versioned_path(path, stat)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("signature invalide")
+            length, = _LENGTH.unpack(f.read(_LENGTH.size))
+            header = json.loads(f.read(length))
+
+            if (header.get("version") != LEDGER_VERSION
+                    or header.get("byteorder") != sys.byteorder
+                    or header.get("size") != stat.st_size
+                    or header.get("mtime_ns") != stat.st_mtime_ns):
+                print(f"[Ledger] Registre perime ignore: {path}")
+                return None
+
+            if header.get("hash") != snapshot_cache.file_hash(json_path):
+                print(f"[Ledger] Contenu different du fichier JSON: {path}")
+                return None
+
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return _open_mapped(mapped, header, len(MAGIC) + _LENGTH.size + length)
+    except Exception as e:
+        print(f"[Ledger] Registre illisible ({e}): {path}")
+        return None
+
+
+def _open_mapped(mapped, header, start):
+    """
+    Cree le registre dont les colonnes sont lues dans un fichier projete.
+
+    Si une colonne ou une table est invalide, les vues sur le fichier
+    sont liberees et la projection fermee avant de propager l'erreur.
+
+    Args:
+        mapped: Le fichier projete (mmap)
+        header: L'en-tete du fichier
+        start: La position de la premiere colonne
+
+    Returns:
+        Le registre
+    """
+    views = []
+    opened = False
+    try:
+        rows = header["rows"]
+        view = memoryview(mapped)
+        views.append(view)
+        columns = {}
+        for name, typecode in COLUMNS:
+            stored, itemsize, offset = header["columns"][name]
+            if stored != typecode or itemsize != array(typecode).itemsize:
+                raise ValueError(f"colonne {name} incompatible")
+            begin = start + offset
+            if begin + rows * itemsize > len(mapped):
+                raise ValueError(f"colonne {name} tronquee")
+            with view[begin:begin + rows * itemsize] as part:
+                columns[name] = part.cast(typecode)
+            views.append(columns[name])
+
+        tables = {}
+        for field in DICTIONARY_FIELDS:
+            table = header["tables"][field]
+            if field in Depense.INTERNED:
+                table = [records.intern_value(value) for value in table]
+            table[0] = ABSENT
+            tables[field] = table
+
+        overlay = IdMap.from_pairs((item['id'], Depense.from_dict(item))
+                                   for item in header.get("autres", ()))
+        result = Ledger._make_ledger(Columns(columns, tables, mapped), IdMap(), overlay)
+        opened = True
+        return result
+    finally:
+        if not opened:
+            for view in reversed(views):
+                view.release()
+            mapped.close()
@@ -14,18 +14,31 @@ Date: Decembre 2024
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, simpledialog, filedialog
+import os
+import queue
 import sys
+import threading
 
 # Import des configurations
 from config import (
     APP_TITLE, WINDOW_WIDTH, WINDOW_HEIGHT,
-    MIN_WIDTH, MIN_HEIGHT, COLORS, FONTS
+    MIN_WIDTH, MIN_HEIGHT, COLORS, FONTS, format_date, format_currency, SYNC_INTERVAL_MS
 )
 
 # Import du gestionnaire de donnees (module avec fonctions)
 import data_manager
 
+# Import du catalogue des voyages
+import catalog
+
+# Import du bus d'evenements de modification
+import events
+
+# Import et export de fichiers (CSV, releves bancaires, calendriers, vCard)
+import importer
+import exporter
+
 # Import des frames (onglets)
 from frames import (
     HomeFrame,
@@ -50,6 +63,58 @@ notebook = None
 # Dictionnaire des frames
 frames = {}
 
+# Texte d'etat affiche dans l'en-tete (chargement en cours...)
+status_var = None
+
+# Liste deroulante des voyages et identifiants dans l'ordre de la liste
+trip_combo = None
+trip_ids = []
+
+# Voile affiche par-dessus les onglets pendant le chargement des donnees
+# (les frames ne lisent rien tant que les sections ne sont pas chargees)
+loading_label = None
+
+# Frames a relire entierement a leur prochain affichage (apres un
+# rechargement complet des donnees)
+stale_frames = set()
+
+# Intervalle (ms) de remise des evenements de modification
+EVENT_POLL_MS = 50
+
+# Avancement de l'operation en cours (import, export): rapports envoyes
+# par le thread de l'operation
+task_queue = None
+
+# Recherche globale: champ de saisie, nombre de resultats, liste des
+# resultats (affichee sous le champ) et resultats dans l'ordre de la
+# liste (tuples (section, cle, element), voir data_manager.search)
+search_var = None
+search_count_var = None
+search_entry = None
+search_list = None
+search_results = []
+
+# Recherche programmee par la derniere touche (identifiant root.after), ou
+# None: la recherche n'a lieu qu'apres une pause de la saisie
+search_job = None
+
+# Delai (ms) sans frappe avant de lancer la recherche
+SEARCH_DELAY_MS = 200
+
+# Onglet (cle du frame) de chaque section des resultats de recherche
+SEARCH_FRAMES = {
+    "activites": "activities",
+    "depenses": "budget",
+    "participants": "participants",
+    "checklist": "checklist",
+    "hotel": "hotel",
+    "transport": "transport",
+    "sur_place": "transport",
+}
+
+# Nombre maximal de lignes visibles de la liste des resultats
+SEARCH_LIST_HEIGHT = 12
+
 
 # ============================================
 # FONCTIONS DE CONFIGURATION
@@ -205,6 +270,8 @@ def create_header(parent):
     Args:
         parent: Le widget parent
     """
+    global status_var, trip_combo
+
     header_frame = ttk.Frame(parent)
     header_frame.pack(fill=tk.X, pady=(0, 10))
 
@@ -216,6 +283,14 @@ def create_header(parent):
     )
     title_label.pack(side=tk.LEFT)
 
+    # Etat du chargement des donnees
+    status_var = tk.StringVar(value="Chargement des donnees...")
+    ttk.Label(
+        header_frame,
+        textvariable=status_var,
+        font=FONTS["small"]
+    ).pack(side=tk.LEFT, padx=15)
+
     # Bouton de sauvegarde manuelle
     save_btn = ttk.Button(
         header_frame,
@@ -224,6 +299,21 @@ def create_header(parent):
     )
     save_btn.pack(side=tk.RIGHT, padx=5)
 
+    # Annuler / retablir la derniere modification (aussi Ctrl+Z / Ctrl+Y)
+    redo_btn = ttk.Button(
+        header_frame,
+        text="Retablir",
+        command=redo_last
+    )
+    redo_btn.pack(side=tk.RIGHT, padx=5)
+
+    undo_btn = ttk.Button(
+        header_frame,
+        text="Annuler",
+        command=undo_last
+    )
+    undo_btn.pack(side=tk.RIGHT, padx=5)
+
     # Bouton de reinitialisation
     reset_btn = ttk.Button(
         header_frame,
@@ -232,6 +322,67 @@ def create_header(parent):
     )
     reset_btn.pack(side=tk.RIGHT, padx=5)
 
+    # Duplication du voyage ouvert (modele pour un nouveau voyage)
+    clone_btn = ttk.Button(
+        header_frame,
+        text="Dupliquer",
+        command=clone_trip
+    )
+    clone_btn.pack(side=tk.RIGHT, padx=5)
+
+    # Choix du voyage (le catalogue ne contient que les resumes)
+    trip_combo = ttk.Combobox(header_frame, state="readonly", width=30)
+    trip_combo.pack(side=tk.RIGHT, padx=5)
+    trip_combo.bind("<<ComboboxSelected>>", on_trip_selected)
+    update_trip_list()
+
+    # Recherche globale (sous le titre)
+    create_search_bar(parent)
+
+
+def create_search_bar(parent):
+    """
+    Cree le champ de recherche globale (aussi Ctrl+F).
+
+    Les resultats sont cherches des que la saisie marque une pause
+    (SEARCH_DELAY_MS) et affiches dans une liste sous le champ, par-dessus les onglets (PLACE). Choisir un
+    resultat ouvre son onglet et selectionne sa ligne.
+
+    Args:
+        parent: Le widget parent
+    """
+    global search_var, search_count_var, search_entry, search_list
+
+    search_frame = ttk.Frame(parent)
+    search_frame.pack(fill=tk.X, pady=(0, 10))
+
+    ttk.Label(
+        search_frame,
+        text="Rechercher :",
+        font=FONTS["body"]
+    ).pack(side=tk.LEFT)
+
+    search_var = tk.StringVar()
+    search_entry = ttk.Entry(search_frame, textvariable=search_var, width=50)
+    search_entry.pack(side=tk.LEFT, padx=5)
+    search_entry.bind("<KeyRelease>", schedule_search)
+    search_entry.bind("<Return>", open_first_search_result)
+    search_entry.bind("<Down>", focus_search_results)
+    search_entry.bind("<Escape>", hide_search_results)
+
+    search_count_var = tk.StringVar()
+    ttk.Label(
+        search_frame,
+        textvariable=search_count_var,
+        font=FONTS["small"]
+    ).pack(side=tk.LEFT, padx=5)
+
+    # Liste des resultats, placee sous le champ quand elle est remplie
+    search_list = tk.Listbox(root, font=FONTS["body"], activestyle="dotbox")
+    search_list.bind("<Return>", lambda e: open_search_result(selected_search_result()))
+    search_list.bind("<ButtonRelease-1>", lambda e: open_search_result(selected_search_result()))
+    search_list.bind("<Escape>", hide_search_results)
+
 
 def create_notebook(parent):
     """
@@ -280,6 +431,40 @@ def create_notebook(parent):
     # Evenement lors du changement d'onglet
     notebook.bind("<<NotebookTabChanged>>", on_tab_changed)
 
+    # Etat de chargement, par-dessus les onglets (PLACE)
+    global loading_label
+    loading_label = ttk.Label(
+        root,
+        text="Chargement des donnees...",
+        font=FONTS["heading"],
+        anchor=tk.CENTER
+    )
+    show_loading()
+
+
+def create_menu():
+    """
+    Cree la barre de menus de la fenetre (menu Fichier).
+    """
+    global root
+
+    menubar = tk.Menu(root)
+
+    file_menu = tk.Menu(menubar, tearoff=0)
+    file_menu.add_command(label="Importer...", command=import_file)
+
+    export_menu = tk.Menu(file_menu, tearoff=0)
+    for name, spec in exporter.EXPORTS.items():
+        export_menu.add_command(label=spec.label + "...",
+                                command=lambda name=name: export_data(name))
+    file_menu.add_cascade(label="Exporter", menu=export_menu)
+
+    file_menu.add_separator()
+    file_menu.add_command(label="Quitter", command=on_closing)
+    menubar.add_cascade(label="Fichier", menu=file_menu)
+
+    root.config(menu=menubar)
+
 
 def create_widgets():
     """
@@ -287,6 +472,9 @@ def create_widgets():
     """
     global root
 
+    # Barre de menus
+    create_menu()
+
     # Container principal
     main_container = ttk.Frame(root)
     main_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -302,17 +490,200 @@ def create_widgets():
 # CALLBACKS ET GESTIONNAIRES D'EVENEMENTS
 # ============================================
 
-def on_tab_changed(event):
+def describe_result(section, key, item):
     """
-    Callback appele lors du changement d'onglet.
+    Retourne le texte d'un resultat de recherche dans la liste.
 
-    Permet de rafraichir les donnees de l'onglet actif.
+    Args:
+        section: La section du resultat (voir data_manager.TEXT_FIELDS)
+        key: La cle du resultat (voir data_manager.search)
+        item: L'element trouve
+
+    Returns:
+        Le texte de la ligne
+    """
+    if section == "activites":
+        return "Activite : {} - {} ({})".format(
+            item.get('nom', ''), format_date(item.get('date', '')), item.get('lieu', ''))
+    if section == "depenses":
+        return "Depense : {} - {} ({})".format(
+            item.get('description', ''), format_currency(item.get('montant', 0)),
+            format_date(item.get('date', '')))
+    if section == "participants":
+        return "Participant : {} {} ({})".format(
+            item.get('prenom', ''), item.get('nom', ''), item.get('role', ''))
+    if section == "checklist":
+        return "Checklist : {} ({})".format(item.get('item', ''), item.get('categorie', ''))
+    if section == "hotel":
+        return "Hotel : {}".format(item.get('nom', ''))
+    if section == "transport":
+        return "Transport {} : {} {} ({} -> {})".format(
+            key, item.get('compagnie', ''), item.get('numero', ''),
+            item.get('depart_lieu', ''), item.get('arrivee_lieu', ''))
+    return "Transport sur place : {} - {}".format(item.get('type', ''), item.get('description', ''))
+
+
+def schedule_search(event=None):
+    """
+    Programme la recherche apres une pause de la saisie.
+
+    Appelee a chaque touche relachee dans le champ: la recherche
+    programmee par la touche precedente est annulee, seule la derniere
+    est lancee (SEARCH_DELAY_MS apres).
 
     Args:
-        event: L'evenement Tkinter
+        event: L'evenement Tkinter (ou None)
+    """
+    global search_job
+
+    if event is not None and event.keysym in ("Return", "Down", "Up", "Escape"):
+        return
+
+    if search_job is not None:
+        root.after_cancel(search_job)
+    search_job = root.after(SEARCH_DELAY_MS, update_search)
+
+
+def update_search():
+    """
+    Cherche le texte du champ de recherche et affiche les resultats.
+
+    La recherche lit les index maintenus par le data_manager (voir
+    search_index.py). Tant que les sections sont en cours de chargement,
+    "Chargement des donnees..." est affiche et la recherche est relancee
+    plus tard: elle ne lit jamais une section dans le thread Tk.
+    """
+    global search_results, search_job
+
+    search_job = None
+
+    text = search_var.get()
+    if not text.strip():
+        search_count_var.set("")
+        hide_search_results()
+        return
+
+    if not data_manager.is_loaded():
+        search_count_var.set("Chargement des donnees...")
+        search_job = root.after(SEARCH_DELAY_MS, update_search)
+        return
+
+    total, search_results = data_manager.search(text)
+
+    search_list.delete(0, tk.END)
+    for result in search_results:
+        search_list.insert(tk.END, describe_result(*result))
+    if total > len(search_results):
+        search_list.insert(tk.END, "... {} autres resultats (precisez la recherche)".format(
+            total - len(search_results)))
+
+    search_count_var.set("{} resultat(s)".format(total))
+
+    if not search_results:
+        hide_search_results()
+        return
+
+    search_list.configure(height=min(search_list.size(), SEARCH_LIST_HEIGHT))
+    search_list.place(in_=search_entry, x=0, rely=1.0, width=650)
+    search_list.lift()
+
+
+def open_first_search_result(event=None):
+    """
+    Ouvre le premier resultat (Entree), apres avoir lance la recherche
+    programmee si la saisie vient de changer.
+    """
+    if search_job is not None:
+        root.after_cancel(search_job)
+        update_search()
+    return open_search_result(0)
+
+
+def selected_search_result():
+    """
+    Retourne la position du resultat selectionne dans la liste, ou None.
+    """
+    selection = search_list.curselection()
+    return selection[0] if selection else None
+
+
+def focus_search_results(event=None):
+    """
+    Passe du champ de recherche a la liste des resultats (fleche bas).
+    """
+    if search_results:
+        search_list.focus_set()
+        search_list.selection_clear(0, tk.END)
+        search_list.selection_set(0)
+        search_list.activate(0)
+    return "break"
+
+
+def hide_search_results(event=None):
+    """
+    Masque la liste des resultats de recherche.
+    """
+    if search_list is not None:
+        search_list.place_forget()
+
+
+def focus_search(event=None):
+    """
+    Place le curseur dans le champ de recherche (Ctrl+F).
+    """
+    search_entry.focus_set()
+    search_entry.select_range(0, tk.END)
+    return "break"
+
+
+def open_search_result(index):
+    """
+    Ouvre l'onglet d'un resultat de recherche et y affiche l'element.
+
+    Args:
+        index: La position du resultat dans la liste (ou None)
     """
     global notebook, frames
 
+    if index is None or not 0 <= index < len(search_results):
+        return "break"
+
+    section, key, _item = search_results[index]
+    frame_key = SEARCH_FRAMES[section]
+    frame = frames[frame_key]
+
+    hide_search_results()
+    notebook.select(frame)
+    refresh_if_stale(frame_key)
+    if hasattr(frame, 'show_item'):
+        frame.show_item(key)
+    return "break"
+
+
+def show_loading():
+    """
+    Affiche ou masque l'etat de chargement par-dessus les onglets.
+
+    Tant que les sections ne sont pas toutes chargees (voir
+    data_manager.start_loading), les frames restent sous le voile: aucun
+    callback Tk ne lit une section au premier acces.
+    """
+    if data_manager.is_loaded():
+        loading_label.place_forget()
+    else:
+        loading_label.place(in_=notebook, x=0, y=0, relwidth=1.0, relheight=1.0)
+        loading_label.lift()
+
+
+def get_current_frame_key():
+    """
+    Retourne la cle du frame de l'onglet actif.
+
+    Returns:
+        La cle du frame (voir create_notebook), ou None
+    """
+    global notebook
+
     # Obtenir l'index de l'onglet actif
     selected_index = notebook.index(notebook.select())
 
@@ -320,19 +691,406 @@ def on_tab_changed(event):
     frame_keys = ["home", "activities", "budget", "hotel",
                   "transport", "participants", "checklist"]
 
-    # Rafraichir le frame actif s'il a une methode refresh
     if selected_index < len(frame_keys):
-        frame_key = frame_keys[selected_index]
-        frame = frames.get(frame_key)
+        return frame_keys[selected_index]
+    return None
+
+
+def refresh_if_stale(frame_key):
+    """
+    Rafraichit un frame s'il doit etre relu entierement.
+
+    Args:
+        frame_key: La cle du frame
+    """
+    global frames
+
+    frame = frames.get(frame_key)
+    if frame_key in stale_frames and frame and hasattr(frame, 'refresh'):
+        stale_frames.discard(frame_key)
+        frame.refresh()
+
+
+def on_tab_changed(event):
+    """
+    Callback appele lors du changement d'onglet.
+
+    Les frames sont tenus a jour par les evenements du data_manager:
+    seul un frame a relire apres un rechargement complet est rafraichi.
+
+    Args:
+        event: L'evenement Tkinter
+    """
+    # Les frames seront rafraichis a la fin du chargement
+    if not data_manager.is_loaded():
+        return
+
+    refresh_if_stale(get_current_frame_key())
+
+
+def on_data_changed(batch):
+    """
+    Callback appele pour chaque lot d'evenements du data_manager.
+
+    Apres un rechargement complet (chargement, changement de voyage,
+    reinitialisation), le frame actif est rafraichi tout de suite et
+    les autres a leur prochain affichage. Les autres evenements sont
+    traites par les frames eux-memes.
+
+    Les conflits avec une autre instance sont presentes a l'utilisateur.
+
+    Args:
+        batch: Le lot d'evenements (tuple de events.ChangeEvent)
+    """
+    global frames
+
+    conflicts = events.get_conflicts(batch)
+    if conflicts:
+        show_conflicts(conflicts)
+
+    if not events.is_reload(batch):
+        return
 
-        if frame and hasattr(frame, 'refresh'):
-            frame.refresh()
+    stale_frames.update(frames)
+
+    # Manifeste lu, sections en cours de prechargement: un second
+    # rechargement est publie quand elles sont toutes lues
+    show_loading()
+    if not data_manager.is_loaded():
+        return
+
+    refresh_if_stale(get_current_frame_key())
+
+    # Les resultats affiches viennent des donnees precedentes
+    hide_search_results()
+    search_results.clear()
+
+    status_var.set("")
+
+
+def dispatch_events():
+    """
+    Remet periodiquement les evenements de modification aux frames.
+
+    Les modifications peuvent venir d'un autre thread (chargement en
+    arriere-plan): les evenements sont toujours remis ici, dans le
+    thread Tk.
+    """
+    global root
+
+    events.dispatch()
+    root.after(EVENT_POLL_MS, dispatch_events)
+
+
+def check_external_changes():
+    """
+    Integre periodiquement les modifications des autres instances qui
+    ont ouvert le meme repertoire de donnees (dossier partage), et la
+    table des taux de change si son fichier a ete modifie.
+
+    Les frames sont mis a jour par les evenements publies.
+    """
+    global root
+
+    # Les modifications seront integrees a la fin du prechargement
+    if not data_manager.is_loaded():
+        root.after(SYNC_INTERVAL_MS, check_external_changes)
+        return
+
+    try:
+        data_manager.sync_external_changes()
+        data_manager.sync_exchange_rates()
+    except Exception as e:
+        print(f"[Main] Erreur de synchronisation: {e}")
+    root.after(SYNC_INTERVAL_MS, check_external_changes)
+
+
+def describe_conflict(conflict):
+    """
+    Decrit un conflit en une ligne (element et champs concernes).
+
+    Args:
+        conflict: Le conflit (events.Conflict)
+
+    Returns:
+        Le texte
+    """
+    if conflict.id is None:
+        label = conflict.collection
+    else:
+        item = conflict.ours or conflict.theirs or {}
+        name = item.get('nom') or item.get('description') or item.get('item') or ""
+        label = f"{conflict.collection} #{conflict.id} {name}".strip()
+
+    if conflict.fields:
+        return f"{label} ({', '.join(conflict.fields)})"
+    if conflict.ours is None:
+        return f"{label} (supprime ici, modifie ailleurs)"
+    if conflict.theirs is None:
+        return f"{label} (modifie ici, supprime ailleurs)"
+    return label
+
+
+def show_conflicts(conflicts):
+    """
+    Signale les modifications concurrentes du meme element et laisse
+    choisir la version a conserver.
+
+    Les versions locales sont conservees par defaut; l'utilisateur peut
+    reprendre celles de l'autre instance.
+
+    Args:
+        conflicts: Les conflits (liste de events.Conflict)
+    """
+    lines = [" - " + describe_conflict(conflict) for conflict in conflicts[:10]]
+    if len(conflicts) > 10:
+        lines.append(f" ... et {len(conflicts) - 10} autre(s)")
+
+    keep_ours = messagebox.askyesno(
+        "Modifications concurrentes",
+        "Une autre personne a modifie les memes elements que vous:\n\n"
+        + "\n".join(lines)
+        + "\n\nConserver vos versions ?\n"
+        "(Non: reprendre les versions de l'autre personne)"
+    )
+
+    if keep_ours:
+        status_var.set(f"{len(conflicts)} conflit(s): vos versions sont conservees")
+    else:
+        data_manager.accept_theirs(conflicts)
+        status_var.set(f"{len(conflicts)} conflit(s): versions de l'autre personne reprises")
+
+
+def update_trip_list():
+    """
+    Remplit la liste deroulante des voyages a partir du catalogue.
+    """
+    global trip_combo, trip_ids
+
+    trips = catalog.list_trips()
+    trip_ids = [trip["id"] for trip in trips]
+    trip_combo["values"] = [
+        f"{trip['nom']} ({format_date(trip.get('date_depart', ''))})"
+        for trip in trips
+    ]
+
+    current = data_manager.get_current_trip_id()
+    if current in trip_ids:
+        trip_combo.current(trip_ids.index(current))
+
+
+def switch_trip(trip_id):
+    """
+    Ouvre un autre voyage et recharge les frames en arriere-plan.
+
+    Args:
+        trip_id: L'identifiant du voyage a ouvrir
+    """
+    global root
+
+    data_manager.open_trip(trip_id)
+    catalog.set_current_trip(trip_id)
+    update_trip_list()
+
+    # Les frames sont rafraichis par on_data_changed a la fin du chargement
+    status_var.set("Chargement des donnees...")
+    show_loading()
+    data_manager.start_loading()
+
+
+def on_trip_selected(event):
+    """
+    Callback appele lors du choix d'un voyage dans la liste.
+
+    Args:
+        event: L'evenement Tkinter
+    """
+    global trip_combo, trip_ids
+
+    trip_id = trip_ids[trip_combo.current()]
+    if trip_id != data_manager.get_current_trip_id():
+        switch_trip(trip_id)
+
+
+def clone_trip():
+    """
+    Duplique le voyage ouvert sous un nouveau nom et l'ouvre.
+    """
+    if not data_manager.is_loaded():
+        root.bell()
+        return
+
+    current = data_manager.get_current_trip_id()
+    nom = simpledialog.askstring(
+        "Dupliquer le voyage",
+        "Nom du nouveau voyage:",
+        initialvalue=catalog.get_trip(current)["nom"] + " (copie)"
+    )
+    if not nom:
+        return
+
+    # Le voyage d'origine doit etre entierement ecrit avant la copie
+    data_manager.save_data()
+    trip_id = catalog.clone_trip(current, nom.strip())
+    switch_trip(trip_id)
+
+
+def run_task(title, work, finish):
+    """
+    Lance une operation longue (import, export) dans un thread: la
+    fenetre reste utilisable pendant l'operation.
+
+    L'avancement est affiche dans l'en-tete (voir poll_task).
+
+    Args:
+        title: Le titre de l'operation (en-tete et fenetres)
+        work: Fonction executee dans le thread, appelee avec la fonction
+            de rapport d'avancement; retourne le rapport final
+        finish: Fonction appelee dans le thread Tk avec le rapport final
+    """
+    global task_queue
+
+    if task_queue is not None:
+        messagebox.showinfo(title, "Une operation est deja en cours.")
+        return
+
+    task_queue = queue.Queue()
+    reports = task_queue
+
+    def run():
+        try:
+            reports.put(("done", work(reports.put)))
+        except Exception as e:
+            reports.put(("error", e))
+
+    status_var.set(title + "...")
+    threading.Thread(target=run, name="task", daemon=True).start()
+    root.after(EVENT_POLL_MS, poll_task, title, finish)
+
+
+def poll_task(title, finish):
+    """
+    Affiche l'avancement de l'operation en cours, puis son resultat.
+
+    Args:
+        title: Le titre de l'operation
+        finish: Fonction appelee avec le rapport final (voir run_task)
+    """
+    global task_queue
+
+    stats = None
+    try:
+        while True:
+            message = task_queue.get_nowait()
+            if isinstance(message, dict):
+                stats = message
+            else:
+                break
+    except queue.Empty:
+        if stats is not None:
+            if stats.get("total_bytes"):
+                percent = 100 * stats["bytes"] // stats["total_bytes"]
+            else:
+                percent = 100 * stats["rows"] // max(stats.get("total") or 1, 1)
+            status_var.set(f"{title}: {stats['rows']} lignes, "
+                           f"{stats['rows_per_s']:.0f} lignes/s ({percent} %)")
+        root.after(EVENT_POLL_MS, poll_task, title, finish)
+        return
+
+    task_queue = None
+    kind, result = message
+    if kind == "error":
+        status_var.set("")
+        messagebox.showerror(title, f"Operation impossible:\n{result}")
+        return
+    finish(result)
+
+
+def import_file():
+    """
+    Importe un fichier choisi par l'utilisateur (CSV, OFX, CAMT.053, ICS,
+    vCard) en arriere-plan.
+
+    Les frames sont mis a jour par les evenements de modification.
+    """
+    path = filedialog.askopenfilename(title="Importer un fichier",
+                                      filetypes=importer.FILE_TYPES)
+    if not path:
+        return
+
+    run_task(f"Import de {os.path.basename(path)}",
+             lambda progress: importer.import_file(path, progress=progress),
+             show_import_result)
+
+
+def show_import_result(result):
+    """
+    Affiche le resume d'un import (elements ajoutes, doublons, erreurs).
+
+    Args:
+        result: Le rapport d'import (voir importer.import_file)
+    """
+    status_var.set(f"Import termine: {result['imported']} element(s) ajoute(s)")
+    lines = [f"Ligne {line}: {error}" for line, error in result["errors"][:10]]
+    messagebox.showinfo(
+        "Import",
+        f"{result['imported']} {result['collection']} importe(s)\n"
+        f"{result['duplicates']} doublon(s) ignore(s)\n"
+        f"{result['rejected']} ligne(s) rejetee(s)\n"
+        f"{result['rows']} lignes en {result['elapsed_s']:.1f} s"
+        + ("\n\n" + "\n".join(lines) if lines else "")
+    )
+
+
+def export_data(name):
+    """
+    Exporte une collection dans un fichier choisi par l'utilisateur, en
+    arriere-plan.
+
+    Args:
+        name: Le nom de l'export (cle de exporter.EXPORTS)
+    """
+    spec = exporter.EXPORTS[name]
+    path = filedialog.asksaveasfilename(
+        title="Exporter: " + spec.label,
+        defaultextension=spec.extension,
+        initialfile=spec.collection + spec.extension,
+        filetypes=[(spec.label, "*" + spec.extension)]
+    )
+    if not path:
+        return
+
+    run_task(f"Export de {os.path.basename(path)}",
+             lambda progress: exporter.export(name, path, progress=progress),
+             show_export_result)
+
+
+def show_export_result(result):
+    """
+    Affiche le resume d'un export.
+
+    Args:
+        result: Le rapport d'export (voir exporter.write_export)
+    """
+    status_var.set(f"Export termine: {result['rows']} element(s)")
+    messagebox.showinfo(
+        "Export",
+        f"{result['rows']} element(s) exporte(s) dans\n{result['path']}\n"
+        f"({result['bytes'] / 1e6:.1f} Mo en {result['elapsed_s']:.1f} s)"
+    )
 
 
 def save_all_data():
     """
     Sauvegarde manuelle de toutes les donnees.
+
+    Force l'ecriture immediate des modifications en attente.
     """
+    # Rien n'a pu etre modifie pendant le chargement
+    if not data_manager.is_loaded():
+        root.bell()
+        return
+
     if data_manager.save_data():
         messagebox.showinfo(
             "Sauvegarde",
@@ -345,26 +1103,54 @@ def save_all_data():
         )
 
 
+def undo_last(event=None):
+    """
+    Annule la derniere modification, quel que soit l'onglet (Ctrl+Z).
+
+    Les frames concernes sont mis a jour par leurs evenements.
+
+    Args:
+        event: L'evenement clavier (None pour le bouton)
+    """
+    if not data_manager.can_undo():
+        root.bell()
+    else:
+        data_manager.undo()
+    return "break"
+
+
+def redo_last(event=None):
+    """
+    Retablit la derniere modification annulee (Ctrl+Y, Ctrl+Shift+Z).
+
+    Args:
+        event: L'evenement clavier (None pour le bouton)
+    """
+    if not data_manager.can_redo():
+        root.bell()
+    else:
+        data_manager.redo()
+    return "break"
+
+
 def reset_data():
     """
     Reinitialise toutes les donnees aux valeurs par defaut.
     """
-    global frames
+    if not data_manager.is_loaded():
+        root.bell()
+        return
 
     confirm = messagebox.askyesno(
         "Confirmation",
         "Etes-vous sur de vouloir reinitialiser toutes les donnees ?\n\n"
-        "Cette action est irreversible !"
+        "Cette action est irreversible (elle ne peut pas etre annulee) !"
     )
 
     if confirm:
+        # Les frames sont rafraichis par on_data_changed
         data_manager.reset_to_defaults()
 
-        # Rafraichir tous les frames
-        for frame in frames.values():
-            if hasattr(frame, 'refresh'):
-                frame.refresh()
-
         messagebox.showinfo(
             "Reinitialisation",
             "Les donnees ont ete reinitialisees avec succes !"
@@ -379,9 +1165,14 @@ def on_closing():
     """
     global root
 
-    # Sauvegarder automatiquement
+    # Ecrire immediatement les modifications encore en attente
     data_manager.save_data()
 
+    stats = data_manager.get_save_stats()
+    print("Sauvegardes: {} ecriture(s), {} modification(s) regroupee(s), "
+          "{:.1f} ms en moyenne".format(
+              stats["writes"], stats["coalesced"], stats["avg_flush_ms"]))
+
     # Fermer l'application
     root.destroy()
 
@@ -404,6 +1195,9 @@ def main():
     print("Demarrage de l'application...")
 
     try:
+        # Ouvrir le dernier voyage du catalogue (seul l'index est lu)
+        data_manager.open_trip(catalog.get_current_trip_id())
+
         # Creer la fenetre principale
         root = tk.Tk()
 
@@ -422,6 +1216,25 @@ def main():
         # Gestion de la fermeture
         root.protocol("WM_DELETE_WINDOW", on_closing)
 
+        # Annuler / retablir dans tous les onglets
+        root.bind_all("<Control-z>", undo_last)
+        root.bind_all("<Control-y>", redo_last)
+        root.bind_all("<Control-Z>", redo_last)
+
+        # Recherche globale
+        root.bind_all("<Control-f>", focus_search)
+
+        # Remettre les evenements de modification aux frames
+        data_manager.subscribe(on_data_changed)
+        root.after(EVENT_POLL_MS, dispatch_events)
+
+        # Integrer les modifications des autres instances (dossier partage)
+        root.after(SYNC_INTERVAL_MS, check_external_changes)
+
+        # Charger les donnees en arriere-plan: la fenetre s'affiche
+        # tout de suite et les frames sont remplis a la fin du chargement
+        data_manager.start_loading()
+
         print("Application prete !")
         print("=" * 50)
 
@@ -0,0 +1,173 @@
+"""
+money.py - Montants en centimes (virgule fixe) de l'application Amsterdam
+Trip Planner.
+
+Les montants (depenses, prix des activites et des transports, budget
+prevu) sont manipules en centimes entiers: les sommes sont exactes,
+quel que soit le nombre de lignes (une somme de floats derive de
+quelques centimes sur des milliers de depenses), et l'affichage n'a
+plus rien a arrondir.
+
+Les fichiers JSON gardent des montants en euros (12.5): les
+enregistrements (voir records.py) convertissent a la lecture et a
+l'ecriture, et item.get('montant') retourne toujours des euros.
+
+Usage:
+    cents = to_cents(12.5)          # 1250
+    cents = parse_amount("12,50")   # 1250 (saisie ou fichier importe)
+    euros = from_cents(1250)        # 12.5
+    texte = format_cents(1250)      # "12,50 EUR"
+"""
+
+import math
+import re
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+
+# Nombre de centimes dans une unite
+CENTS = 100
+
+# Ecart a un demi-centime en dessous duquel un float est arrondi par sa
+# representation decimale (1.005 -> 1,01 et non 1,00)
+_TIE_TOLERANCE = 1e-6
+
+_ONE = Decimal(1)
+
+
+def to_cents(value):
+    """
+    Convertit un montant en euros (nombre) en centimes.
+
+    Le montant est arrondi au centime le plus proche (un demi-centime est
+    arrondi en s'eloignant de zero, comme dans sa forme decimale).
+
+    Args:
+        value: Le montant (int, float ou Decimal)
+
+    Returns:
+        Le montant en centimes (int)
+
+    Raises:
+        TypeError: si la valeur n'est pas un nombre
+        ValueError: si le montant est infini ou NaN
+    """
+    kind = type(value)
+    if kind is int:
+        return value * CENTS
+    if kind is float:
+        if not math.isfinite(value):
+            raise ValueError(f"Montant invalide: {value!r}")
+        scaled = value * CENTS
+        cents = round(scaled)
+        if abs(abs(scaled - cents) - 0.5) > _TIE_TOLERANCE:
+            return cents
+        # Demi-centime (ou presque): la forme decimale du float decide
+        return _decimal_cents(Decimal(repr(value)))
+    if isinstance(value, Decimal):
+        if not value.is_finite():
+            raise ValueError(f"Montant invalide: {value!r}")
+        return _decimal_cents(value)
+    if isinstance(value, float):
+        return to_cents(float(value))
+    if isinstance(value, int):
+        return to_cents(int(value))
+    raise TypeError(f"Montant invalide: {value!r}")
+
+
+def _decimal_cents(value):
+    """
+    Convertit un montant Decimal en centimes (arrondi au plus proche).
+    """
+    return int((value * CENTS).quantize(_ONE, rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    """
+    Convertit un montant en centimes en euros (pour le JSON et les calculs).
+
+    Args:
+        cents: Le montant en centimes
+
+    Returns:
+        Le montant en euros (float)
+    """
+    return cents / CENTS
+
+
+def format_cents(cents, currency="EUR"):
+    """
+    Formate un montant en centimes (sans aucun arrondi).
+
+    Args:
+        cents: Le montant en centimes
+        currency: La devise (par defaut: EUR)
+
+    Returns:
+        Le montant formate (ex: "1 234,50 EUR"; "1,234.50 USD" pour une
+        autre devise)
+    """
+    sign = "-" if cents < 0 else ""
+    units, rest = divmod(abs(cents), CENTS)
+    if currency == "EUR":
+        return f"{sign}{units:,}".replace(",", " ") + f",{rest:02d} EUR"
+    return f"{sign}{units:,}.{rest:02d} {currency}"
+
+
+_AMOUNT_NOISE = re.compile(r"[^0-9,.\-+()]")
+
+
+def parse_amount(text):
+    """
+    Convertit un montant saisi ou lu dans un fichier en centimes
+    (1234.5, 1 234,50 EUR, 1.234,50, -12,00, (12.00)).
+
+    Avec une virgule et un point, le dernier des deux est le separateur
+    decimal; une virgule seule est un separateur decimal. Le texte est
+    converti sans passer par un float (aucune erreur d'arrondi).
+
+    Args:
+        text: Le texte du montant (ou un nombre, voir to_cents)
+
+    Returns:
+        Le montant en centimes, arrondi au centime (negatif pour un debit)
+
+    Raises:
+        ValueError: si le montant n'est pas reconnu
+    """
+    if isinstance(text, (int, float, Decimal)) and not isinstance(text, bool):
+        return to_cents(text)
+
+    value = _AMOUNT_NOISE.sub("", str(text))
+    negative = value.startswith("-") or (value.startswith("(") and value.endswith(")"))
+    value = value.strip("+-()")
+
+    if "," in value and "." in value:
+        if value.rfind(",") > value.rfind("."):
+            value = value.replace(".", "").replace(",", ".")
+        else:
+            value = value.replace(",", "")
+    elif value.count(",") == 1:
+        value = value.replace(",", ".")
+    elif "," in value or value.count(".") > 1:
+        value = value.replace(",", "").replace(".", "")
+
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"Montant invalide: {text!r}") from None
+    if not amount.is_finite():
+        raise ValueError(f"Montant invalide: {text!r}")
+    cents = _decimal_cents(amount)
+    return -cents if negative else cents
+
+
+def sum_cents(amounts):
+    """
+    Additionne exactement des montants en euros (nombres).
+
+    Args:
+        amounts: Les montants (int, float ou Decimal)
+
+    Returns:
+        La somme en centimes
+    """
+    return sum(map(to_cents, amounts))
@@ -0,0 +1,319 @@
+"""
+persistent.py - Collections immuables a partage de structure de
+l'application Amsterdam Trip Planner.
+
+Les collections (activites, depenses, participants, checklist) sont
+stockees dans des IdMap: un arbre de recherche sur l'ID des elements
+(32 branches par noeud) qui n'est jamais modifie. Ajouter, remplacer ou
+supprimer un element retourne une nouvelle IdMap qui ne recopie que les
+noeuds du chemin de l'element (au plus quelques tuples de 32 cases) et
+partage tout le reste avec l'ancienne version.
+
+Conserver une version (instantane, etape d'annulation) coute donc
+O(1), et chaque modification ne consomme que O(log32 n) de memoire, au
+lieu d'une copie complete de la liste.
+
+Une IdMap s'utilise comme la liste qu'elle remplace: elle s'itere sur
+ses elements (par ID croissant, c'est-a-dire dans l'ordre d'ajout car
+les IDs sont attribues par un compteur monotone), len() donne le nombre
+d'elements, et elle se serialise en liste (voir records.json_default).
+
+Usage:
+    items = IdMap.from_pairs((item['id'], item) for item in liste)
+    items2 = items.set(12, nouvel_element)   # items est inchange
+    items3 = items2.remove(12)
+"""
+
+
+# ============================================
+# PARAMETRES DE L'ARBRE
+# ============================================
+
+# Nombre de bits de l'ID consommes par niveau (32 branches par noeud)
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+
+# Noeud vide (aucune branche)
+_EMPTY_NODE = (None,) * WIDTH
+
+
+# ============================================
+# FONCTIONS SUR LES NOEUDS
+# ============================================
+
+def _node_set(node, shift, key, value):
+    """
+    Retourne une copie du noeud avec la valeur placee (copie de chemin).
+
+    Args:
+        node: Le noeud (tuple de WIDTH cases) ou None
+        shift: Le decalage des bits de l'ID a ce niveau
+        key: L'ID
+        value: La valeur
+
+    Returns:
+        Tuple (nouveau noeud, True si l'ID n'existait pas)
+    """
+    if node is None:
+        node = _EMPTY_NODE
+
+    slot = (key >> shift) & MASK
+    if shift == 0:
+        added = node[slot] is None
+    else:
+        value, added = _node_set(node[slot], shift - BITS, key, value)
+
+    return node[:slot] + (value,) + node[slot + 1:], added
+
+
+def _node_remove(node, shift, key):
+    """
+    Retourne une copie du noeud sans la valeur d'un ID (copie de chemin).
+
+    Args:
+        node: Le noeud (tuple de WIDTH cases)
+        shift: Le decalage des bits de l'ID a ce niveau
+        key: L'ID (present dans le noeud)
+
+    Returns:
+        Le nouveau noeud, ou None s'il est vide
+    """
+    slot = (key >> shift) & MASK
+    child = None if shift == 0 else _node_remove(node[slot], shift - BITS, key)
+
+    node = node[:slot] + (child,) + node[slot + 1:]
+    if child is None and all(branch is None for branch in node):
+        return None
+    return node
+
+
+def _node_values(node, shift):
+    """
+    Parcourt les valeurs d'un noeud par ID croissant.
+
+    Args:
+        node: Le noeud (tuple de WIDTH cases)
+        shift: Le decalage des bits de l'ID a ce niveau
+    """
+    if shift == 0:
+        for value in node:
+            if value is not None:
+                yield value
+    else:
+        for child in node:
+            if child is not None:
+                yield from _node_values(child, shift - BITS)
+
+
+def _node_items(node, shift, prefix):
+    """
+    Parcourt les couples (ID, valeur) d'un noeud par ID croissant.
+
+    Args:
+        node: Le noeud (tuple de WIDTH cases)
+        shift: Le decalage des bits de l'ID a ce niveau
+        prefix: Les bits de l'ID deja determines par les niveaux superieurs
+    """
+    for slot, child in enumerate(node):
+        if child is None:
+            continue
+        key = prefix | (slot << shift)
+        if shift == 0:
+            yield key, child
+        else:
+            yield from _node_items(child, shift - BITS, key)
+
+
+def _freeze_node(node, shift):
+    """
+    Convertit un noeud construit avec des listes en tuples (construction
+    en bloc, voir IdMap.from_pairs).
+
+    Args:
+        node: Le noeud (liste de WIDTH cases)
+        shift: Le decalage des bits de l'ID a ce niveau
+
+    Returns:
+        Le noeud en tuples
+    """
+    if shift == 0:
+        return tuple(node)
+    return tuple(None if child is None else _freeze_node(child, shift - BITS)
+                 for child in node)
+
+
+def _check_key(key):
+    """
+    Verifie qu'un ID peut etre place dans une IdMap.
+
+    Raises:
+        TypeError: si l'ID n'est pas un entier positif ou nul
+    """
+    if type(key) is not int or key < 0:
+        raise TypeError(f"ID invalide pour une IdMap: {key!r}")
+
+
+# ============================================
+# IDMAP
+# ============================================
+
+class IdMap:
+    """
+    Collection immuable d'elements indexes par un ID entier positif.
+
+    Les valeurs None ne peuvent pas etre stockees (une case vide vaut None).
+    """
+
+    __slots__ = ("_root", "_shift", "_count")
+
+    def __init__(self):
+        self._root = None
+        self._shift = 0
+        self._count = 0
+
+    @classmethod
+    def _make(cls, root, shift, count):
+        result = cls.__new__(cls)
+        result._root = root
+        result._shift = shift
+        result._count = count
+        return result
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """
+        Construit une IdMap en un seul parcours (sans copie de chemin).
+
+        Args:
+            pairs: Les couples (ID, valeur); pour un ID repete, la
+                derniere valeur est conservee
+
+        Returns:
+            La nouvelle IdMap
+        """
+        pairs = list(pairs)
+        if not pairs:
+            return cls()
+
+        for key, _ in pairs:
+            _check_key(key)
+
+        max_key = max(key for key, _ in pairs)
+        shift = 0
+        while max_key >> (shift + BITS):
+            shift += BITS
+
+        root = [None] * WIDTH
+        count = 0
+        for key, value in pairs:
+            node = root
+            for level in range(shift, 0, -BITS):
+                slot = (key >> level) & MASK
+                child = node[slot]
+                if child is None:
+                    child = node[slot] = [None] * WIDTH
+                node = child
+            slot = key & MASK
+            if node[slot] is None:
+                count += 1
+            node[slot] = value
+
+        return cls._make(_freeze_node(root, shift), shift, count)
+
+    # --- Lecture ---
+
+    def get(self, key, default=None):
+        """
+        Recupere la valeur d'un ID.
+
+        Args:
+            key: L'ID
+            default: La valeur retournee si l'ID est absent
+
+        Returns:
+            La valeur, ou default
+        """
+        node = self._root
+        if node is None or type(key) is not int or key < 0 or key >> (self._shift + BITS):
+            return default
+
+        for level in range(self._shift, 0, -BITS):
+            node = node[(key >> level) & MASK]
+            if node is None:
+                return default
+
+        value = node[key & MASK]
+        return default if value is None else value
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        if self._root is None:
+            return iter(())
+        return _node_values(self._root, self._shift)
+
+    def keys(self):
+        """
+        Parcourt les IDs par ordre croissant.
+        """
+        return (key for key, _ in self.items())
+
+    def items(self):
+        """
+        Parcourt les couples (ID, valeur) par ID croissant.
+        """
+        if self._root is None:
+            return iter(())
+        return _node_items(self._root, self._shift, 0)
+
+    # --- Nouvelles versions ---
+
+    def set(self, key, value):
+        """
+        Retourne une nouvelle IdMap ou l'ID a la valeur donnee.
+
+        Args:
+            key: L'ID (entier positif ou nul)
+            value: La valeur (pas None)
+
+        Returns:
+            La nouvelle IdMap (self n'est pas modifiee)
+        """
+        _check_key(key)
+        if value is None:
+            raise ValueError("Une IdMap ne peut pas contenir None")
+
+        root, shift = self._root, self._shift
+        if root is None:
+            shift = 0
+        # Ajouter des niveaux au-dessus de la racine si l'ID depasse
+        while key >> (shift + BITS):
+            if root is not None:
+                root = (root,) + _EMPTY_NODE[1:]
+            shift += BITS
+
+        root, added = _node_set(root, shift, key, value)
+        return IdMap._make(root, shift, self._count + added)
+
+    def remove(self, key):
+        """
+        Retourne une nouvelle IdMap sans l'ID donne.
+
+        Args:
+            key: L'ID
+
+        Returns:
+            La nouvelle IdMap (self si l'ID est absent)
+        """
+        if self.get(key) is None:
+            return self
+
+        root = _node_remove(self._root, self._shift, key)
+        if root is None:
+            return IdMap()
+        return IdMap._make(root, self._shift, self._count - 1)
+
+    def __repr__(self):
+        return "IdMap({!r})".format(dict(self.items()))
@@ -0,0 +1,280 @@
+"""
+pivot.py - Tableaux croises des depenses de l'application Amsterdam Trip
+Planner.
+
+Les depenses sont resumees par un cube: la somme des montants (centimes,
+dans la devise du voyage) de chaque cellule (date, categorie,
+participant), maintenue par le data_manager a chaque ajout ou
+suppression. Un tableau croise regroupe les cellules du cube selon une
+dimension en lignes, une dimension en colonnes (facultative) et des
+filtres (une valeur imposee pour une ou plusieurs dimensions).
+
+Un tableau est calcule en un seul passage sur les cellules du cube
+(quelques milliers au plus, jamais les depenses). Les tableaux deja
+calcules sont gardes en cache (PIVOT_CACHE_SIZE) et mis a jour a chaque
+modification d'une depense: changer de dimension ou de filtre ne relit
+pas les depenses, et un tableau deja affiche n'est jamais recalcule.
+
+Le cumul des depenses par jour du voyage, le rythme des depenses et la
+projection a la fin du sejour sont calcules a partir du tableau par date
+(voir forecast).
+
+Usage:
+    cache = create_cache()
+    spec = make_spec("categorie", "participant", {"date": "2025-09-16"})
+    table = get(cache, spec, cube, counts)
+    update(cache, (date, categorie, participant), montant, sign)
+"""
+
+from collections import OrderedDict
+from datetime import date
+
+from config import PIVOT_CACHE_SIZE, date_ordinal
+
+# Dimensions du cube (ordre des cles des cellules) et libelles affiches
+DIMENSIONS = ("date", "categorie", "participant")
+LABELS = {
+    "date": "Date",
+    "categorie": "Categorie",
+    "participant": "Paye par",
+}
+
+_POSITIONS = {dimension: position for position, dimension in enumerate(DIMENSIONS)}
+
+
+# ============================================
+# DEFINITION D'UN TABLEAU
+# ============================================
+
+def make_spec(rows, columns=None, filters=None):
+    """
+    Verifie et normalise la definition d'un tableau croise.
+
+    Args:
+        rows: La dimension en lignes
+        columns: La dimension en colonnes (None: une seule colonne)
+        filters: {dimension: valeur} (cellules retenues)
+
+    Returns:
+        La definition (tuple, cle du cache): (lignes, colonnes, filtres)
+
+    Raises:
+        ValueError: si une dimension est inconnue ou repetee
+    """
+    for dimension in (rows, columns, *(filters or {})):
+        if dimension is not None and dimension not in _POSITIONS:
+            raise ValueError(f"Dimension inconnue: {dimension!r}")
+    if rows is None or rows == columns:
+        raise ValueError("Les lignes et les colonnes doivent etre deux dimensions differentes")
+
+    return (rows, columns, tuple(sorted((filters or {}).items())))
+
+
+def _add(sums, counts, key, montant, sign):
+    """
+    Ajoute (sign > 0) ou retire (sign < 0) des depenses d'un groupe; le
+    groupe disparait avec sa derniere depense.
+    """
+    count = counts.get(key, 0) + sign
+    if count <= 0:
+        counts.pop(key, None)
+        sums.pop(key, None)
+    else:
+        counts[key] = count
+        sums[key] = sums.get(key, 0) + montant
+
+
+# ============================================
+# CALCUL ET MISE A JOUR D'UN TABLEAU
+# ============================================
+
+def _create(spec):
+    """
+    Cree un tableau vide.
+    """
+    rows, columns, filters = spec
+    return {
+        "spec": spec,
+        "row": _POSITIONS[rows],
+        "column": None if columns is None else _POSITIONS[columns],
+        "filters": tuple((_POSITIONS[dimension], value) for dimension, value in filters),
+        "rows": {},           # ligne -> somme
+        "row_count": {},      # ligne -> nombre de depenses
+        "columns": {},        # colonne -> somme
+        "column_count": {},   # colonne -> nombre de depenses
+        "cells": {},          # (ligne, colonne) -> somme
+        "cell_count": {},     # (ligne, colonne) -> nombre de depenses
+        "total": 0,           # Somme des cellules retenues
+        "count": 0,           # Nombre de depenses retenues
+    }
+
+
+def apply(table, cell, montant, sign):
+    """
+    Ajoute (sign > 0) ou retire (sign < 0) des depenses d'une cellule du
+    cube dans un tableau.
+
+    Args:
+        table: Le tableau
+        cell: La cellule (date, categorie, participant)
+        montant: Le montant (centimes, deja signe)
+        sign: Le nombre de depenses ajoutees (negatif: retirees)
+    """
+    for position, value in table["filters"]:
+        if cell[position] != value:
+            return
+
+    row = cell[table["row"]]
+    _add(table["rows"], table["row_count"], row, montant, sign)
+    if table["column"] is not None:
+        column = cell[table["column"]]
+        _add(table["columns"], table["column_count"], column, montant, sign)
+        _add(table["cells"], table["cell_count"], (row, column), montant, sign)
+    table["total"] += montant
+    table["count"] += sign
+
+
+def build(spec, cube, counts):
+    """
+    Calcule un tableau en un seul passage sur les cellules du cube.
+
+    Args:
+        spec: La definition (voir make_spec)
+        cube: {cellule: somme des montants}
+        counts: {cellule: nombre de depenses}
+
+    Returns:
+        Le tableau (rows, columns, cells, total et les nombres de
+        depenses correspondants)
+    """
+    table = _create(spec)
+    for cell, montant in cube.items():
+        apply(table, cell, montant, counts[cell])
+    return table
+
+
+# ============================================
+# CACHE DES TABLEAUX
+# ============================================
+
+def create_cache():
+    """
+    Cree le cache des tableaux calcules (les moins recemment utilises
+    sont oublies au-dela de PIVOT_CACHE_SIZE).
+    """
+    return OrderedDict()
+
+
+def get(cache, spec, cube, counts):
+    """
+    Retourne un tableau, calcule s'il n'est pas dans le cache.
+
+    Args:
+        cache: Le cache (voir create_cache)
+        spec: La definition (voir make_spec)
+        cube: {cellule: somme des montants}
+        counts: {cellule: nombre de depenses}
+
+    Returns:
+        Le tableau (a ne pas modifier)
+    """
+    table = cache.get(spec)
+    if table is None:
+        table = cache[spec] = build(spec, cube, counts)
+        if len(cache) > PIVOT_CACHE_SIZE:
+            cache.popitem(last=False)
+    cache.move_to_end(spec)
+    return table
+
+
+def update(cache, cell, montant, sign):
+    """
+    Reporte l'ajout ou la suppression d'une depense dans tous les
+    tableaux du cache.
+
+    Args:
+        cache: Le cache (voir create_cache)
+        cell: La cellule de la depense (date, categorie, participant)
+        montant: La variation de la somme de la cellule (centimes)
+        sign: 1 pour un ajout, -1 pour une suppression
+    """
+    for table in cache.values():
+        apply(table, cell, montant, sign)
+
+
+# ============================================
+# CUMUL, RYTHME ET PROJECTION
+# ============================================
+
+def forecast(by_date, start, end, today, budget):
+    """
+    Calcule le cumul des depenses par jour du voyage, le rythme des
+    depenses et la projection a la fin du sejour.
+
+    Le rythme est la moyenne par jour des depenses des jours deja ecoules
+    du voyage. La projection compte, pour chaque jour restant, le plus
+    grand du rythme et des depenses deja saisies pour ce jour; les
+    depenses avant le voyage (reservations) ou sans date sont comptees
+    telles quelles, sans entrer dans le rythme.
+
+    Args:
+        by_date: {date: somme des montants} (centimes)
+        start: Le premier jour du voyage (AAAA-MM-JJ)
+        end: Le dernier jour du voyage (AAAA-MM-JJ)
+        today: Le jour courant (AAAA-MM-JJ)
+        budget: Le budget prevu (centimes)
+
+    Returns:
+        Dictionnaire (jours: [(date, montant, cumul)], avant, apres,
+        jours_ecoules, depense, rythme, projection, budget, ecart), ou
+        None si les dates du voyage sont invalides
+    """
+    first = date_ordinal(start)
+    last = date_ordinal(end)
+    if not first or not last or last < first:
+        return None
+
+    days = last - first + 1
+    per_day = [0] * days
+    before = 0
+    after = 0
+    for date_str, montant in by_date.items():
+        ordinal = date_ordinal(date_str)
+        if not ordinal or ordinal < first:
+            before += montant
+        elif ordinal > last:
+            after += montant
+        else:
+            per_day[ordinal - first] += montant
+
+    current = date_ordinal(today)
+    elapsed = min(max(current - first + 1, 0), days) if current else 0
+    spent = sum(per_day[:elapsed])
+
+    rythme = None
+    remaining = sum(per_day[elapsed:])
+    if elapsed:
+        # Moyenne au centime le plus proche
+        rythme, remainder = divmod(spent, elapsed)
+        if 2 * remainder >= elapsed:
+            rythme += 1
+        remaining = sum(max(montant, rythme) for montant in per_day[elapsed:])
+
+    jours = []
+    cumul = before
+    for offset, montant in enumerate(per_day):
+        cumul += montant
+        jours.append((date.fromordinal(first + offset).isoformat(), montant, cumul))
+
+    projection = before + spent + remaining + after
+    return {
+        "jours": jours,
+        "avant": before,
+        "apres": after,
+        "jours_ecoules": elapsed,
+        "depense": before + spent + (after if current > last else 0),
+        "rythme": rythme,
+        "projection": projection,
+        "budget": budget,
+        "ecart": budget - projection,
+    }
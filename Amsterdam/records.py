@@ -0,0 +1,537 @@
+"""
+records.py - Types d'enregistrements compacts de l'application Amsterdam Trip Planner.
+
+Les elements des collections (activites, depenses, participants, checklist)
+et les transports sur place sont stockes dans des classes a __slots__ au lieu
+de dictionnaires: chaque objet ne porte plus sa propre table de hachage ni
+ses cles, ce qui divise la memoire occupee a grande echelle.
+
+Ces classes se comportent comme des dictionnaires en lecture seule
+(item['nom'], item.get('prix', 0), item.items(), ...), les frames les
+utilisent donc sans modification. Un champ jamais renseigne est "absent",
+comme une cle manquante d'un dictionnaire. Les cles inconnues sont
+conservees dans un dictionnaire annexe (_extra) pour ne perdre aucune
+donnee.
+
+Un enregistrement n'est jamais modifie apres sa creation: une
+modification cree un nouvel enregistrement (item.replace(checked=True)).
+Les versions precedentes des donnees (instantanes, etapes d'annulation,
+voir persistent.py) peuvent ainsi partager les enregistrements sans les
+copier, et une frame ne peut pas modifier les donnees par erreur. Les
+sections (voyage_info, hotel, transport) sont figees de la meme facon
+par freeze().
+
+Les valeurs repetees (categorie, role, type de transport...) sont
+internees: toutes les depenses "Nourriture" partagent la meme chaine.
+
+Les montants (montant, prix) sont stockes en centimes entiers (voir
+money.py): item.cents('montant') les retourne tels quels pour les calculs
+exacts, item.get('montant') et le JSON les retournent en euros comme
+avant.
+
+Serialisation JSON:
+    json.dumps(data, default=records.json_default)
+    records.dumps(data)   # equivalent compact
+"""
+
+import json
+import operator
+import sys
+from collections.abc import Mapping
+from types import MappingProxyType
+
+import money
+from persistent import IdMap
+
+from config import (
+    BUDGET_CATEGORIES, CHECKLIST_CATEGORIES, PARTICIPANT_ROLES, TRANSPORT_TYPES
+)
+
+
+# ============================================
+# INTERNEMENT DES VALEURS REPETEES
+# ============================================
+
+# Table des valeurs connues (listes de config.py) -> chaine partagee
+_INTERNED = {
+    value: sys.intern(value)
+    for values in (BUDGET_CATEGORIES, CHECKLIST_CATEGORIES,
+                   PARTICIPANT_ROLES, TRANSPORT_TYPES)
+    for value in values
+}
+
+
+def intern_value(value):
+    """
+    Retourne l'exemplaire partage d'une valeur repetee.
+
+    Args:
+        value: La valeur (les valeurs qui ne sont pas des chaines sont
+            retournees telles quelles)
+
+    Returns:
+        La chaine partagee
+    """
+    if type(value) is not str:
+        return value
+
+    shared = _INTERNED.get(value)
+    if shared is None:
+        shared = sys.intern(value)
+    return shared
+
+
+# Valeur sentinelle d'un champ absent
+_MISSING = object()
+
+
+class _Absent:
+    """
+    Marque d'un champ absent dans les valeurs d'un enregistrement (voir
+    Record.to_values). Elle reste la meme apres pickle.
+    """
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return "ABSENT"
+
+    def __repr__(self):
+        return "ABSENT"
+
+
+ABSENT = _Absent()
+
+
+def _money_value(value):
+    """
+    Convertit la valeur d'un champ montant en centimes.
+
+    Une valeur qui n'est pas un nombre (None, texte...) est conservee
+    telle quelle.
+    """
+    try:
+        return money.to_cents(value)
+    except (TypeError, ValueError):
+        return value
+
+
+# ============================================
+# CLASSE DE BASE
+# ============================================
+
+class Record(Mapping):
+    """
+    Enregistrement compact et immuable se comportant comme un dictionnaire.
+
+    Les sous-classes definissent FIELDS (les champs stockes dans des slots),
+    INTERNED (les champs dont la valeur est internee) et MONEY (les champs
+    montants, stockes en centimes).
+    """
+
+    __slots__ = ("_extra",)
+
+    FIELDS = ()
+    INTERNED = ()
+    MONEY = ()
+
+    # Ensembles calcules pour chaque sous-classe (tests d'appartenance en O(1))
+    _field_set = frozenset()
+    _interned_set = frozenset()
+    _money_set = frozenset()
+
+    # Lecture de tous les champs en un appel (leve AttributeError si un
+    # champ est absent)
+    _get_all = staticmethod(lambda record: ())
+
+    # Ecriture directe de chaque slot (dans l'ordre de FIELDS)
+    _setters = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+        cls._interned_set = frozenset(cls.INTERNED)
+        cls._money_set = frozenset(cls.MONEY)
+        cls._setters = tuple(cls.__dict__[field].__set__ for field in cls.FIELDS)
+        if len(cls.FIELDS) > 1:
+            cls._get_all = staticmethod(operator.attrgetter(*cls.FIELDS))
+
+    def __init__(self, data=None, **kwargs):
+        self._extra = None
+        if data is not None:
+            for key, value in dict(data).items():
+                self._assign(key, value)
+        for key, value in kwargs.items():
+            self._assign(key, value)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Cree un enregistrement a partir d'un dictionnaire.
+
+        Args:
+            data: Le dictionnaire (ou un autre enregistrement)
+
+        Returns:
+            Le nouvel enregistrement
+        """
+        record = cls.__new__(cls)
+        record._extra = None
+        fields = cls._field_set
+        interned = cls._interned_set
+        amounts = cls._money_set
+        extra = None
+
+        for key, value in data.items():
+            if key in fields:
+                if key in interned:
+                    value = intern_value(value)
+                elif key in amounts:
+                    value = _money_value(value)
+                object.__setattr__(record, key, value)
+            else:
+                if extra is None:
+                    extra = record._extra = {}
+                extra[key] = value
+
+        return record
+
+    @classmethod
+    def from_values(cls, values, absent=ABSENT):
+        """
+        Cree un enregistrement a partir des valeurs de tous ses champs.
+
+        Args:
+            values: Tuple des valeurs, dans l'ordre de FIELDS (montants en
+                centimes, ABSENT pour un champ absent, voir to_values)
+            absent: La marque d'un champ absent dans values (autre que
+                ABSENT dans le cache binaire, voir snapshot_cache)
+
+        Returns:
+            Le nouvel enregistrement
+        """
+        record = cls.__new__(cls)
+        record._extra = None
+        if absent in values:
+            for setter, value in zip(cls._setters, values):
+                if value is not absent:
+                    setter(record, value)
+        else:
+            for setter, value in zip(cls._setters, values):
+                setter(record, value)
+        return record
+
+    def to_values(self):
+        """
+        Retourne les valeurs de tous les champs (inverse de from_values).
+
+        Returns:
+            Tuple des valeurs stockees dans l'ordre de FIELDS (montants en
+            centimes, ABSENT pour un champ absent), ou None si
+            l'enregistrement a des cles inconnues
+        """
+        if self._extra:
+            return None
+        try:
+            return self._get_all(self)
+        except AttributeError:
+            return tuple(getattr(self, field, ABSENT) for field in self.FIELDS)
+
+    # --- Acces aux champs ---
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                if type(value) is int and key in self._money_set:
+                    return money.from_cents(value)
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def _assign(self, key, value):
+        # Reserve a la construction: l'enregistrement est ensuite immuable
+        if key in self._field_set:
+            if key in self._interned_set:
+                value = intern_value(value)
+            elif key in self._money_set:
+                value = _money_value(value)
+            object.__setattr__(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def get(self, key, default=None):
+        if key in self._field_set:
+            value = getattr(self, key, _MISSING)
+            if value is _MISSING:
+                return default
+            if type(value) is int and key in self._money_set:
+                return money.from_cents(value)
+            return value
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def cents(self, key):
+        """
+        Retourne un montant en centimes (calculs exacts).
+
+        Args:
+            key: Le champ montant (voir MONEY)
+
+        Returns:
+            Le montant en centimes, 0 s'il est absent ou n'est pas un nombre
+        """
+        value = getattr(self, key, 0)
+        return value if type(value) is int else 0
+
+    def __contains__(self, key):
+        if key in self._field_set:
+            return getattr(self, key, _MISSING) is not _MISSING
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            if getattr(self, field, _MISSING) is not _MISSING:
+                yield field
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        count = sum(1 for field in self.FIELDS
+                    if getattr(self, field, _MISSING) is not _MISSING)
+        return count + (len(self._extra) if self._extra is not None else 0)
+
+    # --- Conversion ---
+
+    def to_dict(self):
+        """
+        Convertit l'enregistrement en dictionnaire (pour le JSON).
+
+        Returns:
+            Un nouveau dictionnaire avec les champs renseignes
+        """
+        try:
+            # Cas courant: tous les champs sont renseignes
+            result = dict(zip(self.FIELDS, self._get_all(self)))
+        except AttributeError:
+            result = {}
+            for field in self.FIELDS:
+                value = getattr(self, field, _MISSING)
+                if value is not _MISSING:
+                    result[field] = value
+
+        for field in self.MONEY:
+            value = result.get(field)
+            if type(value) is int:
+                result[field] = money.from_cents(value)
+
+        if self._extra is not None:
+            result.update(self._extra)
+        return result
+
+    def copy(self):
+        """
+        Retourne une copie modifiable de l'enregistrement (dictionnaire).
+        """
+        return self.to_dict()
+
+    def replace(self, **changes):
+        """
+        Retourne un nouvel enregistrement avec certains champs modifies.
+
+        Args:
+            **changes: Les champs a modifier et leur nouvelle valeur
+
+        Returns:
+            Le nouvel enregistrement (self n'est pas modifie)
+        """
+        data = self.to_dict()
+        data.update(changes)
+        return type(self).from_dict(data)
+
+    def __eq__(self, other):
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__, self.to_dict())
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self._extra = None
+        for key, value in state.items():
+            self._assign(key, value)
+
+
+# ============================================
+# TYPES D'ENREGISTREMENTS
+# ============================================
+
+class Activite(Record):
+    """Activite du planning."""
+
+    FIELDS = ("id", "date", "nom", "lieu", "horaire", "duree", "prix", "description",
+              "prix_min", "prix_max")
+    INTERNED = ("date",)
+    MONEY = ("prix", "prix_min", "prix_max")
+    __slots__ = FIELDS
+
+
+class Depense(Record):
+    """Depense du budget (devise absente: devise du voyage)."""
+
+    FIELDS = ("id", "date", "categorie", "montant", "description", "participant", "devise")
+    INTERNED = ("date", "categorie", "participant", "devise")
+    MONEY = ("montant",)
+    __slots__ = FIELDS
+
+
+class Participant(Record):
+    """Participant au voyage."""
+
+    FIELDS = ("id", "nom", "prenom", "email", "telephone", "role",
+              "date_naissance", "allergies", "notes", "arrivee", "depart")
+    INTERNED = ("role",)
+    __slots__ = FIELDS
+
+
+class ChecklistItem(Record):
+    """Element de la checklist."""
+
+    FIELDS = ("id", "item", "categorie", "checked")
+    INTERNED = ("categorie",)
+    __slots__ = FIELDS
+
+
+class LocalTransport(Record):
+    """Transport sur place (abonnement, location...)."""
+
+    FIELDS = ("type", "description", "prix", "prix_min", "prix_max")
+    INTERNED = ("type",)
+    MONEY = ("prix", "prix_min", "prix_max")
+    __slots__ = FIELDS
+
+
+# Type d'enregistrement de chaque collection
+COLLECTION_TYPES = {
+    "activites": Activite,
+    "depenses": Depense,
+    "participants": Participant,
+    "checklist": ChecklistItem,
+}
+
+
+def convert_list(items, record_type):
+    """
+    Convertit sur place les elements d'une liste en enregistrements.
+
+    Args:
+        items: La liste d'elements (dictionnaires ou enregistrements)
+        record_type: La classe d'enregistrement a utiliser
+
+    Returns:
+        La meme liste
+    """
+    for i, item in enumerate(items):
+        if type(item) is not record_type:
+            items[i] = record_type.from_dict(item)
+    return items
+
+
+# ============================================
+# SECTIONS FIGEES
+# ============================================
+
+def freeze(value):
+    """
+    Retourne une version immuable d'une valeur (section des donnees).
+
+    Les dictionnaires deviennent des vues en lecture seule
+    (MappingProxyType) et les listes des tuples, recursivement. Les
+    enregistrements et les IdMap, deja immuables, sont conserves.
+
+    Args:
+        value: La valeur (dictionnaire, liste, scalaire...)
+
+    Returns:
+        La valeur figee
+    """
+    if isinstance(value, (Record, IdMap, MappingProxyType)):
+        return value
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(v) for key, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """
+    Retourne une copie modifiable d'une valeur figee (inverse de freeze).
+
+    Utilise avant la serialisation (le cache binaire ne sait pas ecrire
+    les vues en lecture seule). Les enregistrements sont conserves tels quels et
+    les IdMap deviennent des listes d'enregistrements.
+
+    Args:
+        value: La valeur figee
+
+    Returns:
+        La valeur avec des dictionnaires et des listes
+    """
+    if isinstance(value, Record):
+        return value
+    if isinstance(value, Mapping):
+        return {key: thaw(v) for key, v in value.items()}
+    if isinstance(value, (list, tuple, IdMap)):
+        return [thaw(v) for v in value]
+    return value
+
+
+# ============================================
+# CODEC JSON
+# ============================================
+
+def json_default(obj):
+    """
+    Hook "default" de json.dumps pour serialiser les enregistrements.
+
+    Args:
+        obj: L'objet que json ne sait pas serialiser
+
+    Returns:
+        Le dictionnaire equivalent
+    """
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    if isinstance(obj, IdMap):
+        return list(obj)
+    if isinstance(obj, MappingProxyType):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(value, **kwargs):
+    """
+    Serialise des donnees contenant des enregistrements en JSON.
+
+    Args:
+        value: Les donnees a serialiser
+        **kwargs: Options supplementaires de json.dumps (indent, ...)
+
+    Returns:
+        La chaine JSON
+    """
+    kwargs.setdefault("ensure_ascii", False)
+    if "indent" not in kwargs:
+        kwargs.setdefault("separators", (",", ":"))
+    return json.dumps(value, default=json_default, **kwargs)
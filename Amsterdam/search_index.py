@@ -0,0 +1,376 @@
+"""
+search_index.py - Index inverse de la recherche plein texte.
+
+La recherche globale (champ de recherche de l'en-tete) et le filtre
+texte des requetes de data_manager (query_depenses(text=...)) trouvent
+les documents qui contiennent des mots sans parcourir les donnees:
+chaque document (une activite, un participant, les notes de l'hotel...)
+est decoupe en mots (minuscules, sans accents), et l'index associe a
+chaque mot les documents qui le contiennent.
+
+Un mot cherche trouve aussi les mots qui le contiennent ("museum" trouve
+"rijksmuseum"). Le vocabulaire est indexe par trigrammes (suites de 3
+lettres), plus les 1 et 2 premieres lettres de chaque mot:
+- un mot de 3 lettres ou plus est cherche par ses trigrammes: chacun
+  donne les mots du vocabulaire qui le contiennent
+- un mot plus court est cherche comme debut de mot ("vi" trouve
+  "visite", pas "avion")
+
+L'index est mis a jour document par document (add, remove): aucune
+reconstruction apres une modification. Chaque section des donnees a son
+propre index (voir data_manager._search), dont les documents sont
+identifies par une cle (l'ID d'un element).
+
+Usage:
+    index = create()
+    add(index, 12, "Rijksmuseum Museumstraat 1")
+    add_many(index, [13, 14], "Tram GVB")
+    remove(index, 12)
+    total, cles = search(index, "rijks musee", limit=50)
+    cles = matches(index, "museum")
+"""
+
+import heapq
+import re
+import unicodedata
+
+# Decoupage en mots (lettres et chiffres)
+_WORD_RE = re.compile(r"\w+")
+
+# Signes diacritiques (accents) separes des lettres par la forme NFKD
+_COMBINING_RE = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
+
+# Marque de debut de mot (cles des 1 et 2 premieres lettres)
+_START = "^"
+
+# Valeur sentinelle d'un mot absent des postings (une cle peut etre None)
+_ABSENT = object()
+
+
+def create():
+    """
+    Cree un index vide.
+
+    Returns:
+        Dictionnaire (postings: mot -> cles des documents, ou la cle seule
+        pour un mot d'un seul document; docs: cle -> mots du document;
+        grams: trigramme ou debut de mot -> mots)
+    """
+    return {
+        "postings": {},
+        "docs": {},
+        "grams": {},
+    }
+
+
+def fold(text):
+    """
+    Retourne un texte en minuscules et sans accents.
+    """
+    return _COMBINING_RE.sub("", unicodedata.normalize("NFKD", str(text))).casefold()
+
+
+def tokenize(text):
+    """
+    Decoupe un texte en mots (minuscules, sans accents).
+
+    Args:
+        text: Le texte
+
+    Returns:
+        Liste des mots, dans l'ordre du texte
+    """
+    if not text:
+        return []
+    if text.isascii():
+        return _WORD_RE.findall(text.lower())
+    return _WORD_RE.findall(fold(text))
+
+
+def _grams(word):
+    """
+    Retourne les cles d'un mot du vocabulaire: ses trigrammes et ses 1
+    et 2 premieres lettres.
+    """
+    grams = {word[i:i + 3] for i in range(len(word) - 2)}
+    grams.add(_START + word[:1])
+    if len(word) >= 2:
+        grams.add(_START + word[:2])
+    return grams
+
+
+def add(index, key, text):
+    """
+    Indexe un document (remplace sa version precedente).
+
+    Args:
+        index: L'index (voir create)
+        key: La cle du document
+        text: Le texte du document
+    """
+    if key in index["docs"]:
+        remove(index, key)
+
+    words = tuple(set(tokenize(text)))
+    index["docs"][key] = words
+
+    # Un mot d'un seul document (nombre, email...) garde la cle seule
+    # plutot qu'un ensemble
+    postings = index["postings"]
+    for word in words:
+        keys = postings.get(word, _ABSENT)
+        if keys is _ABSENT:
+            postings[word] = key
+            _add_word(index, word)
+        elif type(keys) is set:
+            keys.add(key)
+        else:
+            postings[word] = {keys, key}
+
+
+def add_many(index, keys, text):
+    """
+    Indexe plusieurs documents de meme texte (texte decoupe une seule
+    fois, mots partages entre les documents).
+
+    Args:
+        index: L'index (voir create)
+        keys: Les cles des documents
+        text: Le texte commun des documents
+    """
+    keys = list(keys)
+    if not keys:
+        return
+    docs = index["docs"]
+    for key in keys:
+        if key in docs:
+            remove(index, key)
+
+    words = tuple(set(tokenize(text)))
+    docs.update(dict.fromkeys(keys, words))
+
+    postings = index["postings"]
+    for word in words:
+        current = postings.get(word, _ABSENT)
+        if current is _ABSENT:
+            postings[word] = keys[0] if len(keys) == 1 else set(keys)
+            _add_word(index, word)
+        elif type(current) is set:
+            current.update(keys)
+        else:
+            postings[word] = {current, *keys}
+
+
+def remove(index, key):
+    """
+    Retire un document (rien s'il est absent).
+
+    Args:
+        index: L'index (voir create)
+        key: La cle du document
+    """
+    words = index["docs"].pop(key, None)
+    if words is None:
+        return
+
+    postings = index["postings"]
+    for word in words:
+        keys = postings[word]
+        if type(keys) is not set:
+            del postings[word]
+            _remove_word(index, word)
+            continue
+        keys.discard(key)
+        if len(keys) == 1:
+            postings[word] = keys.pop()
+
+
+def size(index):
+    """
+    Retourne le nombre de documents indexes.
+    """
+    return len(index["docs"])
+
+
+def _add_word(index, word):
+    """
+    Ajoute un nouveau mot du vocabulaire a ses trigrammes.
+    """
+    grams = index["grams"]
+    for gram in _grams(word):
+        words = grams.get(gram)
+        if words is None:
+            grams[gram] = {word}
+        else:
+            words.add(word)
+
+
+def _remove_word(index, word):
+    """
+    Retire un mot qui n'est plus dans aucun document.
+    """
+    grams = index["grams"]
+    for gram in _grams(word):
+        words = grams.get(gram)
+        if words is not None:
+            words.discard(word)
+            if not words:
+                del grams[gram]
+
+
+def _matching_words(index, word):
+    """
+    Retourne les mots du vocabulaire trouves par un mot cherche.
+
+    Args:
+        index: L'index (voir create)
+        word: Le mot cherche (decoupe par tokenize)
+
+    Returns:
+        Les mots du vocabulaire qui contiennent le mot (3 lettres ou
+        plus) ou qui commencent par le mot (1 ou 2 lettres)
+    """
+    grams = index["grams"]
+    if len(word) < 3:
+        return grams.get(_START + word, ())
+
+    # Intersection des mots de chaque trigramme, du plus rare au plus courant
+    sets = []
+    for i in range(len(word) - 2):
+        words = grams.get(word[i:i + 3])
+        if not words:
+            return ()
+        sets.append(words)
+    sets.sort(key=len)
+
+    candidates = sets[0]
+    for words in sets[1:]:
+        if len(candidates) <= 8:
+            break
+        candidates = candidates & words
+    return [candidate for candidate in candidates if word in candidate]
+
+
+def _keys(postings, word):
+    """
+    Retourne les cles des documents d'un mot du vocabulaire (ensemble).
+    """
+    keys = postings.get(word, _ABSENT)
+    if keys is _ABSENT:
+        return set()
+    return keys if type(keys) is set else {keys}
+
+
+def _word_keys(postings, words):
+    """
+    Retourne les cles des documents de mots du vocabulaire (ensemble).
+    """
+    if len(words) == 1:
+        for word in words:
+            return _keys(postings, word)
+
+    found = set()
+    single = []
+    for word in words:
+        keys = postings[word]
+        if type(keys) is set:
+            found |= keys
+        else:
+            single.append(keys)
+    found.update(single)
+    return found
+
+
+def _lookup(index, words):
+    """
+    Cherche les documents qui contiennent tous les mots cherches.
+
+    Args:
+        index: L'index (voir create)
+        words: Les mots cherches (decoupes par tokenize), sans doublon
+
+    Returns:
+        Tuple (cles des documents trouves, True si chaque mot cherche n'a
+        trouve que lui-meme dans le vocabulaire)
+    """
+    postings = index["postings"]
+    found = None
+    whole = True
+
+    # Mots longs d'abord: ils trouvent le moins de documents
+    for word in sorted(words, key=len, reverse=True):
+        matching = _matching_words(index, word)
+        whole = whole and len(matching) == 1 and word in postings
+        keys = _word_keys(postings, matching)
+        found = keys if found is None else found & keys
+        if not found:
+            return set(), whole
+    return found, whole
+
+
+def matches(index, text):
+    """
+    Retourne les documents qui contiennent tous les mots d'un texte.
+
+    Args:
+        index: L'index (voir create)
+        text: Les mots cherches
+
+    Returns:
+        Ensemble des cles des documents (a ne pas modifier)
+    """
+    words = set(tokenize(text))
+    if not words:
+        return set()
+    return _lookup(index, words)[0]
+
+
+def search(index, text, limit=None):
+    """
+    Cherche les documents qui contiennent tous les mots d'un texte.
+
+    Les documents ou chaque mot cherche est un mot entier viennent en
+    premier, puis les autres; chaque groupe est dans l'ordre des cles.
+
+    Args:
+        index: L'index (voir create)
+        text: Les mots cherches
+        limit: Le nombre maximal de documents retournes, ou None
+
+    Returns:
+        Tuple (nombre de documents trouves, liste des cles des documents)
+    """
+    words = set(tokenize(text))
+    if not words:
+        return 0, []
+
+    found, whole = _lookup(index, words)
+    if not found:
+        return 0, []
+
+    # Documents qui contiennent les mots entiers (tous, si chaque mot
+    # cherche n'a trouve que lui-meme)
+    if whole:
+        exact = found
+    else:
+        postings = index["postings"]
+        exact = found
+        for word in words:
+            exact = exact & _keys(postings, word)
+            if not exact:
+                break
+
+    keys = _first(exact, limit)
+    if limit is None or len(keys) < limit:
+        rest = found - exact if exact else found
+        keys += _first(rest, None if limit is None else limit - len(keys))
+    return len(found), keys
+
+
+def _first(keys, limit):
+    """
+    Retourne les limit plus petites cles d'un ensemble, triees.
+    """
+    if limit is None or len(keys) <= limit:
+        return sorted(keys)
+    return heapq.nsmallest(limit, keys)
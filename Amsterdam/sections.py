@@ -0,0 +1,412 @@
+"""
+sections.py - Fichiers par section des donnees de l'application
+Amsterdam Trip Planner.
+
+L'instantane des donnees n'est plus un seul gros fichier voyage_data.json
+mais un repertoire (data/sections/) avec un fichier JSON par section:
+
+    sections/
+        manifest.json       # journal_seq, next_ids, totaux des depenses...
+        voyage_info.json
+        activites.json
+        budget.json         # budget prevu (sans les depenses)
+        depenses.json       # historique des depenses
+        hotel.json
+        transport.json
+        participants.json
+        checklist.json
+
+Une sauvegarde ne reecrit que les sections modifiees (plus le manifeste,
+tres petit), et une section n'est lue qu'au premier acces: afficher
+l'accueil n'analyse pas tout l'historique des depenses.
+
+Chaque fichier est ecrit dans un fichier temporaire puis renomme, et peut
+avoir a cote de lui son cache binaire (<section>.cache, voir
+snapshot_cache.py). En mode COLUMNAR_DEPENSES, le cache des depenses est
+le fichier du registre en colonnes (depenses.<version>.ledger, voir
+ledger.py).
+
+Le manifeste est ecrit en dernier: il memorise le numero du dernier
+enregistrement du journal inclus dans les sections. Si l'application
+s'arrete avant, les enregistrements deja inclus dans une section sont
+rejoues une seconde fois au chargement, ce qui ne change rien (chaque
+operation du journal remplace une valeur).
+"""
+
+import json
+import os
+
+import ledger
+import records
+import snapshot_cache
+from config import COLUMNAR_DEPENSES
+from journal import COLLECTION_PATHS, SECTION_PATHS
+
+
+# ============================================
+# EMPLACEMENT DES SECTIONS DANS LES DONNEES
+# ============================================
+
+# Chemin de chaque section (un fichier par section) dans le dictionnaire.
+# Les depenses ont leur propre fichier: le reste du budget est minuscule
+# et lu bien plus souvent.
+SECTION_FILES = {
+    "voyage_info": ("voyage_info",),
+    "activites": ("activites",),
+    "budget": ("budget",),
+    "depenses": ("budget", "depenses"),
+    "hotel": ("hotel",),
+    "transport": ("transport",),
+    "participants": ("participants",),
+    "checklist": ("checklist",),
+}
+
+# Nom du fichier manifeste
+MANIFEST_NAME = "manifest.json"
+
+# Version du format (a incrementer si la structure des fichiers change)
+SECTIONS_VERSION = 1
+
+
+def section_of(col):
+    """
+    Retourne la section qui contient une collection ou une section du journal.
+
+    Args:
+        col: La collection ou la section (voir journal.py)
+
+    Returns:
+        Le nom de la section (cle de SECTION_FILES), ou None si la
+        collection est inconnue
+    """
+    if col in SECTION_FILES:
+        return col
+    path = COLLECTION_PATHS.get(col) or SECTION_PATHS.get(col)
+    return path[0] if path else None
+
+
+# ============================================
+# DECOUPAGE DES DONNEES
+# ============================================
+
+def get_value(data, name):
+    """
+    Extrait la valeur d'une section des donnees.
+
+    Le budget est retourne sans ses depenses (section a part).
+
+    Args:
+        data: Les donnees completes
+        name: Le nom de la section
+
+    Returns:
+        La valeur de la section (None si elle est absente)
+    """
+    parent = data
+    path = SECTION_FILES[name]
+    for key in path[:-1]:
+        parent = parent.get(key, {})
+    value = parent.get(path[-1])
+
+    if name == "budget" and isinstance(value, dict):
+        value = {key: v for key, v in value.items() if key != "depenses"}
+    return value
+
+
+def set_value(data, name, value):
+    """
+    Place la valeur d'une section dans les donnees.
+
+    Args:
+        data: Les donnees (modifiees sur place)
+        name: Le nom de la section
+        value: La valeur lue du fichier de la section
+    """
+    path = SECTION_FILES[name]
+    parent = data
+    for key in path[:-1]:
+        parent = parent.setdefault(key, {})
+
+    if name == "budget":
+        # Conserver les depenses si elles sont deja chargees
+        parent.setdefault(path[-1], {}).update(value)
+    else:
+        parent[path[-1]] = value
+
+
+def get_meta(data):
+    """
+    Extrait les cles des donnees qui ne sont dans aucune section.
+
+    Args:
+        data: Les donnees completes
+
+    Returns:
+        Dictionnaire (next_ids, last_modified, ...)
+    """
+    return {key: value for key, value in data.items() if key not in SECTION_FILES}
+
+
+# ============================================
+# CHEMINS DES FICHIERS
+# ============================================
+
+def section_path(directory, name):
+    """
+    Retourne le chemin du fichier JSON d'une section.
+
+    Args:
+        directory: Le repertoire des sections
+        name: Le nom de la section
+    """
+    return os.path.join(directory, name + ".json")
+
+
+def cache_path(directory, name):
+    """
+    Retourne le chemin du cache binaire d'une section.
+
+    Args:
+        directory: Le repertoire des sections
+        name: Le nom de la section
+    """
+    return os.path.join(directory, name + ".cache")
+
+
+def ledger_path(directory, name):
+    """
+    Retourne le chemin du registre en colonnes d'une section, sans la
+    version du fichier JSON (voir ledger.versioned_path).
+
+    Args:
+        directory: Le repertoire des sections
+        name: Le nom de la section
+    """
+    return os.path.join(directory, name + ".ledger")
+
+
+def is_columnar(name):
+    """
+    Indique si le cache d'une section est un registre en colonnes.
+    """
+    return COLUMNAR_DEPENSES and name == "depenses"
+
+
+def exists(directory):
+    """
+    Indique si le repertoire contient des donnees par section.
+
+    Args:
+        directory: Le repertoire des sections
+
+    Returns:
+        True si le manifeste existe
+    """
+    return os.path.exists(os.path.join(directory, MANIFEST_NAME))
+
+
+# ============================================
+# LECTURE ET ECRITURE
+# ============================================
+
+def _write_atomic(path, payload):
+    """
+    Ecrit un fichier via un fichier temporaire renomme ensuite.
+
+    Args:
+        path: Le chemin du fichier
+        payload: Le contenu (octets)
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_manifest(directory):
+    """
+    Lit le manifeste des sections.
+
+    Args:
+        directory: Le repertoire des sections
+
+    Returns:
+        Le manifeste (dictionnaire)
+    """
+    with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(directory, manifest):
+    """
+    Ecrit le manifeste des sections.
+
+    Args:
+        directory: Le repertoire des sections
+        manifest: Le manifeste (dictionnaire)
+    """
+    manifest = dict(manifest, version=SECTIONS_VERSION)
+    payload = json.dumps(manifest, ensure_ascii=False, indent=2,
+                         default=records.json_default).encode("utf-8")
+    _write_atomic(os.path.join(directory, MANIFEST_NAME), payload)
+
+
+def read_section(directory, name, use_cache=True):
+    """
+    Lit le fichier d'une section (ou son cache s'il est a jour).
+
+    Args:
+        directory: Le repertoire des sections
+        name: Le nom de la section
+        use_cache: False pour ignorer le cache binaire
+
+    Returns:
+        La valeur de la section, ou None si le fichier n'existe pas
+    """
+    json_path = section_path(directory, name)
+    if not os.path.exists(json_path):
+        return None
+
+    if use_cache and is_columnar(name):
+        items = ledger.load(ledger_path(directory, name), json_path)
+        if items is not None:
+            return items
+    elif use_cache:
+        wrapped = snapshot_cache.load(cache_path(directory, name), json_path)
+        if wrapped is not None:
+            return get_value(wrapped, name)
+
+    with open(json_path, "rb") as f:
+        raw = f.read()
+    value = json.loads(raw)
+
+    if use_cache:
+        _write_cache(directory, name, _dumps_cache(name, value), snapshot_cache.content_hash(raw))
+    return value
+
+
+def dumps_section(name, value, use_cache=True):
+    """
+    Serialise une section.
+
+    Les valeurs des sections sont immuables (voir records.freeze et
+    persistent.py): la serialisation peut avoir lieu sans verrouiller
+    les donnees.
+
+    Args:
+        name: Le nom de la section
+        value: La valeur de la section
+        use_cache: False pour ne pas preparer le cache binaire
+
+    Returns:
+        Tuple (contenu JSON en octets, cache binaire ou None)
+    """
+    frozen = value
+    value = records.thaw(value)
+    payload = json.dumps(value, ensure_ascii=False, indent=2,
+                         default=records.json_default).encode("utf-8")
+
+    cached = None
+    if use_cache:
+        # Un registre en colonnes est ecrit depuis ses colonnes (sans
+        # les reconstruire s'il n'a pas change depuis son ouverture)
+        cached = _dumps_cache(name, frozen if is_columnar(name) else value)
+    return payload, cached
+
+
+def _dumps_cache(name, value):
+    """
+    Serialise une section au format du cache binaire.
+
+    Le cache contient la section a sa place dans les donnees, pour que
+    les collections y soient stockees en lignes compactes (voir
+    snapshot_cache._pack).
+
+    Args:
+        name: Le nom de la section
+        value: La valeur de la section
+
+    Returns:
+        Les octets du cache (registre en colonnes: voir ledger.dumps)
+    """
+    if is_columnar(name):
+        return ledger.dumps(value)
+
+    wrapped = {}
+    set_value(wrapped, name, value)
+    return snapshot_cache.dumps_data(wrapped)
+
+
+def write_section(directory, name, payload, cached=None):
+    """
+    Ecrit le fichier d'une section (et son cache binaire).
+
+    Args:
+        directory: Le repertoire des sections
+        name: Le nom de la section
+        payload: Le contenu JSON (voir dumps_section)
+        cached: Le cache binaire (voir dumps_section), ou None
+
+    Returns:
+        False si le cache binaire n'a pas pu etre ecrit (le fichier JSON,
+        la reference, l'a ete)
+    """
+    _write_atomic(section_path(directory, name), payload)
+
+    if cached is not None:
+        return _write_cache(directory, name, cached, snapshot_cache.content_hash(payload))
+    return True
+
+
+def _write_cache(directory, name, cached, json_hash):
+    """
+    Ecrit le cache binaire d'une section.
+
+    Une erreur d'ecriture du cache n'est pas bloquante: le JSON reste
+    la reference.
+
+    Args:
+        directory: Le repertoire des sections
+        name: Le nom de la section
+        cached: Le cache binaire (ou le contenu du registre en colonnes)
+        json_hash: L'empreinte du contenu du fichier JSON
+
+    Returns:
+        True si le cache a ete ecrit
+    """
+    try:
+        if is_columnar(name):
+            ledger.write(ledger_path(directory, name), section_path(directory, name),
+                         cached, json_hash)
+        else:
+            snapshot_cache.write(cache_path(directory, name), section_path(directory, name),
+                                 cached, json_hash)
+    except Exception as e:
+        print(f"[Sections] Erreur d'ecriture du cache {name}: {e}")
+        return False
+    return True
+
+
+def read_all(directory, use_cache=True):
+    """
+    Lit toutes les sections (migration vers SQLite, outils).
+
+    Args:
+        directory: Le repertoire des sections
+        use_cache: False pour ignorer les caches binaires
+
+    Returns:
+        Les donnees completes, avec journal_seq du manifeste (le journal
+        n'est pas rejoue)
+    """
+    data = read_manifest(directory)
+    data.pop("version", None)
+    data.pop("totals", None)
+
+    for name in SECTION_FILES:
+        value = read_section(directory, name, use_cache)
+        if value is not None:
+            set_value(data, name, value)
+    return data
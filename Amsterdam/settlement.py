@@ -0,0 +1,350 @@
+"""
+settlement.py - Partage des depenses et remboursements entre participants
+de l'application Amsterdam Trip Planner.
+
+Chaque depense est payee par un participant (champ "participant") et
+partagee entre les participants selon la regle de partage du budget:
+- "egal":     parts egales entre tous les participants
+- "presence": chaque depense est partagee entre les participants presents
+              a sa date (champs "arrivee" et "depart" du participant;
+              sans date, present pendant tout le voyage)
+- "poids":    parts proportionnelles au poids de chaque participant
+              (1 par defaut)
+
+Une depense payee par le "Groupe" (cagnotte commune) ou sans payeur
+n'entre pas dans les soldes.
+
+Le solde d'un participant est ce qu'il a paye moins sa part. Les
+remboursements sont calcules a partir des soldes par un algorithme
+glouton (le plus gros debiteur rembourse le plus gros creancier, avec
+deux tas): au plus (participants - 1) virements.
+
+Les montants sont en centimes entiers: les parts d'une depense sont
+arrondies par la methode du plus fort reste, leur somme est exactement
+le montant partage.
+
+Les parts sont maintenues par date (voir create_shares et update_shares):
+quand une depense change, seules les parts de sa date sont recalculees.
+
+Usage:
+    state = create_shares()
+    owed = update_shares(state, rule, members, shared_by_date)
+    balances = compute_balances(paid, owed)
+    transfers = settle(balances)
+"""
+
+import heapq
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+from functools import reduce
+from math import gcd
+
+from config import date_ordinal
+
+# Modes de partage (cle du mode -> libelle affiche)
+EQUAL = "egal"
+ATTENDANCE = "presence"
+WEIGHTS = "poids"
+MODES = {
+    EQUAL: "Parts egales",
+    ATTENDANCE: "Selon la presence",
+    WEIGHTS: "Poids personnalises",
+}
+
+# Regle de partage par defaut (budget['partage'] absent)
+DEFAULT_RULE = {"mode": EQUAL, "poids": {}}
+
+# Payeur d'une depense payee par la cagnotte commune
+GROUP = "Groupe"
+
+
+# ============================================
+# REGLE DE PARTAGE
+# ============================================
+
+def parse_weight(value):
+    """
+    Convertit un poids (texte ou nombre) en fraction exacte.
+
+    Args:
+        value: Le poids ("1", "0,5", 2...)
+
+    Returns:
+        Le poids (Fraction positive ou nulle)
+
+    Raises:
+        ValueError: si le poids n'est pas un nombre positif ou nul
+    """
+    try:
+        weight = Decimal(str(value).strip().replace(",", "."))
+    except InvalidOperation:
+        raise ValueError(f"Poids invalide: {value!r}") from None
+    if not weight.is_finite() or weight < 0:
+        raise ValueError(f"Poids invalide: {value!r}")
+    return Fraction(weight)
+
+
+def normalize_rule(rule):
+    """
+    Verifie une regle de partage et la met sous sa forme enregistree.
+
+    Args:
+        rule: {"mode": ..., "poids": {participant: poids}} (mode absent:
+            parts egales)
+
+    Returns:
+        La regle (dictionnaire, poids en texte)
+
+    Raises:
+        ValueError: si le mode ou un poids est invalide
+    """
+    rule = rule or {}
+    mode = rule.get("mode") or EQUAL
+    if mode not in MODES:
+        raise ValueError(f"Mode de partage inconnu: {mode!r}")
+
+    weights = {}
+    for name, value in (rule.get("poids") or {}).items():
+        parse_weight(value)
+        weights[str(name)] = str(value).strip().replace(",", ".")
+    return {"mode": mode, "poids": weights}
+
+
+def member_name(participant):
+    """
+    Retourne le nom d'un participant tel qu'il est enregistre comme payeur
+    d'une depense ("Prenom Nom", voir budget_frame.update_participants_list).
+    """
+    return f"{participant.get('prenom', '')} {participant.get('nom', '')}"
+
+
+def members_of(participants):
+    """
+    Retourne les membres du partage: tuple de (nom, premier jour, dernier
+    jour), les jours etant des numeros de jour (0: sans limite).
+
+    Args:
+        participants: Les participants
+
+    Returns:
+        Le tuple des membres (trie par nom, sans doublon)
+    """
+    members = {}
+    for p in participants:
+        name = member_name(p)
+        members[name] = (name, date_ordinal(p.get('arrivee')), date_ordinal(p.get('depart')))
+    return tuple(members[name] for name in sorted(members))
+
+
+# ============================================
+# PARTS DE CHAQUE PARTICIPANT
+# ============================================
+
+def allocate(amount, weights):
+    """
+    Repartit un montant en centimes proportionnellement a des poids.
+
+    Methode du plus fort reste: chaque part est arrondie a l'entier
+    inferieur, puis les centimes restants vont aux plus forts restes
+    (a egalite, dans l'ordre des poids). La somme des parts est
+    exactement le montant.
+
+    Args:
+        amount: Le montant en centimes
+        weights: Liste de couples (nom, poids entier positif)
+
+    Returns:
+        Dictionnaire nom -> part en centimes (vide si la somme des poids
+        est nulle)
+    """
+    total_weight = sum(weight for _, weight in weights)
+    if total_weight <= 0:
+        return {}
+
+    sign = -1 if amount < 0 else 1
+    amount = abs(amount)
+
+    shares = {}
+    remainders = []
+    given = 0
+    for position, (name, weight) in enumerate(weights):
+        share, remainder = divmod(amount * weight, total_weight)
+        shares[name] = share
+        given += share
+        remainders.append((-remainder, position, name))
+
+    for _, _, name in sorted(remainders)[:amount - given]:
+        shares[name] += 1
+
+    if sign < 0:
+        return {name: -share for name, share in shares.items()}
+    return shares
+
+
+def _integer_weights(rule, members):
+    """
+    Retourne les poids entiers des membres (meme proportion que les poids
+    de la regle): liste de couples (nom, poids).
+    """
+    if rule["mode"] != WEIGHTS:
+        return [(name, 1) for name, _, _ in members]
+
+    weights = [(name, parse_weight(rule["poids"].get(name, 1))) for name, _, _ in members]
+    if not any(weight for _, weight in weights):
+        # Tous les poids a zero: parts egales
+        return [(name, 1) for name, _, _ in members]
+
+    # Plus petit denominateur commun des poids (Python 3.8: pas de math.lcm)
+    scale = reduce(lambda a, b: a * b // gcd(a, b), (weight.denominator for _, weight in weights), 1)
+    return [(name, int(weight * scale)) for name, weight in weights]
+
+
+def _present(members, weights, ordinal):
+    """
+    Retourne les poids des membres presents a un jour (tous les membres si
+    le jour est inconnu ou si personne n'est present).
+    """
+    if not ordinal:
+        return weights
+    present = [
+        entry for entry, (_, first, last) in zip(weights, members)
+        if (not first or first <= ordinal) and (not last or ordinal <= last)
+    ]
+    return present or weights
+
+
+def create_shares():
+    """
+    Cree l'etat des parts maintenues.
+
+    Returns:
+        Dictionnaire (rule, members, weights, allocations, owed)
+    """
+    return {
+        "rule": None,         # Regle des parts calculees
+        "members": None,      # Membres des parts calculees
+        "weights": [],        # Poids entiers des membres
+        "allocations": {},    # cle de partage -> (montant, {nom: part})
+        "owed": {},           # nom -> somme des parts
+    }
+
+
+def update_shares(state, rule, members, shared_by_date):
+    """
+    Met a jour les parts de chaque membre.
+
+    Les montants partages sont regroupes par cle de partage: la date en
+    mode "presence", une seule cle sinon. Seules les cles dont le montant
+    a change sont repartis de nouveau (une depense modifiee ne touche
+    qu'une date); un changement de regle ou de membres repart de zero.
+
+    Args:
+        state: L'etat cree par create_shares
+        rule: La regle de partage (voir normalize_rule)
+        members: Les membres (voir members_of)
+        shared_by_date: {date: montant partage en centimes}
+
+    Returns:
+        Dictionnaire nom -> part en centimes (a ne pas modifier)
+    """
+    if state["rule"] != rule or state["members"] != members:
+        state["rule"] = rule
+        state["members"] = members
+        state["weights"] = _integer_weights(rule, members)
+        state["allocations"] = {}
+        state["owed"] = {name: 0 for name, _, _ in members}
+
+    if rule["mode"] == ATTENDANCE:
+        amounts = shared_by_date
+    else:
+        amounts = {None: sum(shared_by_date.values())}
+
+    allocations = state["allocations"]
+    owed = state["owed"]
+
+    for key in [key for key in allocations if key not in amounts]:
+        _, shares = allocations.pop(key)
+        for name, share in shares.items():
+            owed[name] -= share
+
+    for key, amount in amounts.items():
+        previous = allocations.get(key)
+        if previous is not None and previous[0] == amount:
+            continue
+        if previous is not None:
+            for name, share in previous[1].items():
+                owed[name] -= share
+
+        weights = state["weights"]
+        if key is not None:
+            weights = _present(members, weights, date_ordinal(key))
+        shares = allocate(amount, weights)
+        allocations[key] = (amount, shares)
+        for name, share in shares.items():
+            owed[name] += share
+
+    return owed
+
+
+# ============================================
+# SOLDES ET REMBOURSEMENTS
+# ============================================
+
+def compute_balances(paid, owed):
+    """
+    Calcule le solde de chaque participant.
+
+    Args:
+        paid: {nom: montant paye en centimes} (payeurs hors cagnotte)
+        owed: {nom: part en centimes}
+
+    Returns:
+        Dictionnaire nom -> (paye, part, solde) en centimes; un solde
+        positif est a recevoir, negatif a rembourser
+    """
+    balances = {}
+    for name in set(paid).union(owed):
+        if name in ("", GROUP):
+            continue
+        p = paid.get(name, 0)
+        o = owed.get(name, 0)
+        balances[name] = (p, o, p - o)
+    return balances
+
+
+def settle(balances):
+    """
+    Calcule les virements qui soldent tous les comptes.
+
+    Algorithme glouton: a chaque etape, le plus gros debiteur rembourse
+    le plus gros creancier (le plus petit des deux montants), puis le
+    reste de l'un des deux retourne dans son tas. Chaque etape solde au
+    moins un compte: au plus (participants - 1) virements.
+
+    Args:
+        balances: Dictionnaire nom -> (paye, part, solde) (voir
+            compute_balances)
+
+    Returns:
+        Liste de tuples (debiteur, creancier, montant en centimes), par
+        montant decroissant
+    """
+    creditors = [(-solde, name) for name, (_, _, solde) in balances.items() if solde > 0]
+    debtors = [(solde, name) for name, (_, _, solde) in balances.items() if solde < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debt, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append((debtor, creditor, amount))
+
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+        elif -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor))
+
+    transfers.sort(key=lambda t: (-t[2], t[0], t[1]))
+    return transfers
@@ -0,0 +1,259 @@
+"""
+simulation.py - Simulation de Monte-Carlo du risque de depassement du
+budget de l'application Amsterdam Trip Planner.
+
+Le cout du voyage est la somme d'une partie fixe (depenses deja faites)
+et de postes incertains (activites a venir, transports sur place,
+depenses prevues). Chaque poste a un prix minimal, probable et maximal
+(centimes): le prix saisi et, a defaut de minimum ou de maximum saisi,
+un ecart par categorie (SIMULATION_SPREAD). Le cout de chaque poste est
+tire selon une loi triangulaire (minimum, prix probable, maximum).
+
+Les tirages sont faits par paquets de SIMULATION_BATCH_SIZE essais, un
+poste a la fois pour tout le paquet: avec NumPy si le module est
+installe, sinon avec des tableaux array('d') remplis par des listes en
+comprehension. Les postes identiques sont regroupes, les postes sans
+incertitude (minimum = maximum) passent dans la partie fixe. Chaque
+paquet a sa propre graine, tiree des donnees et du numero du paquet: le
+resultat ne depend pas du nombre de processus.
+
+Pour un gros voyage (SIMULATION_PARALLEL_MIN tirages au moins), les
+paquets sont repartis sur un pool de processus.
+
+Usage:
+    low, likely, high = parse_estimate("45", "40", "60")
+    lines = make_lines([estimate(likely, low, high, "Activites")])
+    result = simulate(lines, fixed, budget)
+"""
+
+import bisect
+import hashlib
+import math
+import multiprocessing
+import os
+import random
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from config import (
+    SIMULATION_TRIALS, SIMULATION_BATCH_SIZE, SIMULATION_PARALLEL_MIN,
+    SIMULATION_WORKERS, SIMULATION_PERCENTILES, SIMULATION_SPREAD
+)
+from money import parse_amount
+
+
+# ============================================
+# ESTIMATION DES POSTES
+# ============================================
+
+def parse_estimate(prix, prix_min="", prix_max=""):
+    """
+    Convertit le prix probable, minimal et maximal saisis d'un poste.
+
+    Args:
+        prix: Le prix probable (texte vide: 0)
+        prix_min: Le prix minimal (texte vide: absent)
+        prix_max: Le prix maximal (texte vide: absent)
+
+    Returns:
+        Tuple (prix, minimum, maximum) en centimes (None si absent)
+
+    Raises:
+        ValueError: si un prix est invalide ou si minimum <= prix <=
+            maximum n'est pas respecte
+    """
+    likely = parse_amount(prix) if str(prix).strip() else 0
+    low = parse_amount(prix_min) if str(prix_min).strip() else None
+    high = parse_amount(prix_max) if str(prix_max).strip() else None
+
+    if low is not None and low > likely:
+        raise ValueError("Le prix minimal doit etre inferieur ou egal au prix")
+    if high is not None and high < likely:
+        raise ValueError("Le prix maximal doit etre superieur ou egal au prix")
+    return likely, low, high
+
+
+def estimate(likely, low, high, categorie):
+    """
+    Retourne l'estimation d'un poste: (minimum, prix probable, maximum)
+    en centimes, l'ecart de la categorie remplacant un minimum ou un
+    maximum absent.
+
+    Args:
+        likely: Le prix probable (centimes)
+        low: Le prix minimal (centimes, None si absent)
+        high: Le prix maximal (centimes, None si absent)
+        categorie: La categorie du poste (voir SIMULATION_SPREAD)
+    """
+    below, above = SIMULATION_SPREAD.get(categorie, SIMULATION_SPREAD["Autre"])
+    if low is None:
+        low = likely * (100 + below) // 100
+    if high is None:
+        high = -(-likely * (100 + above) // 100)
+    return min(low, likely), likely, max(high, likely)
+
+
+def make_lines(estimates):
+    """
+    Regroupe les estimations des postes.
+
+    Args:
+        estimates: Les estimations (minimum, prix probable, maximum)
+
+    Returns:
+        Tuple (fixe, postes): la somme des postes sans incertitude
+        (centimes) et le tuple trie des ((minimum, probable, maximum),
+        nombre de postes) incertains
+    """
+    fixed = 0
+    counts = {}
+    for low, likely, high in estimates:
+        if low == high:
+            fixed += likely
+        else:
+            key = (low, likely, high)
+            counts[key] = counts.get(key, 0) + 1
+    return fixed, tuple(sorted(counts.items()))
+
+
+# ============================================
+# TIRAGES
+# ============================================
+
+def _seed(lines, fixed, index):
+    """
+    Retourne la graine d'un paquet (tiree des donnees et du numero du
+    paquet).
+    """
+    digest = hashlib.sha256(repr((lines, fixed, index)).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def _batch_python(lines, fixed, size, seed):
+    """
+    Tire un paquet d'essais sans NumPy (inverse de la fonction de
+    repartition de la loi triangulaire).
+    """
+    rand = random.Random(seed).random
+    sqrt = math.sqrt
+    totals = [float(fixed)] * size
+    for (low, likely, high), count in lines:
+        width = high - low
+        split = (likely - low) / width
+        left = width * (likely - low)
+        right = width * (high - likely)
+        for _ in range(count):
+            totals = [
+                total + (low + sqrt(u * left) if u < split else high - sqrt((1.0 - u) * right))
+                for total, u in zip(totals, [rand() for _ in range(size)])
+            ]
+    return array('d', totals)
+
+
+def _batch_numpy(lines, fixed, size, seed):
+    """
+    Tire un paquet d'essais avec NumPy.
+    """
+    rng = numpy.random.default_rng(seed)
+    totals = numpy.full(size, float(fixed))
+    for (low, likely, high), count in lines:
+        for _ in range(count):
+            totals += rng.triangular(low, likely, high, size)
+    result = array('d')
+    result.frombytes(totals.tobytes())
+    return result
+
+
+def run_batch(lines, fixed, size, seed):
+    """
+    Tire un paquet d'essais (execute aussi dans un processus du pool).
+
+    Args:
+        lines: Les postes incertains (voir make_lines)
+        fixed: La partie fixe (centimes)
+        size: Le nombre d'essais
+        seed: La graine du paquet
+
+    Returns:
+        Les couts totaux des essais (array('d'), centimes)
+    """
+    if numpy is not None:
+        return _batch_numpy(lines, fixed, size, seed)
+    return _batch_python(lines, fixed, size, seed)
+
+
+# ============================================
+# SIMULATION
+# ============================================
+
+def simulate(lines, fixed, budget, trials=SIMULATION_TRIALS, parallel=None):
+    """
+    Simule le cout du voyage et la probabilite de depasser le budget.
+
+    Args:
+        lines: Les postes incertains (voir make_lines)
+        fixed: La partie fixe (centimes)
+        budget: Le budget prevu (centimes)
+        trials: Le nombre d'essais
+        parallel: True pour repartir les paquets sur un pool de processus
+            (None: si trials x postes >= SIMULATION_PARALLEL_MIN)
+
+    Returns:
+        Dictionnaire (essais, postes, fixe, budget, moyenne, minimum,
+        maximum, percentiles: {p: cout}, depassement: probabilite,
+        moteur, processus, duree)
+    """
+    start = time.perf_counter()
+    trials = max(int(trials), 1)
+    n_lines = sum(count for _, count in lines)
+    if parallel is None:
+        parallel = trials * n_lines >= SIMULATION_PARALLEL_MIN
+
+    batches = []
+    for index, offset in enumerate(range(0, trials, SIMULATION_BATCH_SIZE)):
+        size = min(SIMULATION_BATCH_SIZE, trials - offset)
+        batches.append((lines, fixed, size, _seed(lines, fixed, index)))
+
+    workers = 1
+    if not n_lines:
+        parts = [array('d', [float(fixed)]) * trials]
+    elif parallel and len(batches) > 1:
+        workers = min(SIMULATION_WORKERS or os.cpu_count() or 1, len(batches))
+        # spawn: l'application a des threads (Tk, sauvegarde), fork n'est pas sur
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            parts = list(pool.map(run_batch, *zip(*batches)))
+    else:
+        parts = [run_batch(*batch) for batch in batches]
+
+    totals = array('d')
+    for part in parts:
+        totals.extend(part)
+    values = sorted(totals)
+
+    percentiles = {}
+    for p in SIMULATION_PERCENTILES:
+        # Rang le plus proche
+        rank = min(max(math.ceil(p * trials / 100), 1), trials)
+        percentiles[p] = round(values[rank - 1])
+
+    return {
+        "essais": trials,
+        "postes": n_lines,
+        "fixe": fixed,
+        "budget": budget,
+        "moyenne": round(math.fsum(values) / trials),
+        "minimum": round(values[0]),
+        "maximum": round(values[-1]),
+        "percentiles": percentiles,
+        "depassement": (trials - bisect.bisect_right(values, budget)) / trials,
+        "moteur": "numpy" if numpy is not None and n_lines else "python",
+        "processus": workers,
+        "duree": time.perf_counter() - start,
+    }
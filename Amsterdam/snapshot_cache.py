@@ -0,0 +1,312 @@
+"""
+snapshot_cache.py - Cache binaire de l'instantane JSON de l'application
+Amsterdam Trip Planner.
+
+Analyser un gros fichier voyage_data.json a chaque demarrage est lent.
+Ce module conserve a cote du fichier JSON une copie binaire (marshal)
+des memes donnees, beaucoup plus rapide a relire.
+
+Le cache n'est utilise que s'il correspond exactement au fichier JSON:
+meme taille, meme date de modification et meme empreinte du contenu
+(BLAKE2b). Sinon, l'appelant relit le JSON et reconstruit le cache.
+
+Le format marshal ne contient que des valeurs simples (dictionnaires,
+listes, tuples, chaines, nombres): relire un cache, meme fabrique par
+quelqu'un d'autre, n'execute aucun code (contrairement a pickle). Un
+cache qui n'appartient pas a l'utilisateur, ou que d'autres peuvent
+modifier (dossier de donnees partage), est tout de meme ignore.
+
+Format du fichier cache:
+    1. la longueur de l'en-tete (4 octets)
+    2. l'en-tete (marshal): {"version", "marshal", "size", "mtime_ns", "hash"}
+    3. les donnees (marshal): (squelette, {collection: lignes}) ou le squelette
+       contient tout sauf les collections, et chaque ligne est le tuple
+       des valeurs d'un enregistrement (voir records.Record.to_values,
+       ... pour un champ absent) ou le dictionnaire d'un enregistrement
+       ayant des cles inconnues
+"""
+
+import gc
+import hashlib
+import marshal
+import os
+import stat as stat_module
+import struct
+from collections.abc import Mapping
+
+import records
+from journal import COLLECTION_PATHS
+
+
+# Version du format (a incrementer si la structure du cache change;
+# 2: montants des enregistrements en centimes; 3: champs absents marques
+# records.ABSENT, devise des depenses; 4: dates d'arrivee et de depart
+# des participants; 5: prix minimal et maximal des activites et des
+# transports sur place; 6: format marshal au lieu de pickle)
+CACHE_VERSION = 6
+
+# Marque d'un champ absent dans les lignes du cache (records.ABSENT
+# n'est pas une valeur simple; ... n'apparait jamais dans du JSON)
+_ABSENT = ...
+
+# Taille des blocs lus pour calculer l'empreinte d'un fichier
+_CHUNK_SIZE = 1024 * 1024
+
+# Longueur de l'en-tete, au debut du fichier cache
+_LENGTH = struct.Struct("<I")
+
+
+# ============================================
+# FONCTIONS D'EMPREINTE
+# ============================================
+
+def content_hash(payload):
+    """
+    Calcule l'empreinte d'un contenu deja en memoire.
+
+    Args:
+        payload: Le contenu (octets)
+
+    Returns:
+        L'empreinte hexadecimale
+    """
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def file_hash(path):
+    """
+    Calcule l'empreinte du contenu d'un fichier.
+
+    Args:
+        path: Chemin du fichier
+
+    Returns:
+        L'empreinte hexadecimale
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ============================================
+# CONVERSION DES COLLECTIONS
+# ============================================
+
+def _pack(data):
+    """
+    Separe les collections du reste des donnees.
+
+    Args:
+        data: Les donnees completes (non modifiees)
+
+    Returns:
+        Tuple (squelette, {collection: lignes})
+    """
+    skeleton = dict(data)
+    collections = {}
+
+    for col, path in COLLECTION_PATHS.items():
+        # Copier les dictionnaires parents pour ne pas modifier data
+        parent = skeleton
+        for key in path[:-1]:
+            child = parent.get(key)
+            if not isinstance(child, dict):
+                break
+            parent[key] = child = dict(child)
+            parent = child
+        else:
+            items = parent.get(path[-1])
+            if items is None:
+                continue
+
+            record_type = records.COLLECTION_TYPES[col]
+            rows = []
+            for item in items:
+                if type(item) is not record_type:
+                    item = record_type.from_dict(item)
+                values = item.to_values()
+                if values is None:
+                    # Element avec des cles inconnues: garde en dictionnaire
+                    rows.append(_plain(item))
+                elif records.ABSENT in values:
+                    rows.append(tuple(_ABSENT if value is records.ABSENT else value
+                                      for value in values))
+                else:
+                    rows.append(values)
+
+            collections[col] = rows
+            parent[path[-1]] = []
+
+    return _plain(skeleton), collections
+
+
+def _plain(value):
+    """
+    Convertit une valeur en valeurs simples (enregistrements et vues en
+    lecture seule en dictionnaires), seules acceptees par marshal.
+    """
+    if isinstance(value, Mapping):
+        return {key: _plain(v) for key, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _unpack(packed):
+    """
+    Reconstruit les donnees completes (inverse de _pack).
+
+    Args:
+        packed: Tuple (squelette, {collection: lignes})
+
+    Returns:
+        Les donnees, avec des enregistrements dans les collections
+    """
+    data, collections = packed
+
+    for col, rows in collections.items():
+        path = COLLECTION_PATHS[col]
+        parent = data
+        for key in path[:-1]:
+            parent = parent[key]
+
+        record_type = records.COLLECTION_TYPES[col]
+        from_values = record_type.from_values
+        # Ligne en dictionnaire: element avec des cles inconnues
+        parent[path[-1]] = [
+            from_values(row, _ABSENT) if type(row) is tuple else record_type.from_dict(row)
+            for row in rows
+        ]
+
+    return data
+
+
+def _trusted(f):
+    """
+    Indique si un cache ouvert peut etre relu.
+
+    Sous POSIX, le fichier doit appartenir a l'utilisateur et n'etre
+    modifiable ni par son groupe ni par les autres: dans un dossier de
+    donnees partage, un cache ecrit par quelqu'un d'autre est ignore.
+
+    Args:
+        f: Le fichier cache ouvert (verifie par fstat, apres l'ouverture)
+
+    Returns:
+        True si le cache peut etre relu
+    """
+    if not hasattr(os, "getuid"):
+        return True
+    info = os.fstat(f.fileno())
+    return (info.st_uid == os.getuid()
+            and not info.st_mode & (stat_module.S_IWGRP | stat_module.S_IWOTH))
+
+
+# ============================================
+# ECRITURE ET LECTURE DU CACHE
+# ============================================
+
+def dumps_data(data):
+    """
+    Serialise les donnees au format du cache.
+
+    Args:
+        data: Les donnees a mettre en cache
+
+    Returns:
+        Les octets marshal
+    """
+    return marshal.dumps(_pack(data))
+
+
+def write(cache_path, json_path, packed, json_hash):
+    """
+    Ecrit le cache correspondant au fichier JSON actuel.
+
+    L'ecriture passe par un fichier temporaire renomme ensuite, modifiable
+    par son seul proprietaire (voir _trusted).
+
+    Args:
+        cache_path: Chemin du fichier cache
+        json_path: Chemin du fichier JSON (deja ecrit)
+        packed: Les donnees serialisees (voir dumps_data)
+        json_hash: L'empreinte du contenu du fichier JSON
+    """
+    stat = os.stat(json_path)
+    header = {
+        "version": CACHE_VERSION,
+        "marshal": marshal.version,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": json_hash,
+    }
+
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        if hasattr(os, "fchmod"):
+            os.fchmod(f.fileno(), 0o644)
+        encoded = marshal.dumps(header)
+        f.write(_LENGTH.pack(len(encoded)))
+        f.write(encoded)
+        f.write(packed)
+    os.replace(tmp_path, cache_path)
+
+
+def load(cache_path, json_path):
+    """
+    Charge les donnees du cache s'il correspond au fichier JSON.
+
+    La taille et la date de modification sont verifiees d'abord (gratuit),
+    puis l'empreinte du contenu (lecture du fichier, mais sans analyse JSON).
+
+    Args:
+        cache_path: Chemin du fichier cache
+        json_path: Chemin du fichier JSON
+
+    Returns:
+        Les donnees, ou None si le cache est absent, perime ou illisible
+    """
+    if not os.path.exists(cache_path):
+        return None
+
+    try:
+        stat = os.stat(json_path)
+        with open(cache_path, "rb") as f:
+            if not _trusted(f):
+                print(f"[Cache] Cache d'un autre utilisateur ou modifiable par d'autres "
+                      f"ignore: {cache_path}")
+                return None
+
+            # marshal.loads sur le contenu lu en un bloc (marshal.load lit
+            # le fichier par petits morceaux, plusieurs fois plus lent)
+            length, = _LENGTH.unpack(f.read(_LENGTH.size))
+            header = marshal.loads(f.read(length))
+
+            if (header.get("version") != CACHE_VERSION
+                    or header.get("marshal") != marshal.version
+                    or header.get("size") != stat.st_size
+                    or header.get("mtime_ns") != stat.st_mtime_ns):
+                print(f"[Cache] Cache perime ignore: {cache_path}")
+                return None
+
+            if header.get("hash") != file_hash(json_path):
+                print(f"[Cache] Contenu different du fichier JSON: {cache_path}")
+                return None
+
+            packed = marshal.loads(f.read())
+    except Exception as e:
+        print(f"[Cache] Cache illisible ({e}): {cache_path}")
+        return None
+
+    # Le ramasse-miettes n'a rien a liberer pendant la creation des
+    # enregistrements, mais se declencherait des milliers de fois
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _unpack(packed)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
@@ -0,0 +1,193 @@
+"""
+sorted_index.py - Ordre trie maintenu des elements d'une collection.
+
+Les requetes de data_manager (query_depenses, query_activites...)
+parcourent les elements dans l'ordre d'un champ (date, nom, montant...)
+sans les trier a chaque appel: chaque ordre est une liste de cles
+(valeur, id) maintenue triee a chaque ajout et suppression (bisect).
+
+Une seule liste Python couterait un deplacement de toute la liste a
+chaque insertion (import de milliers de depenses). Les cles sont donc
+rangees en blocs tries d'au plus 2 * CHUNK_SIZE cles, avec la plus
+grande cle de chaque bloc: une insertion ne deplace qu'un bloc.
+
+Usage:
+    order = create(sorted(cles))
+    insert(order, (valeur, item_id))
+    remove(order, (valeur, item_id))
+    start = bisect_left(order, (date_debut,))
+    for cle in iter_range(order, start, size(order), reverse=True):
+        ...
+"""
+
+import bisect as _bisect
+
+# Taille d'un bloc apres un decoupage (un bloc est coupe en deux au-dela
+# de 2 * CHUNK_SIZE cles)
+CHUNK_SIZE = 512
+
+
+def create(keys=()):
+    """
+    Cree un ordre trie.
+
+    Args:
+        keys: Les cles deja triees
+
+    Returns:
+        Dictionnaire (chunks: blocs de cles, maxes: plus grande cle de
+        chaque bloc, size: nombre de cles)
+    """
+    keys = list(keys)
+    chunks = [keys[i:i + CHUNK_SIZE] for i in range(0, len(keys), CHUNK_SIZE)]
+    return {
+        "chunks": chunks,
+        "maxes": [chunk[-1] for chunk in chunks],
+        "size": len(keys),
+    }
+
+
+def size(order):
+    """
+    Retourne le nombre de cles d'un ordre.
+    """
+    return order["size"]
+
+
+def insert(order, key):
+    """
+    Insere une cle a sa place.
+
+    Args:
+        order: L'ordre (voir create)
+        key: La cle (valeur, id)
+    """
+    chunks, maxes = order["chunks"], order["maxes"]
+    order["size"] += 1
+
+    if not chunks:
+        chunks.append([key])
+        maxes.append(key)
+        return
+
+    pos = _bisect.bisect_left(maxes, key)
+    if pos == len(maxes):
+        pos -= 1
+        chunks[pos].append(key)
+        maxes[pos] = key
+    else:
+        _bisect.insort(chunks[pos], key)
+
+    chunk = chunks[pos]
+    if len(chunk) > 2 * CHUNK_SIZE:
+        chunks.insert(pos + 1, chunk[CHUNK_SIZE:])
+        del chunk[CHUNK_SIZE:]
+        maxes.insert(pos, chunk[-1])
+
+
+def remove(order, key):
+    """
+    Retire une cle (rien si elle est absente).
+
+    Args:
+        order: L'ordre (voir create)
+        key: La cle (valeur, id)
+    """
+    chunks, maxes = order["chunks"], order["maxes"]
+    pos = _bisect.bisect_left(maxes, key)
+    if pos == len(maxes):
+        return
+
+    chunk = chunks[pos]
+    i = _bisect.bisect_left(chunk, key)
+    if i == len(chunk) or chunk[i] != key:
+        return
+
+    del chunk[i]
+    order["size"] -= 1
+    if not chunk:
+        del chunks[pos]
+        del maxes[pos]
+    else:
+        maxes[pos] = chunk[-1]
+
+
+def _position(order, key, bisect_chunk):
+    """
+    Retourne la position (dans l'ordre complet) ou s'insererait une cle.
+    """
+    maxes = order["maxes"]
+    if bisect_chunk is _bisect.bisect_left:
+        pos = _bisect.bisect_left(maxes, key)
+    else:
+        pos = _bisect.bisect_right(maxes, key)
+    if pos == len(maxes):
+        return order["size"]
+
+    before = sum(len(chunk) for chunk in order["chunks"][:pos])
+    return before + bisect_chunk(order["chunks"][pos], key)
+
+
+def bisect_left(order, key):
+    """
+    Retourne la position de la premiere cle >= key.
+    """
+    return _position(order, key, _bisect.bisect_left)
+
+
+def bisect_right(order, key):
+    """
+    Retourne la position de la premiere cle > key.
+    """
+    return _position(order, key, _bisect.bisect_right)
+
+
+def iter_range(order, start=0, stop=None, reverse=False):
+    """
+    Parcourt les cles des positions start (incluse) a stop (exclue).
+
+    L'ordre ne doit pas etre modifie pendant le parcours.
+
+    Args:
+        order: L'ordre (voir create)
+        start: La premiere position
+        stop: La position de fin (None pour la fin de l'ordre)
+        reverse: True pour parcourir de stop - 1 a start
+
+    Yields:
+        Les cles
+    """
+    stop = order["size"] if stop is None else min(stop, order["size"])
+    start = max(start, 0)
+    if start >= stop:
+        return
+
+    # Bloc de la position start (ou stop - 1 a l'envers)
+    chunks = order["chunks"]
+    target = stop - 1 if reverse else start
+    offset = 0
+    pos = 0
+    while offset + len(chunks[pos]) <= target:
+        offset += len(chunks[pos])
+        pos += 1
+
+    remaining = stop - start
+    if reverse:
+        i = target - offset
+        while remaining > 0:
+            chunk = chunks[pos]
+            for key in reversed(chunk[max(i - remaining + 1, 0):i + 1]):
+                yield key
+            remaining -= i + 1
+            pos -= 1
+            if pos >= 0:
+                i = len(chunks[pos]) - 1
+    else:
+        i = target - offset
+        while remaining > 0:
+            chunk = chunks[pos]
+            part = chunk[i:i + remaining]
+            yield from part
+            remaining -= len(part)
+            pos += 1
+            i = 0
@@ -0,0 +1,400 @@
+"""
+sqlite_backend.py - Stockage SQLite pour l'application Amsterdam Trip Planner.
+
+Ce module permet de stocker les donnees du voyage dans une base SQLite
+locale au lieu du fichier JSON. Il est utilise par data_manager lorsque
+STORAGE_BACKEND vaut "sqlite" dans config.py.
+
+Chaque collection (activites, depenses, participants, checklist) est une
+table dont les colonnes indexees (date, categorie, role, participant...)
+sont extraites de l'element; l'element complet est conserve en JSON dans
+la colonne "data". Les sections simples (voyage_info, hotel, transport,
+budget) sont stockees dans la table "sections".
+
+Les modifications sont appliquees ligne par ligne a partir des
+enregistrements du journal (voir journal.py), donc en O(modification).
+
+Usage (migration ponctuelle des donnees JSON existantes):
+    python sqlite_backend.py
+"""
+
+import json
+import os
+import sqlite3
+
+import journal
+import records
+import sections
+
+
+# ============================================
+# SCHEMA DE LA BASE
+# ============================================
+
+# Colonnes extraites de chaque element (en plus de id et data)
+COLLECTION_COLUMNS = {
+    "activites": ("date",),
+    "depenses": ("date", "categorie", "participant", "montant"),
+    "participants": ("nom", "role"),
+    "checklist": ("categorie", "checked"),
+}
+
+# Sections stockees en bloc dans la table "sections"
+SECTIONS = ("voyage_info", "hotel", "transport", "budget")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS activites (
+    id INTEGER PRIMARY KEY,
+    date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_activites_date ON activites(date);
+
+CREATE TABLE IF NOT EXISTS depenses (
+    id INTEGER PRIMARY KEY,
+    date TEXT,
+    categorie TEXT,
+    participant TEXT,
+    montant REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_depenses_date ON depenses(date);
+CREATE INDEX IF NOT EXISTS idx_depenses_categorie ON depenses(categorie);
+CREATE INDEX IF NOT EXISTS idx_depenses_participant ON depenses(participant);
+
+CREATE TABLE IF NOT EXISTS participants (
+    id INTEGER PRIMARY KEY,
+    nom TEXT,
+    role TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_participants_role ON participants(role);
+
+CREATE TABLE IF NOT EXISTS checklist (
+    id INTEGER PRIMARY KEY,
+    categorie TEXT,
+    checked INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_checklist_categorie ON checklist(categorie);
+
+CREATE TABLE IF NOT EXISTS sections (
+    nom TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+
+# ============================================
+# FONCTIONS DE CONNEXION
+# ============================================
+
+def connect(path):
+    """
+    Ouvre (et cree si besoin) la base SQLite.
+
+    La connexion est partagee entre le thread Tk et le thread de
+    sauvegarde differee: l'appelant doit serialiser son utilisation.
+
+    Args:
+        path: Chemin du fichier SQLite
+
+    Returns:
+        La connexion sqlite3
+    """
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    conn.commit()
+    return conn
+
+
+def is_empty(conn):
+    """
+    Indique si la base ne contient encore aucune donnee.
+
+    Args:
+        conn: La connexion sqlite3
+
+    Returns:
+        True si la table des sections est vide
+    """
+    row = conn.execute("SELECT COUNT(*) FROM sections").fetchone()
+    return row[0] == 0
+
+
+# ============================================
+# FONCTIONS D'ECRITURE
+# ============================================
+
+def _dumps(value):
+    """
+    Serialise une valeur en JSON compact.
+
+    Args:
+        value: La valeur a serialiser
+
+    Returns:
+        La chaine JSON
+    """
+    return records.dumps(value)
+
+
+def _upsert_item(conn, col, item):
+    """
+    Insere ou remplace un element d'une collection.
+
+    Args:
+        conn: La connexion sqlite3
+        col: Le nom de la collection
+        item: L'element (dictionnaire avec un 'id')
+    """
+    columns = COLLECTION_COLUMNS[col]
+    values = [item.get("id")] + [item.get(c) for c in columns] + [_dumps(item)]
+    placeholders = ", ".join("?" * len(values))
+
+    conn.execute(
+        "INSERT OR REPLACE INTO {} (id, {}, data) VALUES ({})".format(
+            col, ", ".join(columns), placeholders
+        ),
+        values
+    )
+
+
+def _set_section(conn, nom, value):
+    """
+    Remplace le contenu d'une section.
+
+    Args:
+        conn: La connexion sqlite3
+        nom: Le nom de la section
+        value: Le nouveau contenu
+    """
+    conn.execute(
+        "INSERT OR REPLACE INTO sections (nom, data) VALUES (?, ?)",
+        (nom, _dumps(value))
+    )
+
+
+def _get_section(conn, nom):
+    """
+    Lit le contenu d'une section.
+
+    Args:
+        conn: La connexion sqlite3
+        nom: Le nom de la section
+
+    Returns:
+        Le contenu de la section, ou None si elle n'existe pas
+    """
+    row = conn.execute("SELECT data FROM sections WHERE nom = ?", (nom,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def apply_records(conn, records):
+    """
+    Applique des enregistrements du journal a la base, dans une transaction.
+
+    Args:
+        conn: La connexion sqlite3
+        records: Liste d'enregistrements (voir journal.py)
+    """
+    with conn:
+        for record in records:
+            op = record.get("op")
+            col = record.get("col")
+
+            if op == "set":
+                if col in ("budget_prevu", "partage"):
+                    budget = _get_section(conn, "budget") or {}
+                    budget[col] = record.get("rec")
+                    _set_section(conn, "budget", budget)
+                elif col in SECTIONS:
+                    _set_section(conn, col, record.get("rec"))
+                continue
+
+            if col not in COLLECTION_COLUMNS:
+                continue
+
+            item_id = record.get("id")
+
+            if op in ("add", "update"):
+                item = dict(record.get("rec"))
+                item["id"] = item_id
+                _upsert_item(conn, col, item)
+            elif op == "patch":
+                row = conn.execute(
+                    "SELECT data FROM {} WHERE id = ?".format(col), (item_id,)
+                ).fetchone()
+                if row:
+                    item = json.loads(row[0])
+                    item.update(record.get("rec", {}))
+                    _upsert_item(conn, col, item)
+            elif op == "delete":
+                conn.execute("DELETE FROM {} WHERE id = ?".format(col), (item_id,))
+
+
+def save_all(conn, data):
+    """
+    Remplace tout le contenu de la base par les donnees fournies.
+
+    Utilise pour la migration depuis le JSON et la reinitialisation.
+
+    Args:
+        conn: La connexion sqlite3
+        data: Les donnees completes (meme structure que le fichier JSON)
+    """
+    budget = dict(data.get("budget", {}))
+    depenses = budget.pop("depenses", [])
+
+    collections = {
+        "activites": data.get("activites", []),
+        "depenses": depenses,
+        "participants": data.get("participants", []),
+        "checklist": data.get("checklist", []),
+    }
+
+    with conn:
+        for col, items in collections.items():
+            conn.execute("DELETE FROM {}".format(col))
+            for item in items:
+                _upsert_item(conn, col, item)
+
+        conn.execute("DELETE FROM sections")
+        _set_section(conn, "voyage_info", data.get("voyage_info", {}))
+        _set_section(conn, "hotel", data.get("hotel", {}))
+        _set_section(conn, "transport", data.get("transport", {}))
+        _set_section(conn, "budget", budget)
+        _set_section(conn, "next_ids", data.get("next_ids", {}))
+
+
+# ============================================
+# FONCTIONS DE LECTURE
+# ============================================
+
+def load(conn):
+    """
+    Charge toutes les donnees de la base.
+
+    Args:
+        conn: La connexion sqlite3
+
+    Returns:
+        Les donnees (meme structure que le fichier JSON)
+    """
+    def read_collection(col):
+        rows = conn.execute("SELECT data FROM {} ORDER BY id".format(col))
+        return [json.loads(row[0]) for row in rows]
+
+    budget = _get_section(conn, "budget") or {"budget_prevu": 0}
+    budget["depenses"] = read_collection("depenses")
+
+    return {
+        "voyage_info": _get_section(conn, "voyage_info") or {},
+        "activites": read_collection("activites"),
+        "budget": budget,
+        "hotel": _get_section(conn, "hotel") or {},
+        "transport": _get_section(conn, "transport") or {},
+        "participants": read_collection("participants"),
+        "checklist": read_collection("checklist"),
+        "next_ids": _get_section(conn, "next_ids") or {},
+    }
+
+
+# Montant d'une depense en centimes entiers (somme exacte en SQL)
+_CENTS = "CAST(ROUND(COALESCE(montant, 0) * 100) AS INTEGER)"
+
+
+def get_depenses_buckets(conn):
+    """
+    Calcule en SQL la somme des depenses de chaque paquet (devise, date,
+    categorie, participant), avant conversion dans la devise du voyage
+    (voir data_manager._convert_buckets).
+
+    La devise n'a pas de colonne: elle est lue dans l'element complet
+    (vide pour une depense dans la devise du voyage).
+
+    Args:
+        conn: La connexion sqlite3
+
+    Returns:
+        Tuple ({paquet: somme en centimes}, {paquet: nombre de depenses})
+    """
+    rows = conn.execute(
+        "SELECT COALESCE(json_extract(data, '$.devise'), '') AS d, COALESCE(date, '') AS j, "
+        "COALESCE(categorie, 'Autre') AS c, COALESCE(participant, '') AS p, "
+        "SUM({}), COUNT(*) FROM depenses GROUP BY d, j, c, p".format(_CENTS)
+    )
+    buckets = {}
+    counts = {}
+    for devise, date, categorie, participant, total, count in rows:
+        key = (devise, date, categorie, participant)
+        buckets[key] = total
+        counts[key] = count
+    return buckets, counts
+
+
+# ============================================
+# MIGRATION DEPUIS LE FICHIER JSON
+# ============================================
+
+def migrate_from_json(conn, json_path, journal_path=None):
+    """
+    Importe le fichier JSON existant (et son journal) dans la base.
+
+    Args:
+        conn: La connexion sqlite3
+        json_path: Chemin du fichier JSON
+        journal_path: Chemin du journal a rejouer (optionnel)
+
+    Returns:
+        Les donnees importees
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if journal_path:
+        journal.replay(data, journal.read_records(journal_path), data.get("journal_seq", 0))
+
+    save_all(conn, data)
+    print(f"[SQLite] Donnees migrees depuis {json_path}")
+    return data
+
+
+def migrate_from_sections(conn, directory, journal_path=None):
+    """
+    Importe les fichiers JSON par section (et leur journal) dans la base.
+
+    Args:
+        conn: La connexion sqlite3
+        directory: Le repertoire des sections (voir sections.py)
+        journal_path: Chemin du journal a rejouer (optionnel)
+
+    Returns:
+        Les donnees importees
+    """
+    data = sections.read_all(directory)
+
+    if journal_path:
+        journal.replay(data, journal.read_records(journal_path), data.get("journal_seq", 0))
+
+    save_all(conn, data)
+    print(f"[SQLite] Donnees migrees depuis {directory}")
+    return data
+
+
+if __name__ == "__main__":
+    from config import DATA_FILE, JOURNAL_FILE, SECTIONS_DIR, SQLITE_FILE
+
+    if not sections.exists(SECTIONS_DIR) and not os.path.exists(DATA_FILE):
+        print(f"[SQLite] Aucune donnee a migrer: {SECTIONS_DIR}")
+    else:
+        connection = connect(SQLITE_FILE)
+        if not is_empty(connection):
+            print(f"[SQLite] La base {SQLITE_FILE} contient deja des donnees")
+        elif sections.exists(SECTIONS_DIR):
+            migrate_from_sections(connection, SECTIONS_DIR, JOURNAL_FILE)
+        else:
+            migrate_from_json(connection, DATA_FILE, JOURNAL_FILE)
+        connection.close()
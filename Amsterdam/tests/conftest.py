@@ -0,0 +1,40 @@
+"""
+conftest.py - Fixtures communes des tests de l'application Amsterdam Trip Planner.
+
+Les modules de l'application sont importes depuis le dossier parent
+(comme dans les benchmarks). Chaque test travaille dans un repertoire de
+donnees temporaire: le dossier data/ n'est jamais lu ni modifie.
+
+Usage:
+    python -m pytest -q
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def trip(tmp_path):
+    """
+    Ouvre un voyage vide (donnees par defaut) dans un repertoire temporaire.
+
+    Returns:
+        Le module data_manager
+    """
+    import data_manager
+    import events
+    import exchange_rates
+
+    exchange_rates.load(str(tmp_path / "taux_de_change.json"))
+    data_manager._set_trip_paths(str(tmp_path / "voyage"))
+    data_manager.load_data()
+
+    yield data_manager
+
+    data_manager.save_data()
+    # Evenements jamais remis (pas de thread Tk): la file est videe
+    events.dispatch()
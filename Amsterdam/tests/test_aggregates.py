@@ -0,0 +1,267 @@
+"""
+test_aggregates.py - Totaux maintenus par data_manager (VERIFY_AGGREGATES).
+
+Les totaux des depenses, les tableaux croises, les ordres de tri, la
+recherche et le compte des items coches sont mis a jour a chaque
+modification. Ces tests activent config.VERIFY_AGGREGATES (chaque
+lecture d'un total les recalcule depuis zero et les compare) et
+enchainent ajouts, suppressions, cases cochees, taux de change,
+annulations et transactions annulees.
+"""
+
+import random
+import threading
+import time
+
+import pytest
+
+import config
+from config import BUDGET_CATEGORIES, CHECKLIST_CATEGORIES
+
+
+@pytest.fixture
+def verified(trip, monkeypatch):
+    """
+    Voyage vide avec la verification des totaux activee.
+
+    Returns:
+        Le module data_manager
+    """
+    monkeypatch.setattr(config, "VERIFY_AGGREGATES", True)
+    return trip
+
+
+@pytest.fixture
+def verified_sqlite(trip, monkeypatch):
+    """
+    Le meme voyage stocke dans une base SQLite, verification activee.
+
+    Returns:
+        Le module data_manager
+    """
+    monkeypatch.setattr(config, "VERIFY_AGGREGATES", True)
+    monkeypatch.setattr(trip, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(trip, "_conn", None)
+    trip.load_data()
+
+    yield trip
+
+    trip.save_data()
+    trip._conn.close()
+
+
+def make_depense(rng, devise=None):
+    """
+    Cree une depense aleatoire (dictionnaire).
+    """
+    depense = {
+        "date": "2025-09-{:02d}".format(rng.randint(10, 20)),
+        "categorie": rng.choice(BUDGET_CATEGORIES),
+        "montant": rng.randint(1, 50000) / 100,
+        "description": rng.choice(["Dejeuner", "Tram", "Musee", "Velo"]),
+        "participant": rng.choice(["Groupe", "Alice", "Bob"]),
+    }
+    if devise is not None:
+        depense["devise"] = devise
+    return depense
+
+
+def read_totals(dm):
+    """
+    Lit tous les totaux (chaque lecture les verifie).
+
+    Returns:
+        Tuple des totaux en centimes
+    """
+    return (dm.get_pivot("categorie", "participant"),
+            dm.get_total_depenses(cents=True),
+            dm.get_depenses_by_category(cents=True),
+            dm.get_totals_by_participant(cents=True),
+            dm.get_checklist_progress())
+
+
+def test_verification_lue_a_chaque_appel(trip, monkeypatch):
+    calls = []
+    monkeypatch.setattr(trip, "verify_aggregates", lambda: calls.append(1))
+    monkeypatch.setattr(config, "VERIFY_AGGREGATES", False)
+
+    trip.get_total_depenses()
+    assert calls == []
+
+    # Active apres l'import de data_manager: pris en compte tout de suite
+    monkeypatch.setattr(config, "VERIFY_AGGREGATES", True)
+    trip.get_total_depenses()
+    trip.get_checklist_progress()
+    assert len(calls) == 2
+
+
+def test_ajouts_et_suppressions(verified):
+    dm = verified
+    rng = random.Random(1)
+    ids = []
+
+    for step in range(200):
+        if ids and rng.random() < 0.3:
+            dm.delete_depense(ids.pop(rng.randrange(len(ids))))
+        elif rng.random() < 0.1:
+            ids.extend(dm.add_depenses([make_depense(rng) for _ in range(5)]))
+        else:
+            ids.append(dm.add_depense(make_depense(rng)))
+        if step % 20 == 0:
+            read_totals(dm)
+
+    dm.delete_depenses(ids[:len(ids) // 2])
+    read_totals(dm)
+    dm.verify_aggregates()
+
+    expected = sum(d.cents("montant") for d in dm.get_depenses())
+    assert dm.get_total_depenses(cents=True) == expected
+
+    # Depenses d'un participant (index) et total par participant
+    alice = dm.get_depenses_by_participant("Alice")
+    assert alice and all(d["participant"] == "Alice" for d in alice)
+    assert dm.get_totals_by_participant(cents=True)["Alice"] == sum(d.cents("montant") for d in alice)
+
+
+def test_devises_et_taux_de_change(verified):
+    dm = verified
+    rng = random.Random(2)
+
+    dm.add_depense(make_depense(rng, "GBP"))
+    # Sans taux, la depense n'est pas comptee
+    assert dm.get_unconverted_count() == 1
+    read_totals(dm)
+
+    dm.set_exchange_rate("GBP", "2025-09-01", "0.85")
+    assert dm.get_unconverted_count() == 0
+    for _ in range(20):
+        dm.add_depense(make_depense(rng, rng.choice(["EUR", "GBP"])))
+    read_totals(dm)
+
+    dm.set_exchange_rate("GBP", "2025-09-15", "0.9")
+    read_totals(dm)
+    dm.verify_aggregates()
+
+
+def test_checklist(verified):
+    dm = verified
+    rng = random.Random(3)
+    initial = len(dm.get_checklist())
+    ids = [dm.add_checklist_item({"item": "Item {}".format(i),
+                                  "categorie": rng.choice(CHECKLIST_CATEGORIES),
+                                  "checked": False})
+           for i in range(30)]
+
+    for item_id in rng.sample(ids, 12):
+        dm.toggle_checklist_item(item_id)
+    read_totals(dm)
+
+    dm.set_checklist_checked(ids[:10], True)
+    dm.set_checklist_checked(ids[5:15], False)
+    read_totals(dm)
+
+    dm.delete_checklist_item(ids[0])
+    dm.delete_checklist_items(ids[1:4])
+    checked, total, _ = dm.get_checklist_progress()
+    assert total == initial + 26
+    assert checked == sum(1 for item in dm.get_checklist() if item.get("checked"))
+
+
+def test_annuler_retablir(verified):
+    dm = verified
+    rng = random.Random(4)
+
+    expected = [read_totals(dm)]
+    for _ in range(15):
+        choice = rng.random()
+        depenses = dm.get_depenses()
+        if depenses and choice < 0.3:
+            dm.delete_depense(rng.choice([d["id"] for d in depenses]))
+        elif choice < 0.5:
+            dm.add_depenses([make_depense(rng) for _ in range(3)])
+        elif choice < 0.7:
+            dm.add_checklist_item({"item": "Sac", "categorie": CHECKLIST_CATEGORIES[0],
+                                   "checked": rng.random() < 0.5})
+        else:
+            dm.add_depense(make_depense(rng))
+        expected.append(read_totals(dm))
+
+    # Chaque annulation revient exactement aux totaux de l'etape precedente
+    for totals in reversed(expected[:-1]):
+        assert dm.undo()
+        assert read_totals(dm) == totals
+    assert not dm.can_undo()
+
+    for totals in expected[1:]:
+        assert dm.redo()
+        assert read_totals(dm) == totals
+    dm.verify_aggregates()
+
+
+def test_transaction_annulee(verified):
+    dm = verified
+    rng = random.Random(5)
+    dm.add_depenses([make_depense(rng) for _ in range(10)])
+    before = read_totals(dm)
+
+    with pytest.raises(RuntimeError):
+        with dm.transaction():
+            dm.add_depense(make_depense(rng))
+            dm.delete_depense(next(iter(dm.get_depenses()))["id"])
+            dm.add_checklist_item({"item": "Passeport", "categorie": CHECKLIST_CATEGORIES[0],
+                                   "checked": True})
+            raise RuntimeError("annulation")
+
+    assert read_totals(dm) == before
+    dm.verify_aggregates()
+
+
+def test_verification_pendant_une_sauvegarde_sqlite(verified_sqlite):
+    dm = verified_sqlite
+    dm.add_depense(make_depense(random.Random(6)))
+    started = threading.Event()
+    errors = []
+
+    def background_save():
+        # Ordre de la sauvegarde en arriere-plan: _write_lock, puis _lock
+        with dm._write_lock:
+            started.set()
+            time.sleep(0.2)
+            with dm._lock:
+                pass
+
+    def check():
+        try:
+            dm.verify_aggregates()
+        except Exception as e:
+            errors.append(e)
+
+    saver = threading.Thread(target=background_save, daemon=True)
+    saver.start()
+    started.wait()
+    checker = threading.Thread(target=check, daemon=True)
+    checker.start()
+    checker.join(10)
+    saver.join(10)
+
+    assert not checker.is_alive() and not saver.is_alive(), "interblocage"
+    assert errors == []
+
+
+def test_verification_dans_une_transaction_sqlite(verified_sqlite):
+    dm = verified_sqlite
+    rng = random.Random(7)
+    dm.save_data()
+    count = len(dm.get_depenses())
+
+    with pytest.raises(RuntimeError):
+        with dm.transaction():
+            dm.add_depense(make_depense(rng))
+            read_totals(dm)
+            raise RuntimeError("annulation")
+
+    # La depense annulee n'a pas ete ecrite dans la base par la verification
+    dm.save_data()
+    dm.load_data()
+    assert len(dm.get_depenses()) == count
+    read_totals(dm)
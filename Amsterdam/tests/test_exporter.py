@@ -0,0 +1,65 @@
+"""
+test_exporter.py - Export des fichiers (exporter.py).
+
+Un calendrier ICS exporte se relit avec importer.py sans perte: prix
+(propriete X-PRIX, dans la devise du voyage), horaire, duree, lieu et
+description inchanges. Le relire par-dessus les activites exportees
+n'ajoute rien.
+"""
+
+import exporter
+import importer
+
+
+ACTIVITES = [
+    {"date": "2025-09-16", "nom": "Rijksmuseum", "lieu": "Museumstraat 1, Amsterdam",
+     "horaire": "10:00", "duree": "2h", "prix": 22.5, "description": "Billets; audioguide"},
+    {"date": "2025-09-17", "nom": "Croisiere", "lieu": "", "horaire": "14:30",
+     "duree": "1h30", "prix": 18, "description": ""},
+    {"date": "2025-09-18", "nom": "Vondelpark", "lieu": "", "horaire": "",
+     "duree": "", "prix": 0, "description": "Pique-nique"},
+]
+
+
+def activity_rows(dm):
+    """
+    Contenu comparable des activites (sans les IDs).
+    """
+    return sorted((a.get("date"), a.get("nom"), a.get("lieu"), a.get("horaire"),
+                   a.get("duree"), a.cents("prix"), a.get("description"))
+                  for a in dm.get_activites())
+
+
+def test_activites_ics_aller_retour(trip, tmp_path):
+    dm = trip
+    dm.delete_activites([a["id"] for a in dm.get_activites()])
+    dm.add_activites(ACTIVITES)
+    expected = activity_rows(dm)
+
+    path = str(tmp_path / "agenda.ics")
+    exporter.export("activites_ics", path)
+
+    # Relu par-dessus les activites exportees: aucun doublon
+    result = importer.import_file(path)
+    assert (result["imported"], result["rejected"], result["duplicates"]) == (0, 0, 3)
+
+    # Relu dans un voyage vide: les memes activites
+    dm.delete_activites([a["id"] for a in dm.get_activites()])
+    result = importer.import_file(path)
+    assert (result["imported"], result["rejected"], result["duplicates"]) == (3, 0, 0)
+    assert activity_rows(dm) == expected
+
+
+def test_prix_dans_la_devise_du_voyage(trip, tmp_path, monkeypatch):
+    dm = trip
+    monkeypatch.setattr(dm, "get_devise", lambda: "GBP")
+    dm.delete_activites([a["id"] for a in dm.get_activites()])
+    dm.add_activites(ACTIVITES[:1])
+
+    path = tmp_path / "agenda.ics"
+    exporter.export("activites_ics", str(path))
+    text = path.read_bytes().decode("utf-8")
+
+    assert "X-PRIX:22.50 GBP\r\n" in text
+    assert "DESCRIPTION:Billets\\; audioguide\r\n" in text
+    assert "EUR" not in text
@@ -0,0 +1,52 @@
+"""
+test_importer.py - Import des fichiers (importer.py).
+
+Un fichier exporte par l'application (exporter.py) se relit sans perte:
+champs entre guillemets avec des guillemets doubles, des separateurs ou
+des retours a la ligne (les espaces d'un champ sont normalises a la
+lecture). Relire un export n'ajoute rien (dedoublonnage par empreinte
+du contenu).
+"""
+
+import exporter
+import importer
+
+
+DEPENSES = [
+    {"date": "2025-09-16", "categorie": "Nourriture", "montant": 42.5,
+     "description": 'Diner "chez Piet"; dessert compris', "participant": "Groupe"},
+    {"date": "2025-09-17", "categorie": "Transport", "montant": 3.2,
+     "description": 'ligne 1\nligne "2"', "participant": "Alice"},
+    {"date": "2025-09-18", "categorie": "Activites", "montant": 12,
+     "description": "Café, musée", "participant": "Bob"},
+]
+
+
+def expense_rows(dm):
+    """
+    Contenu comparable des depenses (sans les IDs, espaces normalises).
+    """
+    return sorted((d.get("date"), d.get("categorie"), d.cents("montant"),
+                   " ".join(d.get("description").split()), d.get("participant"))
+                  for d in dm.get_depenses())
+
+
+def test_depenses_csv_aller_retour(trip, tmp_path):
+    dm = trip
+    dm.delete_depenses([d["id"] for d in dm.get_depenses()])
+    dm.add_depenses(DEPENSES)
+    expected = expense_rows(dm)
+
+    path = str(tmp_path / "depenses.csv")
+    exporter.export("depenses_csv", path)
+
+    # Relu par-dessus les donnees exportees: aucun doublon
+    result = importer.import_file(path)
+    assert (result["imported"], result["rejected"], result["duplicates"]) == (0, 0, 3)
+    assert result["errors"] == []
+
+    # Relu dans un voyage vide: les memes depenses
+    dm.delete_depenses([d["id"] for d in dm.get_depenses()])
+    result = importer.import_file(path)
+    assert (result["imported"], result["rejected"], result["duplicates"]) == (3, 0, 0)
+    assert expense_rows(dm) == expected
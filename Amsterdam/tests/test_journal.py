@@ -0,0 +1,153 @@
+"""
+test_journal.py - Journal des modifications (journal.py) et compactage.
+
+Le rejeu des enregistrements sur un instantane, la lecture d'un journal
+dont la derniere ligne est incomplete, puis, avec data_manager, le
+rechargement des donnees depuis l'instantane et le journal, avant et
+apres un compactage.
+"""
+
+import journal
+
+
+def make_snapshot():
+    """
+    Instantane minimal (dictionnaires).
+    """
+    return {
+        "activites": [{"id": 1, "nom": "Rijksmuseum", "prix": 20}],
+        "budget": {"depenses": [{"id": 1, "montant": 10}, {"id": 2, "montant": 5}]},
+        "hotel": {"nom": "Ancien"},
+    }
+
+
+def test_rejeu():
+    data = make_snapshot()
+    records = [
+        {"seq": 1, "op": "add", "col": "activites", "id": 2, "rec": {"id": 2, "nom": "Croisiere"}},
+        {"seq": 2, "op": "patch", "col": "activites", "id": 1, "rec": {"prix": 25}},
+        {"seq": 3, "op": "update", "col": "depenses", "id": 2, "rec": {"id": 2, "montant": 7}},
+        {"seq": 4, "op": "delete", "col": "depenses", "id": 1},
+        {"seq": 5, "op": "set", "col": "hotel", "rec": {"nom": "Nouveau"}},
+        {"seq": 6, "op": "set", "col": "partage", "rec": {"mode": "egal", "poids": {}}},
+        # Inconnus ou sans effet: ignores
+        {"seq": 7, "op": "patch", "col": "activites", "id": 99, "rec": {"prix": 1}},
+        {"seq": 8, "op": "add", "col": "inconnue", "id": 1, "rec": {}},
+        {"seq": 9, "op": "renomme", "col": "activites", "id": 1},
+    ]
+
+    applied, last_seq = journal.replay(data, records)
+
+    assert applied == 7
+    assert last_seq == 9
+    assert data["activites"] == [{"id": 1, "nom": "Rijksmuseum", "prix": 25},
+                                 {"id": 2, "nom": "Croisiere"}]
+    assert data["budget"]["depenses"] == [{"id": 2, "montant": 7}]
+    assert data["budget"]["partage"] == {"mode": "egal", "poids": {}}
+    assert data["hotel"] == {"nom": "Nouveau"}
+
+
+def test_rejeu_apres_instantane():
+    data = make_snapshot()
+    records = [
+        {"seq": 3, "op": "delete", "col": "activites", "id": 1},
+        {"seq": 4, "op": "set", "col": "hotel", "rec": {"nom": "Nouveau"}},
+    ]
+
+    # Enregistrements deja inclus dans l'instantane (seq <= 3): ignores
+    applied, last_seq = journal.replay(data, records, after_seq=3)
+
+    assert (applied, last_seq) == (1, 4)
+    assert data["activites"] == make_snapshot()["activites"]
+    assert data["hotel"] == {"nom": "Nouveau"}
+
+
+def test_derniere_ligne_incomplete(tmp_path):
+    path = str(tmp_path / "voyage.journal")
+    first = [{"seq": 1, "op": "delete", "col": "activites", "id": 1}]
+    size = journal.append_records(path, first)
+    assert journal.get_size(path) == size
+
+    # Ecriture interrompue au milieu d'un enregistrement
+    with open(path, "ab") as f:
+        f.write(b'{"seq": 2, "op": "del')
+
+    assert list(journal.read_records(path)) == first
+    records, offset = journal.read_tail(path)
+    assert (records, offset) == (first, size)
+
+    # La suite de l'ecriture est lue a partir de la position retournee
+    with open(path, "ab") as f:
+        f.write(b'ete", "col": "activites", "id": 2}\n')
+    records, offset = journal.read_tail(path, offset)
+    assert records == [{"seq": 2, "op": "delete", "col": "activites", "id": 2}]
+    assert offset == journal.get_size(path)
+
+    journal.truncate(path)
+    assert journal.get_size(path) == 0
+    assert list(journal.read_records(path)) == []
+    assert list(journal.read_records(str(tmp_path / "absent.journal"))) == []
+
+
+def fingerprint(dm):
+    """
+    Resume comparable des donnees d'une instance.
+    """
+    return {
+        "depenses": sorted((d["id"], d.get("description"), d.get("montant"))
+                           for d in dm.get_depenses()),
+        "activites": sorted((a["id"], a.get("nom"), a.get("prix")) for a in dm.get_activites()),
+        "hotel": dict(dm.get_hotel()),
+    }
+
+
+def edit(dm, number):
+    """
+    Quelques modifications de toutes les sortes (ajout, modification,
+    suppression, section).
+    """
+    ids = dm.add_depenses([{"date": "2025-09-16", "categorie": "Nourriture", "montant": 10 + i,
+                            "description": "Lot {} #{}".format(number, i), "participant": "Groupe"}
+                           for i in range(5)])
+    dm.delete_depense(ids[0])
+    activite = dm.add_activite({"date": "2025-09-17", "nom": "Musee {}".format(number), "prix": 12})
+    dm.update_activite(activite, dict(dm.get_activite(activite), prix=15 + number))
+    dm.update_hotel(dict(dm.get_hotel(), nom="Hotel {}".format(number)))
+
+
+def test_rechargement_et_compactage(trip, monkeypatch):
+    dm = trip
+    dm.save_data()
+    compactions = dm.get_save_stats()["compactions"]
+
+    # Modifications ajoutees au journal, sans nouvel instantane
+    edit(dm, 1)
+    assert dm._flush()
+    assert journal.get_size(dm.JOURNAL_FILE) > 0
+    assert dm.get_save_stats()["compactions"] == compactions
+    expected = fingerprint(dm)
+
+    dm.load_data()
+    assert fingerprint(dm) == expected
+
+    # Journal trop gros: instantane complet, journal vide
+    edit(dm, 2)
+    monkeypatch.setattr(dm, "JOURNAL_MAX_BYTES", 1)
+    assert dm._flush()
+    assert journal.get_size(dm.JOURNAL_FILE) == 0
+    assert dm.get_save_stats()["compactions"] > compactions
+    expected = fingerprint(dm)
+
+    dm.load_data()
+    assert fingerprint(dm) == expected
+
+    # Le journal suivant est rejoue par-dessus le nouvel instantane
+    monkeypatch.undo()
+    edit(dm, 3)
+    assert dm._flush()
+    assert journal.get_size(dm.JOURNAL_FILE) > 0
+    expected = fingerprint(dm)
+
+    dm.load_data()
+    assert fingerprint(dm) == expected
+    dm.verify_aggregates()
@@ -0,0 +1,85 @@
+"""
+test_money.py - Montants en centimes (money.py).
+
+Conversions euros -> centimes (arrondi d'un demi-centime), lecture des
+montants saisis ou importes, affichage et sommes exactes.
+"""
+
+from decimal import Decimal
+
+import pytest
+
+import money
+
+
+@pytest.mark.parametrize("value, cents", [
+    (0, 0),
+    (12, 1200),
+    (12.5, 1250),
+    (0.1, 10),
+    (19.99, 1999),
+    # Demi-centime: arrondi en s'eloignant de zero, selon la forme decimale
+    (1.005, 101),
+    (2.675, 268),
+    (-1.005, -101),
+    (0.125, 13),
+    (Decimal("0.005"), 1),
+    (Decimal("-12.345"), -1235),
+])
+def test_to_cents(value, cents):
+    assert money.to_cents(value) == cents
+
+
+@pytest.mark.parametrize("value", [float("inf"), float("nan"), Decimal("NaN")])
+def test_to_cents_refuse_les_montants_infinis(value):
+    with pytest.raises(ValueError):
+        money.to_cents(value)
+
+
+def test_to_cents_refuse_le_texte():
+    with pytest.raises(TypeError):
+        money.to_cents("12.50")
+
+
+@pytest.mark.parametrize("text, cents", [
+    ("12,50", 1250),
+    ("12.5", 1250),
+    ("1 234,50 EUR", 123450),
+    ("1.234,50", 123450),
+    ("1,234.50", 123450),
+    ("1.234.567", 123456700),
+    ("-12,00", -1200),
+    ("(12.00)", -1200),
+    ("+3", 300),
+    ("0,005", 1),
+    (7, 700),
+    (0.1, 10),
+])
+def test_parse_amount(text, cents):
+    assert money.parse_amount(text) == cents
+
+
+@pytest.mark.parametrize("text", ["", "abc", "12,5,0.1.2x", "Infinity"])
+def test_parse_amount_refuse(text):
+    with pytest.raises(ValueError):
+        money.parse_amount(text)
+
+
+def test_format_cents():
+    assert money.format_cents(123450) == "1 234,50 EUR"
+    assert money.format_cents(-5) == "-0,05 EUR"
+    assert money.format_cents(123450, "USD") == "1,234.50 USD"
+    assert money.format_cents(0) == "0,00 EUR"
+
+
+def test_aller_retour():
+    for cents in (0, 1, 99, 1250, 123456789, -4321):
+        assert money.to_cents(money.from_cents(cents)) == cents
+        assert money.parse_amount(money.format_cents(cents)) == cents
+
+
+def test_sum_cents_exacte():
+    # Une somme de floats derive: 0.1 * 1000 != 100.0
+    amounts = [0.1] * 1000 + [19.99] * 1000
+    assert sum(amounts) != 100 + 19990
+    assert money.sum_cents(amounts) == 10000 + 1999000
@@ -0,0 +1,86 @@
+"""
+test_persistent.py - Collections immuables a partage de structure (IdMap).
+
+Une suite aleatoire d'ajouts, remplacements et suppressions est comparee
+a un dictionnaire; chaque version conservee doit rester intacte apres
+les modifications suivantes.
+"""
+
+import random
+
+import pytest
+
+from persistent import IdMap, WIDTH
+
+
+def check(items, expected):
+    """
+    Compare une IdMap a un dictionnaire (lecture, ordre, taille).
+    """
+    assert len(items) == len(expected)
+    assert list(items.items()) == sorted(expected.items())
+    assert list(items) == [expected[key] for key in sorted(expected)]
+    assert list(items.keys()) == sorted(expected)
+    for key, value in expected.items():
+        assert items.get(key) == value
+
+
+def test_versions_independantes():
+    rng = random.Random(1)
+    items = IdMap()
+    expected = {}
+    versions = [(items, dict(expected))]
+
+    for _ in range(3000):
+        # IDs sur plusieurs niveaux de l'arbre (32, 1024, 32768...)
+        key = rng.choice((rng.randrange(WIDTH), rng.randrange(WIDTH ** 2), rng.randrange(WIDTH ** 3)))
+        if expected and rng.random() < 0.3:
+            key = rng.choice(list(expected))
+            items = items.remove(key)
+            del expected[key]
+        else:
+            value = "v{}".format(rng.random())
+            items = items.set(key, value)
+            expected[key] = value
+        if rng.random() < 0.05:
+            versions.append((items, dict(expected)))
+
+    check(items, expected)
+    for version, content in versions:
+        check(version, content)
+
+
+def test_from_pairs():
+    pairs = [(5, "a"), (40000, "b"), (0, "c"), (5, "d")]
+    items = IdMap.from_pairs(pairs)
+    check(items, {0: "c", 5: "d", 40000: "b"})
+    assert len(IdMap.from_pairs([])) == 0
+
+    # Une version construite en bloc se modifie comme les autres
+    check(items.set(33, "e").remove(0), {5: "d", 33: "e", 40000: "b"})
+    check(items, {0: "c", 5: "d", 40000: "b"})
+
+
+def test_suppression_jusqu_a_vide():
+    items = IdMap.from_pairs((key, key) for key in range(1, 100))
+    for key in range(1, 100):
+        items = items.remove(key)
+    assert len(items) == 0
+    assert list(items) == []
+    assert items.get(1) is None
+
+    # ID absent: la meme version est retournee
+    assert items.remove(5) is items
+    one = IdMap().set(3, "x")
+    assert one.remove(4) is one
+
+
+def test_cles_invalides():
+    items = IdMap().set(1, "a")
+    for key in (-1, "1", 1.0, None):
+        with pytest.raises(TypeError):
+            items.set(key, "b")
+        assert items.get(key, "absent") == "absent"
+    with pytest.raises(ValueError):
+        items.set(2, None)
+    assert items.get(10 ** 12) is None
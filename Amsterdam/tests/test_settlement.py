@@ -0,0 +1,173 @@
+"""
+test_settlement.py - Partage des depenses et remboursements.
+
+Repartition au centime pres (plus fort reste), parts maintenues par
+date comparees a un recalcul complet, virements qui soldent tous les
+comptes. Les depenses sont enregistrees au nom de leur payeur (voir
+settlement.member_name): quand un participant change de nom, ses
+paiements et son poids doivent le suivre, en une seule etape
+d'annulation.
+"""
+
+import random
+
+import pytest
+
+import settlement
+
+
+def test_allocate_plus_fort_reste():
+    assert settlement.allocate(100, [("a", 1), ("b", 1), ("c", 1)]) == {"a": 34, "b": 33, "c": 33}
+    assert settlement.allocate(1000, [("a", 2), ("b", 1)]) == {"a": 667, "b": 333}
+    assert settlement.allocate(-100, [("a", 1), ("b", 1), ("c", 1)]) == {"a": -34, "b": -33, "c": -33}
+    assert settlement.allocate(2, [("a", 1), ("b", 0), ("c", 1)]) == {"a": 1, "b": 0, "c": 1}
+    assert settlement.allocate(50, [("a", 0)]) == {}
+    assert settlement.allocate(50, []) == {}
+
+
+def test_allocate_somme_exacte():
+    rng = random.Random(1)
+    for _ in range(500):
+        weights = [(str(i), rng.randint(0, 7)) for i in range(rng.randint(1, 12))]
+        amount = rng.randint(-100000, 100000)
+        shares = settlement.allocate(amount, weights)
+        if not any(weight for _, weight in weights):
+            assert shares == {}
+            continue
+        assert sum(shares.values()) == amount
+        total = sum(weight for _, weight in weights)
+        for name, weight in weights:
+            # Chaque part est a moins d'un centime de sa valeur exacte
+            assert abs(shares[name] * total - amount * weight) < total
+
+
+def check_transfers(balances, transfers):
+    """
+    Verifie que les virements soldent tous les comptes.
+    """
+    remaining = {name: solde for name, (_, _, solde) in balances.items()}
+    for debtor, creditor, amount in transfers:
+        assert amount > 0
+        remaining[debtor] += amount
+        remaining[creditor] -= amount
+    assert not any(remaining.values())
+    assert len(transfers) <= max(len(balances) - 1, 0)
+    assert [t[2] for t in transfers] == sorted((t[2] for t in transfers), reverse=True)
+
+
+def test_settle():
+    balances = settlement.compute_balances({"a": 9000, "Groupe": 500, "": 100},
+                                           {"a": 3000, "b": 3000, "c": 3000})
+    assert balances == {"a": (9000, 3000, 6000), "b": (0, 3000, -3000), "c": (0, 3000, -3000)}
+    transfers = settlement.settle(balances)
+    assert transfers == [("b", "a", 3000), ("c", "a", 3000)]
+    assert settlement.settle({}) == []
+
+    rng = random.Random(2)
+    for _ in range(200):
+        names = ["p{}".format(i) for i in range(rng.randint(1, 30))]
+        paid = {name: rng.randint(0, 50000) for name in names}
+        owed = settlement.allocate(sum(paid.values()), [(name, rng.randint(1, 3)) for name in names])
+        balances = settlement.compute_balances(paid, owed)
+        assert sum(solde for _, _, solde in balances.values()) == 0
+        check_transfers(balances, settlement.settle(balances))
+
+
+def test_parts_maintenues_egales_au_recalcul():
+    rng = random.Random(3)
+    dates = ["2025-09-{}".format(day) for day in range(14, 22)]
+    participants = [{"prenom": "P{}".format(i), "nom": "N",
+                     "arrivee": rng.choice(["", "2025-09-15", "2025-09-17"]),
+                     "depart": rng.choice(["", "2025-09-18", "2025-09-20"])}
+                    for i in range(12)]
+    members = settlement.members_of(participants)
+    names = [name for name, _, _ in members]
+    rules = [{"mode": settlement.EQUAL, "poids": {}},
+             {"mode": settlement.ATTENDANCE, "poids": {}},
+             {"mode": settlement.WEIGHTS,
+              "poids": {name: rng.choice(["0", "1", "1,5", "2"]) for name in names}}]
+
+    state = settlement.create_shares()
+    shared = {}
+    for step in range(300):
+        date = rng.choice(dates)
+        shared[date] = shared.get(date, 0) + rng.randint(-5000, 20000)
+        if shared[date] == 0 or rng.random() < 0.1:
+            del shared[date]
+        if step % 50 == 0:
+            members = settlement.members_of(participants[:rng.randint(6, 12)])
+        if step % 7 == 0:
+            rule = settlement.normalize_rule(rules[step // 7 % len(rules)])
+
+        owed = settlement.update_shares(state, rule, members, shared)
+        expected = settlement.update_shares(settlement.create_shares(), rule, members, shared)
+        assert owed == expected
+        assert sum(owed.values()) == sum(shared.values())
+
+
+@pytest.fixture
+def pair(trip):
+    """
+    Voyage a deux participants (Ann A et Bob B), partage par poids,
+    et une depense payee par Ann.
+
+    Returns:
+        Tuple (data_manager, ID de Ann, ID de Bob)
+    """
+    dm = trip
+    dm.delete_participants([p["id"] for p in dm.get_participants()])
+    dm.delete_depenses([d["id"] for d in dm.get_depenses()])
+    ann, bob = dm.add_participants([{"prenom": "Ann", "nom": "A"},
+                                    {"prenom": "Bob", "nom": "B"}])
+    dm.update_split_rule({"mode": "poids", "poids": {"Ann A": "2", "Bob B": "1"}})
+    dm.add_depense({"date": "2025-09-16", "categorie": "Nourriture", "montant": 30,
+                    "description": "Diner", "participant": "Ann A"})
+    return dm, ann, bob
+
+
+def test_renommer_un_payeur(pair):
+    dm, ann, _ = pair
+    balances, transfers = dm.get_settlement()
+    assert balances["Ann A"] == (3000, 2000, 1000)
+    assert transfers == [("Bob B", "Ann A", 1000)]
+
+    dm.update_participant(ann, dict(dm.get_participant(ann), prenom="Anna"))
+
+    # Pas de payeur fantome sous l'ancien nom
+    balances, transfers = dm.get_settlement()
+    assert set(balances) == {"Anna A", "Bob B"}
+    assert balances["Anna A"] == (3000, 2000, 1000)
+    assert transfers == [("Bob B", "Anna A", 1000)]
+    assert [d["participant"] for d in dm.get_depenses()] == ["Anna A"]
+    assert dm.get_split_rule()["poids"] == {"Anna A": "2", "Bob B": "1"}
+
+    # Une seule etape d'annulation
+    assert dm.undo()
+    balances, _ = dm.get_settlement()
+    assert set(balances) == {"Ann A", "Bob B"}
+    assert [d["participant"] for d in dm.get_depenses()] == ["Ann A"]
+    assert dm.get_split_rule()["poids"] == {"Ann A": "2", "Bob B": "1"}
+    dm.verify_aggregates()
+
+
+def test_homonyme_garde_les_depenses(pair):
+    dm, ann, _ = pair
+    # Un second "Ann A": les depenses a ce nom peuvent etre les siennes
+    dm.add_participant({"prenom": "Ann", "nom": "A"})
+    dm.update_participant(ann, dict(dm.get_participant(ann), prenom="Anna"))
+
+    assert [d["participant"] for d in dm.get_depenses()] == ["Ann A"]
+    assert "Ann A" in dm.get_split_rule()["poids"]
+
+
+def test_regle_relue_apres_transaction_annulee(pair):
+    dm, _, _ = pair
+
+    with pytest.raises(RuntimeError):
+        with dm.transaction():
+            dm.update_split_rule({"mode": "egal", "poids": {}})
+            # Regle gardee pendant la transaction (voir _checked_split_rule)
+            assert dm.get_settlement()[0]["Ann A"] == (3000, 1500, 1500)
+            raise RuntimeError("annulation")
+
+    assert dm.get_settlement()[0]["Ann A"] == (3000, 2000, 1000)
@@ -0,0 +1,151 @@
+"""
+test_shared_dir.py - Deux instances modifient le meme repertoire de donnees.
+
+Deux processus (comme deux personnes sur un dossier partage) partent des
+memes donnees, les modifient chacun de leur cote sans se synchroniser,
+puis sauvegardent l'un apres l'autre et integrent les modifications de
+l'autre (data_manager.sync_external_changes). Aucune modification ne
+doit etre perdue:
+- les depenses ajoutees en meme temps (meme ID) sont toutes presentes,
+  une seule fois, avec des IDs differents;
+- deux champs differents d'une meme activite, modifies chacun par une
+  instance, gardent les deux modifications;
+- un meme champ modifie des deux cotes est signale comme conflit et les
+  deux instances finissent avec la meme valeur;
+- les deux instances, et une nouvelle instance qui relit le repertoire,
+  voient exactement les memes donnees et des totaux corrects.
+
+Le scenario aleatoire a plusieurs instances reste dans
+benchmarks/stress_shared_dir.py.
+"""
+
+import multiprocessing
+
+import pytest
+
+
+def fingerprint(dm):
+    """
+    Resume comparable des donnees d'une instance.
+    """
+    return {
+        "depenses": sorted((d["id"], d.get("description"), d.get("montant"))
+                           for d in dm.get_depenses()),
+        "activites": sorted((a["id"], a.get("horaire"), a.get("prix"))
+                            for a in dm.get_activites()),
+        "checklist": sorted((c["id"], c.get("checked", False)) for c in dm.get_checklist()),
+    }
+
+
+def instance(directory, number, ids, barrier, results):
+    """
+    Une instance (processus): modifications sans synchronisation, puis
+    sauvegarde a son tour et integration des modifications de l'autre.
+
+    Args:
+        directory: Le repertoire de donnees commun
+        number: 0 ou 1
+        ids: IDs (activite modifiee par les deux, activite en conflit,
+            items de la checklist)
+        barrier: Barriere commune aux deux instances
+        results: File des resultats
+    """
+    import data_manager as dm
+    import events
+
+    dm._set_trip_paths(directory)
+    dm.load_data()
+    conflicts = []
+    events.subscribe(lambda batch: conflicts.extend(events.get_conflicts(batch)))
+    shared, disputed, items = ids
+
+    # Les deux instances partent des memes donnees
+    barrier.wait()
+    dm.add_depense({"date": "2025-09-16", "categorie": "Nourriture", "montant": 10 + number,
+                    "description": f"instance {number}", "participant": "Groupe"})
+    activite = dm.get_activite(shared)
+    if number == 0:
+        dm.update_activite(shared, dict(activite, horaire="09:00"))
+    else:
+        dm.update_activite(shared, dict(activite, prix=42))
+    dm.toggle_checklist_item(items[number])
+    dm.update_activite(disputed, dict(dm.get_activite(disputed), prix=5 + number))
+    barrier.wait()
+
+    # Sauvegardes l'une apres l'autre: la seconde integre la premiere
+    for turn in range(2):
+        if turn == number:
+            dm.save_data()
+        barrier.wait()
+
+    while dm.has_external_changes():
+        dm.sync_external_changes()
+    dm.save_data()
+    barrier.wait()
+    while dm.has_external_changes():
+        dm.sync_external_changes()
+
+    events.dispatch()
+    try:
+        dm.verify_aggregates()
+        totals_ok = True
+    except AssertionError:
+        totals_ok = False
+    results.put((number, len(conflicts), totals_ok, fingerprint(dm)))
+
+
+def test_deux_instances_sans_perte(trip, tmp_path):
+    dm = trip
+    shared, disputed = dm.add_activites([
+        {"date": "2025-09-16", "nom": "Rijksmuseum", "horaire": "10:00", "prix": 20},
+        {"date": "2025-09-17", "nom": "Croisiere", "horaire": "14:00", "prix": 15},
+    ])
+    items = dm.add_checklist_items([
+        {"item": "Passeport", "categorie": "Divers", "checked": False},
+        {"item": "Chargeur", "categorie": "Divers", "checked": False},
+    ])
+    dm.save_data()
+    directory = dm.DATA_DIR
+
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(2)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=instance,
+                             args=(directory, number, (shared, disputed, items), barrier, results))
+                 for number in range(2)]
+    for p in processes:
+        p.start()
+    try:
+        outcomes = sorted(results.get(timeout=120) for _ in processes)
+    finally:
+        for p in processes:
+            p.join(timeout=30)
+            if p.is_alive():
+                p.terminate()
+    assert all(p.exitcode == 0 for p in processes)
+
+    # Nouvelle lecture du repertoire (comme une troisieme instance)
+    dm.load_data()
+    reference = fingerprint(dm)
+    dm.verify_aggregates()
+
+    for number, _, totals_ok, data in outcomes:
+        assert totals_ok, f"totaux incorrects (instance {number})"
+        assert data == reference, f"l'instance {number} ne voit pas les memes donnees"
+
+    # Aucune depense perdue ni dupliquee, IDs renumerotes
+    descriptions = sorted(d for _, d, _ in reference["depenses"] if d.startswith("instance"))
+    assert descriptions == ["instance 0", "instance 1"]
+    depense_ids = [item_id for item_id, _, _ in reference["depenses"]]
+    assert len(set(depense_ids)) == len(depense_ids)
+
+    # Champs differents de la meme activite: les deux modifications restent
+    activites = {item_id: (horaire, prix) for item_id, horaire, prix in reference["activites"]}
+    assert activites[shared] == ("09:00", pytest.approx(42))
+
+    # Meme champ modifie des deux cotes: conflit signale, une seule valeur
+    assert activites[disputed][1] in (5, 6)
+    assert sum(count for _, count, _, _ in outcomes) >= 1
+
+    checklist = dict(reference["checklist"])
+    assert checklist[items[0]] and checklist[items[1]]
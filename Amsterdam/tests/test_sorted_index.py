@@ -0,0 +1,85 @@
+"""
+test_sorted_index.py - Ordres tries maintenus en blocs (sorted_index.py).
+
+Les insertions et suppressions aleatoires (avec des blocs petits pour
+provoquer decoupages et blocs vides) sont comparees a une liste triee:
+positions (bisect) et parcours dans les deux sens.
+"""
+
+import bisect
+import random
+
+import pytest
+
+import sorted_index
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """
+    Blocs de 4 cles: chaque test traverse de nombreux blocs.
+    """
+    monkeypatch.setattr(sorted_index, "CHUNK_SIZE", 4)
+
+
+def check(order, expected):
+    """
+    Compare un ordre a la liste triee attendue.
+    """
+    assert sorted_index.size(order) == len(expected)
+    assert list(sorted_index.iter_range(order)) == expected
+    assert all(chunk for chunk in order["chunks"])
+    assert order["maxes"] == [chunk[-1] for chunk in order["chunks"]]
+
+
+def test_insertions_et_suppressions(small_chunks):
+    rng = random.Random(1)
+    order = sorted_index.create()
+    expected = []
+
+    for step in range(2000):
+        if expected and rng.random() < 0.4:
+            key = expected.pop(rng.randrange(len(expected)))
+            sorted_index.remove(order, key)
+        else:
+            key = (rng.randrange(50), step)
+            sorted_index.insert(order, key)
+            bisect.insort(expected, key)
+        if step % 100 == 0:
+            check(order, expected)
+
+    check(order, expected)
+
+    # Retirer une cle absente ne change rien
+    sorted_index.remove(order, (999, 0))
+    sorted_index.remove(order, (-1, 0))
+    check(order, expected)
+
+
+def test_positions_et_parcours(small_chunks):
+    rng = random.Random(2)
+    expected = sorted((rng.randrange(30), i) for i in range(300))
+    order = sorted_index.create(expected)
+    check(order, expected)
+
+    for value in range(-1, 32):
+        assert sorted_index.bisect_left(order, (value,)) == bisect.bisect_left(expected, (value,))
+        assert sorted_index.bisect_right(order, (value, 10 ** 9)) == \
+            bisect.bisect_right(expected, (value, 10 ** 9))
+
+    for _ in range(200):
+        start = rng.randrange(-5, 310)
+        stop = rng.randrange(0, 310)
+        assert list(sorted_index.iter_range(order, start, stop)) == expected[max(start, 0):stop]
+        assert list(sorted_index.iter_range(order, start, stop, reverse=True)) == \
+            expected[max(start, 0):stop][::-1]
+
+
+def test_ordre_vide():
+    order = sorted_index.create()
+    assert sorted_index.size(order) == 0
+    assert list(sorted_index.iter_range(order)) == []
+    assert list(sorted_index.iter_range(order, reverse=True)) == []
+    assert sorted_index.bisect_left(order, (1,)) == 0
+    sorted_index.remove(order, (1, 1))
+    assert sorted_index.size(order) == 0